@@ -0,0 +1,371 @@
+# api.py
+"""
+REST API: POST /predict, POST /predict_batch, GET /labels, GET /health, GET /metrics.
+
+    uvicorn app.api:app --host 0.0.0.0 --port 8000
+
+/predict answers through the cascade of weak_supervision/cascade.py: the rules when
+they resolve to one class, else the end model (WS_END_MODEL) when it is confident
+enough (WS_CASCADE_THRESHOLD), else the zero-shot NLI model. `tier` says which one
+answered, `degraded` that a tier was skipped to stay within its latency budget
+(WS_TIER_BUDGET_MS); `zero_shot` is null unless the NLI model ran. The rules votes
+(lfs/keyword_lfs) are always returned; they come from the same scan as the rules tier.
+With WS_ZS_MODEL='' there is no zero-shot tier and the NLI model is never loaded. Model calls go through one MicroBatcher per
+model (app/batcher.py): requests arriving within WS_MAX_WAIT_MS of each other share
+one batched forward pass of up to WS_MAX_BATCH texts.
+
+/predict_batch takes a whole query log as the request body (JSON array, NDJSON/JSONL,
+CSV with a `text` column or plain lines; see app/bulk.py) and streams one NDJSON line
+per row back: {"index", "text"} + the /predict response. The body is read chunk by
+chunk (?chunk_size=, default 256 texts); every chunk goes through the same batcher
+while the next one is parsed, and nothing more is read while the client is not reading
+the response, so at most two chunks are in memory.
+
+Both endpoints go through a ResultCache (app/result_cache.py) keyed on the canonical
+query (NFC, casefold, collapsed whitespace): repeated queries skip the model and the
+rules. Its version is a hash of the models, cascade threshold, labels and taxonomy
+file, so a new model or taxonomy never serves old results. Degraded answers are not
+cached. Hit rate and hit / miss latency are reported under "cache" in /health, tier
+counts and costs under "cascade", seconds from import to ready under "startup_seconds"
+and the heavy imports / model loads behind them under "models" (model_registry.stats()).
+
+With WS_PROFILE=1 the hooks of weak_supervision/profiling.py are on in every worker and
+GET /metrics returns that worker's profile: per-tier calls / time ("serving"; "predict"
+hits = result-cache hits), scans and per-class hits of the keyword_lfs rules engines
+("regex") and zero-shot texts/s ("zero_shot", "zs_cache"). Without it /metrics only says
+{"enabled": false} and the request path pays one flag check per hook.
+
+Everything the workers only read (end model, taxonomy, label mapping, the zero-shot
+weights, the compiled rules of lfs/keyword_lfs) is loaded at most once per process by
+`preload()`; app/prefork.py calls it in a master process and forks the workers, which
+then share those pages copy-on-write. With WS_ARTIFACT the end model, labels and
+taxonomy come from one memory-mapped serving artifact (app/serving_artifact.py) instead.
+
+Environment:
+  WS_ZS_MODEL      NLI model (default joeddav/xlm-roberta-large-xnli, '' = no zero-shot tier)
+  WS_ZS_BACKEND    torch | onnx (int8 ONNX Runtime)
+  WS_ZS_THREADS    zero-shot model threads INTRA[:INTER] ('' = runtime default)
+  WS_ZS_CACHE      zero-shot score cache (sqlite path, '' = off)
+  WS_END_MODEL     end-model tier (see cascade.load_end_model; '' = rules -> zero-shot)
+  WS_CASCADE_THRESHOLD  end-model confidence needed to skip zero-shot (default 0.7)
+  WS_TIER_BUDGET_MS     per-tier latency budgets, e.g. rules:2,end_model:50,zero_shot:1000
+  WS_MAX_BATCH     max texts per model call (default 32)
+  WS_MAX_WAIT_MS   how long the first request of a batch waits for others (default 5)
+  WS_CACHE_SIZE    results kept per process (default 100000, 0 = off)
+  WS_CACHE_TTL     seconds a cached result stays valid (default 3600)
+  WS_CACHE_SHARED  SQLite file shared by all workers ('' = process cache only)
+  WS_MODEL_VERSION extra version tag, e.g. the end-model checkpoint
+  WS_MODEL_CACHE   local safetensors snapshots of the HF models (default cache/models)
+  WS_OFFLINE       1 = never download, serve only models already in WS_MODEL_CACHE
+  WS_ARTIFACT      serving artifact (end model + labels + taxonomy), overrides WS_END_MODEL
+  WS_PROFILE       1 = collect the /metrics profile
+"""
+import asyncio, hashlib, json, os, time
+_IMPORT_T0 = time.perf_counter()
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+import yaml
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from app.batcher import MicroBatcher
+from app.bulk import chunked, iter_texts
+from app.result_cache import ResultCache, canonical_query
+from lfs import keyword_lfs
+from lfs.keyword_lfs import LABELS, votes_dict
+from weak_supervision import model_registry, profiling
+from weak_supervision.cascade import Cascade, parse_budgets
+
+ZS_MODEL = os.environ.get("WS_ZS_MODEL", "joeddav/xlm-roberta-large-xnli")
+ZS_BACKEND = os.environ.get("WS_ZS_BACKEND", "torch")
+ZS_THREADS = os.environ.get("WS_ZS_THREADS", "")
+ZS_CACHE = os.environ.get("WS_ZS_CACHE", "")
+END_MODEL = os.environ.get("WS_END_MODEL", "")
+CASCADE_THRESHOLD = float(os.environ.get("WS_CASCADE_THRESHOLD", "0.7"))
+TIER_BUDGET_MS = parse_budgets(os.environ.get("WS_TIER_BUDGET_MS", ""))
+MAX_BATCH = int(os.environ.get("WS_MAX_BATCH", "32"))
+MAX_WAIT_MS = float(os.environ.get("WS_MAX_WAIT_MS", "5"))
+TAXONOMY = os.environ.get("WS_TAXONOMY", "config/taxonomy.yaml")
+CACHE_SIZE = int(os.environ.get("WS_CACHE_SIZE", "100000"))
+CACHE_TTL = float(os.environ.get("WS_CACHE_TTL", "3600"))
+CACHE_SHARED = os.environ.get("WS_CACHE_SHARED", "")
+MODEL_VERSION = os.environ.get("WS_MODEL_VERSION", "")
+ARTIFACT = os.environ.get("WS_ARTIFACT", "")
+MAX_CHUNK = 4096
+_SHARED: Dict = {}  # read-only serving state, filled once per process (see preload)
+
+
+class PredictRequest(BaseModel):
+    text: str
+
+
+def serving_artifact():
+    """The WS_ARTIFACT serving artifact (None when unset)."""
+    if "artifact" not in _SHARED:
+        art = None
+        if ARTIFACT:
+            from app.serving_artifact import open_artifact
+            art = open_artifact(ARTIFACT)
+            if art.labels != LABELS:
+                raise ValueError(f"{ARTIFACT} was built for labels {art.labels}, expected {LABELS}")
+        _SHARED["artifact"] = art
+    return _SHARED["artifact"]
+
+
+def taxonomy() -> Dict:
+    if "taxonomy" not in _SHARED:
+        art = serving_artifact()
+        tax = art.taxonomy if art is not None else {}
+        if art is None and os.path.exists(TAXONOMY):
+            with open(TAXONOMY, "r", encoding="utf-8") as f:
+                tax = yaml.safe_load(f) or {}
+        _SHARED["taxonomy"] = tax
+    return _SHARED["taxonomy"]
+
+
+def end_model():
+    """The end-model tier: from WS_ARTIFACT, else WS_END_MODEL; None = rules -> zero-shot."""
+    if "end_model" not in _SHARED:
+        art = serving_artifact()
+        model = art.end_model if art is not None else None
+        if model is None and END_MODEL:
+            from weak_supervision.cascade import load_end_model
+            model = load_end_model(END_MODEL, LABELS)
+        _SHARED["end_model"] = model
+    return _SHARED["end_model"]
+
+
+def preload(reload: bool = False):
+    """Load the shared read-only state up front: artifact, taxonomy, end model and the torch
+    weights of the NLI / encoder models (through model_registry). The ONNX backend is left
+    to each worker: an ONNX Runtime session owns thread pools that do not survive fork.
+    reload=True re-reads the artifact / taxonomy / end model (registry models stay)."""
+    if reload:
+        _SHARED.clear()
+    serving_artifact()
+    taxonomy()
+    model = end_model()
+    if ZS_MODEL and ZS_BACKEND == "torch":
+        model_registry.tokenizer(ZS_MODEL)
+        model_registry.nli_model(ZS_MODEL)
+    encoder = getattr(model, "encoder_name", None)
+    if encoder:
+        model_registry.tokenizer(encoder, "encoder")
+        model_registry.encoder_model(encoder)
+
+
+def process_memory() -> Dict:
+    """This process' memory in MB: rss, pss (shared pages split between their users), and
+    the private / shared part of rss (Linux /proc/self/smaps_rollup)."""
+    out = {"pid": os.getpid()}
+    try:
+        with open("/proc/self/smaps_rollup", "r") as f:
+            kb = {l.split(":")[0]: int(l.split()[1]) for l in f if l.split()[-1:] == ["kB"]}
+    except OSError:
+        return out
+    out.update({"rss_mb": kb.get("Rss", 0) / 1024, "pss_mb": kb.get("Pss", 0) / 1024,
+                "private_mb": (kb.get("Private_Clean", 0) + kb.get("Private_Dirty", 0)) / 1024,
+                "shared_mb": (kb.get("Shared_Clean", 0) + kb.get("Shared_Dirty", 0)) / 1024})
+    return out
+
+
+def zero_shot_fn():
+    """texts -> zero-shot probability rows over LABELS; one forward pass per batch of texts."""
+    from weak_supervision.zero_shot import ZeroShotEngine, parse_threads
+    from weak_supervision.zs_cache import ScoreCache
+    intra, inter = parse_threads(ZS_THREADS)
+    engine = ZeroShotEngine(ZS_MODEL, batch_size=MAX_BATCH * len(LABELS), backend=ZS_BACKEND,
+                            cache=ScoreCache(ZS_CACHE) if ZS_CACHE else None,
+                            intra_op_threads=intra, inter_op_threads=inter)
+
+    def fn(texts: List[str]) -> List[np.ndarray]:
+        return list(engine.scores(texts, LABELS))
+    return fn
+
+
+def end_model_fn():
+    """texts -> end-model probability rows over LABELS."""
+    model = end_model()
+
+    def fn(texts: List[str]) -> List[np.ndarray]:
+        return list(model.scores(texts))
+    return fn
+
+
+def model_version() -> str:
+    """Changes whenever the served predictions may change: models, threshold, labels, taxonomy."""
+    key = [ZS_MODEL, ZS_BACKEND, END_MODEL, str(CASCADE_THRESHOLD), "\x1e".join(LABELS), MODEL_VERSION]
+    h = hashlib.sha1("\x1f".join(key).encode("utf-8"))
+    if serving_artifact() is not None:
+        h.update(serving_artifact().version.encode("ascii"))
+    elif os.path.exists(TAXONOMY):
+        with open(TAXONOMY, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+
+async def _start_batcher(fn) -> MicroBatcher:
+    batcher = MicroBatcher(fn, max_batch_size=MAX_BATCH, max_wait_ms=MAX_WAIT_MS)
+    # load the weights before the first request instead of inside it
+    await asyncio.get_running_loop().run_in_executor(batcher.executor, batcher.fn, ["warm up"])
+    await batcher.start()
+    return batcher
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    profiling.instrument_engine(keyword_lfs.ENGINE, "keyword_lfs.RX")
+    profiling.instrument_engine(keyword_lfs.STRONG, "keyword_lfs.STRONG")
+    app.state.batcher = await _start_batcher(zero_shot_fn()) if ZS_MODEL else None
+    app.state.end_batcher = await _start_batcher(end_model_fn()) if end_model() is not None else None
+    app.state.cascade = Cascade(LABELS, threshold=CASCADE_THRESHOLD, budgets_ms=TIER_BUDGET_MS)
+    app.state.cache = ResultCache(CACHE_SIZE, CACHE_TTL, model_version(), shared_path=CACHE_SHARED or None)
+    app.state.startup_seconds = round(time.perf_counter() - _IMPORT_T0, 3)
+    yield
+    for b in (app.state.batcher, app.state.end_batcher):
+        if b is not None:
+            await b.stop()
+
+
+app = FastAPI(title="Video query intent", lifespan=lifespan)
+
+
+async def cascade_prediction(text: str) -> Dict:
+    cas: Cascade = app.state.cascade
+    t0 = time.perf_counter()
+    mask = keyword_lfs.hit_mask(text)
+    votes = votes_dict(text, mask)
+    ans = cas.rules(text, mask)
+    dt = time.perf_counter() - t0
+    cas.clock.observe("rules", dt)
+    profiling.record("serving", "rules", hits=ans is not None, seconds=dt)
+    zs = None
+    if ans is None:
+        best, skipped = None, False
+        for tier, batcher in (("end_model", app.state.end_batcher), ("zero_shot", app.state.batcher)):
+            if batcher is None:
+                continue
+            if not cas.clock.fits(tier, time.perf_counter() - t0):
+                skipped = True
+                continue
+            t1 = time.perf_counter()
+            p = await batcher.submit(text)
+            dt = time.perf_counter() - t1
+            cas.clock.observe(tier, dt)
+            final = tier == "zero_shot" or cas.confident(p)
+            profiling.record("serving", tier, hits=final, seconds=dt)
+            a = cas.from_scores(p, tier)
+            if tier == "zero_shot":
+                zs = {"label": a["label"], "score": a["proba"]}
+            if final:
+                ans = a
+                break
+            best = a
+        if ans is None:
+            ans = cas.fallback(best, skipped)
+    cas.clock.stats[ans["tier"]]["answered"] += 1
+    return {**ans, "votes": votes, "zero_shot": zs}
+
+
+async def _compute(text: str, key: str) -> Dict:
+    out = await cascade_prediction(text)
+    if not out["degraded"]:
+        app.state.cache.put(key, out)
+    return out
+
+
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+async def cached_prediction(text: str) -> Dict:
+    cache: ResultCache = app.state.cache
+    t0 = time.perf_counter()
+    key = canonical_query(text)
+    out = cache.get(key)
+    hit = out is not None
+    if not hit:
+        # concurrent misses of one key share a single model call
+        fut = _inflight.get(key)
+        if fut is None:
+            fut = _inflight[key] = asyncio.ensure_future(_compute(text, key))
+            fut.add_done_callback(lambda _: _inflight.pop(key, None))
+        out = await asyncio.shield(fut)
+    dt = time.perf_counter() - t0
+    cache.record_latency(hit, dt)
+    profiling.record("serving", "predict", hits=hit, seconds=dt)
+    return out
+
+
+@app.post("/predict")
+async def predict(req: PredictRequest) -> Dict:
+    return await cached_prediction(req.text)
+
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """A StreamingResponse whose body still reads the request. Starlette's disconnect
+    listener would compete with request.stream() for the request messages; a client
+    disconnect surfaces from request.stream() instead."""
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+
+
+async def _ndjson_chunk(texts: List[Optional[str]], start: int) -> str:
+    ok = [i for i, t in enumerate(texts) if t is not None]
+    preds = await asyncio.gather(*(cached_prediction(texts[i]) for i in ok))
+    rows = [{"index": start + i, "error": "missing text"} for i in range(len(texts))]
+    for i, p in zip(ok, preds):
+        rows[i] = {"index": start + i, "text": texts[i], **p}
+    return "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rows)
+
+
+@app.post("/predict_batch")
+async def predict_batch(request: Request, field: str = "text", chunk_size: int = 256) -> StreamingResponse:
+    texts = iter_texts(request.stream(), request.headers.get("content-type", ""), field)
+    chunks = chunked(texts, max(1, min(chunk_size, MAX_CHUNK)))
+
+    async def body():
+        pending, start = None, 0
+        try:
+            async for chunk in chunks:
+                task = asyncio.create_task(_ndjson_chunk(chunk, start))
+                start += len(chunk)
+                if pending is not None:
+                    yield await pending
+                pending = task
+            if pending is not None:
+                yield await pending
+                pending = None
+        except (ValueError, UnicodeDecodeError) as e:  # malformed body: results so far stay valid
+            if pending is not None:
+                yield await pending
+                pending = None
+            yield json.dumps({"index": start, "error": f"bad request body: {e}"}, ensure_ascii=False) + "\n"
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    return _DuplexStreamingResponse(body(), media_type="application/x-ndjson")
+
+
+@app.get("/labels")
+def labels() -> Dict:
+    tax = taxonomy()
+    return {"labels": tax.get("labels", LABELS), "aliases": tax.get("aliases", {})}
+
+
+@app.get("/health")
+def health() -> Dict:
+    return {"status": "ok", "model": ZS_MODEL, "batcher": app.state.batcher and app.state.batcher.stats,
+            "end_model_batcher": app.state.end_batcher and app.state.end_batcher.stats,
+            "cascade": app.state.cascade.metrics(), "cache": app.state.cache.metrics(),
+            "startup_seconds": app.state.startup_seconds, "models": model_registry.stats(),
+            "artifact": serving_artifact() and serving_artifact().version, "worker": process_memory()}
+
+
+@app.get("/metrics")
+def metrics() -> Dict:
+    return profiling.report() if profiling.enabled() else {"enabled": False, "pid": os.getpid()}
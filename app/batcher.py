@@ -0,0 +1,94 @@
+# batcher.py
+"""
+Dynamic micro-batching for the API: concurrent requests are coalesced into one model call.
+
+`submit(item)` puts (item, future) on an asyncio queue and awaits the future. A single
+background task takes the first waiting item, keeps collecting until `max_batch_size`
+items or `max_wait_ms` after the first one, runs `fn(items)` in a one-thread executor
+(so the event loop keeps accepting requests while the model runs) and fans the results
+back out to the futures. While a batch is running, new requests queue up and form the
+next batch, so under load batches fill up without waiting at all.
+
+`fn` takes a list of items and returns one result per item, in order. If it raises,
+every request of that batch gets the exception.
+"""
+import asyncio, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+
+
+class MicroBatcher:
+    def __init__(self, fn: Callable[[List[Any]], List[Any]], max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.fn = fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="batcher")
+        self.stats = {"requests": 0, "batches": 0, "max_batch": 0, "model_seconds": 0.0}
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._queue is not None and not self._queue.empty():
+            _, fut = self._queue.get_nowait()
+            if not fut.done():
+                fut.set_exception(RuntimeError("batcher stopped"))
+        self.executor.shutdown(wait=False)
+
+    async def submit(self, item: Any) -> Any:
+        if self._task is None:
+            raise RuntimeError("MicroBatcher.start() was not called")
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, fut))
+        return await fut
+
+    async def _collect(self) -> list:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [(item, fut) for item, fut in await self._collect() if not fut.done()]  # drop cancelled requests
+            if not batch:
+                continue
+            t0 = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(self.executor, self.fn, [item for item, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"batch fn returned {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            finally:
+                self.stats["requests"] += len(batch)
+                self.stats["batches"] += 1
+                self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+                self.stats["model_seconds"] += time.perf_counter() - t0
+            for (_, fut), r in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(r)
@@ -0,0 +1,133 @@
+# bulk.py
+"""
+Incremental parsing of /predict_batch request bodies: texts are yielded as the body streams in.
+
+The body format follows the Content-Type:
+  application/json                        a JSON array of strings or of objects with `field`
+  application/x-ndjson, application/jsonl one JSON object (or string) per line
+  text/csv                                CSV with a header row; column `field`
+  text/plain (or anything else)           one text per line
+
+Only the part of the body that has not been parsed yet is held, so memory does not depend
+on the upload size. `chunked` groups the texts into lists of at most `size`.
+"""
+import codecs, csv, json
+from typing import AsyncIterator, List, Optional
+
+
+def _pick(obj, field: str) -> Optional[str]:
+    if isinstance(obj, str):
+        return obj
+    if isinstance(obj, dict):
+        v = obj.get(field, obj.get("query") if field == "text" else None)
+        return None if v is None else str(v)
+    return None
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    dec = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buf = ""
+    async for chunk in chunks:
+        buf += dec.decode(chunk)
+        *lines, buf = buf.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buf += dec.decode(b"", final=True)
+    if buf:
+        yield buf.rstrip("\r")
+
+
+async def iter_json_array(chunks: AsyncIterator[bytes]) -> AsyncIterator[object]:
+    """Elements of a top-level JSON array, decoded one at a time as the bytes arrive."""
+    dec, text = json.JSONDecoder(), codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buf, pos, started, eof = "", 0, False, False
+    it = chunks.__aiter__()
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buf):
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError("expected a JSON array")
+                started, pos = True, pos + 1
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                obj, end = dec.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError("malformed JSON array") from None
+            else:
+                yield obj
+                pos = end
+                continue
+        elif eof:
+            if started:
+                raise ValueError("unterminated JSON array")
+            return
+        try:
+            more = text.decode(await it.__anext__())
+        except StopAsyncIteration:
+            more, eof = text.decode(b"", final=True), True
+        buf, pos = buf[pos:] + more, 0
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes], field: str = "text") -> AsyncIterator[Optional[str]]:
+    async for line in _lines(chunks):
+        if line.strip():
+            yield _pick(json.loads(line), field)
+
+
+async def iter_csv(chunks: AsyncIterator[bytes], field: str = "text") -> AsyncIterator[Optional[str]]:
+    # a quoted field may span lines: parse only groups of lines with balanced quotes
+    col, pending, quotes = None, [], 0
+    async for line in _lines(chunks):
+        pending.append(line + "\n")
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        for row in csv.reader(pending):
+            if col is None:
+                if field not in row:
+                    raise ValueError(f"CSV has no column {field!r}")
+                col = row.index(field)
+            elif row:
+                yield row[col] if col < len(row) else None
+        pending, quotes = [], 0
+    if pending:
+        raise ValueError("unterminated quoted CSV field")
+
+
+async def iter_plain(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    async for line in _lines(chunks):
+        if line.strip():
+            yield line
+
+
+async def iter_texts(chunks: AsyncIterator[bytes], content_type: str, field: str = "text") -> AsyncIterator[Optional[str]]:
+    """Texts of the body; None for array/NDJSON elements without a usable `field`."""
+    ct = (content_type or "").split(";")[0].strip().lower()
+    if ct == "application/json":
+        async for obj in iter_json_array(chunks):
+            yield _pick(obj, field)
+    elif ct in ("application/x-ndjson", "application/jsonl", "application/jsonlines", "application/x-jsonlines"):
+        async for t in iter_ndjson(chunks, field):
+            yield t
+    elif ct in ("text/csv", "application/csv"):
+        async for t in iter_csv(chunks, field):
+            yield t
+    else:
+        async for t in iter_plain(chunks):
+            yield t
+
+
+async def chunked(texts: AsyncIterator, size: int) -> AsyncIterator[List]:
+    batch = []
+    async for t in texts:
+        batch.append(t)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
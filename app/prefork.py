@@ -0,0 +1,152 @@
+# prefork.py
+"""
+Pre-fork serving: load once, fork N workers that share the loaded pages copy-on-write.
+
+    WS_ARTIFACT=artifacts/serving.wsa python -m app.prefork --workers 4 --port 8000
+
+`uvicorn --workers N` starts N fresh interpreters, each importing and loading everything
+again, so memory grows with N copies of the rules tables, taxonomy, end-model and NLI
+weights. Here the master process imports app.api, calls `api.preload()` (compiled
+rules, taxonomy, label mapping, end model / serving artifact, torch NLI weights), binds
+the listening socket and only then forks; every worker runs its own uvicorn server and
+event loop on the inherited socket (the kernel spreads the connections) and reads the
+master's pages without copying them. `gc.freeze()` before the fork moves the preloaded
+objects out of the collector's reach, so a collection in a worker does not write to
+(and thereby copy) their pages. Weights mapped from files (safetensors, the serving
+artifact) are shared through the page cache even across restarts of the master.
+
+The master only supervises: a worker that dies is re-forked from the preloaded state,
+so it is serving again in milliseconds. SIGTERM / SIGINT stop the workers and exit;
+SIGHUP re-runs the preload (e.g. after a new WS_ARTIFACT was written over the old one;
+models already in model_registry stay loaded) and replaces the workers one by one.
+
+Per-worker memory (rss / pss / private / shared MB) is in /health under "worker".
+Threads must not run in the master before the fork (they do not exist in the children),
+which is why the micro-batchers and the model warm-up start in each worker's lifespan.
+"""
+import argparse, gc, os, signal, socket, sys, time
+from typing import Dict
+
+
+class _Signal(Exception):
+    def __init__(self, signum: int):
+        super().__init__(signum)
+        self.signum = signum
+
+
+def _raise(signum, frame):
+    # raising is what interrupts os.waitpid (a handler that returns gets it retried, PEP 475)
+    raise _Signal(signum)
+
+
+def _serve(sock: socket.socket, args) -> None:
+    import uvicorn
+
+    config = uvicorn.Config("app.api:app", log_level=args.log_level, timeout_keep_alive=args.keep_alive)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def _fork_worker(sock: socket.socket, args) -> int:
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGHUP, signal.SIG_DFL)
+        code = 0
+        try:
+            _serve(sock, args)
+        except BaseException:  # noqa: BLE001 - report and leave the restart to the master
+            import traceback
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="0.0.0.0")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--backlog", type=int, default=2048)
+    ap.add_argument("--keep_alive", type=int, default=5)
+    ap.add_argument("--log_level", default="warning")
+    ap.add_argument("--max_restarts_per_min", type=int, default=30, help="give up when workers keep dying")
+    args = ap.parse_args()
+    # HF tokenizers: no Rust thread pool in the master, it would not survive the fork
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+    t0 = time.perf_counter()
+    from app import api
+    api.preload()
+    print(f"[1/2] Preloaded in {time.perf_counter() - t0:.1f}s: artifact={api.ARTIFACT or '-'} "
+          f"end_model={type(api.end_model()).__name__ if api.end_model() is not None else '-'} "
+          f"zero_shot={api.ZS_MODEL or '-'} ({api.ZS_BACKEND})", flush=True)
+
+    sock = socket.socket(socket.AF_INET6 if ":" in args.host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(args.backlog)
+    sock.set_inheritable(True)
+
+    gc.collect()
+    gc.freeze()
+    workers: Dict[int, float] = {}
+    for _ in range(args.workers):
+        workers[_fork_worker(sock, args)] = time.time()
+    print(f"[2/2] Master {os.getpid()} serving on {args.host}:{args.port} with {args.workers} workers "
+          f"{sorted(workers)}", flush=True)
+
+    for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+        signal.signal(sig, _raise)
+
+    restarts = []
+    while True:
+        try:
+            pid, status = os.waitpid(-1, 0)
+        except ChildProcessError:
+            break
+        except _Signal as s:
+            if s.signum != signal.SIGHUP:
+                break
+            gc.unfreeze()
+            api.preload(reload=True)
+            gc.collect()
+            gc.freeze()
+            for old in list(workers):
+                os.kill(old, signal.SIGTERM)
+                os.waitpid(old, 0)
+                del workers[old]
+                workers[_fork_worker(sock, args)] = time.time()
+            print(f"[✓] Reloaded (artifact {api.serving_artifact() and api.serving_artifact().version}), "
+                  f"workers {sorted(workers)}", flush=True)
+            continue
+        if pid not in workers:
+            continue
+        del workers[pid]
+        now = time.time()
+        restarts = [t for t in restarts if now - t < 60] + [now]
+        if len(restarts) > args.max_restarts_per_min:
+            print(f"[!] {len(restarts)} worker restarts within a minute, giving up", file=sys.stderr, flush=True)
+            break
+        workers[_fork_worker(sock, args)] = now
+        print(f"[!] Worker {pid} exited ({os.waitstatus_to_exitcode(status)}), restarted", file=sys.stderr, flush=True)
+
+    for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+        signal.signal(sig, signal.SIG_IGN)
+    for pid in workers:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    for pid in workers:
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# result_cache.py
+"""
+Result cache in front of the intent classifier, keyed on the canonical form of the query.
+
+Queries are head-heavy: the same query arrives over and over with different casing,
+spacing or Unicode composition (NFC vs NFD diacritics). `canonical_query` maps all of
+them to one key (NFC, casefold, collapsed whitespace); the first variant seen computes
+the result, the others reuse it.
+
+- In-process: an LRU of at most `max_entries` results; every entry expires `ttl_seconds`
+  after it was computed.
+- Shared (optional): a local SQLite file (`shared_path`) that several workers read and
+  write, same WAL / IMMEDIATE-transaction setup as weak_supervision/zs_cache.py. A miss in
+  the process LRU is looked up there before the model runs. Its row count is kept in a
+  one-row table by an insert trigger, so a put never scans the table; past `max_entries`
+  expired rows go first, then the least recently used ones (a shared hit refreshes
+  `last_used`, at most once per TOUCH_SECONDS per entry), down to 90% of the cap.
+- Every entry belongs to a `version` (hash of model + taxonomy, see api.model_version),
+  fixed for the lifetime of the cache: a reload (app/prefork.py, SIGHUP) forks new workers,
+  which build their cache under the new version. Shared entries of other versions are
+  never read and age out by TTL / LRU.
+
+`metrics()` reports hits (local / shared), misses, hit rate, evictions, and mean / p50 /
+p99 latency of the requests served from the cache vs by the model.
+"""
+import json, os, sqlite3, time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from weak_supervision.zs_cache import normalize_text
+
+LATENCY_WINDOW = 10_000  # latest requests kept per kind for the percentiles
+TOUCH_SECONDS = 60.0     # a shared hit rewrites last_used only when it is older than this
+
+
+def canonical_query(text: str) -> str:
+    """Cache key of a query: casefolded, NFC, whitespace collapsed."""
+    return normalize_text(str(text).casefold())
+
+
+class SharedStore:
+    """(version, key) -> JSON result with an absolute expiry time, in one SQLite file."""
+
+    def __init__(self, path: str, max_entries: int = 1_000_000, timeout: float = 30.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._conn = None
+        self._pid = None
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " version TEXT NOT NULL, k TEXT NOT NULL, v TEXT NOT NULL, expires REAL NOT NULL,"
+                " last_used REAL NOT NULL, PRIMARY KEY (version, k)) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_lru ON results(last_used)")
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("CREATE TABLE IF NOT EXISTS results_count ("
+                             " id INTEGER PRIMARY KEY CHECK (id = 0), n INTEGER NOT NULL)")
+                conn.execute("CREATE TRIGGER IF NOT EXISTS results_insert AFTER INSERT ON results"
+                             " BEGIN UPDATE results_count SET n = n + 1; END")
+                # counted once, for a file written before the counter existed
+                conn.execute("INSERT OR IGNORE INTO results_count SELECT 0, COUNT(*) FROM results")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get(self, version: str, key: str) -> Optional[Tuple[float, Any]]:
+        now = time.time()
+        db = self._db()
+        row = db.execute("SELECT v, expires, last_used FROM results WHERE version=? AND k=? AND expires>?",
+                         (version, key, now)).fetchone()
+        if row is None:
+            return None
+        if now - row[2] > TOUCH_SECONDS:
+            db.execute("UPDATE results SET last_used=? WHERE version=? AND k=?", (now, version, key))
+        return row[1], json.loads(row[0])
+
+    def put(self, version: str, key: str, value: Any, expires: float):
+        now = time.time()
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            # an upsert, not INSERT OR REPLACE: only new rows fire the counting trigger
+            db.execute("INSERT INTO results VALUES (?,?,?,?,?) ON CONFLICT (version, k) DO UPDATE"
+                       " SET v=excluded.v, expires=excluded.expires, last_used=excluded.last_used",
+                       (version, key, json.dumps(value, ensure_ascii=False), expires, now))
+            if self._count(db) > self.max_entries:
+                # expired rows first, then least recently used, down to 90% of the cap
+                db.execute("DELETE FROM results WHERE expires<=?", (now,))
+                drop = db.execute("SELECT COUNT(*) FROM results").fetchone()[0] - int(self.max_entries * 0.9)
+                if drop > 0:
+                    db.execute("DELETE FROM results WHERE (version, k) IN "
+                               "(SELECT version, k FROM results ORDER BY last_used LIMIT ?)", (drop,))
+                db.execute("UPDATE results_count SET n = (SELECT COUNT(*) FROM results)")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    @staticmethod
+    def _count(db: sqlite3.Connection) -> int:
+        return db.execute("SELECT n FROM results_count").fetchone()[0]
+
+    def __len__(self) -> int:
+        return self._count(self._db())
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = 100_000, ttl_seconds: float = 3600.0, version: str = "",
+                 shared_path: Optional[str] = None, shared_max_entries: int = 1_000_000):
+        self.max_entries = max(0, max_entries)
+        self.ttl = ttl_seconds
+        self.version = version
+        self.shared = SharedStore(shared_path, shared_max_entries) if shared_path else None
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()  # key -> (expires, result)
+        self._latency = {"hit": deque(maxlen=LATENCY_WINDOW), "miss": deque(maxlen=LATENCY_WINDOW)}
+        self.stats = {"hits": 0, "shared_hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        entry = self._data.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._data.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[1]
+            del self._data[key]
+            self.stats["expired"] += 1
+        if self.shared is not None:
+            found = self.shared.get(self.version, key)
+            if found is not None:
+                self._store(key, *found)
+                self.stats["shared_hits"] += 1
+                return found[1]
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key: str, value: Any):
+        expires = time.time() + self.ttl
+        self._store(key, expires, value)
+        if self.shared is not None:
+            self.shared.put(self.version, key, value, expires)
+
+    def _store(self, key: str, expires: float, value: Any):
+        if not self.max_entries:
+            return
+        self._data[key] = (expires, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def record_latency(self, hit: bool, seconds: float):
+        self._latency["hit" if hit else "miss"].append(seconds)
+
+    def metrics(self) -> Dict:
+        s = self.stats
+        hits = s["hits"] + s["shared_hits"]
+        total = hits + s["misses"]
+        out = dict(s, hit_rate=round(hits / total, 4) if total else 0.0, entries=len(self._data),
+                   max_entries=self.max_entries, ttl_seconds=self.ttl, version=self.version)
+        for kind, lat in self._latency.items():
+            if lat:
+                ms = 1000 * np.asarray(lat)
+                out[f"{kind}_latency_ms"] = {"mean": round(float(ms.mean()), 3),
+                                             "p50": round(float(np.percentile(ms, 50)), 3),
+                                             "p99": round(float(np.percentile(ms, 99)), 3)}
+        return out
@@ -0,0 +1,133 @@
+# serving_artifact.py
+"""
+Single-file serving artifact: label mapping, taxonomy and end-model weights in one
+memory-mappable file, so a (re)started API worker attaches to it instead of loading.
+
+    python -m app.serving_artifact --end_model artifacts/ngram_model --out artifacts/serving.wsa
+    WS_ARTIFACT=artifacts/serving.wsa python -m app.prefork --workers 4
+
+Layout:
+  b"WSART001" | uint64 header length | header (JSON, utf-8) | arrays, each 64-byte aligned
+header = {"version", "labels", "taxonomy", "end_model": null | {"kind", "meta", "arrays":
+          {name: {"dtype", "shape", "offset"}}}}
+
+`open_artifact` maps the file read-only and the weights are np.frombuffer views into the
+map: nothing is copied, every process serving the same file shares one copy in the page
+cache, and attaching costs a header parse. The file is written next to the target and
+renamed over it, so workers that still map the old one keep a consistent view.
+`version` is the sha1 of the whole content (used as the API result-cache version).
+"""
+import argparse, hashlib, json, mmap, os, struct
+from typing import Dict, Sequence
+
+import numpy as np
+import yaml
+
+from weak_supervision.end_model import EndModel
+from weak_supervision.ngram_model import HashedNgrams, NgramModel
+
+MAGIC = b"WSART001"
+ALIGN = 64
+
+
+def _end_model_arrays(model) -> Dict:
+    if isinstance(model, NgramModel):
+        return {"kind": "ngram", "arrays": {"weights": model.weights},
+                "meta": dict(model.meta, featurizer=model.featurizer.config())}
+    if isinstance(model, EndModel):
+        return {"kind": "embedding", "arrays": {"W": model.W, "b": model.b},
+                "meta": dict(model.meta, encoder=model.encoder_name)}
+    raise TypeError(f"cannot store {type(model).__name__} in a serving artifact")
+
+
+def build(out: str, labels: Sequence[str], taxonomy_path: str = "", end_model_dir: str = "") -> str:
+    """Write the artifact to `out`; returns its version."""
+    taxonomy = {}
+    if taxonomy_path and os.path.exists(taxonomy_path):
+        with open(taxonomy_path, "r", encoding="utf-8") as f:
+            taxonomy = yaml.safe_load(f) or {}
+    end = None
+    if end_model_dir:
+        model = NgramModel.load(end_model_dir) if NgramModel.exists(end_model_dir) else EndModel.load(end_model_dir)
+        if model.labels != list(labels):
+            raise ValueError(f"{end_model_dir} was trained on labels {model.labels}, expected {list(labels)}")
+        end = _end_model_arrays(model)
+
+    arrays, specs, offset = [], {}, 0
+    for name, a in (end["arrays"].items() if end else ()):
+        a = np.ascontiguousarray(a)
+        offset = -(-offset // ALIGN) * ALIGN
+        specs[name] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": offset}
+        arrays.append((offset, a))
+        offset += a.nbytes
+    digest = hashlib.sha1()
+    for _, a in arrays:
+        digest.update(a.tobytes())
+    header = {"labels": list(labels), "taxonomy": taxonomy,
+              "end_model": end and {"kind": end["kind"], "meta": end["meta"], "arrays": specs}}
+    digest.update(json.dumps(header, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    header["version"] = digest.hexdigest()[:16]
+
+    raw = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    data_start = -(-(len(MAGIC) + 8 + len(raw)) // ALIGN) * ALIGN
+    tmp = out + ".tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(raw)) + raw)
+        for off, a in arrays:
+            f.write(b"\0" * (data_start + off - f.tell()))
+            f.write(a.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, out)
+    return header["version"]
+
+
+class ServingArtifact:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a serving artifact")
+        (n,) = struct.unpack_from("<Q", self._mm, len(MAGIC))
+        start = len(MAGIC) + 8
+        header = json.loads(self._mm[start:start + n].decode("utf-8"))
+        self._data_start = -(-(start + n) // ALIGN) * ALIGN
+        self.version: str = header["version"]
+        self.labels = header["labels"]
+        self.taxonomy: Dict = header["taxonomy"]
+        self.end_model = self._end_model(header["end_model"]) if header["end_model"] else None
+
+    def _array(self, spec: Dict) -> np.ndarray:
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"]))
+        return np.frombuffer(self._mm, dtype=dtype, count=count,
+                             offset=self._data_start + spec["offset"]).reshape(spec["shape"])
+
+    def _end_model(self, spec: Dict):
+        arrays = {name: self._array(s) for name, s in spec["arrays"].items()}
+        meta = dict(spec["meta"])
+        if spec["kind"] == "ngram":
+            return NgramModel(arrays["weights"], self.labels, HashedNgrams(**meta.pop("featurizer")), meta)
+        return EndModel(arrays["W"], arrays["b"], self.labels, meta.pop("encoder"), meta)
+
+
+def open_artifact(path: str) -> ServingArtifact:
+    return ServingArtifact(path)
+
+
+def main():
+    from lfs.keyword_lfs import LABELS
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out", default="artifacts/serving.wsa")
+    ap.add_argument("--end_model", default="", help="train_end_model.py save dir (ngram or embedding)")
+    ap.add_argument("--taxonomy", default="config/taxonomy.yaml")
+    args = ap.parse_args()
+    version = build(args.out, LABELS, args.taxonomy, args.end_model)
+    print(f"[✓] {args.out} ({os.path.getsize(args.out) / 2**20:.1f} MB, version {version})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Throughput / latency of POST /predict (app/api.py) with and without micro-batching.
+
+For every (max_batch, max_wait_ms) setting a uvicorn server is started on a free port,
+--requests pool texts are sent with --concurrency requests in flight, and the
+throughput, p50 / p99 latency and the batcher's mean batch size are reported.
+max_batch=1 is the per-request baseline.
+
+Usage:
+  python benchmarks/bench_api_batching.py --model joeddav/xlm-roberta-large-xnli --settings 1:0 32:5
+"""
+import argparse, asyncio, json, os, socket, subprocess, sys, time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(port, model, backend, max_batch, max_wait_ms):
+    env = dict(os.environ, WS_ZS_MODEL=model, WS_ZS_BACKEND=backend,
+               WS_MAX_BATCH=str(max_batch), WS_MAX_WAIT_MS=str(max_wait_ms))
+    env["PYTHONPATH"] = os.pathsep.join([str(ROOT), env.get("PYTHONPATH", "")])
+    return subprocess.Popen([sys.executable, "-m", "uvicorn", "app.api:app", "--port", str(port), "--log-level", "warning"],
+                            cwd=ROOT, env=env)
+
+async def run_load(url, texts, concurrency):
+    import httpx
+    lat = []
+    sem = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=300, limits=limits) as c:
+        for _ in range(600):                                  # wait for the model to load
+            try:
+                if (await c.get("/health")).status_code == 200:
+                    break
+            except httpx.TransportError:
+                await asyncio.sleep(0.5)
+        stats0 = (await c.get("/health")).json()["batcher"]
+
+        async def one(t):
+            async with sem:
+                t0 = time.perf_counter()
+                r = await c.post("/predict", json={"text": t})
+                r.raise_for_status()
+                lat.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(t) for t in texts))
+        wall = time.perf_counter() - t0
+        stats = (await c.get("/health")).json()["batcher"]
+    batches = stats["batches"] - stats0["batches"]
+    return {"throughput_rps": len(texts) / wall, "p50_ms": 1000 * float(np.percentile(lat, 50)),
+            "p99_ms": 1000 * float(np.percentile(lat, 99)), "mean_batch": len(texts) / max(batches, 1)}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pool", default=str(ROOT / "data/processed/unlabeled_pool.csv"))
+    ap.add_argument("--model", default="joeddav/xlm-roberta-large-xnli")
+    ap.add_argument("--backend", default="torch", choices=["torch", "onnx"])
+    ap.add_argument("--requests", type=int, default=1000)
+    ap.add_argument("--concurrency", type=int, default=64)
+    ap.add_argument("--settings", nargs="+", default=["1:0", "32:5"], help="max_batch:max_wait_ms pairs")
+    ap.add_argument("--out", default=str(ROOT / "outputs/api_batching_bench.json"))
+    args = ap.parse_args()
+
+    texts = pd.read_csv(args.pool)["text"].dropna().astype(str).tolist()[:args.requests]
+    report = {"model": args.model, "requests": len(texts), "concurrency": args.concurrency, "runs": []}
+    print(f"[1/1] {len(texts)} requests, {args.concurrency} in flight, model={args.model}")
+    for s in args.settings:
+        max_batch, max_wait = s.split(":")
+        port = free_port()
+        proc = start_server(port, args.model, args.backend, int(max_batch), float(max_wait))
+        try:
+            r = asyncio.run(run_load(f"http://127.0.0.1:{port}", texts, args.concurrency))
+        finally:
+            proc.terminate()
+            proc.wait()
+        r.update(max_batch=int(max_batch), max_wait_ms=float(max_wait))
+        report["runs"].append(r)
+        print(f"  max_batch={max_batch:<3} wait={max_wait}ms  {r['throughput_rps']:.1f} req/s  "
+              f"p50={r['p50_ms']:.1f}ms p99={r['p99_ms']:.1f}ms  mean batch={r['mean_batch']:.1f}")
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print("[✓] Report:", args.out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Re-fit cost of the end model (weak_supervision/end_model.py) once the embeddings are stored.
+
+Synthetic [--rows, --dim] float16 embeddings are written to a memory-mapped file the way
+EmbeddingStore keeps them, with soft labels from a random linear teacher (sharpened by
+--temperature). For every min_conf threshold the model is re-fitted on the memmap and the
+fit time, training rows, iterations and agreement with the teacher are reported.
+
+Usage:
+  python benchmarks/bench_end_model.py --rows 100000 --dim 384 --min_conf 0 0.5 0.75 0.9
+"""
+import argparse, json, os, sys, tempfile, time
+from pathlib import Path
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT / "weak_supervision")]
+
+from end_model import EndModel
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--classes", type=int, default=8)
+    ap.add_argument("--temperature", type=float, default=0.5)
+    ap.add_argument("--min_conf", type=float, nargs="+", default=[0.0, 0.5, 0.75, 0.9])
+    ap.add_argument("--out", default=str(ROOT / "outputs/end_model_bench.json"))
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(42)
+    N, D, K = args.rows, args.dim, args.classes
+    teacher = rng.normal(size=(D, K)).astype(np.float32) / np.sqrt(D)
+    report = {"rows": N, "dim": D, "classes": K, "runs": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "emb.f16")
+        mm = np.memmap(path, dtype=np.float16, mode="w+", shape=(N, D))
+        Y = np.empty((N, K), dtype=np.float32)
+        for s in range(0, N, 65536):
+            x = rng.normal(size=(min(65536, N - s), D)).astype(np.float32)
+            x /= np.linalg.norm(x, axis=1, keepdims=True)
+            mm[s:s + len(x)] = x
+            z = (x @ teacher) * np.sqrt(D) / args.temperature
+            z = np.exp(z - z.max(axis=1, keepdims=True))
+            Y[s:s + len(x)] = z / z.sum(axis=1, keepdims=True)
+        mm.flush()
+        X = np.memmap(path, dtype=np.float16, mode="r", shape=(N, D))
+        y = Y.argmax(axis=1)
+        print(f"[1/2] {N} x {D} float16 embeddings ({N * D * 2 / 2**20:.0f} MB memmap), {K} classes")
+
+        print("[2/2] min_conf  rows     fit_s   iters  teacher_agreement")
+        for th in args.min_conf:
+            t0 = time.perf_counter()
+            model = EndModel.fit(X, Y, [str(k) for k in range(K)], min_conf=th)
+            sec = time.perf_counter() - t0
+            agree = float(np.mean(model.proba(X[:20000]).argmax(axis=1) == y[:20000]))
+            r = dict(model.meta, wall_seconds=sec, teacher_agreement=agree)
+            report["runs"].append(r)
+            print(f"  {th:<9g} {r['n_train']:<8} {sec:<7.2f} {r['iterations']:<6} {agree:.3f}")
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print("[✓] Report:", args.out)
+
+if __name__ == "__main__":
+    main()
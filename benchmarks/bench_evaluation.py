@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gold-set evaluation of many prediction sets with bootstrap CIs (weak_supervision/evaluation.py)
+against the per-set sklearn path the baseline scripts used before.
+
+--variants prediction sets are derived from the gold labels of --gold (each row flipped to a
+random other label with its own error rate, a few rows set to "UNK"), tiled to --rows. Both
+paths compute accuracy, macro-F1, the classification report and the confusion matrix of every
+set plus --n_boot bootstrap resamples of accuracy / macro-F1: sklearn once per set and per
+resample, evaluate() in one call. The point metrics of both paths must agree; the sklearn
+bootstrap is timed over --sk_boot resamples and extrapolated to --n_boot.
+
+Usage:
+  python benchmarks/bench_evaluation.py --variants 12 --n_boot 1000
+"""
+import argparse, json, os, sys, time
+from pathlib import Path
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT / "weak_supervision")]
+
+from evaluation import evaluate
+from table_io import read_table
+
+def sklearn_set(y_true, pred, labels, n_boot, rng):
+    from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, f1_score
+    out = {"accuracy": accuracy_score(y_true, pred),
+           "macro_f1": f1_score(y_true, pred, labels=labels, average="macro", zero_division=0),
+           "report": classification_report(y_true, pred, labels=labels, output_dict=True, zero_division=0),
+           "confusion_matrix": confusion_matrix(y_true, pred, labels=labels).tolist()}
+    for _ in range(n_boot):
+        i = rng.integers(0, len(y_true), len(y_true))
+        accuracy_score(y_true[i], pred[i])
+        f1_score(y_true[i], pred[i], labels=labels, average="macro", zero_division=0)
+    return out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--gold", default=str(ROOT / "data/processed/gold_label.csv"))
+    ap.add_argument("--variants", type=int, default=12)
+    ap.add_argument("--rows", type=int, default=0, help="tile the gold rows to this many (0 = as is)")
+    ap.add_argument("--n_boot", type=int, default=1000)
+    ap.add_argument("--sk_boot", type=int, default=50, help="sklearn resamples actually timed per set")
+    ap.add_argument("--out", default=str(ROOT / "outputs/evaluation_bench.json"))
+    args = ap.parse_args()
+
+    gold = read_table(args.gold).dropna(subset=["text", "label"])
+    labels = sorted(gold["label"].astype(str).unique())
+    y_true = gold["label"].astype(str).to_numpy()
+    if args.rows:
+        y_true = np.resize(y_true, args.rows)
+    rng = np.random.default_rng(0)
+    preds = {}
+    for v in range(args.variants):
+        p = y_true.copy()
+        flip = rng.random(len(p)) < 0.05 + 0.4 * v / max(args.variants, 1)
+        p[flip] = rng.choice(labels, flip.sum())
+        p[rng.random(len(p)) < 0.01] = "UNK"
+        preds[f"variant_{v}"] = p
+    print(f"[1/2] {args.variants} sets x {len(y_true)} rows, {len(labels)} labels, n_boot={args.n_boot}")
+
+    t0 = time.perf_counter()
+    res = evaluate(y_true, preds, labels, n_boot=args.n_boot, reference="variant_0")
+    fast_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    sk = {name: sklearn_set(y_true, p, labels, args.sk_boot, rng) for name, p in preds.items()}
+    sk_s = time.perf_counter() - t0
+    sk_est_s = sk_s * args.n_boot / max(args.sk_boot, 1)
+
+    worst = 0.0
+    for name in preds:
+        a, b = res[name], sk[name]
+        worst = max(worst, abs(a["accuracy"] - b["accuracy"]), abs(a["macro_f1"] - b["macro_f1"]),
+                    *(abs(a["report"][k][m] - b["report"][k][m]) for k in b["report"] if k != "accuracy"
+                      for m in ("precision", "recall", "f1-score")))
+        assert a["confusion_matrix"] == b["confusion_matrix"], name
+    print(f"[2/2] evaluate(): {fast_s:.3f}s  sklearn: ~{sk_est_s:.1f}s "
+          f"({args.sk_boot} resamples timed)  max |diff| {worst:.2e}")
+
+    report = {"variants": args.variants, "rows": len(y_true), "labels": len(labels), "n_boot": args.n_boot,
+              "evaluate_s": fast_s, "sklearn_est_s": sk_est_s, "speedup": sk_est_s / fast_s, "max_abs_diff": worst}
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[✓] {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fit time + gold accuracy of the label models on our pool:
+snorkel LabelModel (torch, 500 epochs) vs NumPy Dawid-Skene vs weighted majority vote.
+
+The LF matrix (+ an optional LLM column from --llm_model on --llm_frac of the rows) is
+built once; GOLD rows are matched by text. WMV learns its weights from gold, so it is
+scored with 2-fold cross-fitting over the gold rows (weights from one half, accuracy on
+the other). --scale N tiles the matrix to N rows to time the fits on a large pool
+(accuracy is only reported at the original size).
+
+Usage:
+  python benchmarks/bench_label_model.py --scale 2000000
+"""
+import argparse, json, os, sys, time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, f1_score
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT / "weak_supervision"), str(ROOT / "lfs")]
+
+from snorkel.labeling import PandasLFApplier
+from snorkel.labeling.model import LabelModel
+from snorkel_setup import ABSTAIN, LABELS, L2I
+from lfs_text import LFS
+from sparse_label_matrix import SparseLabelMatrix
+from np_label_model import DawidSkene, WeightedMajorityVote
+from table_io import read_table
+
+K = len(LABELS)
+
+def load_gold(path):
+    df = read_table(path)
+    df = df.dropna(subset=["text", "label"])
+    return df[df["label"].isin(LABELS)].reset_index(drop=True)
+
+def fit_snorkel(L):
+    lm = LabelModel(cardinality=K, verbose=False)
+    lm.fit(L.to_dense(), n_epochs=500, log_freq=50, seed=42, lr=1e-2, progress_bar=False)
+    return lambda: lm.predict_proba(L.to_dense())
+
+def fit_ds(L, chunk_size=None):
+    lm = DawidSkene(cardinality=K).fit(L, seed=42, chunk_size=chunk_size)
+    return lambda: lm.predict_proba(L, chunk_size=chunk_size)
+
+def scores(Y_prob, rows, y_true):
+    pred = Y_prob[rows].argmax(axis=1)
+    return {"accuracy": accuracy_score(y_true, pred),
+            "macro_f1": f1_score(y_true, pred, average="macro", labels=list(range(K)), zero_division=0)}
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pool", default=str(ROOT / "data/processed/unlabeled_pool.csv"))
+    ap.add_argument("--gold", default=str(ROOT / "data/processed/gold_label.csv"))
+    ap.add_argument("--llm_model", default="", help="add an NLI zero-shot column (e.g. joeddav/xlm-roberta-large-xnli)")
+    ap.add_argument("--llm_frac", type=float, default=0.2)
+    ap.add_argument("--scale", type=int, default=0, help="also time the fits on the matrix tiled to this many rows")
+    ap.add_argument("--chunk_size", type=int, default=200_000, help="Dawid-Skene E-step block size at --scale")
+    ap.add_argument("--out", default=str(ROOT / "outputs/label_model_bench.json"))
+    args = ap.parse_args()
+
+    pool = pd.read_csv(args.pool).dropna(subset=["text"]).reset_index(drop=True)
+    L = SparseLabelMatrix.from_dense(PandasLFApplier(LFS).apply(df=pool, progress_bar=False), [lf.name for lf in LFS])
+    if args.llm_model:
+        from llm_labeler_hf import hf_zero_shot_votes
+        votes = hf_zero_shot_votes(pool["text"].tolist(), model=args.llm_model, max_n=int(args.llm_frac * len(pool)))
+        L = L.with_column(np.array([votes[i] for i in range(len(pool))]), "llm")
+    row_of = {t: i for i, t in reversed(list(enumerate(pool["text"])))}
+    gold = load_gold(args.gold)
+    gold = gold[gold["text"].isin(row_of)]
+    rows = gold["text"].map(row_of).to_numpy()
+    y = gold["label"].map(L2I).to_numpy()
+    covered = L.n_votes()[rows] > 0
+    print(f"[1/2] pool={L.n_rows} votes={L.nnz} gold rows={len(rows)} (with >=1 vote: {int(covered.sum())})")
+
+    report = {"n_pool": L.n_rows, "n_votes": L.nnz, "n_gold": len(rows), "models": {}}
+    for name, fit in [("snorkel", fit_snorkel), ("dawid_skene", fit_ds)]:
+        predict, t_fit = timed(lambda: fit(L))
+        Y_prob = predict()
+        report["models"][name] = {"fit_seconds": t_fit, **scores(Y_prob, rows, y),
+                                  "covered": scores(Y_prob, rows[covered], y[covered])}
+    # WMV: 2-fold cross-fitting over the gold rows
+    fold = np.random.default_rng(42).random(len(rows)) < 0.5
+    pred = np.empty((len(rows), K))
+    t_fit = 0.0
+    for f in (True, False):
+        Y = np.full(L.n_rows, ABSTAIN)
+        Y[rows[fold == f]] = y[fold == f]
+        wmv, dt = timed(lambda: WeightedMajorityVote(cardinality=K).fit(L, Y))
+        t_fit += dt / 2
+        pred[fold != f] = wmv.predict_proba(L)[rows[fold != f]]
+    report["models"]["wmv"] = {"fit_seconds": t_fit, **scores(pred, np.arange(len(rows)), y),
+                               "covered": scores(pred, np.flatnonzero(covered), y[covered])}
+    for name, r in report["models"].items():
+        print(f"  {name:<12} fit={r['fit_seconds']:.3f}s acc={r['accuracy']:.4f} macroF1={r['macro_f1']:.4f} "
+              f"(covered: acc={r['covered']['accuracy']:.4f})")
+
+    if args.scale:
+        reps = int(np.ceil(args.scale / L.n_rows))
+        big = SparseLabelMatrix.vstack([L] * reps).rows(np.arange(args.scale))
+        print(f"[2/2] timing at {big.n_rows} rows ({big.nnz} votes)")
+        report["scale"] = {"n_rows": big.n_rows}
+        for name, fn in [("snorkel", lambda: fit_snorkel(big)()),
+                         ("dawid_skene", lambda: fit_ds(big, args.chunk_size)()),
+                         ("wmv", lambda: WeightedMajorityVote(cardinality=K).fit(big).predict_proba(big))]:
+            _, dt = timed(fn)
+            report["scale"][f"{name}_fit_predict_seconds"] = dt
+            print(f"  {name:<12} fit+predict={dt:.2f}s")
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print("[✓] Report:", args.out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+How much gold macro-F1 does each LLM-vote selection strategy buy per model call?
+
+For every (strategy, budget, rounds) the LLM column is filled with budgeted_llm_column,
+the LabelModel is fit on [LF matrix, LLM column] over the whole pool and its hard labels
+are scored against the GOLD rows (matched by text, as in eval_ws_on_gold.py). The
+LF-only LabelModel is the baseline; "f1_gain_per_1k_calls" = (macro-F1 - baseline) /
+calls * 1000. Zero-shot scores go through the ScoreCache, so the configurations share
+model work; the reported call counts are what a fresh run would pay.
+
+Usage:
+  python benchmarks/bench_llm_selection.py --llm_model joeddav/xlm-roberta-large-xnli --budgets 0.05,0.1,0.2
+"""
+import argparse, json, os, sys, time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from sklearn.metrics import f1_score
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT / "weak_supervision"), str(ROOT / "lfs")]
+
+from snorkel.labeling import PandasLFApplier
+from snorkel.labeling.model import LabelModel
+from snorkel_setup import LABELS, I2L
+from lfs_text import LFS
+from llm_labeler_hf import zero_shot_voter
+from llm_selection import STRATEGIES, budgeted_llm_column
+from table_io import read_table
+
+def load_gold(path):
+    df = read_table(path)
+    df = df.dropna(subset=["text", "label"])
+    return df[df["label"].isin(LABELS)].reset_index(drop=True)
+
+def gold_macro_f1(L, gold_rows, y_gold, seed=42):
+    lm = LabelModel(cardinality=len(LABELS), verbose=False)
+    lm.fit(L, n_epochs=500, log_freq=50, seed=seed, lr=1e-2, progress_bar=False)
+    pred = [I2L[i] for i in lm.predict_proba(L)[gold_rows].argmax(axis=1)]
+    return f1_score(y_gold, pred, average="macro", labels=LABELS, zero_division=0)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pool", default=str(ROOT / "data/processed/unlabeled_pool.csv"))
+    ap.add_argument("--gold", default=str(ROOT / "data/processed/gold_label.csv"))
+    ap.add_argument("--llm_labeler", default="nli", choices=["nli", "embed"])
+    ap.add_argument("--llm_model", default=None)
+    ap.add_argument("--zs_backend", default="torch", choices=["torch", "onnx"])
+    ap.add_argument("--budgets", default="0.05,0.1,0.2", help="comma-separated fractions of the pool")
+    ap.add_argument("--rounds", default="1,3", help="comma-separated round counts for the uncertainty strategy")
+    ap.add_argument("--out", default=str(ROOT / "outputs/llm_selection_report.json"))
+    args = ap.parse_args()
+
+    pool = pd.read_csv(args.pool).dropna(subset=["text"]).reset_index(drop=True)
+    texts = pool["text"].tolist()
+    row_of = {t: i for i, t in reversed(list(enumerate(texts)))}
+    gold = load_gold(args.gold)
+    gold = gold[gold["text"].isin(row_of)]
+    gold_rows = gold["text"].map(row_of).to_numpy()
+    y_gold = gold["label"].astype(str).tolist()
+    print(f"[1/2] pool={len(texts)} gold rows in pool={len(gold_rows)}")
+
+    L_lf = PandasLFApplier(LFS).apply(df=pool, progress_bar=False)
+    base = gold_macro_f1(L_lf, gold_rows, y_gold)
+    report = {"n_pool": len(texts), "n_gold": len(gold_rows), "llm_labeler": args.llm_labeler,
+              "lf_only_macro_f1": base, "runs": []}
+    print(f"  LF-only macro-F1={base:.4f}")
+
+    vote_fn = zero_shot_voter(texts, args.llm_labeler, model=args.llm_model, backend=args.zs_backend)
+    budgets = [float(b) for b in args.budgets.split(",") if b]
+    rounds = [int(r) for r in args.rounds.split(",") if r]
+    print("[2/2] strategies x budgets")
+    for frac in budgets:
+        budget = int(frac * len(texts))
+        for strategy in STRATEGIES:
+            for n_rounds in (rounds if strategy == "uncertainty" else [1]):
+                t0 = time.perf_counter()
+                col, log = budgeted_llm_column(L_lf, budget, vote_fn, strategy=strategy, rounds=n_rounds)
+                f1 = gold_macro_f1(np.hstack([L_lf, col.reshape(-1, 1)]), gold_rows, y_gold)
+                calls = sum(r["calls"] for r in log)
+                run = {"strategy": strategy, "budget_frac": frac, "rounds": n_rounds, "calls": calls,
+                       "gold_rows_voted": int((col[gold_rows] != -1).sum()), "macro_f1": f1,
+                       "f1_gain_per_1k_calls": (f1 - base) / calls * 1000 if calls else 0.0,
+                       "seconds": time.perf_counter() - t0, "rounds_log": log}
+                report["runs"].append(run)
+                print(f"  {strategy:<11} budget={frac:<5} rounds={n_rounds} calls={calls:<5} "
+                      f"macroF1={f1:.4f} gain/1k calls={run['f1_gain_per_1k_calls']:+.4f}")
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print("[✓] Report:", args.out)
+
+if __name__ == "__main__":
+    main()
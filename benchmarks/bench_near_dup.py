@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Near-duplicate collapsing of the pool (scripts/near_dup.py) at a few Jaccard thresholds:
+rows kept, collapse time, and whether the weak labels survive the collapse.
+
+For every threshold the LF matrix of the representatives is fit with Dawid-Skene, the
+labels are propagated to all members, and compared with a fit on the full pool:
+per-row agreement and total variation distance between the two label distributions.
+
+Usage:
+  python benchmarks/bench_near_dup.py --thresholds 0.6 0.7 0.8
+"""
+import argparse, json, os, sys, time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT / "scripts"), str(ROOT / "weak_supervision"), str(ROOT / "lfs")]
+
+from snorkel.labeling import PandasLFApplier
+from snorkel_setup import LABELS
+from lfs_text import LFS
+from sparse_label_matrix import SparseLabelMatrix
+from np_label_model import DawidSkene
+from near_dup import cluster_near_duplicates
+
+K = len(LABELS)
+
+def weak_labels(L):
+    return DawidSkene(cardinality=K).fit(L, seed=42).predict(L)
+
+def dist(y):
+    return np.bincount(y, minlength=K) / max(len(y), 1)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pool", default=str(ROOT / "data/processed/unlabeled_pool.csv"))
+    ap.add_argument("--thresholds", type=float, nargs="+", default=[0.6, 0.7, 0.8])
+    ap.add_argument("--shingle", type=int, default=1)
+    ap.add_argument("--num_perm", type=int, default=64)
+    ap.add_argument("--out", default=str(ROOT / "outputs/near_dup_bench.json"))
+    args = ap.parse_args()
+
+    texts = pd.read_csv(args.pool).dropna(subset=["text"])["text"].astype(str).tolist()
+    L = SparseLabelMatrix.from_dense(PandasLFApplier(LFS).apply(df=pd.DataFrame({"text": texts}), progress_bar=False),
+                                     [lf.name for lf in LFS])
+    y_full = weak_labels(L)
+    print(f"[1/2] pool={len(texts)} rows, {L.nnz} LF votes")
+
+    report = {"n_pool": len(texts), "shingle": args.shingle, "num_perm": args.num_perm, "runs": []}
+    print("[2/2] threshold  rows_kept  reduction  collapse_s  agreement  TV(full, propagated)")
+    for th in args.thresholds:
+        t0 = time.perf_counter()
+        cid = cluster_near_duplicates(texts, th, args.num_perm, args.shingle)
+        dt = time.perf_counter() - t0
+        reps = np.flatnonzero(cid == np.arange(len(texts)))
+        y_rep = np.empty(len(texts), dtype=np.int64)
+        y_rep[reps] = weak_labels(L.rows(reps))
+        y_prop = y_rep[cid]                           # every member takes its representative's label
+        r = {"threshold": th, "rows_kept": int(len(reps)), "reduction": 1 - len(reps) / len(texts),
+             "collapse_seconds": dt, "agreement": float((y_prop == y_full).mean()),
+             "tv_distance": float(0.5 * np.abs(dist(y_full) - dist(y_prop)).sum()),
+             "dist_full": dist(y_full).round(4).tolist(), "dist_propagated": dist(y_prop).round(4).tolist()}
+        report["runs"].append(r)
+        print(f"  {th:<9} {r['rows_kept']:<10} {r['reduction']:<10.1%} {dt:<11.2f} {r['agreement']:<10.4f} {r['tv_distance']:.4f}")
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print("[✓] Report:", args.out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Load time and inference latency of the hashed n-gram end model (weak_supervision/ngram_model.py).
+
+Uses a model saved by `train_end_model.py --kind ngram` (--model_dir) or, when there is none,
+random weights of the same shape (latency does not depend on the values). Reports the cold
+load (meta.json + memory-mapped weights) and the per-query latency of `scores` at every
+--batch size over real queries of --data.
+
+Usage:
+  python benchmarks/bench_ngram_model.py --model_dir artifacts/ngram_model --batch 1 32 1024
+"""
+import argparse, json, os, sys, tempfile, time
+from pathlib import Path
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT / "weak_supervision")]
+
+from ngram_model import HashedNgrams, NgramModel
+from table_io import read_table
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--model_dir", default=str(ROOT / "artifacts/ngram_model"))
+    ap.add_argument("--data", default=str(ROOT / "data/processed/unlabeled_pool.csv"))
+    ap.add_argument("--bits", type=int, default=18, help="random model only")
+    ap.add_argument("--batch", type=int, nargs="+", default=[1, 32, 1024])
+    ap.add_argument("--queries", type=int, default=5000, help="queries timed per batch size")
+    ap.add_argument("--out", default=str(ROOT / "outputs/ngram_model_bench.json"))
+    args = ap.parse_args()
+
+    texts = read_table(args.data)["text"].dropna().astype(str).tolist()
+    texts = (texts * (args.queries // max(len(texts), 1) + 1))[:args.queries]
+    with tempfile.TemporaryDirectory() as tmp:
+        model_dir = args.model_dir
+        if not NgramModel.exists(model_dir):
+            featurizer = HashedNgrams(args.bits)
+            W = np.random.default_rng(0).normal(size=(featurizer.n_features + 1, 8)).astype(np.float16)
+            NgramModel(W, [str(k) for k in range(8)], featurizer).save(tmp)
+            model_dir = tmp
+            print(f"[1/2] No model in {args.model_dir}; random weights, bits={args.bits}")
+        else:
+            print(f"[1/2] Model: {model_dir}")
+        t0 = time.perf_counter()
+        model = NgramModel.load(model_dir)
+        model.scores(["warm up"])
+        load_ms = 1000 * (time.perf_counter() - t0)
+        size_mb = os.path.getsize(os.path.join(model_dir, "ngram_model.npy")) / 2**20
+        print(f"    load + first query {load_ms:.1f} ms, weights {size_mb:.1f} MB ({model.weights.shape})")
+
+        report = {"model_dir": model_dir, "load_ms": load_ms, "weights_mb": size_mb, "queries": len(texts), "runs": []}
+        print("[2/2] batch  ms/query  queries/s")
+        for bs in args.batch:
+            t0 = time.perf_counter()
+            for s in range(0, len(texts), bs):
+                model.scores(texts[s:s + bs])
+            sec = time.perf_counter() - t0
+            r = {"batch": bs, "ms_per_query": 1000 * sec / len(texts), "qps": len(texts) / sec}
+            report["runs"].append(r)
+            print(f"  {bs:<6} {r['ms_per_query']:<9.4f} {r['qps']:.0f}")
+        del model
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print("[✓] Report:", args.out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Accuracy-parity + throughput report for the zero-shot backends on the GOLD set:
+torch fp32 vs ONNX Runtime fp32 vs ONNX Runtime int8 (dynamic quantization).
+
+Reports, per backend: accuracy / macro-F1 vs gold, top-1 agreement and max score
+difference vs torch, texts/s. Written as JSON so we can decide whether the quantized
+model is good enough for the label model.
+
+Usage:
+  python benchmarks/bench_onnx_zero_shot.py --model joeddav/xlm-roberta-large-xnli --threads 4
+"""
+import argparse, json, os, sys, time
+from pathlib import Path
+import numpy as np
+from sklearn.metrics import accuracy_score, f1_score
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from weak_supervision.zero_shot import ZeroShotEngine
+from weak_supervision.table_io import read_table
+
+LABELS = ["KIS","How-to","Music","News","Sports","Review","Entertainment","Other"]
+
+def load_gold(path):
+    df = read_table(path)
+    df = df.dropna(subset=["text", "label"])
+    return df[df["label"].isin(LABELS)].reset_index(drop=True)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--gold", default=str(ROOT / "data/processed/gold_label.csv"))
+    ap.add_argument("--model", default="joeddav/xlm-roberta-large-xnli")
+    ap.add_argument("--batch_size", type=int, default=64)
+    ap.add_argument("--threads", type=int, default=0, help="ONNX Runtime intra-op threads (0 = ORT default)")
+    ap.add_argument("--out", default=str(ROOT / "outputs/onnx_parity_report.json"))
+    args = ap.parse_args()
+
+    df = load_gold(args.gold)
+    texts = df["text"].astype(str).tolist()
+    y_true = df["label"].astype(str).tolist()
+
+    variants = [("torch_fp32", dict(backend="torch")),
+                ("onnx_fp32", dict(backend="onnx", quantize=False)),
+                ("onnx_int8", dict(backend="onnx", quantize=True))]
+    report = {"model": args.model, "n_gold": len(texts), "batch_size": args.batch_size, "backends": {}}
+    ref = None
+    for name, kw in variants:
+        eng = ZeroShotEngine(args.model, batch_size=args.batch_size, intra_op_threads=args.threads or None, **kw)
+        eng.scores(texts[:8], LABELS)  # load / export outside the timed run
+        t0 = time.perf_counter()
+        S = eng.scores(texts, LABELS)
+        dt = time.perf_counter() - t0
+        pred = [LABELS[k] for k in S.argmax(1)]
+        row = {"accuracy": accuracy_score(y_true, pred),
+               "macro_f1": f1_score(y_true, pred, average="macro", labels=LABELS, zero_division=0),
+               "texts_per_s": len(texts) / dt, "seconds": dt}
+        if ref is None:
+            ref = S
+        else:
+            row["top1_agreement_vs_torch"] = float((S.argmax(1) == ref.argmax(1)).mean())
+            row["max_abs_score_diff_vs_torch"] = float(np.abs(S - ref).max())
+            row["speedup_vs_torch"] = report["backends"]["torch_fp32"]["seconds"] / dt
+        report["backends"][name] = row
+        print(f"  {name:<11} acc={row['accuracy']:.4f} macroF1={row['macro_f1']:.4f} {row['texts_per_s']:8.1f} texts/s")
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print("[✓] Report:", args.out)
+
+if __name__ == "__main__":
+    main()
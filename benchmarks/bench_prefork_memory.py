@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Memory of N API workers: pre-fork (app/prefork.py) vs `uvicorn --workers N`.
+
+Starts each server with the current WS_* environment (e.g. WS_ZS_MODEL, WS_ARTIFACT),
+waits for /health, sends --requests /predict calls so every worker has warmed up, then
+sums rss / pss / private memory over the whole process tree (master + workers) from
+/proc/<pid>/smaps_rollup. pss counts shared pages once in total, so sum(pss) is what
+the N workers really cost; private is what each extra worker adds.
+
+Usage:
+  WS_ARTIFACT=artifacts/serving.wsa python benchmarks/bench_prefork_memory.py --workers 4
+"""
+import argparse, json, os, signal, subprocess, sys, time, urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+def tree(pid):
+    out = [pid]
+    try:
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tid}/children") as f:
+                for child in f.read().split():
+                    out += tree(int(child))
+    except OSError:
+        pass
+    return out
+
+def memory(pid):
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            kb = {l.split(":")[0]: int(l.split()[1]) for l in f if l.split()[-1:] == ["kB"]}
+    except OSError:
+        return None
+    return {"rss_mb": kb.get("Rss", 0) / 1024, "pss_mb": kb.get("Pss", 0) / 1024,
+            "private_mb": (kb.get("Private_Clean", 0) + kb.get("Private_Dirty", 0)) / 1024}
+
+def call(url, body=None, timeout=5.0):
+    req = urllib.request.Request(url, data=body and json.dumps(body).encode(),
+                                 headers={"content-type": "application/json"})
+    with urllib.request.urlopen(req, timeout=timeout) as r:
+        return json.loads(r.read())
+
+def measure(mode, args):
+    port = args.port
+    if mode == "prefork":
+        cmd = [sys.executable, "-m", "app.prefork", "--workers", str(args.workers), "--port", str(port)]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "app.api:app", "--workers", str(args.workers), "--port", str(port),
+               "--log-level", "warning"]
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    try:
+        base = f"http://127.0.0.1:{port}"
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError(f"{mode} server exited with {proc.returncode}")
+            if time.perf_counter() - t0 > args.timeout:
+                raise RuntimeError(f"{mode} server not healthy after {args.timeout}s")
+            try:
+                call(base + "/health", timeout=1.0)
+                break
+            except OSError:
+                time.sleep(0.5)
+        ready = time.perf_counter() - t0
+        pids = set()
+        for i in range(args.requests):
+            call(base + "/predict", {"text": f"query {i} review điện thoại"}, timeout=60.0)
+            pids.add(call(base + "/health")["worker"]["pid"])
+        procs = {p: memory(p) for p in tree(proc.pid)}
+        procs = {p: m for p, m in procs.items() if m}
+        total = {k: sum(m[k] for m in procs.values()) for k in ("rss_mb", "pss_mb", "private_mb")}
+        return {"mode": mode, "workers": args.workers, "ready_seconds": ready, "processes": len(procs),
+                "workers_answering": len(pids), **total}
+    finally:
+        os.killpg(proc.pid, signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--port", type=int, default=8799)
+    ap.add_argument("--requests", type=int, default=40)
+    ap.add_argument("--timeout", type=float, default=600)
+    ap.add_argument("--modes", nargs="+", default=["prefork", "uvicorn"], choices=["prefork", "uvicorn"])
+    ap.add_argument("--out", default=str(ROOT / "outputs/prefork_memory_bench.json"))
+    args = ap.parse_args()
+
+    runs = []
+    print(f"{'mode':<9} {'procs':>5} {'ready_s':>8} {'rss_mb':>9} {'pss_mb':>9} {'private_mb':>11}")
+    for mode in args.modes:
+        r = measure(mode, args)
+        runs.append(r)
+        print(f"{mode:<9} {r['processes']:>5} {r['ready_seconds']:>8.1f} {r['rss_mb']:>9.0f} {r['pss_mb']:>9.0f} "
+              f"{r['private_mb']:>11.0f}")
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"runs": runs}, f, ensure_ascii=False, indent=2)
+    print("[✓] Report:", args.out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hit rate of the API result cache (app/result_cache.py) on a head-skewed query stream.
+
+The stream draws pool texts with Zipf(--zipf) popularity and writes every query in a
+random surface form (upper/title case, extra spaces, NFD diacritics). For each cache
+size the hit rate with the canonical key is compared with keying on the raw text, and
+the cost of a lookup (in-process and through the shared SQLite store) is timed.
+
+Usage:
+  python benchmarks/bench_result_cache.py --queries 200000 --sizes 1000 10000 100000
+"""
+import argparse, json, os, sys, tempfile, time, unicodedata
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT)]
+
+from app.result_cache import ResultCache, canonical_query
+
+def variant(text, rng):
+    k = rng.integers(0, 5)
+    if k == 1:
+        return text.upper()
+    if k == 2:
+        return text.title()
+    if k == 3:
+        return "  " + text.replace(" ", "   ") + " "
+    if k == 4:
+        return unicodedata.normalize("NFD", text)
+    return text
+
+def replay(stream, size, key_fn, shared_path=None):
+    cache = ResultCache(size, ttl_seconds=1e9, version="bench", shared_path=shared_path)
+    t0 = time.perf_counter()
+    for q in stream:
+        k = key_fn(q)
+        if cache.get(k) is None:
+            cache.put(k, {"label": "KIS", "proba": 0.9})
+    sec = time.perf_counter() - t0
+    return cache.metrics()["hit_rate"], 1e6 * sec / len(stream)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pool", default=str(ROOT / "data/processed/unlabeled_pool.csv"))
+    ap.add_argument("--queries", type=int, default=200_000)
+    ap.add_argument("--zipf", type=float, default=1.1)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--shared_queries", type=int, default=20_000, help="stream prefix replayed through the SQLite store")
+    ap.add_argument("--out", default=str(ROOT / "outputs/result_cache_bench.json"))
+    args = ap.parse_args()
+
+    texts = pd.read_csv(args.pool)["text"].dropna().astype(str).drop_duplicates().tolist()
+    rng = np.random.default_rng(42)
+    ranks = rng.zipf(args.zipf, size=args.queries * 2)
+    ranks = ranks[ranks <= len(texts)][:args.queries] - 1
+    order = rng.permutation(len(texts))
+    stream = [variant(texts[order[r]], rng) for r in ranks]
+    distinct = len({canonical_query(q) for q in stream})
+    print(f"[1/2] {len(stream)} queries, {distinct} distinct canonical / {len(set(stream))} distinct raw")
+
+    report = {"queries": len(stream), "distinct_canonical": distinct, "distinct_raw": len(set(stream)), "runs": []}
+    print("[2/2] size      raw_hit  canonical_hit  us/lookup")
+    for size in args.sizes:
+        raw_hit, _ = replay(stream, size, lambda q: q)
+        hit, us = replay(stream, size, canonical_query)
+        report["runs"].append({"size": size, "raw_hit_rate": raw_hit, "canonical_hit_rate": hit, "us_per_lookup": us})
+        print(f"  {size:<9} {raw_hit:<8.3f} {hit:<14.3f} {us:.1f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sub = stream[:args.shared_queries]
+        hit, us = replay(sub, 0, canonical_query, shared_path=os.path.join(tmp, "results.sqlite"))
+    report["shared_store"] = {"queries": len(sub), "hit_rate": hit, "us_per_lookup": us}
+    print(f"  shared SQLite store only: hit={hit:.3f}  {us:.1f} us/lookup")
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print("[✓] Report:", args.out)
+
+if __name__ == "__main__":
+    main()
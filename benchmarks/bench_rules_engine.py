@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parity check + speed benchmark for the single-pass rules engine in lfs/keyword_lfs.py
+against the previous per-class implementation (7 RX searches + tie-break regexes).
+
+Usage:
+  python benchmarks/bench_rules_engine.py --repeat 5
+"""
+import argparse, csv, re, sys, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from lfs import keyword_lfs as kl
+
+
+# --- previous implementation, kept here as the reference ---------------------
+def legacy_votes_dict(q):
+    votes = {lab: 0 for lab in kl.LABELS}
+    if not isinstance(q, str):
+        return votes
+    for lab, rx in kl.RX.items():
+        if rx.search(q):
+            votes[lab] = 1
+    return votes
+
+def legacy_tie_break(q, matched):
+    t = q.lower()
+    if "Sports" in matched and "Review" in matched:
+        if kl.RX_SO_SANH_VS.search(t):
+            matched = [m for m in matched if m != "Sports"]
+        elif kl.RX_SPORTS_STRONG.search(t):
+            matched = [m for m in matched if m != "Review"]
+    if "Music" in matched and "KIS" in matched:
+        if kl.RX_EP_INDICATORS.search(t) and not kl.RX_MUSIC_STRONG.search(t):
+            matched = [m for m in matched if m != "Music"]
+        elif kl.RX_MUSIC_STRONG.search(t):
+            matched = [m for m in matched if m != "KIS"]
+    if "News" in matched and re.search(r"\bnews\b|thời\s*sự|bản\s*tin|tin\s*tức", t, re.I):
+        return "News"
+    if "Entertainment" in matched and len(matched) > 1:
+        spec = [m for m in matched if m != "Entertainment"]
+        if len(spec) == 1:
+            return spec[0]
+    if len(matched) == 1:
+        return matched[0]
+    return None
+
+def legacy_predict_rules_only(q, *, include_other=True):
+    v = legacy_votes_dict(q)
+    matched = [lab for lab, c in v.items() if c > 0]
+    if len(matched) == 0:
+        return "Other" if include_other else ""
+    if len(matched) == 1:
+        return matched[0]
+    tb = legacy_tie_break(q, matched)
+    if tb is not None:
+        return tb
+    return "Other" if include_other else ""
+# -----------------------------------------------------------------------------
+
+
+def read_texts(path):
+    # gold CSVs exported from Excel are not always UTF-8 (see load_gold in the baselines)
+    for enc in ("utf-8", "latin1"):
+        try:
+            with open(path, encoding=enc, newline="") as f:
+                return [r["text"] for r in csv.DictReader(f) if r.get("text")]
+        except UnicodeDecodeError:
+            continue
+
+def timeit(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pool", default=str(ROOT / "data/processed/unlabeled_pool.csv"))
+    ap.add_argument("--gold", default=str(ROOT / "data/processed/gold_label.csv"))
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    texts = read_texts(args.pool) + read_texts(args.gold)
+    print(f"[i] {len(texts)} texts")
+
+    # Parity: votes and labels must be identical
+    n_diff = 0
+    for t in texts:
+        if (legacy_votes_dict(t) != kl.votes_dict(t)
+                or legacy_predict_rules_only(t) != kl.predict_rules_only(t)
+                or legacy_predict_rules_only(t, include_other=False) != kl.predict_rules_only(t, include_other=False)):
+            n_diff += 1
+            if n_diff <= 10:
+                print("  !! mismatch:", repr(t))
+    if kl.predict_rules_only_batch(texts) != [legacy_predict_rules_only(t) for t in texts]:
+        n_diff += 1
+        print("  !! predict_rules_only_batch differs from per-text predictions")
+    print(f"[{'✓' if n_diff == 0 else '✗'}] parity: {n_diff} mismatches")
+
+    t_old = timeit(lambda: [legacy_predict_rules_only(t) for t in texts], args.repeat)
+    t_new = timeit(lambda: [kl.predict_rules_only(t) for t in texts], args.repeat)
+    t_batch = timeit(lambda: kl.predict_rules_only_batch(texts), args.repeat)
+    for name, t in [("legacy", t_old), ("engine", t_new), ("engine batch", t_batch)]:
+        print(f"  {name:<13} {t*1e3:8.2f} ms  {len(texts)/t:10.0f} texts/s  x{t_old/t:.2f}")
+    sys.exit(1 if n_diff else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cold-start time of every entry point (scripts, label-model / end-model jobs, the API).
+
+Each entry point runs --repeat times in a fresh interpreter under `python -X importtime`;
+the report has the best wall time and which heavy packages (torch, transformers, sklearn,
+matplotlib, ...) that path imported, so a heavy import creeping back into a light path
+shows up here. `--help` runs measure import cost only; the rules-only step3 run is a full
+offline run on the gold set. With --zs_model, a fresh process also loads that NLI model
+through weak_supervision/model_registry.py and reports the registry's import / load times.
+
+Usage:
+  python benchmarks/bench_startup.py --repeat 3 --zs_model joeddav/xlm-roberta-large-xnli
+"""
+import argparse, json, os, re, subprocess, sys, tempfile, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+HEAVY = ["torch", "transformers", "onnxruntime", "sklearn", "matplotlib", "scipy", "pandas", "pyarrow", "fastapi"]
+WS_PATH = os.pathsep.join([str(ROOT / "weak_supervision"), str(ROOT / "lfs"), str(ROOT)])
+
+ZS_PROBE = """
+import json, time
+t0 = time.perf_counter()
+import model_registry
+from zero_shot import ZeroShotEngine
+ZeroShotEngine({model!r}).predict(["warm up"], ["News", "Music"])
+print(json.dumps(dict(model_registry.stats(), first_prediction_seconds=time.perf_counter() - t0)))
+"""
+
+def entry_points(tmp, gold, zs_model):
+    eps = [
+        ("step3_submit_baselines --help", ["scripts/step3_submit_baselines.py", "--help"], str(ROOT)),
+        ("step3_submit_baselines rules-only", ["scripts/step3_submit_baselines.py", "--gold", gold,
+                                               "--outdir", os.path.join(tmp, "step3"), "--skip_zero_shot"], str(ROOT)),
+        ("02_run_baselines_8labels --help", ["scripts/02_run_baselines_8labels.py", "--help"], str(ROOT)),
+        ("05_run_baselines --help", ["scripts/05_run_baselines.py", "--help"], str(ROOT)),
+        ("07_cascade_report --help", ["scripts/07_cascade_report.py", "--help"], str(ROOT)),
+        ("run_label_model --help", ["weak_supervision/run_label_model.py", "--help"], WS_PATH),
+        ("train_end_model --help", ["weak_supervision/train_end_model.py", "--help"], WS_PATH),
+        ("app.api import", ["-c", "import app.api"], str(ROOT)),
+    ]
+    if zs_model:
+        eps.append((f"zero-shot first prediction ({zs_model})", ["-c", ZS_PROBE.format(model=zs_model)], WS_PATH))
+    return eps
+
+def heavy_imports(importtime_log: str):
+    # "import time:  self [us] | cumulative | <indent>package" -> top-level packages imported
+    names = {m.group(1).split(".")[0] for m in re.finditer(r"^import time:.*\|\s*([\w.]+)\s*$", importtime_log, re.M)}
+    return [h for h in HEAVY if h in names]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--gold", default=str(ROOT / "data/processed/gold_label.csv"))
+    ap.add_argument("--zs_model", default="", help="also time the first zero-shot prediction of this model")
+    ap.add_argument("--out", default=str(ROOT / "outputs/startup_bench.json"))
+    args = ap.parse_args()
+
+    report = {"python": sys.version.split()[0], "repeat": args.repeat, "entry_points": []}
+    print(f"{'entry point':<48} {'best_s':>7} {'mean_s':>7}  heavy imports")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, argv, pythonpath in entry_points(tmp, args.gold, args.zs_model):
+            env = dict(os.environ, PYTHONPATH=pythonpath)
+            times, log, out = [], "", ""
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                p = subprocess.run([sys.executable, "-X", "importtime"] + argv, cwd=ROOT, env=env,
+                                   capture_output=True, text=True)
+                times.append(time.perf_counter() - t0)
+                log, out = p.stderr, p.stdout
+                if p.returncode != 0:
+                    print(f"[!] {name} failed:\n{log[-2000:]}", file=sys.stderr)
+                    break
+            r = {"name": name, "argv": argv, "ok": p.returncode == 0, "best_seconds": min(times),
+                 "mean_seconds": sum(times) / len(times), "heavy_imports": heavy_imports(log)}
+            if argv[0] == "-c" and out.strip().startswith("{"):
+                r["registry"] = json.loads(out.strip().splitlines()[-1])
+            report["entry_points"].append(r)
+            print(f"{name:<48} {r['best_seconds']:>7.2f} {r['mean_seconds']:>7.2f}  {','.join(r['heavy_imports']) or '-'}")
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print("[✓] Report:", args.out)
+
+if __name__ == "__main__":
+    main()
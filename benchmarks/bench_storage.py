@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CSV vs Parquet vs Arrow IPC (weak_supervision/table_io.py) for a weak_labels_all-shaped table:
+write time, disk footprint, full load, projected load (text, ws_label) and a filtered
+load (ws_conf >= 0.75, text + ws_label only).
+
+Rows are the pool texts tiled to --rows (with a row number appended so they stay distinct),
+with seeded random labels / confidences.
+
+Usage:
+  python benchmarks/bench_storage.py --rows 1000000
+"""
+import argparse, json, os, shutil, sys, tempfile, time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT / "weak_supervision")]
+
+from snorkel_setup import LABELS
+from table_io import FORMATS, read_table, table_path, text_hash, write_table
+
+def disk_bytes(path):
+    if os.path.isdir(path):
+        return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+    return os.path.getsize(path)
+
+def timed(fn, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return out, best
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pool", default=str(ROOT / "data/processed/unlabeled_pool.csv"))
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--out", default=str(ROOT / "outputs/storage_bench.json"))
+    args = ap.parse_args()
+
+    base = pd.read_csv(args.pool)["text"].dropna().astype(str).tolist()
+    rng = np.random.default_rng(42)
+    texts = [f"{base[i % len(base)]} {i}" for i in range(args.rows)]
+    label_id = rng.integers(0, len(LABELS), size=args.rows)
+    df = pd.DataFrame({"text": texts, "text_hash": [text_hash(t) for t in texts], "ws_label_id": label_id,
+                       "ws_label": np.array(LABELS)[label_id], "ws_conf": np.round(rng.beta(5, 2, args.rows), 4)})
+    print(f"[1/2] {len(df)} rows")
+
+    tmp = tempfile.mkdtemp(prefix="bench_storage_")
+    report = {"n_rows": len(df), "formats": {}}
+    try:
+        print("[2/2] format   write_s   MB      load_s  text+ws_label_s  filtered_s")
+        for fmt in FORMATS:
+            path = table_path(tmp, "weak_labels_all", fmt)
+            _, t_write = timed(lambda: write_table(df, path), repeat=1)
+            full, t_full = timed(lambda: read_table(path))
+            _, t_proj = timed(lambda: read_table(path, columns=["text", "ws_label"]))
+            sub, t_filt = timed(lambda: read_table(path, columns=["text", "ws_label"], filters=[("ws_conf", ">=", 0.75)]))
+            assert len(full) == len(df) and (full["ws_label"].to_numpy() == df["ws_label"].to_numpy()).all()
+            r = {"write_seconds": t_write, "bytes": disk_bytes(path), "load_seconds": t_full,
+                 "projected_load_seconds": t_proj, "filtered_load_seconds": t_filt, "filtered_rows": len(sub)}
+            report["formats"][fmt] = r
+            print(f"  {fmt:<8} {t_write:<9.2f} {r['bytes'] / 2**20:<7.1f} {t_full:<7.3f} {t_proj:<16.3f} {t_filt:.3f}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    csv = report["formats"]["csv"]
+    for fmt in ("parquet", "arrow"):
+        r = report["formats"][fmt]
+        print(f"  {fmt} vs csv: {csv['bytes'] / r['bytes']:.1f}x smaller, "
+              f"{csv['projected_load_seconds'] / r['projected_load_seconds']:.1f}x faster text+ws_label load")
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print("[✓] Report:", args.out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parity check + speed benchmark: weak_supervision.zero_shot.ZeroShotEngine against
+one `pipeline("zero-shot-classification")` call per text (previous behaviour).
+
+Usage:
+  python benchmarks/bench_zero_shot.py --model joeddav/xlm-roberta-large-xnli --n 200 --batch_size 64
+"""
+import argparse, csv, sys, time
+from pathlib import Path
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from weak_supervision.zero_shot import ZeroShotEngine
+
+LABELS = ["KIS","How-to","Music","News","Sports","Review","Entertainment","Other"]
+
+def read_texts(path, n):
+    with open(path, encoding="utf-8", newline="") as f:
+        texts = [r["text"] for r in csv.DictReader(f) if r.get("text")]
+    return texts[:n]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pool", default=str(ROOT / "data/processed/unlabeled_pool.csv"))
+    ap.add_argument("--model", default="joeddav/xlm-roberta-large-xnli")
+    ap.add_argument("--n", type=int, default=200)
+    ap.add_argument("--batch_size", type=int, default=64)
+    args = ap.parse_args()
+
+    from transformers import pipeline
+    texts = read_texts(args.pool, args.n)
+
+    clf = pipeline("zero-shot-classification", model=args.model)
+    t0 = time.perf_counter()
+    ref = np.empty((len(texts), len(LABELS)), dtype=np.float32)
+    for i, t in enumerate(texts):
+        r = clf(t, candidate_labels=LABELS, multi_label=False)
+        for lab, p in zip(r["labels"], r["scores"]):
+            ref[i, LABELS.index(lab)] = p
+    t_ref = time.perf_counter() - t0
+
+    engine = ZeroShotEngine(args.model, batch_size=args.batch_size)
+    t0 = time.perf_counter()
+    S = engine.scores(texts, LABELS)
+    t_new = time.perf_counter() - t0
+
+    agree = float((S.argmax(1) == ref.argmax(1)).mean())
+    print(f"[i] {len(texts)} texts, model={args.model}")
+    print(f"  top-1 agreement   {agree:.4f}")
+    print(f"  max |score diff|  {np.abs(S - ref).max():.2e}")
+    print(f"  pipeline/text     {t_ref:8.2f} s  {len(texts)/t_ref:8.1f} texts/s")
+    print(f"  engine (bs={args.batch_size:<4}) {t_new:8.2f} s  {len(texts)/t_new:8.1f} texts/s  x{t_ref/t_new:.1f}")
+
+if __name__ == "__main__":
+    main()
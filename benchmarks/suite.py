@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite of the labeling pipeline on a seeded synthetic workload (benchmarks/workload.py).
+
+Cases (--cases, default all):
+  rules.keyword_hits / rules.rules_score      lfs/advanced_lfs.py, per query
+  rules.votes_dict / rules.predict_rules_only lfs/keyword_lfs.py, per query
+  lfs.apply                                   PandasLFApplier(lfs_text.LFS) per --lf_chunk rows (as sharded_labeling)
+  label_model.{wmv,dawid_skene}.{fit,predict} np_label_model on --rows rows, per run (--repeat)
+  label_model.snorkel.fit                     snorkel LabelModel on --snorkel_rows rows (skipped without snorkel)
+  zero_shot.nli                               ZeroShotEngine per --zs_batch queries (8 labels); --zs_model or a tiny
+                                              random BERT NLI built from the workload vocabulary (skipped without torch)
+
+Each case runs in its own interpreter, so "peak_rss_mb" (VmHWM) is that case's peak and
+imports of one case do not warm up another. Per case the report has items, seconds,
+throughput_per_s (items/s), p50_ms / p99_ms of the timed unit (one query, one chunk or one
+run: see "unit") and peak_rss_mb. The label-model matrix is the LF matrix of the first
+--lm_sample workload rows tiled to --rows (like bench_label_model.py --scale).
+
+--baseline compares with a stored report: a case regresses when its throughput drops or
+its p99 grows by more than --tolerance, or its peak RSS grows by more than
+--rss_tolerance; the regressions are listed and the exit status is 1.
+
+Usage:
+  python benchmarks/suite.py --rows 100000 --save_baseline benchmarks/baseline.json
+  python benchmarks/suite.py --rows 100000 --baseline benchmarks/baseline.json
+  python benchmarks/suite.py --rows 10000000 --cases rules.votes_dict label_model.dawid_skene.fit
+"""
+import argparse, json, os, platform, resource, shutil, subprocess, sys, tempfile, time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT), str(ROOT / "weak_supervision"), str(ROOT / "lfs")]
+
+from workload import LABELS, QueryWorkload
+
+NLI_LABELS = {0: "contradiction", 1: "neutral", 2: "entailment"}
+
+
+class Skip(Exception):
+    pass
+
+
+def per_query(fn):
+    def case(args, wl):
+        lat = np.empty(args.rows)
+        i, t_all = 0, 0.0
+        for texts, _ in wl.batches(args.rows):
+            t0 = time.perf_counter()
+            for t in texts:
+                t1 = time.perf_counter()
+                fn(t)
+                lat[i] = time.perf_counter() - t1
+                i += 1
+            t_all += time.perf_counter() - t0
+        return {"items": args.rows, "unit": "query", "seconds": t_all, "latencies": lat}
+    return case
+
+
+def case_keyword_hits(args, wl):
+    from lfs.advanced_lfs import keyword_hits
+    return per_query(keyword_hits)(args, wl)
+
+
+def case_rules_score(args, wl):
+    from lfs.advanced_lfs import rules_score
+    return per_query(rules_score)(args, wl)
+
+
+def case_votes_dict(args, wl):
+    from lfs.keyword_lfs import votes_dict
+    return per_query(votes_dict)(args, wl)
+
+
+def case_predict_rules_only(args, wl):
+    from lfs.keyword_lfs import predict_rules_only
+    return per_query(predict_rules_only)(args, wl)
+
+
+def lf_matrix(texts, chunk):
+    """LF matrix of texts + seconds per chunk of the PandasLFApplier."""
+    import pandas as pd
+    try:
+        from snorkel.labeling import PandasLFApplier
+        from lfs_text import LFS
+    except ImportError as e:
+        raise Skip(f"snorkel not installed ({e})")
+    from sparse_label_matrix import SparseLabelMatrix
+
+    applier, names = PandasLFApplier(LFS), [lf.name for lf in LFS]
+    parts, lat = [], []
+    for lo in range(0, len(texts), chunk):
+        t0 = time.perf_counter()
+        L = applier.apply(df=pd.DataFrame({"text": texts[lo:lo + chunk]}), progress_bar=False)
+        parts.append(SparseLabelMatrix.from_dense(L, names))
+        lat.append(time.perf_counter() - t0)
+    return SparseLabelMatrix.vstack(parts), np.array(lat)
+
+
+def case_lf_apply(args, wl):
+    n = min(args.rows, args.lf_rows)
+    texts = wl.texts(n)
+    _, lat = lf_matrix(texts, args.lf_chunk)
+    return {"items": n, "unit": f"chunk of {args.lf_chunk} rows", "seconds": float(lat.sum()), "latencies": lat}
+
+
+def workload_matrix(args, wl, n):
+    """LF matrix (+ labels) of the first --lm_sample rows, tiled to n rows."""
+    from sparse_label_matrix import SparseLabelMatrix
+    m = min(n, args.lm_sample)
+    texts, y = [], []
+    for t, yy in wl.batches(m):
+        texts += t
+        y.append(yy)
+    L, _ = lf_matrix(texts, 10_000)
+    y = np.concatenate(y)
+    reps = -(-n // m)
+    return SparseLabelMatrix.vstack([L] * reps).rows(np.arange(n)), np.tile(y, reps)[:n]
+
+
+def label_model_case(name, stage):
+    def case(args, wl):
+        from np_label_model import ABSTAIN, DawidSkene, WeightedMajorityVote
+        L, y = workload_matrix(args, wl, args.rows)
+        K = len(LABELS)
+        if name == "wmv":
+            Y = np.where(np.random.default_rng(args.seed).random(len(y)) < 0.1, y, ABSTAIN)  # 10% gold
+            fit = lambda: WeightedMajorityVote(cardinality=K).fit(L, Y)
+        else:
+            fit = lambda: DawidSkene(cardinality=K).fit(L, seed=args.seed, chunk_size=args.lm_chunk)
+        lat = []
+        model = None
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            if stage == "fit" or model is None:
+                model = fit()
+                if stage == "predict":
+                    t0 = time.perf_counter()
+            if stage == "predict":
+                Y_prob = model.predict_proba(L, chunk_size=args.lm_chunk)
+            lat.append(time.perf_counter() - t0)
+        out = {"items": L.n_rows, "unit": "run", "seconds": float(np.sum(lat)), "latencies": np.array(lat),
+               "throughput_per_s": L.n_rows / float(np.median(lat)), "votes": L.nnz}
+        if stage == "predict":
+            out["accuracy"] = float((Y_prob.argmax(axis=1) == y).mean())
+        return out
+    return case
+
+
+def case_snorkel_fit(args, wl):
+    try:
+        from snorkel.labeling.model import LabelModel
+    except ImportError as e:
+        raise Skip(f"snorkel not installed ({e})")
+    L, _ = workload_matrix(args, wl, min(args.rows, args.snorkel_rows))
+    dense = L.to_dense()
+    lat = []
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        LabelModel(cardinality=len(LABELS), verbose=False).fit(dense, n_epochs=500, seed=args.seed, lr=1e-2,
+                                                               progress_bar=False)
+        lat.append(time.perf_counter() - t0)
+    return {"items": L.n_rows, "unit": "run", "seconds": float(np.sum(lat)), "latencies": np.array(lat),
+            "throughput_per_s": L.n_rows / float(np.median(lat))}
+
+
+def build_tiny_nli(path, texts, seed=0):
+    """Random 2-layer BERT NLI (contradiction/neutral/entailment) with a word vocabulary of `texts`."""
+    try:
+        import torch
+        from transformers import BertConfig, BertForSequenceClassification, BertTokenizerFast
+        from transformers.utils import logging as hf_logging
+    except ImportError as e:
+        raise Skip(f"torch / transformers not installed ({e})")
+    from workload import strip_accents
+    words = set()
+    for t in texts + [f"This example is {lab}." for lab in LABELS]:
+        words.update("".join(c if c.isalnum() else " " for c in strip_accents(t.lower())).split())
+    chars = sorted({c for w in words for c in w})
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + sorted(words) + [f"##{c}" for c in chars]
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, "vocab.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(dict.fromkeys(vocab)) + "\n")
+    tok = BertTokenizerFast(vocab_file=os.path.join(path, "vocab.txt"), do_lower_case=True)
+    hf_logging.disable_progress_bar()
+    torch.manual_seed(seed)
+    config = BertConfig(vocab_size=tok.vocab_size, hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+                        intermediate_size=64, id2label=NLI_LABELS, label2id={v: k for k, v in NLI_LABELS.items()})
+    BertForSequenceClassification(config).save_pretrained(path, safe_serialization=True)
+    tok.save_pretrained(path)
+    return path
+
+
+def case_zero_shot(args, wl):
+    try:
+        from zero_shot import ZeroShotEngine
+        import torch  # noqa: F401
+    except ImportError as e:
+        raise Skip(f"torch / transformers not installed ({e})")
+    texts = wl.texts(args.zs_rows)
+    engine = ZeroShotEngine(args.zs_model, batch_size=64)
+    t0 = time.perf_counter()
+    engine.scores(texts[:args.zs_batch], LABELS)  # load + warm-up, not timed below
+    load = time.perf_counter() - t0
+    lat = []
+    for lo in range(0, len(texts), args.zs_batch):
+        t0 = time.perf_counter()
+        engine.scores(texts[lo:lo + args.zs_batch], LABELS)
+        lat.append(time.perf_counter() - t0)
+    return {"items": len(texts), "unit": f"batch of {args.zs_batch} queries", "seconds": float(np.sum(lat)),
+            "latencies": np.array(lat), "load_seconds": load, "model": args.zs_model}
+
+
+CASES = {
+    "rules.keyword_hits": case_keyword_hits,
+    "rules.rules_score": case_rules_score,
+    "rules.votes_dict": case_votes_dict,
+    "rules.predict_rules_only": case_predict_rules_only,
+    "lfs.apply": case_lf_apply,
+    "label_model.wmv.fit": label_model_case("wmv", "fit"),
+    "label_model.wmv.predict": label_model_case("wmv", "predict"),
+    "label_model.dawid_skene.fit": label_model_case("dawid_skene", "fit"),
+    "label_model.dawid_skene.predict": label_model_case("dawid_skene", "predict"),
+    "label_model.snorkel.fit": case_snorkel_fit,
+    "zero_shot.nli": case_zero_shot,
+}
+
+
+def peak_rss_mb() -> float:
+    # VmHWM starts over at exec; ru_maxrss would carry the parent's peak into the child
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_case(name, args):
+    """In the child: run one case, return its report entry."""
+    wl = QueryWorkload(args.seed, args.noise)
+    try:
+        r = CASES[name](args, wl)
+    except Skip as e:
+        return {"status": "skipped", "reason": str(e)}
+    lat = r.pop("latencies")
+    r.setdefault("throughput_per_s", r["items"] / r["seconds"] if r["seconds"] else 0.0)
+    r.update(status="ok", p50_ms=float(np.percentile(lat, 50) * 1e3), p99_ms=float(np.percentile(lat, 99) * 1e3),
+             peak_rss_mb=peak_rss_mb())
+    return r
+
+
+def spawn(name, args):
+    cmd = [sys.executable, os.path.abspath(__file__), "--_case", name, "--rows", str(args.rows),
+           "--seed", str(args.seed), "--noise", str(args.noise), "--repeat", str(args.repeat),
+           "--lf_rows", str(args.lf_rows), "--lf_chunk", str(args.lf_chunk), "--lm_sample", str(args.lm_sample),
+           "--lm_chunk", str(args.lm_chunk), "--snorkel_rows", str(args.snorkel_rows),
+           "--zs_rows", str(args.zs_rows), "--zs_batch", str(args.zs_batch), "--zs_model", args.zs_model]
+    p = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+    if p.returncode != 0:
+        return {"status": "error", "reason": (p.stderr.strip().splitlines() or ["?"])[-1]}
+    return json.loads(p.stdout.strip().splitlines()[-1])
+
+
+def compare(cases, baseline, tol, rss_tol):
+    """Regressions of `cases` against the baseline report's cases."""
+    out = []
+    for name, r in cases.items():
+        b = baseline.get("cases", {}).get(name)
+        if r.get("status") != "ok" or not b or b.get("status") != "ok":
+            continue
+        if r["items"] != b["items"]:
+            print(f"  [!] {name}: {r['items']} items vs {b['items']} in the baseline, compared anyway")
+        checks = [("throughput_per_s", r["throughput_per_s"] < b["throughput_per_s"] * (1 - tol)),
+                  ("p99_ms", r["p99_ms"] > b["p99_ms"] * (1 + tol)),
+                  ("peak_rss_mb", r["peak_rss_mb"] > b["peak_rss_mb"] * (1 + rss_tol))]
+        for metric, bad in checks:
+            if bad:
+                out.append({"case": name, "metric": metric, "baseline": b[metric], "current": r[metric],
+                            "change": r[metric] / b[metric] - 1 if b[metric] else float("inf")})
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cases", nargs="+", default=list(CASES), choices=list(CASES))
+    ap.add_argument("--rows", type=int, default=100_000, help="workload size (10k..10M)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--noise", type=float, default=0.3)
+    ap.add_argument("--repeat", type=int, default=3, help="runs of the label-model cases")
+    ap.add_argument("--lf_rows", type=int, default=50_000, help="cap on the rows of lfs.apply")
+    ap.add_argument("--lf_chunk", type=int, default=5_000)
+    ap.add_argument("--lm_sample", type=int, default=20_000, help="distinct rows behind the tiled label-model matrix")
+    ap.add_argument("--lm_chunk", type=int, default=200_000)
+    ap.add_argument("--snorkel_rows", type=int, default=100_000)
+    ap.add_argument("--zs_rows", type=int, default=512)
+    ap.add_argument("--zs_batch", type=int, default=32)
+    ap.add_argument("--zs_model", default="", help="NLI model (default: a tiny random one built for the run)")
+    ap.add_argument("--out", default=str(ROOT / "outputs/bench_suite.json"))
+    ap.add_argument("--baseline", default="", help="report to compare with; exit 1 on regressions")
+    ap.add_argument("--save_baseline", default="", help="also write this run as the baseline here")
+    ap.add_argument("--tolerance", type=float, default=0.15, help="allowed throughput drop / p99 growth")
+    ap.add_argument("--rss_tolerance", type=float, default=0.10, help="allowed peak RSS growth")
+    ap.add_argument("--_case", default="", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args._case:
+        print(json.dumps(run_case(args._case, args)))
+        return
+
+    tmp = None
+    if "zero_shot.nli" in args.cases and not args.zs_model:
+        tmp = tempfile.mkdtemp(prefix="tiny-nli-")
+        try:
+            args.zs_model = build_tiny_nli(tmp, QueryWorkload(args.seed, args.noise).texts(min(args.rows, 20_000)),
+                                           args.seed)
+        except Skip as e:
+            print(f"  [!] zero_shot.nli: {e}")
+    print(f"[1/2] {len(args.cases)} cases on {args.rows} synthetic rows (seed {args.seed})")
+    print(f"  {'case':<32} {'items':>9} {'unit':<22} {'items/s':>11} {'p50_ms':>9} {'p99_ms':>9} {'rss_mb':>7}")
+    cases = {}
+    try:
+        for name in args.cases:
+            r = cases[name] = spawn(name, args)
+            if r["status"] != "ok":
+                print(f"  {name:<32} {r['status']}: {r['reason']}")
+                continue
+            print(f"  {name:<32} {r['items']:>9} {r['unit']:<22} {r['throughput_per_s']:>11.1f} "
+                  f"{r['p50_ms']:>9.3f} {r['p99_ms']:>9.3f} {r['peak_rss_mb']:>7.0f}")
+    finally:
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+    if tmp and "zero_shot.nli" in cases:
+        cases["zero_shot.nli"].pop("model", None)  # temp dir, meaningless in the report
+
+    report = {"meta": {"rows": args.rows, "seed": args.seed, "noise": args.noise, "repeat": args.repeat,
+                       "python": platform.python_version(), "platform": platform.platform(),
+                       "cpus": os.cpu_count(), "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+              "cases": cases}
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(cases, baseline, args.tolerance, args.rss_tolerance)
+        report["regressions"] = regressions
+        print(f"[2/2] vs {args.baseline}: {len(regressions)} regression(s)")
+        for g in regressions:
+            print(f"  [!] {g['case']:<32} {g['metric']:<17} {g['baseline']:>11.3f} -> {g['current']:>11.3f} "
+                  f"({g['change']:+.1%})")
+    for path in filter(None, [args.out, args.save_baseline]):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    print("[✓] Report:", args.out)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Seeded synthetic query workload for the benchmarks (benchmarks/suite.py), 10k..10M rows.
+
+Rows come from the gen_synthetic templates of the pool builder (scripts/synthetic_queries.py)
+plus Entertainment / Other (caption-like, ads) templates, with a label mix close to a real
+pool and --noise of the rows perturbed the way real queries are (upper case, no accents,
+extra words in front / behind, a dropped character). Every row carries the label of its
+template. Batch i is drawn from np.random.default_rng((seed, i)): the same seed gives the
+same rows whatever the batch is read by, and a 10M-row workload is never in memory at once.
+
+Usage:
+  python benchmarks/workload.py --rows 10000000 --out data/synthetic/workload_10m.parquet
+"""
+import argparse, os, sys, time, unicodedata
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from synthetic_queries import TEMPLATES, SONGS, THINGS, TEAMS, TOPICS, SERIES, PRODS
+
+LABELS = ["KIS", "How-to", "Music", "News", "Sports", "Review", "Entertainment", "Other"]
+
+EXTRA_TEMPLATES = {
+    "Entertainment": ["{series} reaction", "funny {thing} challenge", "vlog {topic}", "podcast {topic}",
+                      "asmr unboxing {product}", "{team1} fans prank"],
+    "Other": ["a man is talking about {product}", "a woman is cooking in a kitchen", "people dancing at {topic}",
+              "{product} sale giảm giá", "cartoon characters from {series}", "a dog playing with a ball"],
+}
+LABEL_MIX = {"KIS": 0.14, "How-to": 0.14, "Music": 0.16, "News": 0.10, "Sports": 0.14, "Review": 0.12,
+             "Entertainment": 0.10, "Other": 0.10}
+PREFIXES = ["xem", "watch", "top 10", "video", "clip"]
+SUFFIXES = ["2024", "full hd", "mới nhất", "1080p", "#shorts", "hay nhất", "part 2"]
+
+_ACCENTS = {ord("đ"): "d", ord("Đ"): "D"}
+
+
+def strip_accents(t: str) -> str:
+    t = unicodedata.normalize("NFD", t.translate(_ACCENTS))
+    return "".join(c for c in t if not unicodedata.combining(c))
+
+
+class QueryWorkload:
+    def __init__(self, seed: int = 0, noise: float = 0.3, batch_size: int = 100_000,
+                 mix: Optional[Dict[str, float]] = None):
+        self.seed = seed
+        self.noise = noise
+        self.batch_size = batch_size
+        mix = mix or LABEL_MIX
+        self.templates: List[str] = []
+        self.template_label: List[int] = []
+        offsets, counts = [], []
+        for k, lab in enumerate(LABELS):
+            ts = TEMPLATES.get(lab, []) + EXTRA_TEMPLATES.get(lab, [])
+            offsets.append(len(self.templates))
+            counts.append(len(ts) if mix.get(lab, 0) > 0 else 0)
+            self.templates += ts
+            self.template_label += [k] * len(ts)
+        self._offsets = np.array(offsets)
+        self._counts = np.array(counts)
+        p = np.array([mix.get(lab, 0.0) if c else 0.0 for lab, c in zip(LABELS, counts)], dtype=float)
+        self._p = p / p.sum()
+
+    def batch(self, i: int, n: int) -> Tuple[List[str], np.ndarray]:
+        """Rows of batch i (n <= batch_size): texts and label ids (index into LABELS)."""
+        rng = np.random.default_rng((self.seed, i))
+        y = rng.choice(len(LABELS), size=n, p=self._p)
+        tpl = self._offsets[y] + (rng.random(n) * self._counts[y]).astype(np.int64)
+        song, thing, topic = (rng.integers(0, len(v), n) for v in (SONGS, THINGS, TOPICS))
+        team, series = rng.integers(0, len(TEAMS), n), rng.integers(0, len(SERIES), n)
+        prod, prod2 = rng.integers(0, len(PRODS), n), rng.integers(0, len(PRODS), n)
+        ep, season = rng.integers(1, 201, n), rng.integers(1, 11, n)
+        texts = [self.templates[tpl[r]].format(song=SONGS[song[r]], thing=THINGS[thing[r]], topic=TOPICS[topic[r]],
+                                               team1=TEAMS[team[r]][0], team2=TEAMS[team[r]][1],
+                                               series=SERIES[series[r]], product=PRODS[prod[r]],
+                                               product2=PRODS[prod2[r]], ep=ep[r], season=season[r])
+                 for r in range(n)]
+        noisy = np.flatnonzero(rng.random(n) < self.noise)
+        ops, pick, pos = rng.integers(0, 5, len(noisy)), rng.integers(0, 1 << 16, len(noisy)), rng.random(len(noisy))
+        for r, op, k, u in zip(noisy, ops, pick, pos):
+            t = texts[r]
+            if op == 0:
+                t = t.upper()
+            elif op == 1:
+                t = strip_accents(t)
+            elif op == 2:
+                t = f"{t} {SUFFIXES[k % len(SUFFIXES)]}"
+            elif op == 3:
+                t = f"{PREFIXES[k % len(PREFIXES)]} {t}"
+            else:
+                j = int(u * len(t))
+                t = t[:j] + t[j + 1:]
+            texts[r] = t
+        return texts, y
+
+    def batches(self, n_rows: int) -> Iterator[Tuple[List[str], np.ndarray]]:
+        for i, lo in enumerate(range(0, n_rows, self.batch_size)):
+            yield self.batch(i, min(self.batch_size, n_rows - lo))
+
+    def texts(self, n_rows: int) -> List[str]:
+        out: List[str] = []
+        for texts, _ in self.batches(n_rows):
+            out += texts
+        return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=10_000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--noise", type=float, default=0.3, help="fraction of perturbed rows")
+    ap.add_argument("--batch_size", type=int, default=100_000)
+    ap.add_argument("--out", default="data/synthetic/workload.csv", help=".csv / .parquet / .jsonl")
+    args = ap.parse_args()
+    from pool_stream import write_pool
+
+    wl = QueryWorkload(args.seed, args.noise, args.batch_size)
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    t0 = time.perf_counter()
+    rows = ({"text": t, "label": LABELS[k]} for texts, y in wl.batches(args.rows) for t, k in zip(texts, y))
+    n = write_pool(args.out, rows, ["text", "label"])
+    print(f"[✓] {n} rows -> {args.out} ({time.perf_counter() - t0:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
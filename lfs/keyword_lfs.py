@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 import re
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Iterable
+
+from lfs.rules_engine import RulesEngine
 
 LABELS = ["KIS","How-to","Music","News","Sports","Review","Entertainment","Other"]
 
@@ -21,35 +23,55 @@ RX_SO_SANH_VS = re.compile(r"so\s*sánh.*\bvs\b", re.I)
 RX_EP_INDICATORS = re.compile(r"\btập\s*\d+|\bepisode\b|\bep\.?\b|\bseason\b|\bphần\s*\d+|\bchapter\b|\bchương\b|\bvietsub\b", re.I)
 RX_MUSIC_STRONG = re.compile(r"\blyrics?\b|\bkaraoke\b|\bofficial\s+mv\b|\bmv\b|\bofficial\s+audio\b", re.I)
 RX_SPORTS_STRONG = re.compile(r"\b(highlight|highlights|full\s*match|goal|goals|world\s*cup|premier\s*league|champions\s*league|live\b)", re.I)
-
-def votes_dict(q: str) -> Dict[str, int]:
+RX_NEWS_STRONG = re.compile(r"\bnews\b|thời\s*sự|bản\s*tin|tin\s*tức", re.I)
+
+# Single-pass engines: one scan of q for the class hits, and (only when several
+# classes fire) one scan of q.lower() for the tie-break indicators.
+ENGINE = RulesEngine(RX)
+STRONG = RulesEngine({
+    "so_sanh_vs": RX_SO_SANH_VS,
+    "ep": RX_EP_INDICATORS,
+    "music_strong": RX_MUSIC_STRONG,
+    "sports_strong": RX_SPORTS_STRONG,
+    "news_strong": RX_NEWS_STRONG,
+})
+_SBIT = {name: 1 << i for i, name in enumerate(STRONG.names)}
+
+def hit_mask(q: str) -> int:
+    """Bitmask of the classes in RX that fire on q (bit i <-> ENGINE.names[i])."""
+    if not isinstance(q, str):
+        return 0
+    return ENGINE.scan(q)
+
+def votes_dict(q: str, mask: Optional[int] = None) -> Dict[str, int]:
+    """{label: 1 if its rules fire on q else 0}; mask = hit_mask(q) when the caller has it already."""
     votes = {lab: 0 for lab in LABELS}
-    if not isinstance(q, str): 
-        return votes
-    for lab, rx in RX.items():
-        if rx.search(q):
-            votes[lab] = 1
+    if mask is None:
+        mask = hit_mask(q)
+    for lab in ENGINE.names_of(mask):
+        votes[lab] = 1
     return votes
 
-def _tie_break(q: str, matched: List[str]) -> Optional[str]:
-    t = q.lower()
+def _tie_break(matched: List[str], strong: int) -> Optional[str]:
+    def has(name):
+        return bool(strong & _SBIT[name])
 
     # 1) Review vs Sports
     if "Sports" in matched and "Review" in matched:
-        if RX_SO_SANH_VS.search(t):
+        if has("so_sanh_vs"):
             matched = [m for m in matched if m != "Sports"]
-        elif RX_SPORTS_STRONG.search(t):
+        elif has("sports_strong"):
             matched = [m for m in matched if m != "Review"]
 
     # 2) Music vs KIS
     if "Music" in matched and "KIS" in matched:
-        if RX_EP_INDICATORS.search(t) and not RX_MUSIC_STRONG.search(t):
+        if has("ep") and not has("music_strong"):
             matched = [m for m in matched if m != "Music"]
-        elif RX_MUSIC_STRONG.search(t):
+        elif has("music_strong"):
             matched = [m for m in matched if m != "KIS"]
 
     # 3) News có pattern rõ ràng => ưu tiên News
-    if "News" in matched and re.search(r"\bnews\b|thời\s*sự|bản\s*tin|tin\s*tức", t, re.I):
+    if "News" in matched and has("news_strong"):
         return "News"
 
     # 4) Nếu còn nhiều nhãn đặc thù + "Entertainment", ưu tiên nhãn đặc thù
@@ -64,24 +86,52 @@ def _tie_break(q: str, matched: List[str]) -> Optional[str]:
 
     return None
 
-def predict_rules_only(q: str, *, include_other: bool = True) -> str:
+# Decision table indexed by (hit mask << len(STRONG.names)) | strong bits.
+# None means no match or still ambiguous.
+_SHIFT = len(STRONG.names)
+_TABLE: List[Optional[str]] = []
+for _mask in range(ENGINE.full_mask + 1):
+    _matched = ENGINE.names_of(_mask)
+    for _strong in range(STRONG.full_mask + 1):
+        if len(_matched) <= 1:
+            _TABLE.append(_matched[0] if _matched else None)
+        else:
+            _TABLE.append(_tie_break(_matched, _strong))
+del _mask, _matched, _strong
+
+def _resolve(q: str, mask: int) -> Optional[str]:
+    # Strong indicators only matter when at least two classes fire
+    strong = STRONG.scan(q.lower()) if mask & (mask - 1) else 0
+    return _TABLE[(mask << _SHIFT) | strong]
+
+def predict_rules_only(q: str, *, include_other: bool = True, mask: Optional[int] = None) -> str:
     """
     Return one of 8 labels. If ambiguous or no match:
       - include_other=True (default): return "Other"
       - include_other=False: return "" (blank)
+    mask: hit_mask(q) when the caller has it already.
     """
-    v = votes_dict(q)
-    matched = [lab for lab, c in v.items() if c > 0]
-
-    if len(matched) == 0:
+    if mask is None:
+        mask = hit_mask(q)
+    lab = _resolve(q, mask) if mask else None
+    if lab is None:
         return "Other" if include_other else ""
+    return lab
 
-    if len(matched) == 1:
-        return matched[0]
-
-    tb = _tie_break(q, matched)
-    if tb is not None:
-        return tb
-
-    # Still ambiguous
-    return "Other" if include_other else ""
+def predict_rules_only_batch(texts: Iterable, *, include_other: bool = True):
+    """
+    predict_rules_only over a list or pandas Series. Repeated texts are scanned
+    once. Returns a list, or a Series with the same index for Series input.
+    """
+    memo: Dict[str, str] = {}
+    out = []
+    for t in texts:
+        key = t if isinstance(t, str) else None
+        lab = memo.get(key)
+        if lab is None:
+            lab = predict_rules_only(t, include_other=include_other)
+            memo[key] = lab
+        out.append(lab)
+    if hasattr(texts, "index") and hasattr(texts, "map"):
+        return type(texts)(out, index=texts.index, name=getattr(texts, "name", None))
+    return out
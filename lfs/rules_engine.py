@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Single-pass regex engine: scan a text for several named patterns at once and
+return a bitmask of the patterns that occur anywhere in it.
+
+Two stages:
+  1) Literal prefilter. Every alternative of every pattern needs some literal
+     substring to match ("karaoke", "tập", "how", ...). These are extracted once
+     from the parsed patterns and checked with `in` against text.lower(); a class
+     whose literals are all absent cannot fire, and most texts stop here.
+  2) Combined scan. The candidate classes are merged into one alternation of
+     named groups. A search returns the leftmost hit among the classes still
+     missing, so after each hit we resume from the start of that match with the
+     hit class removed. This finds exactly the classes that `rx.search` would
+     find one by one.
+
+Both stages are exact: the result equals {name: bool(rx.search(text))}.
+"""
+import re
+from typing import Dict, List, Optional, Pattern, Set, Tuple
+
+try:  # Python >= 3.11
+    from re import _parser as _sre_parse
+    from re import _constants as _sre_const
+except ImportError:  # pragma: no cover
+    import sre_parse as _sre_parse
+    import sre_constants as _sre_const
+
+
+def _required_literals(items) -> Optional[Set[str]]:
+    """
+    A set of literal strings such that any match of `items` contains at least one
+    of them, or None if no such set can be derived.
+    """
+    best: Optional[Set[str]] = None
+
+    def keep(cand):
+        nonlocal best
+        if cand and (best is None or min(map(len, cand)) > min(map(len, best))):
+            best = cand
+
+    run = ""
+    for op, av in items:
+        if op is _sre_const.LITERAL:
+            run += chr(av)
+            continue
+        if run:
+            keep({run})
+            run = ""
+        if op is _sre_const.SUBPATTERN:
+            keep(_required_literals(av[-1]))
+        elif op is _sre_const.BRANCH:
+            alts = [_required_literals(b) for b in av[1]]
+            if all(alts):
+                keep(set().union(*alts))
+        elif op in (_sre_const.MAX_REPEAT, _sre_const.MIN_REPEAT) and av[0] >= 1:
+            keep(_required_literals(av[2]))
+    if run:
+        keep({run})
+    return best
+
+
+class RulesEngine:
+    def __init__(self, patterns: Dict[str, Pattern]):
+        if len(patterns) > 32:
+            raise ValueError("RulesEngine supports at most 32 patterns")
+        flags = {rx.flags for rx in patterns.values()}
+        if len(flags) != 1:
+            raise ValueError("All patterns must be compiled with the same flags")
+        self.names: List[str] = list(patterns)
+        self.full_mask = (1 << len(self.names)) - 1
+        self._flags = flags.pop()
+        self._sources = [rx.pattern for rx in patterns.values()]
+        self._combined: Dict[int, Pattern] = {}
+        self._build_prefilter()
+
+    def _build_prefilter(self):
+        lits: Dict[str, int] = {}
+        self._always = 0  # classes without usable literals: always scanned
+        for i, src in enumerate(self._sources):
+            req = _required_literals(_sre_parse.parse(src, self._flags))
+            if req is None:
+                self._always |= 1 << i
+                continue
+            for lit in req:
+                lit = lit.lower()
+                lits[lit] = lits.get(lit, 0) | 1 << i
+        # A literal containing a shorter one with the same classes adds nothing
+        # ("streaming" once "stream" is checked).
+        self._literals: List[Tuple[str, int]] = sorted(
+            (a, bits) for a, bits in lits.items()
+            if not any(b != a and b in a and bits & ~lits[b] == 0 for b in lits)
+        )
+
+        # text.lower() agrees with re.IGNORECASE matching except for a few
+        # characters (e.g. "İ", "ı", "ſ" against i/s); texts containing one of
+        # them skip the prefilter. Case equivalences of Latin letters are all in
+        # the BMP, so scanning it is enough.
+        chars = set("".join(lits))
+        if chars and self._flags & re.I:
+            cls = re.compile("[" + "".join(map(re.escape, sorted(chars))) + "]", self._flags)
+            bmp = "".join(map(chr, range(0x10000)))
+            unsafe = {c for c in cls.findall(bmp) if c.lower() not in chars}
+        else:
+            unsafe = set()
+        self._unsafe = re.compile("[" + "".join(map(re.escape, sorted(unsafe))) + "]") if unsafe else None
+
+    def _pattern(self, mask: int) -> Pattern:
+        """Combined alternation over the classes set in `mask` (compiled lazily)."""
+        rx = self._combined.get(mask)
+        if rx is None:
+            parts = [f"(?P<g{i}>{src})" for i, src in enumerate(self._sources) if mask >> i & 1]
+            rx = re.compile("|".join(parts), self._flags)
+            self._combined[mask] = rx
+        return rx
+
+    def candidates(self, text: str) -> int:
+        """Classes that may fire on `text` according to the literal prefilter."""
+        if self._unsafe is not None and not text.isascii() and self._unsafe.search(text):
+            return self.full_mask
+        low = text.lower() if self._flags & re.I else text
+        cand = self._always
+        for lit, bits in self._literals:
+            if lit in low:
+                cand |= bits
+        return cand
+
+    def scan(self, text: str) -> int:
+        """Bitmask of the patterns found in `text` (bit i <-> self.names[i])."""
+        remaining = self.candidates(text)
+        found, pos = 0, 0
+        while remaining:
+            m = self._pattern(remaining).search(text, pos)
+            if m is None:
+                break
+            bit = 1 << int(m.lastgroup[1:])
+            found |= bit
+            remaining &= ~bit
+            pos = m.start()
+        return found
+
+    def names_of(self, mask: int) -> List[str]:
+        return [n for i, n in enumerate(self.names) if mask >> i & 1]
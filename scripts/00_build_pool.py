@@ -3,26 +3,19 @@
 """
 Build an unlabeled text pool from MSR-VTT captions (text-only),
 optionally add simple synthetic queries via templates, then export a CSV for manual gold labeling.
-Requires: datasets, pandas
+Captions are streamed, filtered and deduped on the fly into a seeded sample of --sample
+texts (see pool_stream.py), so memory does not grow with the corpus.
+With --near_dup T, paraphrases (MinHash Jaccard >= T) are clustered as they stream in, before
+sampling, and only one representative per cluster is sampled (near_dup.py); the membership of
+the sampled clusters is written next to the pool as <pool>.clusters.<csv|parquet|arrow>;
+06_propagate_near_dup_labels.py copies the weak labels back to every member.
+Requires: datasets
 """
 
 import argparse, os, random
 from pathlib import Path
-import pandas as pd
-
-def load_msrvtt(config="train_9k"):
-    from datasets import load_dataset
-    print(f"  -> using MSR-VTT config = {config}")
-    ds = load_dataset("friedrichor/MSR-VTT", config, split="train")
-    
-    texts = []
-    for r in ds:
-        cap = r.get("caption", "")
-        if isinstance(cap, list):   # nếu caption là list thì nối từng phần tử
-            texts.extend([c for c in cap if isinstance(c, str)])
-        elif isinstance(cap, str):
-            texts.append(cap)
-    return texts
+from pool_stream import iter_msrvtt, filtered, DistinctReservoir, read_texts, write_csv, write_pool
+from near_dup import PoolDeduper
 
 def gen_synthetic(n=600):
     # Simple template-based synthetic queries (EN + VN)
@@ -53,18 +46,6 @@ def gen_synthetic(n=600):
     out = list(dict.fromkeys(out))
     return out[:n]
 
-def basic_filter(texts, min_len=3, max_len=80):
-    cleaned = []
-    for t in texts:
-        t = (t or "").strip()
-        if not t: 
-            continue
-        L = len(t.split())
-        if L < min_len or L > max_len:
-            continue
-        cleaned.append(t)
-    return cleaned
-
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--output_unlabeled", default="data/processed/unlabeled_pool.csv")
@@ -74,29 +55,49 @@ def main():
     ap.add_argument("--msrvtt_config", type=str, default="train_9k",
                     choices=["train_9k","train_7k","test_1k"],
                     help="Which MSR-VTT config to use")
+    ap.add_argument("--near_dup", type=float, default=0.0,
+                    help="collapse near-duplicates with MinHash/LSH at this Jaccard threshold (e.g. 0.7; 0 = off)")
+    ap.add_argument("--shingle", type=int, default=1, help="word n-gram size of the near-dup shingles")
+    ap.add_argument("--keep_texts", nargs="*", default=[],
+                    help="tables whose texts are always in the pool, outside the --sample draw "
+                         "(e.g. data/processed/gold_label.csv, so an existing gold set still matches the pool)")
     args = ap.parse_args()
 
     os.makedirs(Path(args.output_unlabeled).parent, exist_ok=True)
+    pinned = read_texts(args.keep_texts)
+    if pinned:
+        print(f"[0] Keeping {len(pinned)} texts of {', '.join(args.keep_texts)} in the pool")
+    sample = DistinctReservoir(args.sample, seed=42, pinned=pinned)  # filtered texts are deduped + sampled as they stream in
+    dedup = PoolDeduper(args.near_dup, args.shingle) if args.near_dup > 0 else None
+    if dedup:  # kept texts seed the near-dup clusters, so their paraphrases follow their labels
+        for _ in dedup.filter(pinned):
+            pass
 
-    print("[1/3] Loading MSR-VTT captions (text-only)...")
-    msr_texts = load_msrvtt(args.msrvtt_config)
-    print(f"  -> got {len(msr_texts)} captions")
+    def keep(texts):  # with --near_dup only cluster representatives reach the sampler
+        texts = filtered(texts, 3, 80)
+        return dedup.filter(texts) if dedup else texts
+
+    print("[1/3] Streaming MSR-VTT captions (text-only)...")
+    print(f"  -> using MSR-VTT config = {args.msrvtt_config}")
+    sample.extend(keep(iter_msrvtt(args.msrvtt_config)))
+    print(f"  -> {sample.seen} captions passed the filter")
 
     print("[2/3] Adding simple synthetic queries...")
     syn = gen_synthetic(args.synthetic)
+    sample.extend(keep(syn))
     print(f"  -> added {len(syn)} synthetic")
 
-    pool = list(dict.fromkeys(msr_texts + syn))  # dedupe, preserve order
-    pool = basic_filter(pool, 3, 80)
-    if len(pool) > args.sample:
-        random.seed(42)
-        pool = random.sample(pool, args.sample)
-
-    pd.DataFrame({"text": pool}).to_csv(args.output_unlabeled, index=False, encoding="utf-8")
-    print(f"[✓] Saved unlabeled pool to {args.output_unlabeled} (n={len(pool)})")
+    pool = sample.sample()
+    if dedup:
+        dedup.write_sidecar(pool, args.output_unlabeled)
+    write_pool(args.output_unlabeled, ({"text": t} for t in pool), ["text"])  # .csv / .parquet / .arrow
+    print(f"[✓] Saved unlabeled pool to {args.output_unlabeled} (n={len(pool)}, from {sample.seen} filtered texts{' (cluster representatives)' if dedup else ''})")
 
-    gold = random.sample(pool, min(300, len(pool)))
-    pd.DataFrame({"text": gold, "label": ""}).to_csv(args.export_gold_template, index=False, encoding="utf-8")
+    kept = set(pinned)  # kept texts are labeled already
+    fresh = [t for t in pool if t not in kept]
+    random.seed(42)
+    gold = random.sample(fresh, min(300, len(fresh)))
+    write_csv(args.export_gold_template, ({"text": t, "label": ""} for t in gold), ["text", "label"])
     print(f"[✓] Exported gold template to {args.export_gold_template} (fill 'label' with one of: KIS, How-to, Music, News, Sports, Review)")
 
 if __name__ == "__main__":
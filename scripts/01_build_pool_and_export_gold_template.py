@@ -1,136 +1,124 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-Build an unlabeled text pool (MSR-VTT captions + synthetic and/or TVR queries),
+Build an unlabeled text pool (MSR-VTT captions + synthetic and/or TVR queries / query logs),
 then export a GOLD template with configurable size (default 600).
 
+All sources are streamed, filtered and deduped on the fly into a seeded sample of
+--sample texts (see pool_stream.py): memory is bounded by --sample, not by the corpus.
+With --near_dup T, paraphrases (MinHash Jaccard >= T) are clustered as they stream in, before
+sampling, and only one representative per cluster is sampled (near_dup.py); the membership of
+the sampled clusters is written next to the pool as <pool>.clusters.<csv|parquet|arrow>;
+06_propagate_near_dup_labels.py copies the weak labels back to every member.
+
 Examples:
   ONLINE:
     python scripts/01_build_pool_and_export_gold_template.py \
-      --output_unlabeled data/unlabeled_pool.csv \
-      --export_gold_template data/gold_label_template.csv \
+      --output_unlabeled data/processed/unlabeled_pool.csv \
+      --export_gold_template data/processed/gold_label_template.csv \
       --synthetic 800 --sample 8000 --gold_size 600
 
   OFFLINE (synthetic only):
     python scripts/01_build_pool_and_export_gold_template.py \
       --offline_only --synthetic 4000 --sample 8000 --gold_size 600
+
+  KEEP AN EXISTING GOLD SET (its texts are in the pool whatever the seeded draw picks;
+  the template is drawn from the other texts):
+    python scripts/01_build_pool_and_export_gold_template.py \
+      --offline_only --keep_texts data/processed/gold_label.csv
+
+  QUERY LOGS (csv column 'text', jsonl/json field 'query', or txt one per line):
+    python scripts/01_build_pool_and_export_gold_template.py \
+      --offline_only --queries logs/2024-*.jsonl --sample 200000
 """
-import argparse, os, random, json
-import pandas as pd
-
-def load_msrvtt():
-    from datasets import load_dataset
-    ds = load_dataset("friedrichor/MSR-VTT", split="train")
-    return [r.get("caption","") for r in ds if r.get("caption")]
-
-def load_tvr_queries(json_path: str):
-    texts = []
-    if json_path.endswith(".jsonl"):
-        with open(json_path, "r", encoding="utf-8") as f:
-            for line in f:
-                try:
-                    obj = json.loads(line)
-                    if "query" in obj and obj["query"]:
-                        texts.append(str(obj["query"]))
-                except Exception:
-                    continue
-    else:
-        data = json.load(open(json_path, "r", encoding="utf-8"))
-        if isinstance(data, list):
-            for obj in data:
-                q = obj.get("query")
-                if q:
-                    texts.append(str(q))
-    return texts
+import argparse, os, random
+from pool_stream import iter_msrvtt, iter_json_queries, iter_query_log, filtered, DistinctReservoir, read_texts, write_csv, write_pool
+from near_dup import PoolDeduper
+from synthetic_queries import TEMPLATES, SONGS, THINGS, TEAMS, TOPICS, SERIES, PRODS
 
 def gen_synthetic(n=800):
-    import random
-    music = ["lyrics {song}", "{song} official mv", "karaoke {song}", "lofi chill", "official audio {song}"]
-    howto = ["how to fix {thing}", "tutorial {thing}", "hướng dẫn {thing}", "cách {thing}"]
-    sports = ["{team1} vs {team2} highlights", "{team1} vs {team2} full match", "world cup highlights", "premier league live"]
-    news = ["breaking news {topic}", "thời sự 19h hôm nay", "bản tin {topic}"]
-    kis = ["{series} tập {ep} vietsub", "{series} trailer", "{series} season {season} episode {ep}"]
-    review = ["review {product}", "unboxing {product}", "so sánh {product} vs {product2}", "giá {product}"]
-
-    SONGS = ["Hãy Trao Cho Anh", "Drivers License", "Shape of You", "Đom Đóm", "Haru Haru", "Nơi Này Có Anh"]
-    THINGS = ["wifi windows 11", "máy in không nhận lệnh", "latte art", "react build error", "node not found"]
-    TEAMS = [("MU","Liverpool"), ("Lakers","Celtics"), ("Vietnam","Thailand"), ("Real Madrid","Barcelona")]
-    TOPICS = ["bão số 5", "wildfires", "lạm phát", "earthquake"]
-    SERIES = ["Conan", "One Piece", "Friends", "Stranger Things"]
-    PRODS = ["iPhone 15", "Galaxy S23", "PS5", "air purifier", "Kindle Paperwhite"]
-
+    T = TEMPLATES
     out = []
     for _ in range(max(1, n//6)):
-        out += [random.choice(music).format(song=random.choice(SONGS))]
-        out += [random.choice(howto).format(thing=random.choice(THINGS))]
+        out += [random.choice(T["Music"]).format(song=random.choice(SONGS))]
+        out += [random.choice(T["How-to"]).format(thing=random.choice(THINGS))]
         t1,t2 = random.choice(TEAMS)
-        out += [random.choice(sports).format(team1=t1, team2=t2)]
-        out += [random.choice(news).format(topic=random.choice(TOPICS))]
-        out += [random.choice(kis).format(series=random.choice(SERIES), ep=random.randint(1,200), season=random.randint(1,10))]
-        out += [random.choice(review).format(product=random.choice(PRODS), product2=random.choice(PRODS))]
+        out += [random.choice(T["Sports"]).format(team1=t1, team2=t2)]
+        out += [random.choice(T["News"]).format(topic=random.choice(TOPICS))]
+        out += [random.choice(T["KIS"]).format(series=random.choice(SERIES), ep=random.randint(1,200), season=random.randint(1,10))]
+        out += [random.choice(T["Review"]).format(product=random.choice(PRODS), product2=random.choice(PRODS))]
     out = list(dict.fromkeys(out))
     return out[:n]
 
-def basic_filter(texts, min_len=3, max_len=80):
-    cleaned = []
-    for t in texts:
-        t = (t or "").strip()
-        if not t: continue
-        L = len(t.split())
-        if L < min_len or L > max_len: continue
-        cleaned.append(t)
-    return cleaned
-
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--output_unlabeled", default="data/unlabeled_pool.csv")
-    ap.add_argument("--export_gold_template", default="data/gold_label_template.csv")
+    ap.add_argument("--output_unlabeled", default="data/processed/unlabeled_pool.csv")
+    ap.add_argument("--export_gold_template", default="data/processed/gold_label_template.csv")
     ap.add_argument("--synthetic", type=int, default=800, help="how many synthetic queries to add")
     ap.add_argument("--sample", type=int, default=8000, help="max pool size after dedupe/filter")
     ap.add_argument("--offline_only", action="store_true", help="skip dataset download, use synthetic only")
     ap.add_argument("--tvr_json", type=str, default="", help="optional: path to TVR JSON/JSONL containing 'query'")
+    ap.add_argument("--queries", nargs="*", default=[], help="optional: query logs (.csv/.jsonl/.json/.txt)")
     ap.add_argument("--gold_size", type=int, default=600, help="size of gold template to export")
+    ap.add_argument("--near_dup", type=float, default=0.0,
+                    help="collapse near-duplicates with MinHash/LSH at this Jaccard threshold (e.g. 0.7; 0 = off)")
+    ap.add_argument("--shingle", type=int, default=1, help="word n-gram size of the near-dup shingles")
+    ap.add_argument("--keep_texts", nargs="*", default=[],
+                    help="tables whose texts are always in the pool, outside the --sample draw "
+                         "(e.g. data/processed/gold_label.csv, so an existing gold set still matches the pool)")
     args = ap.parse_args()
 
     os.makedirs("data", exist_ok=True)
-    pool = []
-
-    if not args.offline_only:
-        print("[1] Loading MSR-VTT captions (text-only) via datasets...")
+    pinned = read_texts(args.keep_texts)
+    if pinned:
+        print(f"[0] Keeping {len(pinned)} texts of {', '.join(args.keep_texts)} in the pool")
+    sample = DistinctReservoir(args.sample, seed=42, pinned=pinned)  # filtered texts are deduped + sampled as they stream in
+    dedup = PoolDeduper(args.near_dup, args.shingle) if args.near_dup > 0 else None
+    if dedup:  # kept texts seed the near-dup clusters, so their paraphrases follow their labels
+        for _ in dedup.filter(pinned):
+            pass
+
+    def keep(texts):  # with --near_dup only cluster representatives reach the sampler
+        texts = filtered(texts, 3, 80)
+        return dedup.filter(texts) if dedup else texts
+
+    def add_source(name, texts):
+        n0 = sample.seen
         try:
-            msr_texts = load_msrvtt()
-            print(f"    -> {len(msr_texts)} captions")
-            pool += msr_texts
+            sample.extend(keep(texts))
+            print(f"    -> {sample.seen - n0} texts")
         except Exception as e:
-            print("    !! MSR-VTT loading failed, continue without it.\n       Reason:", e)
+            print(f"    !! {name} loading failed after {sample.seen - n0} texts, continue without the rest.\n       Reason:", e)
+
+    if not args.offline_only:
+        print("[1] Streaming MSR-VTT captions (text-only) via datasets...")
+        add_source("MSR-VTT", iter_msrvtt())
 
     if args.tvr_json:
-        print("[2] Loading TVR queries from:", args.tvr_json)
-        try:
-            tv_texts = load_tvr_queries(args.tvr_json)
-            print(f"    -> {len(tv_texts)} queries")
-            pool += tv_texts
-        except Exception as e:
-            print("    !! TVR loading failed, continue without it.\n       Reason:", e)
+        print("[2] Streaming TVR queries from:", args.tvr_json)
+        add_source("TVR", iter_json_queries(args.tvr_json))
+
+    for path in args.queries:
+        print("[2] Streaming query log:", path)
+        add_source(path, iter_query_log(path))
 
     print("[3] Adding synthetic queries...")
     syn = gen_synthetic(args.synthetic)
     print(f"    -> {len(syn)} synthetic")
-    pool += syn
-
-    pool = list(dict.fromkeys(pool))
-    pool = basic_filter(pool, 3, 80)
-    if len(pool) > args.sample:
-        import random; random.seed(42)
-        pool = random.sample(pool, args.sample)
-
-    import pandas as pd, random
-    pd.DataFrame({"text": pool}).to_csv(args.output_unlabeled, index=False, encoding="utf-8")
-    print(f"[✓] Saved unlabeled pool to {args.output_unlabeled} (n={len(pool)})")
-
-    gold_n = min(args.gold_size, len(pool))
-    gold = random.sample(pool, gold_n)
-    pd.DataFrame({"text": gold, "label": ""}).to_csv(args.export_gold_template, index=False, encoding="utf-8")
+    sample.extend(keep(syn))
+
+    pool = sample.sample()
+    if dedup:
+        dedup.write_sidecar(pool, args.output_unlabeled)
+    write_pool(args.output_unlabeled, ({"text": t} for t in pool), ["text"])  # .csv / .parquet / .arrow
+    print(f"[✓] Saved unlabeled pool to {args.output_unlabeled} (n={len(pool)}, from {sample.seen} filtered texts{' (cluster representatives)' if dedup else ''})")
+
+    kept = set(pinned)  # kept texts are labeled already
+    fresh = [t for t in pool if t not in kept]
+    gold_n = min(args.gold_size, len(fresh))
+    random.seed(42)
+    gold = random.sample(fresh, gold_n)
+    write_csv(args.export_gold_template, ({"text": t, "label": ""} for t in gold), ["text", "label"])
     print(f"[✓] Exported gold template ({gold_n} rows) to {args.export_gold_template}\n    Fill 'label' with one of: KIS, How-to, Music, News, Sports, Review")
 
 if __name__ == "__main__":
@@ -3,16 +3,21 @@
 """
 Export a gold label template from an existing unlabeled_pool.csv with configurable size (default 600).
 """
-import argparse, pandas as pd, os, random
+import argparse, pandas as pd, os, random, sys
+try:
+    from weak_supervision.table_io import read_table
+except ImportError:  # run as scripts/xx.py without the repo root on PYTHONPATH
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from weak_supervision.table_io import read_table
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--pool", default="data/unlabeled_pool.csv")
-    ap.add_argument("--out", default="data/gold_label_template.csv")
+    ap.add_argument("--pool", default="data/processed/unlabeled_pool.csv")
+    ap.add_argument("--out", default="data/processed/gold_label_template.csv")
     ap.add_argument("--gold_size", type=int, default=600)
     args = ap.parse_args()
 
-    df = pd.read_csv(args.pool)
+    df = read_table(args.pool, columns=["text"])
     texts = df["text"].dropna().astype(str).tolist()
     n = min(len(texts), args.gold_size)
     random.seed(42)
@@ -6,30 +6,33 @@ Run two baselines on a GOLD set (manually labeled):
   (2) Rules-only with keyword LFs
 Outputs: per-sample predictions, metrics JSON, confusion matrix PNG.
 """
-import argparse, os, json
+import argparse, os
 import pandas as pd
-from typing import List
-from sklearn.metrics import classification_report, f1_score, accuracy_score, confusion_matrix
-import matplotlib.pyplot as plt
+from typing import Dict, List
+from weak_supervision.evaluation import evaluate, render_plots, save_metrics
+from weak_supervision.table_io import FORMATS, read_table, table_path, write_table
 
 LABELS = ["KIS","How-to","Music","News","Sports","Review","Entertainment","Other"]
 
 
 def load_gold(path: str) -> pd.DataFrame:
-    df = pd.read_csv(path, encoding="latin1")
+    df = read_table(path)  # utf-8, latin1 fallback
     if "text" not in df.columns or "label" not in df.columns:
         raise ValueError("Gold file must have columns: 'text', 'label'")
     df = df.dropna(subset=["text", "label"])
     df = df[df["label"].isin(LABELS)].reset_index(drop=True)
     return df
 
-def predict_zero_shot(texts: List[str], labels: List[str]) -> List[str]:
-    from transformers import pipeline
-    clf = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
-    preds = []
-    for t in texts:
-        res = clf(str(t), candidate_labels=labels, multi_label=False)
-        preds.append(res["labels"][0])
+def predict_zero_shot(texts: List[str], labels: List[str], batch_size: int = 64, cache_path: str = "", backend: str = "torch",
+                      threads: str = "") -> List[str]:
+    from weak_supervision.zero_shot import ZeroShotEngine, parse_threads
+    from weak_supervision.zs_cache import ScoreCache
+    cache = ScoreCache(cache_path) if cache_path else None
+    intra, inter = parse_threads(threads)
+    preds = ZeroShotEngine("facebook/bart-large-mnli", batch_size=batch_size, cache=cache, backend=backend,
+                           intra_op_threads=intra, inter_op_threads=inter).predict(texts, labels)
+    if cache is not None:
+        print("    zero-shot cache:", cache.stats())
     return preds
 
 def predict_rules_only(texts: List[str]) -> List[str]:
@@ -40,52 +43,46 @@ def predict_rules_only(texts: List[str]) -> List[str]:
         out.append(lab if lab is not None else "UNK")
     return out
 
-def metrics_and_cm(y_true: List[str], y_pred: List[str], title: str, outdir: str, labels: List[str]):
-    import pandas as pd, json, os
+def save_outputs(y_true: List[str], preds: Dict[str, List[str]], outdir: str, labels: List[str], fmt: str = "parquet",
+                 n_boot: int = 1000, plots: bool = True):
+    """predictions_* tables + metrics_*.json of every baseline (one evaluate() call), then the PNGs.
+    Predictions outside `labels` ("UNK") count as errors."""
     os.makedirs(outdir, exist_ok=True)
-    df = pd.DataFrame({"y_true": y_true, "y_pred": y_pred})
-    df.to_csv(os.path.join(outdir, f"predictions_{title}.csv"), index=False, encoding="utf-8")
-
-    mask = df["y_pred"].isin(labels)
-    acc = accuracy_score(df["y_true"][mask], df["y_pred"][mask]) if mask.any() else 0.0
-    macro_f1 = f1_score(df["y_true"][mask], df["y_pred"][mask], average="macro") if mask.any() else 0.0
-    report = classification_report(df["y_true"][mask], df["y_pred"][mask], labels=labels, target_names=labels, output_dict=True)
-    with open(os.path.join(outdir, f"metrics_{title}.json"), "w", encoding="utf-8") as f:
-        json.dump({"accuracy": acc, "macro_f1": macro_f1, "report": report}, f, ensure_ascii=False, indent=2)
-
-    cm = confusion_matrix(df["y_true"][mask], df["y_pred"][mask], labels=labels)
-    fig = plt.figure(figsize=(6,5))
-    ax = fig.add_subplot(111)
-    im = ax.imshow(cm, interpolation="nearest")
-    ax.set_title(f"Confusion Matrix — {title}")
-    ax.set_xlabel("Predicted")
-    ax.set_ylabel("True")
-    ax.set_xticks(range(len(labels))); ax.set_yticks(range(len(labels)))
-    ax.set_xticklabels(labels, rotation=45, ha="right"); ax.set_yticklabels(labels)
-    for i in range(len(labels)):
-        for j in range(len(labels)):
-            ax.text(j, i, int(cm[i, j]), ha="center", va="center")
-    plt.tight_layout()
-    fig.savefig(os.path.join(outdir, f"confusion_matrix_{title}.png"), dpi=200)
-    plt.close(fig)
+    results = evaluate(y_true, preds, labels, n_boot=n_boot)
+    jobs = []
+    for title, y_pred in preds.items():
+        write_table(pd.DataFrame({"y_true": y_true, "y_pred": y_pred}), table_path(outdir, f"predictions_{title}", fmt))
+        save_metrics(results[title], outdir, title)
+        jobs.append({"cm": results[title]["confusion_matrix"], "labels": labels, "title": title, "figsize": (6, 5),
+                     "path": os.path.join(outdir, f"confusion_matrix_{title}.png")})
+    if plots:
+        render_plots(jobs)
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--gold", default="data/gold_test.csv", help="CSV with columns: text,label")
+    ap.add_argument("--gold", default="data/processed/gold_test.csv", help="CSV with columns: text,label")
     ap.add_argument("--outdir", default="outputs")
+    ap.add_argument("--zs_batch_size", type=int, default=64, help="(text, label) pairs per forward pass")
+    ap.add_argument("--zs_cache", default="cache/zero_shot_scores.sqlite", help="zero-shot score cache ('' to disable)")
+    ap.add_argument("--zs_backend", default="torch", choices=["torch","onnx"], help="onnx = int8-quantized ONNX Runtime (CPU)")
+    ap.add_argument("--zs_threads", default=os.environ.get("WS_ZS_THREADS", ""),
+                    help="zero-shot model threads INTRA[:INTER] (default: WS_ZS_THREADS, else the runtime default)")
+    ap.add_argument("--format", default="parquet", choices=list(FORMATS), help="predictions_* table format")
+    ap.add_argument("--n_boot", type=int, default=1000, help="bootstrap resamples for the CIs (0 = none)")
+    ap.add_argument("--no_plots", action="store_true", help="skip the confusion-matrix PNGs")
     args = ap.parse_args()
 
     df = load_gold(args.gold)
     texts = df["text"].astype(str).tolist()
     y_true = df["label"].astype(str).tolist()
 
-    print("[1/2] Running zero-shot (facebook/bart-large-mnli)...")
-    zs_pred = predict_zero_shot(texts, LABELS)
-    metrics_and_cm(y_true, zs_pred, "zero_shot_bart_mnli", args.outdir, LABELS)
+    print(f"[1/2] Running zero-shot (facebook/bart-large-mnli, {args.zs_backend})...")
+    zs_pred = predict_zero_shot(texts, LABELS, args.zs_batch_size, args.zs_cache, args.zs_backend, args.zs_threads)
 
     print("[2/2] Running rules-only (keyword LFs)...")
     rules_pred = predict_rules_only(texts)
-    metrics_and_cm(y_true, rules_pred, "rules_only", args.outdir, LABELS)
+    save_outputs(y_true, {"zero_shot_bart_mnli": zs_pred, "rules_only": rules_pred}, args.outdir, LABELS, args.format,
+                 args.n_boot, not args.no_plots)
 
     print("[✓] Done. See outputs directory.")
 
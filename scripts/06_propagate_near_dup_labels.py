@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copy the weak labels of a near-dup-collapsed pool (built with --near_dup) back to every
+cluster member, using the <pool>.clusters.<csv|parquet|arrow> sidecar.
+
+Writes weak_labels_propagated (every member: text, rep_text, cluster_id + the
+representative's ws_* columns) and weak_train_0p75_propagated (ws_conf >= 0.75) tables,
+and prints the label distribution over representatives vs over members so a shift
+caused by the collapse is visible.
+
+Usage:
+  python scripts/06_propagate_near_dup_labels.py \
+    --clusters data/processed/unlabeled_pool.clusters.csv --weak_labels outputs_ws/weak_labels_all.parquet
+"""
+import argparse, os, sys
+import pandas as pd
+try:
+    from weak_supervision.table_io import FORMATS, read_table, table_path, write_table
+except ImportError:  # run as scripts/xx.py without the repo root on PYTHONPATH
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from weak_supervision.table_io import FORMATS, read_table, table_path, write_table
+
+CONF_THRESHOLD = 0.75
+
+def propagate(weak: pd.DataFrame, clusters: pd.DataFrame) -> pd.DataFrame:
+    """One row per cluster member; members of unlabeled representatives are dropped."""
+    ws_cols = [c for c in weak.columns if c != "text"]
+    reps = weak.drop_duplicates("text").rename(columns={"text": "rep_text"})
+    return clusters.merge(reps[["rep_text"] + ws_cols], on="rep_text", how="inner")
+
+def distribution(labels: pd.Series, names) -> pd.Series:
+    return labels.value_counts(normalize=True).reindex(names, fill_value=0.0)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clusters", default="data/processed/unlabeled_pool.clusters.csv")
+    ap.add_argument("--weak_labels", default="outputs_ws/weak_labels_all.parquet")
+    ap.add_argument("--outdir", default="", help="default: the directory of --weak_labels")
+    ap.add_argument("--format", default="parquet", choices=list(FORMATS))
+    args = ap.parse_args()
+
+    if args.clusters.endswith(".csv"):  # keep texts such as "NA" / "null" as strings
+        clusters = pd.read_csv(args.clusters, keep_default_na=False)
+    else:
+        clusters = read_table(args.clusters)
+    weak = read_table(args.weak_labels)
+    out = propagate(weak, clusters)
+    missing = clusters["rep_text"].nunique() - out["rep_text"].nunique()
+    print(f"[1/2] {len(weak)} labeled representatives -> {len(out)} members "
+          f"(x{len(out) / max(len(weak), 1):.2f}; {missing} clusters without a weak label)")
+
+    outdir = args.outdir or os.path.dirname(args.weak_labels) or "."
+    os.makedirs(outdir, exist_ok=True)
+    write_table(out, table_path(outdir, "weak_labels_propagated", args.format))
+    train = out[out["ws_conf"] >= CONF_THRESHOLD][["text", "ws_label"]].rename(columns={"ws_label": "label"})
+    write_table(train, table_path(outdir, "weak_train_0p75_propagated", args.format))
+
+    names = weak.sort_values("ws_label_id")["ws_label"].unique()
+    dist = pd.DataFrame({"representatives": distribution(weak["ws_label"], names),
+                         "members": distribution(out["ws_label"], names)})
+    tv = 0.5 * (dist["representatives"] - dist["members"]).abs().sum()
+    print("[2/2] Weak-label distribution:\n", dist.round(4))
+    print(f"  -> total variation distance = {tv:.4f}")
+    print(f"[✓] Saved {outdir}/weak_labels_propagated{FORMATS[args.format]} and "
+          f"weak_train_0p75_propagated{FORMATS[args.format]} ({len(train)} rows)")
+
+if __name__ == "__main__":
+    main()
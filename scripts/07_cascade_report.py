@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Accuracy vs latency of the rules -> end model -> zero-shot cascade (weak_supervision/cascade.py)
+on the GOLD set, for a sweep of end-model confidence thresholds.
+
+Every gold text goes once, alone (batch of 1, as a single /predict request would),
+through the rules, the end model and the zero-shot model; each call is timed. The
+cascade is then replayed offline per threshold: a text costs the rules time, plus the
+end-model time when the rules are not sure, plus the zero-shot time when the end model
+is below the threshold. Reports accuracy, macro-F1, mean / p99 latency and the share
+of texts answered by each tier; "rules_only", "end_model_only" and "zero_shot_only"
+rows are the single-model references. Latency budgets are a serving-time guard and
+are not applied here.
+
+Usage:
+  PYTHONPATH=. python scripts/07_cascade_report.py \
+    --end_model sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2 \
+    --zs_model joeddav/xlm-roberta-large-xnli --thresholds 0.3 0.5 0.7 0.9
+"""
+import argparse, json, os, time
+import numpy as np
+import pandas as pd
+
+from lfs.keyword_lfs import LABELS
+from weak_supervision.cascade import load_end_model, rules_label
+from weak_supervision.evaluation import evaluate
+from weak_supervision.table_io import read_table
+from weak_supervision.zero_shot import ZeroShotEngine, parse_threads
+
+
+def load_gold(path: str) -> pd.DataFrame:
+    df = read_table(path)
+    df = df.dropna(subset=["text", "label"])
+    return df[df["label"].isin(LABELS)].reset_index(drop=True)
+
+def timed_rows(fn, texts):
+    """fn([text]) -> [1, K] for every text alone: (rows [N, K], seconds [N])."""
+    fn(texts[:1])  # load the weights outside the timings
+    rows, sec = [], []
+    for t in texts:
+        t0 = time.perf_counter()
+        rows.append(np.asarray(fn([t]))[0])
+        sec.append(time.perf_counter() - t0)
+    return np.stack(rows), np.array(sec)
+
+def summarize(name, y_true, pred, latency, tier):
+    ms = 1000 * latency
+    m = evaluate(y_true, pred, LABELS, n_boot=0)["predictions"]
+    r = {"name": name, "accuracy": m["accuracy"], "macro_f1": m["macro_f1"],
+         "mean_ms": float(ms.mean()), "p99_ms": float(np.percentile(ms, 99))}
+    for t in ("rules", "end_model", "zero_shot"):
+        r[f"share_{t}"] = float(np.mean(tier == t))
+    return r
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--gold", default="data/processed/gold_label.csv")
+    ap.add_argument("--end_model", default="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+    ap.add_argument("--zs_model", default="joeddav/xlm-roberta-large-xnli")
+    ap.add_argument("--zs_backend", default="torch", choices=["torch", "onnx"])
+    ap.add_argument("--zs_threads", default=os.environ.get("WS_ZS_THREADS", ""), help="INTRA[:INTER] model threads")
+    ap.add_argument("--thresholds", type=float, nargs="+", default=[0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9])
+    ap.add_argument("--out", default="outputs/cascade_report.json")
+    args = ap.parse_args()
+
+    df = load_gold(args.gold)
+    texts = df["text"].astype(str).tolist()
+    y_true = np.array(df["label"].astype(str).tolist())
+    n = len(texts)
+
+    print(f"[1/3] Rules on {n} gold texts...")
+    rules, rules_s = [], []
+    for t in texts:
+        t0 = time.perf_counter()
+        rules.append(rules_label(t))
+        rules_s.append(time.perf_counter() - t0)
+    rules_s = np.array(rules_s)
+    sure = np.array([r is not None for r in rules])
+
+    print(f"[2/3] End model ({args.end_model}) and zero-shot ({args.zs_model}), one text per call...")
+    end_model = load_end_model(args.end_model, LABELS)
+    intra, inter = parse_threads(args.zs_threads)
+    zs = ZeroShotEngine(args.zs_model, backend=args.zs_backend, intra_op_threads=intra, inter_op_threads=inter)
+    P_end, end_s = timed_rows(end_model.scores, texts)
+    P_zs, zs_s = timed_rows(lambda b: zs.scores(b, LABELS), texts)
+    end_pred = np.array(LABELS)[P_end.argmax(1)]
+    zs_pred = np.array(LABELS)[P_zs.argmax(1)]
+    end_conf = P_end.max(1)
+
+    print("[3/3] Replaying the cascade per threshold")
+    rules_pred = np.array([r or "Other" for r in rules])
+    runs = [summarize("rules_only", y_true, rules_pred, rules_s, np.full(n, "rules")),
+            summarize("end_model_only", y_true, end_pred, end_s, np.full(n, "end_model")),
+            summarize("zero_shot_only", y_true, zs_pred, zs_s, np.full(n, "zero_shot"))]
+    for th in args.thresholds:
+        escalate = ~sure & (end_conf < th)
+        tier = np.where(sure, "rules", np.where(escalate, "zero_shot", "end_model"))
+        pred = np.where(sure, rules_pred, np.where(escalate, zs_pred, end_pred))
+        latency = rules_s + np.where(sure, 0.0, end_s) + np.where(escalate, zs_s, 0.0)
+        r = summarize(f"cascade@{th:g}", y_true, pred, latency, tier)
+        r["threshold"] = th
+        runs.append(r)
+
+    print(f"  {'run':<16} {'acc':>6} {'F1':>6} {'mean_ms':>8} {'p99_ms':>8}  rules/end/zs")
+    for r in runs:
+        print(f"  {r['name']:<16} {r['accuracy']:>6.3f} {r['macro_f1']:>6.3f} {r['mean_ms']:>8.2f} {r['p99_ms']:>8.2f}"
+              f"  {r['share_rules']:.2f}/{r['share_end_model']:.2f}/{r['share_zero_shot']:.2f}")
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"n_gold": n, "end_model": args.end_model, "zs_model": args.zs_model, "runs": runs},
+                  f, ensure_ascii=False, indent=2)
+    print("[✓] Report:", args.out)
+
+if __name__ == "__main__":
+    main()
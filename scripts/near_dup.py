@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Near-duplicate collapsing for the pool builders (MinHash over word shingles + LSH banding).
+
+MSR-VTT has ~20 paraphrased captions per video; exact dedup keeps all of them. Here
+every text gets a MinHash signature of its word n-gram set (unigrams by default:
+captions are ~10 words), the signature is cut into bands, texts sharing a band bucket
+become candidates, and a candidate joins a cluster if its estimated Jaccard similarity
+to the cluster's representative reaches `threshold`. One representative per cluster
+(its first text) stays in the pool; the membership goes to a sidecar table
+(text, rep_text, cluster_id) so weak labels can be copied back to every member after
+labeling (see 06_propagate_near_dup_labels.py).
+
+The pool builders cluster the whole stream BEFORE sampling (PoolDeduper): every filtered
+text goes through the index and only new representatives are offered to the sampler, so
+the pool holds --sample distinct clusters instead of a sample in which paraphrases rarely
+meet. Memory grows with the number of clusters (their signatures and LSH buckets), not
+with the stream; memberships are spooled to a temporary file.
+"""
+import csv, os, re, tempfile, zlib
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+import numpy as np
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def shingles(text: str, n: int = 2) -> List[str]:
+    toks = _TOKEN.findall(str(text).lower())
+    if len(toks) <= n:
+        return [" ".join(toks)]
+    return [" ".join(toks[i:i + n]) for i in range(len(toks) - n + 1)]
+
+
+def lsh_params(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """(bands, rows) with bands * rows <= num_perm whose S-curve midpoint (1/b)^(1/r) is closest to threshold."""
+    best = None
+    for r in range(1, num_perm + 1):
+        b = num_perm // r
+        err = abs((1.0 / b) ** (1.0 / r) - threshold)
+        if best is None or err < best[0]:
+            best = (err, b, r)
+    return best[1], best[2]
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = 64, ngram: int = 1, seed: int = 42):
+        rng = np.random.default_rng(seed)
+        # multiply-shift: h_p(x) = ((a_p * x + b_p) mod 2^64) >> 32, a_p odd; uint64 arithmetic wraps mod 2^64
+        self.a = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+        self.ngram = ngram
+
+    def signatures(self, texts: Sequence[str], chunk: int = 4096) -> np.ndarray:
+        """uint64 [N, num_perm] (32-bit values)."""
+        out = np.empty((len(texts), self.num_perm), dtype=np.uint64)
+        for lo in range(0, len(texts), chunk):
+            sh = [[zlib.crc32(s.encode("utf-8")) for s in shingles(t, self.ngram)] for t in texts[lo:lo + chunk]]
+            x = np.fromiter((h for hs in sh for h in hs), dtype=np.uint64)
+            starts = np.cumsum([0] + [len(hs) for hs in sh[:-1]])
+            vals = (self.a[:, None] * x[None, :] + self.b[:, None]) >> np.uint64(32)
+            out[lo:lo + len(sh)] = np.minimum.reduceat(vals, starts, axis=1).T
+        return out
+
+
+class NearDupIndex:
+    """
+    Leader clustering over a stream of texts, in arrival order: a text joins the first
+    earlier representative it shares an LSH bucket with and whose estimated Jaccard is
+    >= threshold, otherwise it becomes a representative itself. Only representatives are
+    indexed, and every member is compared with its representative (no union-find chaining
+    of short captions through intermediate texts).
+    """
+
+    def __init__(self, threshold: float = 0.7, num_perm: int = 64, ngram: int = 1, seed: int = 42):
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, ngram, seed)
+        self.bands, self.rows = lsh_params(num_perm, threshold)
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bands)]
+        self._sigs: List[np.ndarray] = []  # signature of every representative
+        self.seen = 0
+
+    def __len__(self):
+        return len(self._sigs)
+
+    def assign(self, texts: Sequence[str]) -> List[int]:
+        """Representative number per text; a text that starts a cluster gets the next number."""
+        if not len(texts):
+            return []
+        sig = self.hasher.signatures(texts)
+        r = self.rows
+        keys = [np.ascontiguousarray(sig[:, b * r:(b + 1) * r]).view(np.dtype((np.void, r * 8))).ravel().tolist()
+                for b in range(self.bands)]
+        out = []
+        for i in range(len(texts)):
+            cands = sorted({c for b in range(self.bands) for c in self._buckets[b].get(keys[b][i], ())})
+            for c in cands:
+                if (sig[i] == self._sigs[c]).mean() >= self.threshold:
+                    out.append(c)
+                    break
+            else:
+                c = len(self._sigs)
+                self._sigs.append(sig[i])
+                for b in range(self.bands):
+                    self._buckets[b].setdefault(keys[b][i], []).append(c)
+                out.append(c)
+        self.seen += len(texts)
+        return out
+
+
+def cluster_near_duplicates(texts: Sequence[str], threshold: float = 0.7, num_perm: int = 64, ngram: int = 1,
+                            seed: int = 42) -> np.ndarray:
+    """Cluster id per text = index of the cluster's representative (NearDupIndex over `texts`)."""
+    rep_no = NearDupIndex(threshold, num_perm, ngram, seed).assign(texts)
+    first: List[int] = []
+    for i, c in enumerate(rep_no):
+        if c == len(first):
+            first.append(i)
+    return np.array([first[c] for c in rep_no], dtype=np.int64)
+
+
+def clusters_path(pool_path: str) -> str:
+    """<pool>.clusters.<same extension as the pool> (.csv / .parquet / .arrow)."""
+    root, ext = os.path.splitext(pool_path)
+    return root + ".clusters" + (ext or ".csv")
+
+
+class PoolDeduper:
+    """
+    Pool-builder stage in front of the sampler: `filter(texts)` yields only the texts that
+    start a new near-dup cluster; after sampling, `write_sidecar(pool, pool_path)` writes the
+    members of the sampled representatives (cluster_id = the representative's pool row).
+    """
+
+    def __init__(self, threshold: float, ngram: int = 1, num_perm: int = 64, chunk: int = 4096):
+        self.index = NearDupIndex(threshold, num_perm, ngram)
+        self.chunk = chunk
+        self._spool = tempfile.TemporaryFile("w+", encoding="utf-8", newline="")
+        self._writer = csv.writer(self._spool)
+
+    def _assign(self, buf: List[str]) -> Iterator[str]:
+        n_reps = len(self.index)
+        for t, c in zip(buf, self.index.assign(buf)):
+            new = c >= n_reps
+            n_reps += new
+            self._writer.writerow([t, c, int(new)])
+            if new:
+                yield t
+
+    def filter(self, texts: Iterable[str]) -> Iterator[str]:
+        buf: List[str] = []
+        for t in texts:
+            buf.append(t)
+            if len(buf) >= self.chunk:
+                yield from self._assign(buf)
+                buf = []
+        yield from self._assign(buf)
+
+    def write_sidecar(self, pool: Sequence[str], pool_path: str) -> str:
+        from pool_stream import write_pool
+        row = {t: i for i, t in enumerate(pool)}
+        self._spool.flush()
+        self._spool.seek(0)
+        reps = {c: t for t, c, new in csv.reader(self._spool) if new == "1" and t in row}
+        self._spool.seek(0)
+        done = set()
+
+        def members():
+            for t, c, _ in csv.reader(self._spool):
+                rep = reps.get(c)
+                if rep is not None and t not in done:
+                    done.add(t)
+                    yield {"text": t, "rep_text": rep, "cluster_id": row[rep]}
+        side = clusters_path(pool_path)
+        n = write_pool(side, members(), ["text", "rep_text", "cluster_id"])
+        print(f"  -> near-dup clusters (Jaccard >= {self.index.threshold}): {self.index.seen} texts -> "
+              f"{len(self.index)} clusters ({1 - len(self.index) / max(self.index.seen, 1):.1%} fewer); "
+              f"{n} members of the {len(pool)} sampled clusters -> {side}")
+        self._spool.close()
+        return side
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming, bounded-memory building blocks for the pool builders (00_build_pool.py,
+01_build_pool_and_export_gold_template.py).
+
+- Sources are generators: MSR-VTT through `datasets` streaming, JSONL line by line,
+  JSON arrays parsed object by object, CSV / TXT query logs row by row.
+- `DistinctReservoir` keeps a seeded uniform sample of size k over the *distinct*
+  texts of the stream: every text gets a 64-bit keyed hash and the k smallest hashes
+  are kept (bottom-k). Equal texts hash equally, so duplicates are dropped for free and
+  the only fingerprints held are the k sampled ones; memory is O(k) however long the
+  stream is, and the sample does not depend on stream order.
+  This is not the old `dict.fromkeys` + `random.seed(42); random.sample` draw: the same
+  sources give a different pool than before. Texts that must stay in the pool whatever the
+  draw (an already labeled gold set) are passed as `pinned` (the builders' --keep_texts).
+- `write_csv` writes rows as they come instead of building a DataFrame; `write_pool` picks
+  CSV or a typed Parquet / Arrow table (weak_supervision/table_io.py) from the extension.
+"""
+import csv, hashlib, heapq, json, os, sys
+from typing import Iterable, Iterator, List, Optional, Set
+
+# ---------- sources ----------
+def iter_msrvtt(config: Optional[str] = None, split: str = "train") -> Iterator[str]:
+    from datasets import load_dataset
+    args = ("friedrichor/MSR-VTT", config) if config else ("friedrichor/MSR-VTT",)
+    for r in load_dataset(*args, split=split, streaming=True):
+        cap = r.get("caption", "")
+        if isinstance(cap, list):   # nếu caption là list thì nối từng phần tử
+            yield from (c for c in cap if isinstance(c, str))
+        elif isinstance(cap, str):
+            yield cap
+
+def iter_json_array(path: str, chunk_chars: int = 1 << 20) -> Iterator[object]:
+    """Elements of a top-level JSON array, decoded one at a time (the file is never loaded whole)."""
+    dec = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf, pos, eof = "", 0, False
+        started = False
+        while True:
+            # skip whitespace / separators
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if not started and pos < len(buf):
+                if buf[pos] != "[":
+                    raise ValueError(f"{path}: expected a JSON array")
+                started, pos = True, pos + 1
+                continue
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            try:
+                obj, end = dec.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    if buf[pos:].strip():
+                        raise
+                    return
+                more = f.read(chunk_chars)
+                eof = not more
+                buf, pos = buf[pos:] + more, 0
+                continue
+            # a number at the buffer end may be cut in two: only trust it if more text follows
+            if end == len(buf) and not eof:
+                more = f.read(chunk_chars)
+                eof = not more
+                buf, pos = buf[pos:] + more, 0
+                continue
+            yield obj
+            pos = end
+
+def iter_json_queries(path: str, field: str = "query") -> Iterator[str]:
+    """`field` of every object in a JSON array or JSONL file (TVR-style); bad lines are skipped."""
+    if path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    obj = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(obj, dict) and obj.get(field):
+                    yield str(obj[field])
+    else:
+        for obj in iter_json_array(path):
+            if isinstance(obj, dict) and obj.get(field):
+                yield str(obj[field])
+
+def iter_query_log(path: str, column: str = "text") -> Iterator[str]:
+    """Logged queries: .json/.jsonl (field `column` or 'query'), .csv (column `column`), else one per line."""
+    if path.endswith((".json", ".jsonl")):
+        field = column if column != "text" else "query"
+        yield from iter_json_queries(path, field)
+    elif path.endswith(".csv"):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                if row.get(column):
+                    yield row[column]
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                yield line.rstrip("\n")
+
+# ---------- filtering ----------
+def clean_text(t, min_len=3, max_len=80) -> Optional[str]:
+    """Stripped text, or None if it is empty or its word count is outside [min_len, max_len]."""
+    t = "" if t is None else str(t).strip()
+    if not t:
+        return None
+    L = len(t.split())
+    if L < min_len or L > max_len:
+        return None
+    return t
+
+def filtered(texts: Iterable, min_len=3, max_len=80) -> Iterator[str]:
+    for t in texts:
+        t = clean_text(t, min_len, max_len)
+        if t is not None:
+            yield t
+
+# ---------- sampling ----------
+class DistinctReservoir:
+    """Seeded uniform sample of k distinct texts (bottom-k of a keyed 64-bit hash).
+    `pinned` texts are always in the sample and take up part of k; the rest is drawn from the stream."""
+
+    def __init__(self, k: int, seed: int = 42, pinned: Iterable[str] = ()):
+        self._key = hashlib.blake2b(str(seed).encode(), digest_size=16).digest()
+        self._pinned = {}
+        for t in pinned:
+            self._pinned.setdefault(self._hash(t), t)
+        self.k = max(0, k - len(self._pinned))  # slots left for the stream
+        self._heap: List[tuple] = []      # (-hash, text): the root holds the largest kept hash
+        self._kept: Set[int] = set()      # fingerprint set of the sample
+        self.seen = 0                     # texts offered so far
+
+    def _hash(self, text: str) -> int:
+        h = hashlib.blake2b(text.encode("utf-8"), digest_size=8, key=self._key).digest()
+        return int.from_bytes(h, "little")
+
+    def add(self, text: str) -> bool:
+        """Offer one text; True if it is (now) in the sample."""
+        self.seen += 1
+        h = self._hash(text)
+        if h in self._pinned:
+            return True
+        if self.k <= 0:
+            return False
+        if len(self._heap) >= self.k and h >= -self._heap[0][0]:
+            return False
+        if h in self._kept:               # duplicate (or a 64-bit collision) of a sampled text
+            return False
+        if len(self._heap) >= self.k:
+            neg_old, _ = heapq.heapreplace(self._heap, (-h, text))
+            self._kept.discard(-neg_old)
+        else:
+            heapq.heappush(self._heap, (-h, text))
+        self._kept.add(h)
+        return True
+
+    def extend(self, texts: Iterable[str]):
+        for t in texts:
+            self.add(t)
+
+    def __len__(self):
+        return len(self._heap) + len(self._pinned)
+
+    def sample(self) -> List[str]:
+        """The kept and pinned texts in hash order (a seeded shuffle)."""
+        return [t for _, t in sorted([(-h, t) for h, t in self._pinned.items()] + self._heap, reverse=True)]
+
+def read_texts(paths: Iterable[str]) -> List[str]:
+    """Distinct non-empty texts of small tables (column 'text' of csv / parquet / arrow, read like
+    the rest of the pipeline reads them; jsonl/json field 'query', txt lines), in order."""
+    out: List[str] = []
+    for p in paths:
+        if p.endswith((".json", ".jsonl", ".txt")):
+            out += iter_query_log(p)
+        else:
+            out += [str(t) for t in _table_io().read_table(p, columns=["text"])["text"].dropna()]
+    return list(dict.fromkeys(t for t in out if t.strip()))
+
+# ---------- output ----------
+def write_csv(path: str, rows: Iterable[dict], fieldnames: List[str]) -> int:
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    n = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=fieldnames)
+        w.writeheader()
+        for r in rows:
+            w.writerow(r)
+            n += 1
+    return n
+
+def write_pool(path: str, rows: Iterable[dict], fieldnames: List[str]) -> int:
+    if path.endswith(".csv"):
+        return write_csv(path, rows, fieldnames)
+    return _table_io().write_rows(path, rows, fieldnames)
+
+def _table_io():
+    try:
+        from weak_supervision import table_io
+    except ImportError:  # run as scripts/xx.py without the repo root on PYTHONPATH
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from weak_supervision import table_io
+    return table_io
@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cached build -> label -> train -> evaluate pipeline over the existing scripts (config/pipeline.yaml).
+
+Every stage is one script invocation with its inputs, parameters and code declared:
+
+  script      the entry point, run from the repo root
+  pythonpath  import roots of the script (repo root is always last)
+  args        path arguments; "{out}" is the stage's output dir, "{scratch}" a throwaway dir,
+              "{<stage>}" the output dir of another stage (-> a dependency), "{<source>}" a file
+              of the `sources` section
+  params      everything else; args and params become --key value flags (true -> --key, false /
+              null -> omitted, lists -> several values)
+  code        extra files the stage reads besides its Python imports (yaml tables, ...)
+  enabled     false = only run when named on the command line
+
+The key of a stage is the sha256 of its script, args, params, its code version and its inputs.
+The code version is the hash of the script and of every repo module it imports, followed
+transitively (import statements anywhere in the file, resolved on its pythonpath), plus the
+`code` files: editing an LF in lfs/lfs_text.py changes the key of the labeling stage only, not
+of the pool build or the rules baseline. Inputs are the content hashes of the source files and
+of the outputs of upstream stages, so a stage whose upstream reran but wrote the same bytes is
+still skipped.
+
+A stage runs into a fresh directory; its files then go to the content-addressed store
+(<cache>/objects/<sha256>, read-only, shared by identical files of all runs) and a manifest
+<cache>/runs/<key>.json maps the stage key to them. A stage with a manifest for its key is not
+run: its files are hard-linked into <workdir>/<stage> (copied across filesystems) and its
+dependents go on. Stages whose dependencies are done run concurrently (--jobs); a failed
+stage stops its dependents only. The cache can be deleted at any time; --gc drops the objects
+no manifest refers to.
+
+Usage:
+  python scripts/run_pipeline.py                       # every enabled stage
+  python scripts/run_pipeline.py evaluate --dry_run    # what would run for `evaluate` and its upstream
+  python scripts/run_pipeline.py --set build.offline_only=true --set label.label_model=wmv
+  python scripts/run_pipeline.py baseline_zero_shot --jobs 2
+"""
+import argparse, ast, hashlib, json, os, re, shutil, subprocess, sys, threading, time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+RESERVED = ("out", "scratch")
+PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+
+def sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def sha256_json(obj) -> str:
+    return hashlib.sha256(json.dumps(obj, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def tree_hash(files: Dict[str, str]) -> str:
+    """Hash of a {relative path: sha256} listing (a directory's content)."""
+    return sha256_json(sorted(files.items()))
+
+
+def hash_path(path: Path) -> str:
+    if path.is_dir():
+        return tree_hash({p.relative_to(path).as_posix(): sha256_file(p) for p in sorted(path.rglob("*")) if p.is_file()})
+    return sha256_file(path)
+
+
+# --- code version: the repo modules a script imports, transitively -------------------------
+
+class ImportScanner:
+    def __init__(self, root: Path = ROOT):
+        self.root = root
+        self._imports: Dict[Path, List] = {}
+
+    def _parse(self, path: Path) -> List:
+        """(module, level, names) of every import statement of a file (nested ones included)."""
+        if path not in self._imports:
+            try:
+                tree = ast.parse(path.read_text(encoding="utf-8"), str(path))
+            except (SyntaxError, UnicodeDecodeError):
+                tree = ast.Module(body=[], type_ignores=[])
+            found = []
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Import):
+                    found += [(a.name, 0, []) for a in node.names]
+                elif isinstance(node, ast.ImportFrom):
+                    found.append((node.module or "", node.level, [a.name for a in node.names]))
+            self._imports[path] = found
+        return self._imports[path]
+
+    @staticmethod
+    def _resolve(module: str, roots: List[Path]) -> Optional[Path]:
+        for root in roots:
+            base = root.joinpath(*module.split(".")) if module else root
+            if base.with_suffix(".py").is_file():
+                return base.with_suffix(".py")
+            if (base / "__init__.py").is_file():
+                return base / "__init__.py"
+        return None
+
+    def modules(self, script: Path, pythonpath: List[Path]) -> List[Path]:
+        """The script and every repo file it imports (third-party imports do not resolve here)."""
+        roots = [script.parent] + pythonpath + [self.root]
+        seen: Set[Path] = set()
+        todo = [script.resolve()]
+        while todo:
+            path = todo.pop()
+            if path in seen:
+                continue
+            seen.add(path)
+            for module, level, names in self._parse(path):
+                if level:
+                    base = path.parent
+                    for _ in range(level - 1):
+                        base = base.parent
+                    search = [base]
+                else:  # flat names also resolve next to the importing file (weak_supervision/__init__.py)
+                    search = [path.parent] + roots
+                candidates = [module] + [f"{module}.{n}" if module else n for n in names]
+                parts = module.split(".") if module else []
+                candidates += [".".join(parts[:i]) for i in range(1, len(parts))]  # parent packages
+                for name in candidates:
+                    hit = self._resolve(name, search)
+                    if hit is not None and self.root in hit.parents:
+                        todo.append(hit.resolve())
+        return sorted(seen)
+
+
+# --- pipeline definition -----------------------------------------------------------------
+
+def parse_value(text: str):
+    return yaml.safe_load(text)
+
+
+def load_pipeline(path: str, overrides: List[str]) -> Dict:
+    with open(path, "r", encoding="utf-8") as f:
+        spec = yaml.safe_load(f) or {}
+    spec.setdefault("sources", {})
+    spec.setdefault("stages", {})
+    for item in overrides:
+        target, eq, value = item.partition("=")
+        stage, _, key = target.partition(".")
+        if stage not in spec["stages"] or not key or not eq:
+            raise SystemExit(f"--set {item!r}: expected <stage>.<param>=<value> with a stage of {path}")
+        spec["stages"][stage].setdefault("params", {})[key] = parse_value(value)
+    for name, st in spec["stages"].items():
+        if name in RESERVED or name in spec["sources"]:
+            raise SystemExit(f"stage name {name!r} is reserved or a source name")
+        st.setdefault("args", {})
+        st.setdefault("params", {})
+        st.setdefault("pythonpath", [])
+        st.setdefault("code", [])
+        st["deps"] = sorted({m for v in st["args"].values() for m in PLACEHOLDER.findall(str(v))
+                             if m in spec["stages"]})
+        unknown = {m for v in st["args"].values() for m in PLACEHOLDER.findall(str(v))} \
+            - set(spec["stages"]) - set(spec["sources"]) - set(RESERVED)
+        if unknown:
+            raise SystemExit(f"stage {name!r}: unknown placeholders {sorted(unknown)}")
+    return spec
+
+
+def topo_order(stages: Dict, targets: List[str]) -> List[str]:
+    order, state = [], {}
+
+    def visit(name, path):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "open":
+            raise SystemExit(f"dependency cycle: {' -> '.join(path + [name])}")
+        state[name] = "open"
+        for d in stages[name]["deps"]:
+            visit(d, path + [name])
+        state[name] = "done"
+        order.append(name)
+
+    for t in targets:
+        if t not in stages:
+            raise SystemExit(f"unknown stage {t!r} (stages: {', '.join(stages)})")
+        visit(t, [])
+    return order
+
+
+def to_flags(values: Dict) -> List[str]:
+    argv = []
+    for k, v in values.items():
+        if v is None or v is False:
+            continue
+        if v is True:
+            argv.append(f"--{k}")
+        elif isinstance(v, (list, tuple)):
+            argv += [f"--{k}"] + [str(x) for x in v]
+        else:
+            argv += [f"--{k}", str(v)]
+    return argv
+
+
+# --- content-addressed store -------------------------------------------------------------
+
+class Store:
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.objects, self.runs, self.tmp = self.root / "objects", self.root / "runs", self.root / "tmp"
+        for d in (self.objects, self.runs, self.tmp):
+            d.mkdir(parents=True, exist_ok=True)
+
+    def object_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest
+
+    def manifest(self, key: str) -> Optional[Dict]:
+        path = self.runs / f"{key}.json"
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            man = json.load(f)
+        return man if all(self.object_path(d).exists() for d in man["files"].values()) else None
+
+    def ingest(self, out_dir: Path) -> Dict[str, str]:
+        """Move every file of out_dir into the store: {relative path: sha256}."""
+        files = {}
+        for p in sorted(out_dir.rglob("*")):
+            if not p.is_file() or p.is_symlink():
+                continue
+            digest = sha256_file(p)
+            dst = self.object_path(digest)
+            if not dst.exists():
+                dst.parent.mkdir(exist_ok=True)
+                os.replace(p, dst)
+                dst.chmod(0o444)
+            files[p.relative_to(out_dir).as_posix()] = digest
+        return files
+
+    def save_manifest(self, man: Dict):
+        path = self.runs / f"{man['key']}.json"
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(man, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+
+    def materialize(self, man: Dict, dest: Path):
+        """dest = exactly the files of the manifest (hard links into the store, else copies)."""
+        marker = dest / ".pipeline.json"
+        if marker.exists():
+            with open(marker, "r", encoding="utf-8") as f:
+                if json.load(f).get("key") == man["key"]:
+                    return
+        if dest.exists():
+            shutil.rmtree(dest)
+        dest.mkdir(parents=True)
+        for rel, digest in man["files"].items():
+            target = dest / rel
+            target.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(self.object_path(digest), target)
+            except OSError:
+                shutil.copyfile(self.object_path(digest), target)
+        with open(marker, "w", encoding="utf-8") as f:
+            json.dump({"stage": man["stage"], "key": man["key"], "tree": man["tree"]}, f, indent=2)
+
+    def gc(self) -> int:
+        live = set()
+        for path in self.runs.glob("*.json"):
+            with open(path, "r", encoding="utf-8") as f:
+                live.update(json.load(f)["files"].values())
+        dropped = 0
+        for obj in self.objects.glob("*/*"):
+            if obj.name not in live:
+                obj.unlink()
+                dropped += 1
+        return dropped
+
+
+# --- runner ------------------------------------------------------------------------------
+
+class Pipeline:
+    def __init__(self, spec: Dict, store: Store, workdir: str, force: Set[str] = frozenset()):
+        self.spec, self.store, self.force = spec, store, set(force)
+        self.workdir = Path(workdir)
+        self.scanner = ImportScanner()
+        self.trees: Dict[str, str] = {}  # finished stage -> hash of its outputs
+        self._source_hashes: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def out_dir(self, name: str) -> Path:
+        return self.workdir / name
+
+    def code_version(self, name: str) -> Dict[str, str]:
+        st = self.spec["stages"][name]
+        pythonpath = [ROOT / p for p in st["pythonpath"]]
+        with self._lock:  # the scanner's parse memo is shared by the worker threads
+            files = self.scanner.modules(ROOT / st["script"], pythonpath)
+        files += [p for pattern in st["code"] for p in sorted(ROOT.glob(pattern)) if p.is_file()]
+        return {p.relative_to(ROOT).as_posix(): sha256_file(p) for p in files}
+
+    def source_hash(self, name: str) -> str:
+        if name not in self._source_hashes:
+            path = ROOT / self.spec["sources"][name]
+            if not path.exists():
+                raise FileNotFoundError(f"source {name!r}: {path} does not exist")
+            self._source_hashes[name] = hash_path(path)
+        return self._source_hashes[name]
+
+    def key(self, name: str) -> Dict:
+        """The stage's key and what went into it (upstream stages must be finished)."""
+        st = self.spec["stages"][name]
+        used = {m for v in st["args"].values() for m in PLACEHOLDER.findall(str(v))}
+        inputs = {f"source:{s}": self.source_hash(s) for s in sorted(used & set(self.spec["sources"]))}
+        inputs.update({f"stage:{d}": self.trees[d] for d in st["deps"]})
+        parts = {"script": st["script"], "args": st["args"], "params": st["params"], "version": st.get("version", ""),
+                 "python": f"{sys.version_info[0]}.{sys.version_info[1]}", "code": self.code_version(name),
+                 "inputs": inputs}
+        return {"key": sha256_json(parts), **parts}
+
+    def argv(self, name: str, out: Path, scratch: Path) -> List[str]:
+        st = self.spec["stages"][name]
+        paths = {"out": str(out), "scratch": str(scratch)}
+        paths.update({s: str(ROOT / p) for s, p in self.spec["sources"].items()})
+        paths.update({s: str(self.out_dir(s).resolve()) for s in self.spec["stages"]})
+        args = {k: PLACEHOLDER.sub(lambda m: paths[m.group(1)], str(v)) for k, v in st["args"].items()}
+        return [sys.executable, str(ROOT / st["script"])] + to_flags(args) + to_flags(st["params"])
+
+    def run_stage(self, name: str, dry_run: bool = False) -> Dict:
+        st = self.spec["stages"][name]
+        k = self.key(name)
+        man = None if name in self.force else self.store.manifest(k["key"])
+        if man is not None:
+            if not dry_run:
+                self.store.materialize(man, self.out_dir(name))
+            self.trees[name] = man["tree"]
+            return {"stage": name, "status": "cached", "key": k["key"], "seconds": 0.0}
+        if dry_run:
+            return {"stage": name, "status": "would run", "key": k["key"], "seconds": 0.0}
+
+        base = self.store.tmp / f"{name}.{k['key'][:16]}"
+        if base.exists():
+            shutil.rmtree(base)
+        out, scratch = base / "out", base / "scratch"
+        out.mkdir(parents=True)
+        scratch.mkdir()
+        argv = self.argv(name, out, scratch)
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join([str(ROOT / p) for p in st["pythonpath"]] + [str(ROOT)])
+        self.workdir.mkdir(parents=True, exist_ok=True)
+        log_path = self.workdir / f"{name}.log"
+        t0 = time.perf_counter()
+        with open(log_path, "w", encoding="utf-8") as log:
+            log.write("$ " + " ".join(argv) + "\n")
+            log.flush()
+            rc = subprocess.call(argv, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+        seconds = time.perf_counter() - t0
+        if rc != 0:
+            shutil.rmtree(base, ignore_errors=True)
+            return {"stage": name, "status": "failed", "key": k["key"], "seconds": seconds, "log": str(log_path),
+                    "returncode": rc}
+        files = self.store.ingest(out)
+        man = {"stage": name, "key": k["key"], "tree": tree_hash(files), "files": files, "seconds": seconds,
+               "argv": argv[1:], "finished": time.strftime("%Y-%m-%dT%H:%M:%S"),
+               **{p: k[p] for p in ("args", "params", "code", "inputs")}}
+        self.store.save_manifest(man)
+        shutil.rmtree(base, ignore_errors=True)
+        self.store.materialize(man, self.out_dir(name))
+        self.trees[name] = man["tree"]
+        return {"stage": name, "status": "ran", "key": k["key"], "seconds": seconds, "log": str(log_path)}
+
+    def run(self, targets: List[str], jobs: int = 1, dry_run: bool = False) -> List[Dict]:
+        stages = self.spec["stages"]
+        order = topo_order(stages, targets)
+        results: Dict[str, Dict] = {}
+        pending = list(order)
+        running = {}
+
+        def report(r):
+            key = r["key"][:12] if r.get("key") else "-"
+            extra = f" ({r['seconds']:.1f}s)" if r["status"] == "ran" else ""
+            extra += f" -> see {r['log']}" if r["status"] == "failed" else ""
+            print(f"  [{r['status']:>9}] {r['stage']:<22} {key}{extra}", flush=True)
+
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            while pending or running:
+                for name in list(pending):
+                    deps = stages[name]["deps"]
+                    if any(results.get(d, {}).get("status") in ("failed", "skipped") for d in deps):
+                        results[name] = {"stage": name, "status": "skipped", "seconds": 0.0}
+                        pending.remove(name)
+                        report(results[name])
+                    elif dry_run and any(results.get(d, {}).get("status") == "would run" for d in deps):
+                        results[name] = {"stage": name, "status": "would run", "seconds": 0.0}  # key unknown yet
+                        pending.remove(name)
+                        report(results[name])
+                    elif all(d in results for d in deps):
+                        pending.remove(name)
+                        running[pool.submit(self.run_stage, name, dry_run)] = name
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    name = running.pop(fut)
+                    try:
+                        results[name] = fut.result()
+                    except Exception as e:  # missing source, unreadable store, ...
+                        results[name] = {"stage": name, "status": "failed", "seconds": 0.0, "error": str(e)}
+                        print(f"  [!] {name}: {e}", file=sys.stderr)
+                    report(results[name])
+        return [results[n] for n in order]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("targets", nargs="*", help="stages to bring up to date, with their upstream (default: all enabled)")
+    ap.add_argument("--pipeline", default=str(ROOT / "config/pipeline.yaml"))
+    ap.add_argument("--workdir", default=str(ROOT / "outputs_pipeline"), help="where stage outputs are materialized")
+    ap.add_argument("--cache", default=str(ROOT / "cache/pipeline"), help="content-addressed store + run manifests")
+    ap.add_argument("--set", dest="overrides", action="append", default=[], metavar="STAGE.PARAM=VALUE",
+                    help="override a stage parameter (YAML value), may repeat")
+    ap.add_argument("--force", nargs="*", default=[], help="rerun these stages even if cached")
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="stages run at the same time")
+    ap.add_argument("--dry_run", action="store_true", help="only show what is cached and what would run")
+    ap.add_argument("--gc", action="store_true", help="delete stored files no run manifest refers to, then exit")
+    args = ap.parse_args()
+
+    if args.gc:
+        store = Store(args.cache)
+        print(f"[✓] {store.gc()} unreferenced objects removed from {store.objects}")
+        return
+    spec = load_pipeline(args.pipeline, args.overrides)
+    store = Store(args.cache)
+    targets = args.targets or [n for n, st in spec["stages"].items() if st.get("enabled", True)]
+    unknown = set(args.force) - set(spec["stages"])
+    if unknown:
+        raise SystemExit(f"--force: unknown stages {sorted(unknown)}")
+
+    print(f"[1/2] {'Plan' if args.dry_run else 'Running'}: {', '.join(topo_order(spec['stages'], targets))} "
+          f"(jobs={args.jobs})")
+    t0 = time.perf_counter()
+    results = Pipeline(spec, store, args.workdir, set(args.force)).run(targets, args.jobs, args.dry_run)
+    counts = {s: sum(r["status"] == s for r in results) for s in ("ran", "cached", "would run", "failed", "skipped")}
+    print("[2/2] " + ", ".join(f"{v} {k}" for k, v in counts.items() if v)
+          + f" in {time.perf_counter() - t0:.1f}s; outputs in {args.workdir}")
+    if counts["failed"] or counts["skipped"]:
+        sys.exit(1)
+    print("[✓] Done.")
+
+
+if __name__ == "__main__":
+    main()
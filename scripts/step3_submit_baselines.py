@@ -4,10 +4,13 @@
 Step 3 — Baseline submission helper
 - Reads a GOLD file (CSV with columns: text,label)
 - Runs Zero-shot (optional) and Rules-only baselines
-- Saves metrics (Accuracy, Macro-F1 + full classification_report JSON)
-- Saves confusion matrix PNGs
+- Saves metrics (Accuracy, Macro-F1 + full classification_report JSON, bootstrap CIs) of all
+  baselines from one weak_supervision/evaluation.py call
+- Saves confusion matrix PNGs (after all metrics; --no_plots skips them)
 - Saves predictions_*.csv
 - Exports Top-20 frequent errors per baseline
+- Optionally scores trained end models (--end_model dirs of weak_supervision/train_end_model.py)
+  on the same gold set; baselines_summary.json compares all of them (accuracy, macro-F1, ms/query)
 
 Usage examples:
   # Run both (need internet + transformers for zero-shot)
@@ -15,20 +18,21 @@ Usage examples:
 
   # Offline: only rules baseline
   python step3_submit_baselines.py --gold data/processed/gold_test.csv --outdir outputs_step3 --skip_zero_shot
+
+  # + distilled end models vs the baselines
+  python step3_submit_baselines.py --gold data/processed/gold_test.csv --skip_zero_shot --end_model artifacts/ngram_model artifacts/end_model
 """
-import argparse, os, json, sys
+import argparse, os, json, sys, time
 import pandas as pd
 import numpy as np
 from typing import List
-from sklearn.metrics import classification_report, confusion_matrix, accuracy_score, f1_score
-import matplotlib
-matplotlib.use("Agg")  # headless
-import matplotlib.pyplot as plt
+from weak_supervision.evaluation import evaluate, render_plots, save_metrics
+from weak_supervision.table_io import FORMATS, read_table, table_path, write_table
 
 LABELS = ["KIS","How-to","Music","News","Sports","Review","Entertainment","Other"]
 
 def load_gold(path: str, labels: List[str]) -> pd.DataFrame:
-    df = pd.read_csv(path, encoding="latin1")
+    df = read_table(path)  # utf-8, latin1 fallback
     if "text" not in df.columns or "label" not in df.columns:
         raise ValueError("Gold CSV must have columns: 'text' and 'label'")
     df = df.dropna(subset=["text","label"]).copy()
@@ -38,17 +42,22 @@ def load_gold(path: str, labels: List[str]) -> pd.DataFrame:
         raise ValueError("No rows with valid labels after filtering. Check your taxonomy/labels.")
     return df
 
-def predict_zero_shot(texts: List[str], labels: List[str], model_name: str) -> List[str]:
+def predict_zero_shot(texts: List[str], labels: List[str], model_name: str, batch_size: int = 64,
+                      cache_path: str = "", backend: str = "torch",
+                      threads: str = "") -> List[str]:
+    from weak_supervision.zero_shot import ZeroShotEngine, parse_threads
+    from weak_supervision.zs_cache import ScoreCache
+    cache = ScoreCache(cache_path) if cache_path else None
+    intra, inter = parse_threads(threads)
+    engine = ZeroShotEngine(model_name, batch_size=batch_size, cache=cache, backend=backend,
+                            intra_op_threads=intra, inter_op_threads=inter)
     try:
-        from transformers import pipeline
-    except Exception as e:
+        preds = engine.predict(texts, labels)
+    except ImportError:
         print("[!] transformers not available. Install 'transformers' to run zero-shot.", file=sys.stderr)
         raise
-    clf = pipeline("zero-shot-classification", model=model_name)
-    preds = []
-    for t in texts:
-        r = clf(str(t), candidate_labels=labels, multi_label=False)
-        preds.append(r["labels"][0])
+    if cache is not None:
+        print("    zero-shot cache:", cache.stats())
     return preds
 
 def predict_rules_only(texts: List[str]) -> List[str]:
@@ -74,32 +83,10 @@ def predict_rules_only(texts: List[str]) -> List[str]:
             out.append(hits[0] if hits else "Other")
         return out
 
-def save_metrics_and_cm(y_true: List[str], y_pred: List[str], labels: List[str], title: str, outdir: str):
-    os.makedirs(outdir, exist_ok=True)
-    acc = accuracy_score(y_true, y_pred)
-    macro_f1 = f1_score(y_true, y_pred, average="macro", labels=labels)
-    report = classification_report(y_true, y_pred, labels=labels, target_names=labels, output_dict=True, zero_division=0)
-
-    with open(os.path.join(outdir, f"metrics_{title}.json"), "w", encoding="utf-8") as f:
-        json.dump({"accuracy": acc, "macro_f1": macro_f1, "report": report}, f, ensure_ascii=False, indent=2)
-
-    cm = confusion_matrix(y_true, y_pred, labels=labels)
-    fig = plt.figure(figsize=(8,7))
-    ax = fig.add_subplot(111)
-    im = ax.imshow(cm, interpolation="nearest")
-    ax.set_title(f"Confusion Matrix — {title}")
-    ax.set_xlabel("Predicted")
-    ax.set_ylabel("True")
-    ax.set_xticks(range(len(labels))); ax.set_yticks(range(len(labels)))
-    ax.set_xticklabels(labels, rotation=45, ha="right"); ax.set_yticklabels(labels)
-    # counts overlay
-    for i in range(len(labels)):
-        for j in range(len(labels)):
-            ax.text(j, i, int(cm[i, j]), ha="center", va="center", fontsize=9)
-    fig.colorbar(im, fraction=0.046, pad=0.04)
-    fig.tight_layout()
-    fig.savefig(os.path.join(outdir, f"confusion_matrix_{title}.png"), dpi=200)
-    plt.close(fig)
+def predict_end_model(texts: List[str], labels: List[str], model_dir: str) -> List[str]:
+    from weak_supervision.cascade import load_end_model
+    model = load_end_model(model_dir, labels)
+    return [labels[k] for k in np.asarray(model.scores(texts)).argmax(axis=1)]
 
 def export_top_errors(df_pred: pd.DataFrame, title: str, outdir: str, topk: int = 20):
     """df_pred has columns: text, y_true, y_pred"""
@@ -129,44 +116,89 @@ def export_top_errors(df_pred: pd.DataFrame, title: str, outdir: str, topk: int
             rows.append({"y_true": yt, "y_pred": yp, "text": e["text"]})
     pd.DataFrame(rows).to_csv(os.path.join(outdir, f"errors_pairs_examples_{title}.csv"), index=False, encoding="utf-8")
 
-def run_baseline(df: pd.DataFrame, labels: List[str], baseline_name: str, predictor, outdir: str):
+def run_baseline(df: pd.DataFrame, baseline_name: str, predictor, outdir: str, fmt: str = "parquet"):
+    """Predict the gold texts, save predictions_* + top errors; returns (y_pred, ms per query)."""
     texts = df["text"].astype(str).tolist()
     y_true = df["label"].astype(str).tolist()
+    t0 = time.perf_counter()
     y_pred = predictor(texts)
+    sec = time.perf_counter() - t0
     # Save predictions
     pred_df = pd.DataFrame({"text": texts, "y_true": y_true, "y_pred": y_pred})
-    pred_df.to_csv(os.path.join(outdir, f"predictions_{baseline_name}.csv"), index=False, encoding="utf-8")
-    # Metrics + CM
-    save_metrics_and_cm(y_true, y_pred, labels, baseline_name, outdir)
+    write_table(pred_df, table_path(outdir, f"predictions_{baseline_name}", fmt))
     # Top errors
     export_top_errors(pred_df, baseline_name, outdir)
+    return y_pred, 1000 * sec / len(texts)
+
+def evaluate_all(df: pd.DataFrame, labels: List[str], preds: dict, ms: dict, outdir: str, n_boot: int = 1000,
+                 plots: bool = True) -> dict:
+    """Metrics (+ bootstrap CIs, paired deltas vs rules_only) of all baselines in one evaluate() call,
+    metrics_*.json per baseline, then the confusion-matrix PNGs."""
+    results = evaluate(df["label"].astype(str).tolist(), preds, labels, n_boot=n_boot,
+                       reference="rules_only" if "rules_only" in preds else None)
+    summary, jobs = {}, []
+    for name, r in results.items():
+        save_metrics(r, outdir, name)
+        summary[name] = {"accuracy": r["accuracy"], "macro_f1": r["macro_f1"], "ms_per_query": ms[name]}
+        for k in ("ci", "delta_vs_rules_only"):
+            if k in r:
+                summary[name][k] = r[k]
+        jobs.append({"cm": r["confusion_matrix"], "labels": labels, "title": name,
+                     "path": os.path.join(outdir, f"confusion_matrix_{name}.png")})
+    if plots:
+        render_plots(jobs)
+    return summary
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--gold", required=True, help="CSV with columns: text,label")
     ap.add_argument("--outdir", default="outputs_step3")
     ap.add_argument("--zs_model", default="joeddav/xlm-roberta-large-xnli", help="HuggingFace zero-shot model")
+    ap.add_argument("--zs_batch_size", type=int, default=64, help="(text, label) pairs per forward pass")
+    ap.add_argument("--zs_cache", default="cache/zero_shot_scores.sqlite", help="zero-shot score cache ('' to disable)")
+    ap.add_argument("--zs_backend", default="torch", choices=["torch","onnx"], help="onnx = int8-quantized ONNX Runtime (CPU)")
+    ap.add_argument("--zs_threads", default=os.environ.get("WS_ZS_THREADS", ""),
+                    help="zero-shot model threads INTRA[:INTER] (default: WS_ZS_THREADS, else the runtime default)")
     ap.add_argument("--skip_zero_shot", action="store_true")
+    ap.add_argument("--end_model", nargs="*", default=[], help="train_end_model.py save dirs to score as well")
+    ap.add_argument("--format", default="parquet", choices=list(FORMATS), help="predictions_* table format (errors_* stay CSV)")
+    ap.add_argument("--n_boot", type=int, default=1000, help="bootstrap resamples for the CIs (0 = none)")
+    ap.add_argument("--no_plots", action="store_true", help="skip the confusion-matrix PNGs")
     args = ap.parse_args()
 
     os.makedirs(args.outdir, exist_ok=True)
 
     df = load_gold(args.gold, LABELS)
+    preds, ms = {}, {}
 
     # Rules-only
-    print("[1/2] Rules-only baseline ...")
-    run_baseline(df, LABELS, "rules_only", predict_rules_only, args.outdir)
+    print("[1/3] Rules-only baseline ...")
+    preds["rules_only"], ms["rules_only"] = run_baseline(df, "rules_only", predict_rules_only, args.outdir, args.format)
 
     # Zero-shot (optional)
     if not args.skip_zero_shot:
         try:
-            print("[2/2] Zero-shot baseline ...", args.zs_model)
-            predictor = lambda texts: predict_zero_shot(texts, LABELS, args.zs_model)
-            run_baseline(df, LABELS, "zero_shot", predictor, args.outdir)
+            print("[2/3] Zero-shot baseline ...", args.zs_model)
+            predictor = lambda texts: predict_zero_shot(texts, LABELS, args.zs_model, args.zs_batch_size, args.zs_cache, args.zs_backend, args.zs_threads)
+            preds["zero_shot"], ms["zero_shot"] = run_baseline(df, "zero_shot", predictor, args.outdir, args.format)
         except Exception as e:
             print("[!] Zero-shot failed or unavailable:", e)
             print("    -> Continue with Rules-only outputs only.")
 
+    # Trained end models (optional)
+    for model_dir in args.end_model:
+        name = "end_model_" + os.path.basename(os.path.normpath(model_dir))
+        print("[3/3] End model ...", model_dir)
+        predictor = lambda texts: predict_end_model(texts, LABELS, model_dir)
+        preds[name], ms[name] = run_baseline(df, name, predictor, args.outdir, args.format)
+
+    summary = evaluate_all(df, LABELS, preds, ms, args.outdir, args.n_boot, not args.no_plots)
+    with open(os.path.join(args.outdir, "baselines_summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    print(f"    {'baseline':<28} {'accuracy':>8} {'macro_f1':>8} {'macro_f1 CI':>15} {'ms/query':>9}")
+    for name, m in summary.items():
+        ci = "{:.3f}-{:.3f}".format(*m["ci"]["macro_f1"]) if "ci" in m else "-"
+        print(f"    {name:<28} {m['accuracy']:>8.3f} {m['macro_f1']:>8.3f} {ci:>15} {m['ms_per_query']:>9.3f}")
     print("[✓] Done. Outputs in:", args.outdir)
 
 if __name__ == "__main__":
@@ -0,0 +1,22 @@
+# synthetic_queries.py
+"""
+Query templates + slot values of the synthetic pool (01_build_pool_and_export_gold_template.py)
+and of the benchmark workloads (benchmarks/workload.py). TEMPLATES keys are the intended
+labels; a template is filled with str.format from the slot lists below.
+"""
+
+TEMPLATES = {
+    "Music": ["lyrics {song}", "{song} official mv", "karaoke {song}", "lofi chill", "official audio {song}"],
+    "How-to": ["how to fix {thing}", "tutorial {thing}", "hướng dẫn {thing}", "cách {thing}"],
+    "Sports": ["{team1} vs {team2} highlights", "{team1} vs {team2} full match", "world cup highlights", "premier league live"],
+    "News": ["breaking news {topic}", "thời sự 19h hôm nay", "bản tin {topic}"],
+    "KIS": ["{series} tập {ep} vietsub", "{series} trailer", "{series} season {season} episode {ep}"],
+    "Review": ["review {product}", "unboxing {product}", "so sánh {product} vs {product2}", "giá {product}"],
+}
+
+SONGS = ["Hãy Trao Cho Anh", "Drivers License", "Shape of You", "Đom Đóm", "Haru Haru", "Nơi Này Có Anh"]
+THINGS = ["wifi windows 11", "máy in không nhận lệnh", "latte art", "react build error", "node not found"]
+TEAMS = [("MU","Liverpool"), ("Lakers","Celtics"), ("Vietnam","Thailand"), ("Real Madrid","Barcelona")]
+TOPICS = ["bão số 5", "wildfires", "lạm phát", "earthquake"]
+SERIES = ["Conan", "One Piece", "Friends", "Stranger Things"]
+PRODS = ["iPhone 15", "Galaxy S23", "PS5", "air purifier", "Kindle Paperwhite"]
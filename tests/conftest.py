@@ -0,0 +1,7 @@
+# conftest.py
+"""Tests import the repo as packages from its root: lfs.*, weak_supervision.*, app.*, scripts on demand."""
+import os, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
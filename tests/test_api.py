@@ -0,0 +1,30 @@
+# test_api.py
+"""app/api.py without the zero-shot tier (WS_ZS_MODEL=''): answers and votes from the rules, no NLI model."""
+import json, os, subprocess, sys
+
+from conftest import ROOT
+
+SERVE = """
+import json, sys
+from fastapi.testclient import TestClient
+from app import api
+from lfs.keyword_lfs import votes_dict
+with TestClient(api.app) as c:
+    out = [c.post("/predict", json={"text": t}).json() for t in sys.argv[1:]]
+    health = c.get("/health").json()
+print(json.dumps({"out": out, "votes": [votes_dict(t) for t in sys.argv[1:]], "batcher": health["batcher"],
+                  "nli_imported": "transformers" in sys.modules}))
+"""
+
+
+def test_rules_only_service_never_loads_the_nli_model():
+    texts = ["karaoke shape of you", "a man is walking his dog"]
+    env = dict(os.environ, WS_ZS_MODEL="", WS_END_MODEL="", WS_ARTIFACT="", WS_CACHE_SIZE="0", WS_CACHE_SHARED="")
+    r = subprocess.run([sys.executable, "-c", SERVE, *texts], cwd=ROOT, env=env, capture_output=True, text=True)
+    assert r.returncode == 0, r.stderr
+    res = json.loads(r.stdout.strip().splitlines()[-1])
+    assert not res["nli_imported"] and res["batcher"] is None
+    assert [o["votes"] for o in res["out"]] == res["votes"]
+    assert res["out"][0]["label"] == "Music" and res["out"][0]["tier"] == "rules"
+    # nothing left to ask: the open text falls back to "Other" without a zero-shot answer
+    assert res["out"][1]["label"] == "Other" and res["out"][1]["zero_shot"] is None
@@ -0,0 +1,129 @@
+# test_batcher.py
+"""app/batcher.py: concurrent submits share model calls, results and errors fan back out."""
+import asyncio, threading
+
+import pytest
+
+from app.batcher import MicroBatcher
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_fan_out_in_order():
+    calls = []
+
+    def fn(items):
+        calls.append(list(items))
+        return [x * 10 for x in items]
+
+    async def main():
+        b = MicroBatcher(fn, max_batch_size=4, max_wait_ms=50)
+        await b.start()
+        try:
+            return await asyncio.gather(*(b.submit(i) for i in range(10))), b.stats
+        finally:
+            await b.stop()
+
+    results, stats = run(main())
+    assert results == [i * 10 for i in range(10)]
+    assert sorted(x for c in calls for x in c) == list(range(10))
+    assert all(len(c) <= 4 for c in calls) and len(calls) < 10
+    assert stats["requests"] == 10 and stats["batches"] == len(calls) and stats["max_batch"] == 4
+
+
+def test_single_request_waits_at_most_max_wait():
+    async def main():
+        b = MicroBatcher(lambda items: [len(items)], max_batch_size=32, max_wait_ms=1)
+        await b.start()
+        try:
+            return await asyncio.wait_for(b.submit("x"), timeout=5)
+        finally:
+            await b.stop()
+
+    assert run(main()) == 1
+
+
+def test_error_reaches_every_request_of_the_batch_only():
+    def fn(items):
+        if "bad" in items:
+            raise ValueError("model failed")
+        return items
+
+    async def main():
+        b = MicroBatcher(fn, max_batch_size=8, max_wait_ms=50)
+        await b.start()
+        try:
+            first = await asyncio.gather(b.submit("ok"), b.submit("bad"), return_exceptions=True)
+            second = await b.submit("ok")  # the batcher keeps serving after a failed batch
+            return first, second
+        finally:
+            await b.stop()
+
+    first, second = run(main())
+    assert all(isinstance(r, ValueError) for r in first)
+    assert second == "ok"
+
+
+def test_wrong_result_count_is_an_error():
+    async def main():
+        b = MicroBatcher(lambda items: items[:-1], max_batch_size=8, max_wait_ms=20)
+        await b.start()
+        try:
+            return await asyncio.gather(b.submit(1), b.submit(2), return_exceptions=True)
+        finally:
+            await b.stop()
+
+    assert all(isinstance(r, RuntimeError) and "results" in str(r) for r in run(main()))
+
+
+def test_submit_before_start():
+    with pytest.raises(RuntimeError, match="start"):
+        run(MicroBatcher(lambda items: items).submit(1))
+
+
+def test_stop_fails_queued_requests():
+    release = threading.Event()
+
+    def slow(items):
+        release.wait(5)
+        return items
+
+    async def main():
+        b = MicroBatcher(slow, max_batch_size=1, max_wait_ms=0)
+        await b.start()
+        running = asyncio.ensure_future(b.submit("running"))
+        await asyncio.sleep(0.05)  # the first request is now inside fn
+        queued = asyncio.ensure_future(b.submit("queued"))
+        await asyncio.sleep(0.05)
+        await b.stop()
+        release.set()
+        with pytest.raises(RuntimeError, match="stopped"):
+            await queued
+        running.cancel()
+
+    run(main())
+
+
+def test_cancelled_requests_are_dropped():
+    seen = []
+
+    def fn(items):
+        seen.extend(items)
+        return items
+
+    async def main():
+        b = MicroBatcher(fn, max_batch_size=8, max_wait_ms=50)
+        await b.start()
+        try:
+            gone = asyncio.ensure_future(b.submit("gone"))
+            kept = asyncio.ensure_future(b.submit("kept"))
+            await asyncio.sleep(0)
+            gone.cancel()
+            return await kept
+        finally:
+            await b.stop()
+
+    assert run(main()) == "kept"
+    assert seen == ["kept"]
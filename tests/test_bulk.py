@@ -0,0 +1,88 @@
+# test_bulk.py
+"""app/bulk.py: every body format parses the same however the bytes are chunked."""
+import asyncio, json
+
+import pytest
+
+from app.bulk import chunked, iter_texts
+
+TEXTS = ["bản tin thời sự 19h", 'say "hi", then leave', "line\nbreak", "karaoke Đom Đóm", "x"]
+
+
+async def _chunks(body: bytes, size: int):
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+
+def parse(body: bytes, content_type: str, size: int = 3, field: str = "text"):
+    async def main():
+        return [t async for t in iter_texts(_chunks(body, size), content_type, field)]
+    return asyncio.run(main())
+
+
+def csv_body(texts, field="text"):
+    quote = lambda t: '"' + t.replace('"', '""') + '"' if any(c in t for c in ',"\n') else t
+    return (f"id,{field}\r\n" + "".join(f"{i},{quote(t)}\r\n" for i, t in enumerate(texts))).encode("utf-8")
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 1 << 16])
+def test_json_array(size):
+    body = json.dumps(TEXTS[:2] + [{"text": TEXTS[2]}, {"query": TEXTS[3]}, {"other": 1}, 5],
+                      ensure_ascii=False).encode("utf-8")
+    assert parse(body, "application/json; charset=utf-8", size) == TEXTS[:4] + [None, None]
+
+
+@pytest.mark.parametrize("size", [1, 5, 1 << 16])
+def test_ndjson(size):
+    lines = [json.dumps({"text": t}, ensure_ascii=False) for t in TEXTS] + ["", json.dumps("plain")]
+    body = "\r\n".join(lines).encode("utf-8")
+    assert parse(body, "application/x-ndjson", size) == TEXTS + ["plain"]
+    assert parse(body, "application/jsonl", size, field="query") == [None] * len(TEXTS) + ["plain"]
+
+
+@pytest.mark.parametrize("size", [1, 4, 1 << 16])
+def test_csv_with_quoted_newlines(size):
+    assert parse(csv_body(TEXTS), "text/csv", size) == TEXTS
+    assert parse(csv_body(TEXTS, field="q"), "text/csv", size, field="q") == TEXTS
+
+
+@pytest.mark.parametrize("size", [1, 3, 1 << 16])
+def test_plain_lines(size):
+    body = "a query\r\n\n  \nbản tin\nlast without newline".encode("utf-8")
+    assert parse(body, "text/plain", size) == ["a query", "bản tin", "last without newline"]
+    assert parse(body, "", size) == parse(body, "text/plain", size)
+
+
+def test_empty_bodies():
+    assert parse(b"", "application/json") == []
+    assert parse(b"[]", "application/json") == []
+    assert parse(b"", "application/x-ndjson") == []
+    assert parse(b"", "text/plain") == []
+
+
+@pytest.mark.parametrize("body, content_type, message", [
+    (b'{"text": "x"}', "application/json", "expected a JSON array"),
+    (b'["a", "b"', "application/json", "unterminated JSON array"),
+    (b'["a", nope]', "application/json", "malformed JSON array"),
+    (b'id,query\n1,a\n', "text/csv", "no column 'text'"),
+    (b'text\n"open quote\n', "text/csv", "unterminated quoted CSV field"),
+])
+def test_malformed_bodies(body, content_type, message):
+    with pytest.raises(ValueError, match=message):
+        parse(body, content_type)
+
+
+def test_invalid_utf8_is_replaced():
+    assert parse(b"caf\xe9 live\n", "text/plain") == ["caf� live"]
+
+
+def test_chunked():
+    async def main(n, size):
+        async def texts():
+            for i in range(n):
+                yield i
+        return [b async for b in chunked(texts(), size)]
+
+    assert asyncio.run(main(7, 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert asyncio.run(main(6, 3)) == [[0, 1, 2], [3, 4, 5]]
+    assert asyncio.run(main(0, 3)) == []
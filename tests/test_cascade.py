@@ -0,0 +1,121 @@
+# test_cascade.py
+"""weak_supervision/cascade.py: tier routing, latency budgets and end-model specs."""
+import time
+
+import numpy as np
+import pytest
+
+from lfs.keyword_lfs import LABELS
+from weak_supervision.cascade import DEFAULT_BUDGETS_MS, Cascade, TierClock, load_end_model, parse_budgets
+
+MUSIC, NEWS = LABELS.index("Music"), LABELS.index("News")
+RULES_TEXT = "karaoke shape of you"           # the rules answer Music
+OPEN_TEXT = "a man is walking his dog"         # no rule fires
+
+
+def one_hot(k: int, p: float) -> np.ndarray:
+    out = np.full(len(LABELS), (1 - p) / (len(LABELS) - 1))
+    out[k] = p
+    return out
+
+
+class EndModel:
+    def __init__(self, p: float, delay: float = 0.0):
+        self.p, self.delay, self.calls = p, delay, []
+
+    def scores(self, texts):
+        self.calls.append(list(texts))
+        time.sleep(self.delay)
+        return np.stack([one_hot(NEWS, self.p) for _ in texts])
+
+
+class ZeroShot:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.stack([one_hot(MUSIC, 0.6) for _ in texts])
+
+
+def test_parse_budgets():
+    assert parse_budgets("") == DEFAULT_BUDGETS_MS
+    assert parse_budgets("rules:1, zero_shot:250") == dict(DEFAULT_BUDGETS_MS, rules=1.0, zero_shot=250.0)
+    with pytest.raises(ValueError, match="Unknown tier"):
+        parse_budgets("llm:5")
+
+
+def test_each_tier_only_sees_what_is_left_open():
+    end, zs = EndModel(p=0.9), ZeroShot()
+    out = Cascade(end_model=end, zero_shot=zs).predict([RULES_TEXT, OPEN_TEXT])
+    assert [a["tier"] for a in out] == ["rules", "end_model"]
+    assert out[0] == dict(out[0], label="Music", proba=None, degraded=False)
+    assert out[1]["label"] == "News" and out[1]["proba"] == 0.9
+    assert end.calls == [[OPEN_TEXT]] and zs.calls == []
+    assert all(a["latency_ms"] >= 0 for a in out)
+
+
+def test_unconfident_end_model_goes_to_zero_shot():
+    end, zs = EndModel(p=0.5), ZeroShot()
+    c = Cascade(end_model=end, zero_shot=zs, threshold=0.7)
+    out = c.predict([OPEN_TEXT, RULES_TEXT, OPEN_TEXT + "!"])
+    assert [a["tier"] for a in out] == ["zero_shot", "rules", "zero_shot"]
+    assert zs.calls == [[OPEN_TEXT, OPEN_TEXT + "!"]]
+    tiers = c.metrics()["tiers"]
+    assert tiers["rules"]["answered"] == 1 and tiers["zero_shot"]["answered"] == 2
+    assert tiers["end_model"]["requests"] == 2 and tiers["end_model"]["answered"] == 0
+
+
+def test_without_models_open_rows_fall_back_to_other():
+    out = Cascade().predict([OPEN_TEXT])
+    assert out[0]["label"] == "Other" and out[0]["tier"] == "rules" and not out[0]["degraded"]
+
+
+def test_zero_budget_skips_unobserved_tier():
+    # regression: a tier that does not fit before it was ever observed must not raise KeyError
+    clock = TierClock({"end_model": 0.0})
+    assert not clock.fits("end_model", elapsed=1.0, n=3)
+    assert clock.stats["end_model"]["skipped"] == 3 and "end_model" not in clock.cost
+
+    end, zs = EndModel(p=0.5), ZeroShot()
+    c = Cascade(end_model=end, zero_shot=zs, budgets_ms={"rules": 0.0, "end_model": 0.0, "zero_shot": 0.0})
+    out = c.predict([OPEN_TEXT, RULES_TEXT])
+    assert out[1]["tier"] == "rules"
+    assert out[0]["degraded"] and out[0]["label"] == "Other"
+    assert zs.calls == []
+
+
+def test_degraded_answer_keeps_the_unconfident_end_model():
+    end, zs = EndModel(p=0.5), ZeroShot()
+    c = Cascade(end_model=end, zero_shot=zs, threshold=0.7)
+    c.clock.observe("zero_shot", 10.0)
+    out = c.predict([OPEN_TEXT])
+    assert out[0] == dict(out[0], label="News", proba=0.5, tier="end_model", degraded=True)
+    assert c.clock.stats["zero_shot"]["skipped"] == 1
+
+
+def test_budgets_are_per_request_not_per_batch():
+    # 2000 rows x 0.1 ms of end model = 200 ms per batch, far above the 50 ms per-request budget;
+    # per row it is well inside, so the tier must not be skipped on the second batch
+    end = EndModel(p=0.9, delay=0.2)
+    c = Cascade(end_model=end, budgets_ms={"rules": 50.0, "end_model": 50.0})
+    texts = [f"{OPEN_TEXT} {i}" for i in range(2000)]
+    for _ in range(2):
+        out = c.predict(texts)
+        assert all(a["tier"] == "end_model" and not a["degraded"] for a in out)
+    assert len(end.calls) == 2 and c.clock.stats["end_model"]["skipped"] == 0
+    assert c.clock.cost["end_model"] < 0.050
+
+
+def test_skipped_tier_cost_decays():
+    clock = TierClock({"end_model": 1.0})
+    clock.observe("end_model", 1.0)
+    before = clock.cost["end_model"]
+    assert not clock.fits("end_model", 0.0)
+    assert clock.cost["end_model"] == pytest.approx(before * (1 - clock.alpha))
+
+
+@pytest.mark.parametrize("spec", ["artifacts/end_modle", "./no/such/model", "/tmp/no-such-end-model", "a/b/c"])
+def test_mistyped_end_model_path_raises(spec):
+    with pytest.raises(FileNotFoundError, match="neither a model saved"):
+        load_end_model(spec)
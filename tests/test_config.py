@@ -0,0 +1,83 @@
+# test_config.py
+"""config/: the taxonomy files agree with the label set, and pipeline.yaml is a valid stage graph."""
+import json, os, sys
+
+import pytest
+import yaml
+
+from conftest import ROOT
+from lfs.keyword_lfs import LABELS
+
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+from run_pipeline import load_pipeline, to_flags, topo_order  # noqa: E402
+
+PIPELINE = os.path.join(ROOT, "config", "pipeline.yaml")
+
+
+def test_taxonomy_labels_match_the_rules():
+    with open(os.path.join(ROOT, "config", "taxonomy.yaml"), encoding="utf-8") as f:
+        tax = yaml.safe_load(f)
+    with open(os.path.join(ROOT, "config", "taxonomy_8labels.json"), encoding="utf-8") as f:
+        tax8 = json.load(f)
+    assert tax["labels"] == LABELS == tax8["labels"]
+    for t in (tax, tax8):
+        assert set(t["aliases"]) <= set(LABELS)
+        assert all(t["aliases"][lab] for lab in t["aliases"])
+
+
+def test_snorkel_label_ids_follow_the_label_order():
+    from weak_supervision.snorkel_setup import ABSTAIN, I2L, L2I, LABELS as WS_LABELS
+    assert WS_LABELS == LABELS
+    assert [L2I[lab] for lab in LABELS] == list(range(len(LABELS)))
+    assert I2L[L2I["Music"]] == "Music" and ABSTAIN not in I2L
+
+
+def test_pipeline_stages_resolve():
+    spec = load_pipeline(PIPELINE, [])
+    stages = spec["stages"]
+    for name, st in stages.items():
+        assert os.path.isfile(os.path.join(ROOT, st["script"])), name
+        for extra in st["code"]:
+            assert os.path.exists(os.path.join(ROOT, extra)), (name, extra)
+        assert set(st["deps"]) <= set(stages)
+    order = topo_order(stages, list(stages))
+    assert sorted(order) == sorted(stages)
+    for name in order:
+        assert all(order.index(d) < order.index(name) for d in stages[name]["deps"])
+    assert stages["evaluate"]["deps"] == ["train"]
+    assert stages["train"]["deps"] == ["label"]
+    assert stages["label"]["deps"] == ["build"]
+
+
+def test_pipeline_overrides_are_parsed():
+    spec = load_pipeline(PIPELINE, ["build.offline_only=true", "label.llm_frac=0.05", "label.label_model=wmv"])
+    assert spec["stages"]["build"]["params"]["offline_only"] is True
+    assert spec["stages"]["label"]["params"]["llm_frac"] == 0.05
+    assert spec["stages"]["label"]["params"]["label_model"] == "wmv"
+    for bad in ("nostage.x=1", "build=1", "build.sample"):
+        with pytest.raises(SystemExit):
+            load_pipeline(PIPELINE, [bad])
+
+
+def test_unknown_placeholder_and_cycle(tmp_path):
+    bad = tmp_path / "p.yaml"
+    bad.write_text("stages:\n  a:\n    script: x.py\n    args: {inp: '{nothing}/x'}\n")
+    with pytest.raises(SystemExit, match="unknown placeholders"):
+        load_pipeline(str(bad), [])
+    bad.write_text("stages:\n  a:\n    script: x.py\n    args: {inp: '{b}'}\n"
+                   "  b:\n    script: y.py\n    args: {inp: '{a}'}\n")
+    with pytest.raises(SystemExit, match="cycle"):
+        topo_order(load_pipeline(str(bad), [])["stages"], ["a"])
+
+
+def test_to_flags():
+    assert to_flags({"a": 1, "b": True, "c": False, "d": None, "e": ["x", 2]}) == ["--a", "1", "--b", "--e", "x", "2"]
+
+
+def test_package_and_flat_names_are_one_module():
+    import weak_supervision.profiling as pkg
+    from weak_supervision import model_registry
+    import model_registry as flat_registry
+    import profiling as flat
+    assert pkg is flat and model_registry is flat_registry
+    assert pkg.__name__ == "profiling" and pkg.__spec__.name == "profiling"
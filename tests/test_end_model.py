@@ -0,0 +1,113 @@
+# test_end_model.py
+"""end_model.py (soft-label logistic regression), ngram_model.py and embedding_store.py, without an encoder."""
+import os
+
+import numpy as np
+import pytest
+
+from weak_supervision.embedding_store import EmbeddingStore
+from weak_supervision.end_model import EndModel, confidence_weights, fit_soft_logreg
+from weak_supervision.ngram_model import HashedNgrams, NgramModel, strip_accents
+from weak_supervision.table_io import text_hash
+
+LABELS = ["a", "b", "c"]
+
+
+def blobs(n=300, d=8, seed=0):
+    """Three separable clusters and soft labels that mostly agree with them."""
+    rng = np.random.default_rng(seed)
+    y = rng.integers(0, 3, n)
+    X = rng.normal(size=(n, d)) * 0.3 + np.eye(3, d)[y] * 2
+    Y_prob = np.full((n, 3), 0.1)
+    Y_prob[np.arange(n), y] = 0.8
+    return X.astype(np.float32), Y_prob, y
+
+
+def test_confidence_weights():
+    Y = np.array([[0.9, 0.1], [0.6, 0.4], [0.5, 0.5]])
+    np.testing.assert_allclose(confidence_weights(Y, min_conf=0.55, conf_power=2), [0.81, 0.36, 0.0])
+
+
+def test_blocks_float16_and_sparse_input_give_the_same_fit():
+    from scipy.sparse import csr_matrix
+    X, Y_prob, y = blobs()
+    W, b, meta = fit_soft_logreg(X, Y_prob)
+    assert meta["n_train"] == len(X)
+    assert (np.argmax(X @ W + b, axis=1) == y).mean() > 0.95
+    for kw in ({"block_rows": 37, "max_f32_bytes": 0}, {}):
+        W2, b2, _ = fit_soft_logreg(X.astype(np.float16) if kw else csr_matrix(X), Y_prob, **kw)
+        np.testing.assert_allclose(X @ W2 + b2, X @ W + b, atol=0.05)
+    with pytest.raises(ValueError):
+        fit_soft_logreg(X, Y_prob, min_conf=0.9)
+
+
+def test_end_model_save_load(tmp_path):
+    X, Y_prob, y = blobs()
+    model = EndModel.fit(X, Y_prob, LABELS, encoder="some/encoder", min_conf=0.5)
+    assert model.meta["min_conf"] == 0.5
+    path = str(tmp_path / "end_model")
+    assert not EndModel.exists(path)
+    model.save(path)
+    back = EndModel.load(path)
+    assert EndModel.exists(path) and back.labels == LABELS and back.encoder_name == "some/encoder"
+    np.testing.assert_allclose(back.proba(X), model.proba(X))
+    assert back.predict(X[:3]) == [LABELS[k] for k in y[:3]]
+
+
+def test_ngram_features_ignore_case_spacing_and_accents():
+    f = HashedNgrams(bits=12)
+    X = f.transform(["Nhạc  Sơn Tùng", "nhạc sơn tùng", "nhac son tung", "bóng đá"]).toarray()
+    assert X.shape == (4, 4096) and f.transform([]).shape == (0, 4096)
+    np.testing.assert_allclose(np.linalg.norm(X, axis=1), 1, rtol=1e-6)
+    np.testing.assert_array_equal(X[0], X[1])
+    assert X[1] @ X[2] > X[1] @ X[3]  # the unaccented spelling shares the stripped words
+    assert strip_accents("Đá bóng tập gym") == "Da bong tap gym"
+
+
+def test_ngram_model_fit_save_load(tmp_path):
+    texts = ["nhạc remix", "nhạc bolero", "karaoke nhạc trẻ", "bóng đá hôm nay", "trực tiếp bóng đá",
+             "kết quả bóng đá", "cách nấu phở", "cách làm bánh", "hướng dẫn cách vẽ"] * 3
+    Y_prob = np.repeat(np.eye(3) * 0.7 + 0.1, 3, axis=0)
+    Y_prob = np.tile(Y_prob, (3, 1))
+    model = NgramModel.fit(texts, Y_prob, LABELS, HashedNgrams(bits=14))
+    path = str(tmp_path / "ngram")
+    model.save(path)
+    back = NgramModel.load(path)
+    assert NgramModel.exists(path) and not EndModel.exists(path) and back.labels == LABELS
+    assert back.featurizer.config() == model.featurizer.config()
+    np.testing.assert_allclose(back.scores(texts), model.scores(texts), atol=1e-6)
+    X = back.featurizer.transform(["nhac bolero", "bong da", "cach nau"])
+    assert back.predict(X) == LABELS
+
+
+class FakeEncoder:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts):
+        self.calls.append(list(texts))
+        return np.array([[len(t), t.count("a"), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_embedding_store_embeds_each_text_once_and_survives_a_crash(tmp_path):
+    root = str(tmp_path / "emb")
+    store = EmbeddingStore(root, model="org/enc", batch_rows=2)
+    store.encoder = FakeEncoder()
+    rows = store.lookup(["x", "aa", "x", "bab"])
+    assert rows.tolist() == [0, 1, 0, 2] and store.encoder.calls == [["x", "aa"], ["bab"]]
+    np.testing.assert_array_equal(store.embed(["bab", "aa"]), [[3, 1, 1], [2, 2, 1]])
+
+    again = EmbeddingStore(root, model="org/enc")
+    again.encoder = FakeEncoder()
+    assert again.lookup(["aa", "cc"]).tolist() == [1, 3] and again.encoder.calls == [["cc"]]
+    assert again.hashes[:3] == [text_hash(t) for t in ("x", "aa", "bab")]
+    # an append cut short: half a row and a partial hash line are dropped on the next open
+    with open(again.emb_path, "ab") as f:
+        f.write(b"\0\0\0")
+    with open(again.hash_path, "a", encoding="ascii") as f:
+        f.write("abc")
+    back = EmbeddingStore(root, model="org/enc")
+    assert len(back) == 4 and os.path.getsize(back.emb_path) == 4 * 3 * 2
+    assert back.matrix().dtype == np.float16 and back.matrix().shape == (4, 3)
+    with pytest.raises(RuntimeError):
+        EmbeddingStore(root, model="org_enc")  # same directory name, other model
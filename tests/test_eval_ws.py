@@ -0,0 +1,34 @@
+# test_eval_ws.py
+"""weak_supervision/eval_ws_on_gold.py: the gold / weak-label join refuses to report on too few rows."""
+import pandas as pd
+import pytest
+
+from weak_supervision.eval_ws_on_gold import match_gold
+
+GOLD = pd.DataFrame({"text": ["a", "b", "c", "d"], "label": ["Music", "News", "Sports", "Review"]})
+
+
+def weak(texts):
+    return pd.DataFrame({"text": texts, "ws_label": ["Music"] * len(texts)})
+
+
+def test_full_coverage_keeps_every_gold_row_once():
+    df = match_gold(GOLD, weak(["a", "b", "c", "d", "a", "x"]))
+    assert sorted(df["text"]) == ["a", "b", "c", "d"]
+
+
+def test_partial_coverage_warns(capsys):
+    df = match_gold(GOLD, weak(["a", "b", "x"]))
+    assert len(df) == 2
+    assert "2/4 gold rows (50.0%)" in capsys.readouterr().err
+
+
+def test_low_coverage_fails():
+    with pytest.raises(SystemExit, match="1/4 gold rows"):
+        match_gold(GOLD, weak(["a", "x"]))
+    assert len(match_gold(GOLD, weak(["a", "x"]), min_coverage=0)) == 1
+
+
+def test_empty_join_fails_even_without_threshold():
+    with pytest.raises(SystemExit, match="0/4 gold rows"):
+        match_gold(GOLD, weak(["x", "y"]), min_coverage=0)
@@ -0,0 +1,77 @@
+# test_evaluation.py
+"""weak_supervision/evaluation.py against sklearn and a per-resample bootstrap."""
+import numpy as np
+import pytest
+from sklearn.metrics import accuracy_score, classification_report, f1_score
+
+from lfs.keyword_lfs import LABELS
+from weak_supervision.evaluation import bootstrap_weights, confusion, encode, evaluate, format_report
+
+
+def sample(n=300, seed=0, outside=True):
+    rng = np.random.default_rng(seed)
+    y = rng.choice(LABELS, n).tolist()
+    pred = [t if rng.random() < 0.6 else rng.choice(LABELS) for t in y]
+    if outside:  # abstentions / unknown labels of the baselines
+        for i in rng.choice(n, 20, replace=False):
+            pred[i] = rng.choice(["", "UNK", None])
+    return y, pred
+
+
+@pytest.mark.parametrize("outside", [False, True])
+def test_point_metrics_match_sklearn(outside):
+    y, pred = sample(outside=outside)
+    res = evaluate(y, {"p": pred}, LABELS, n_boot=0)["p"]
+    pred_s = ["<none>" if p is None else p for p in pred]
+    assert res["accuracy"] == pytest.approx(accuracy_score(y, pred_s))
+    assert res["macro_f1"] == pytest.approx(f1_score(y, pred_s, labels=LABELS, average="macro", zero_division=0))
+    ref = classification_report(y, pred_s, labels=LABELS, output_dict=True, zero_division=0)
+    assert set(res["report"]) == set(ref)
+    for key, row in ref.items():
+        if isinstance(row, dict):
+            for m, v in row.items():
+                assert res["report"][key][m] == pytest.approx(v), (key, m)
+        else:
+            assert res["report"][key] == pytest.approx(row)
+    assert res["n"] == len(y) and "ci" not in res
+
+
+def test_confusion_matrix_and_encoding():
+    assert encode(["Music", None, "KIS", "x"], LABELS).tolist() == [2, 8, 0, 8]
+    y, pred = sample(outside=False)
+    K = len(LABELS)
+    cm = confusion(encode(y, LABELS), encode(pred, LABELS), K)
+    assert cm.sum() == len(y) and cm[:, K].sum() == 0
+    assert evaluate(y, pred, LABELS, n_boot=0)["predictions"]["confusion_matrix"] == cm[:K, :K].tolist()
+
+
+def test_bootstrap_matches_resampling():
+    y, pred = sample(n=120, seed=1)
+    n_boot, seed = 200, 3
+    res = evaluate(y, {"p": pred}, LABELS, n_boot=n_boot, seed=seed)["p"]
+    W = bootstrap_weights(len(y), n_boot, seed)
+    assert W.shape == (n_boot, len(y)) and (W.sum(axis=1) == len(y)).all()
+    pred_s = ["<none>" if p is None else p for p in pred]
+    acc = [accuracy_score(y, pred_s, sample_weight=w) for w in W]
+    f1 = [f1_score(y, pred_s, labels=LABELS, average="macro", zero_division=0, sample_weight=w) for w in W]
+    np.testing.assert_allclose(res["ci"]["accuracy"], np.quantile(acc, [0.025, 0.975]), atol=1e-6)
+    np.testing.assert_allclose(res["ci"]["macro_f1"], np.quantile(f1, [0.025, 0.975]), atol=1e-6)
+    assert res["ci"]["accuracy"][0] <= res["accuracy"] <= res["ci"]["accuracy"][1]
+
+
+def test_paired_delta():
+    y, pred = sample(seed=2)
+    res = evaluate(y, {"base": pred, "same": list(pred), "gold": y}, LABELS, n_boot=100, reference="base")
+    assert "delta_vs_base" not in res["base"]
+    assert res["same"]["delta_vs_base"]["accuracy"] == {"value": 0.0, "ci": [0.0, 0.0]}
+    d = res["gold"]["delta_vs_base"]["macro_f1"]
+    assert d["value"] == pytest.approx(1.0 - res["base"]["macro_f1"]) and 0 < d["ci"][0] <= d["ci"][1]
+
+
+def test_length_mismatch_and_report_text():
+    y, pred = sample(n=50)
+    with pytest.raises(ValueError, match="rows"):
+        evaluate(y, pred[:-1], LABELS)
+    res = evaluate(y, pred, LABELS, n_boot=50)["predictions"]
+    text = format_report(res, LABELS)
+    assert "micro avg" in text and "bootstrap CI (n_boot=50)" in text
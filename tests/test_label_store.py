@@ -0,0 +1,63 @@
+# test_label_store.py
+"""weak_supervision/label_store.py and run_label_model --incremental: segments, parts, duplicates."""
+import os, subprocess, sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import ROOT
+from weak_supervision.label_store import LabelStore
+from weak_supervision.sparse_label_matrix import SparseLabelMatrix
+from weak_supervision.table_io import read_table, table_parts
+
+META = {"lf_sha1": "x", "llm_labeler": "none"}
+
+
+def test_segments_survive_a_reload(tmp_path):
+    root = str(tmp_path / "store")
+    store = LabelStore(root, META)
+    store.append(["h0", "h1"], SparseLabelMatrix.from_dense(np.array([[0, -1], [-1, 1]], dtype=np.int8)))
+    store.append(["h2"], SparseLabelMatrix.from_dense(np.array([[2, 2]], dtype=np.int8)))
+    again = LabelStore(root, META)
+    assert again.hashes == ["h0", "h1", "h2"] and again.segments() == [(0, 2), (2, 3)]
+    np.testing.assert_array_equal(again.L.to_dense(), [[0, -1], [-1, 1], [2, 2]])
+    with pytest.raises(RuntimeError):
+        LabelStore(root, dict(META, lf_sha1="y"))
+
+
+def label(unlab, outdir, *extra, model="wmv"):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([os.path.join(ROOT, "weak_supervision"),
+                                                       os.path.join(ROOT, "lfs")]))
+    r = subprocess.run([sys.executable, os.path.join(ROOT, "weak_supervision", "run_label_model.py"),
+                        "--unlab", str(unlab), "--outdir", str(outdir), "--llm_labeler", "none",
+                        "--label_model", model, *extra], cwd=ROOT, env=env, capture_output=True, text=True)
+    assert r.returncode == 0, r.stdout + r.stderr
+    return r.stdout
+
+
+def test_incremental_replaces_only_changed_parts_and_matches_full(tmp_path):
+    pool = read_table(os.path.join(ROOT, "data/processed/unlabeled_pool.csv"))["text"].tolist()
+    days = [pool[:200] + pool[:5], pool[:200] + pool[:5] + pool[200:300], pool[:300] + pool[300:400]]
+    out = tmp_path / "inc"
+    weak = out / "weak_labels_all.parquet"
+    for day, texts in enumerate(days):
+        pd.DataFrame({"text": texts}).to_csv(tmp_path / f"day{day}.csv", index=False)
+    label(tmp_path / "day0.csv", out, "--incremental")
+    first = weak / "part-00000.parquet"
+    stamp = os.stat(first).st_mtime_ns
+    log = label(tmp_path / "day1.csv", out, "--incremental")  # plain majority vote: old rows keep their labels
+    assert "0 of 1 parts replaced" in log and os.stat(first).st_mtime_ns == stamp
+    log = label(tmp_path / "day2.csv", out, "--incremental", "--conf_tol", "0", model="dawid_skene")
+    assert "of 2 parts replaced" in log and os.stat(first).st_mtime_ns != stamp
+    for t in ("weak_labels_all", "weak_train_0p75", "label_matrix", "label_probs"):
+        assert table_parts(str(out / f"{t}.parquet")) == 3
+    inc = read_table(str(weak))
+    assert read_table(str(out / "label_probs.parquet"))["text_hash"].tolist() == inc["text_hash"].tolist()
+
+    label(tmp_path / "day2.csv", tmp_path / "full", model="dawid_skene")
+    full = read_table(str(tmp_path / "full" / "weak_labels_all.parquet"))
+    assert len(inc) == len(full) == 400 and inc["text"].is_unique and set(inc["text"]) == set(full["text"])
+    # a pool with duplicate texts labels each text once in both modes
+    label(tmp_path / "day0.csv", tmp_path / "full0")
+    assert len(read_table(str(tmp_path / "full0" / "weak_labels_all.parquet"))) == 200
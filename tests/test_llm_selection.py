@@ -0,0 +1,59 @@
+# test_llm_selection.py
+"""weak_supervision/llm_selection.py: uncertainty tiers, ranking and the budgeted LLM column."""
+import numpy as np
+import pytest
+
+from weak_supervision.llm_labeler_hf import select_rows
+from weak_supervision.llm_selection import (TIER_ALL_ABSTAIN, TIER_CONFLICT, TIER_REST, budgeted_llm_column, lf_tiers,
+                                            rank_rows)
+from weak_supervision.snorkel_setup import ABSTAIN
+from weak_supervision.sparse_label_matrix import SparseLabelMatrix
+
+A = ABSTAIN
+L = np.array([[0, A, 0],   # agree
+              [A, A, A],   # all abstain
+              [1, 2, A],   # conflict
+              [3, A, A],   # one vote
+              [A, A, A],   # all abstain
+              [1, 1, 2]])  # conflict
+
+
+def test_tiers_dense_and_sparse():
+    expected = [TIER_REST, TIER_ALL_ABSTAIN, TIER_CONFLICT, TIER_REST, TIER_ALL_ABSTAIN, TIER_CONFLICT]
+    assert lf_tiers(L).tolist() == expected
+    assert lf_tiers(SparseLabelMatrix.from_dense(L)).tolist() == expected
+
+
+def test_rank_rows_orders_by_tier_then_confidence():
+    conf = np.array([0.9, 0.5, 0.5, 0.6, 0.5, 0.4])
+    order = rank_rows(L, conf)
+    assert sorted(order[:2].tolist()) == [1, 4] and order[2:4].tolist() == [5, 2] and order[4:].tolist() == [3, 0]
+    assert rank_rows(L, conf, exclude=np.isin(np.arange(6), [1, 5])).tolist() == [4, 2, 3, 0]
+
+
+def test_random_strategy_is_the_seeded_shuffle():
+    calls = []
+
+    def vote(rows):
+        calls.append(rows.tolist())
+        return np.zeros(len(rows), dtype=int)
+    col, log = budgeted_llm_column(L, 3, vote, strategy="random", rounds=4, seed=7)
+    assert calls == [select_rows(len(L), 3, 7)] and log[0]["calls"] == 3
+    assert np.flatnonzero(col != ABSTAIN).tolist() == sorted(calls[0])
+
+
+def test_uncertainty_spends_the_budget_on_the_open_rows_in_rounds():
+    pytest.importorskip("snorkel")
+    calls = []
+
+    def vote(rows):
+        calls.append(rows.tolist())
+        return np.where(rows == 2, ABSTAIN, 1)  # the LLM abstains on row 2
+    col, log = budgeted_llm_column(L, 4, vote, strategy="uncertainty", rounds=2)
+    assert [len(c) for c in calls] == [2, 2] and sorted(calls[0]) == [1, 4]
+    assert sorted(calls[1]) == [2, 5]  # the conflicts come next, nobody is asked twice
+    assert col.tolist() == [A, 1, A, A, 1, 1]
+    assert [r["all_abstain"] for r in log] == [2, 0] and [r["conflict"] for r in log] == [0, 2]
+    assert log[1]["votes"] == 1
+    with pytest.raises(ValueError):
+        budgeted_llm_column(L, 1, vote, strategy="greedy")
@@ -0,0 +1,58 @@
+# test_near_dup.py
+"""scripts/near_dup.py: MinHash / LSH clustering and the pool-builder deduper with its sidecar."""
+import os, sys
+
+import pytest
+
+from conftest import ROOT
+
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+from near_dup import (NearDupIndex, PoolDeduper, cluster_near_duplicates, clusters_path, lsh_params,  # noqa: E402
+                      shingles)
+from weak_supervision.table_io import read_table  # noqa: E402
+
+CAPTIONS = ["a man is playing a guitar on stage",
+            "a man is playing the guitar on stage",
+            "a woman is cooking pasta in a kitchen",
+            "a man is playing a guitar on a stage",
+            "two dogs run across a snowy field",
+            "a woman cooking pasta in the kitchen"]
+
+
+def test_shingles_and_lsh_params():
+    assert shingles("A man, a plan", 2) == ["a man", "man a", "a plan"]
+    assert shingles("hi", 2) == ["hi"]
+    b, r = lsh_params(64, 0.7)
+    assert b * r <= 64 and abs((1 / b) ** (1 / r) - 0.7) < 0.05
+
+
+def test_clusters_paraphrases_and_keeps_the_first_as_representative():
+    ids = cluster_near_duplicates(CAPTIONS, threshold=0.6).tolist()
+    assert ids[0] == ids[1] == ids[3] == 0
+    assert ids[2] == ids[5] == 2 and ids[4] == 4
+    # threshold 1: only identical word sets ("a ... on a stage" has the words of "a ... on stage")
+    assert cluster_near_duplicates(CAPTIONS, threshold=1.0).tolist() == [0, 1, 2, 0, 4, 5]
+
+
+def test_index_assigns_across_batches_like_one_pass():
+    one = NearDupIndex(threshold=0.6).assign(CAPTIONS)
+    index = NearDupIndex(threshold=0.6)
+    assert index.assign(CAPTIONS[:2]) + index.assign([]) + index.assign(CAPTIONS[2:]) == one
+    assert len(index) == len(set(one)) and index.seen == len(CAPTIONS)
+
+
+@pytest.mark.parametrize("ext", [".csv", ".parquet"])
+def test_deduper_filters_and_writes_the_sampled_clusters(tmp_path, ext):
+    dedup = PoolDeduper(threshold=0.6, chunk=2)
+    reps = list(dedup.filter(CAPTIONS))
+    assert reps == [CAPTIONS[0], CAPTIONS[2], CAPTIONS[4]]
+    pool = [CAPTIONS[2], CAPTIONS[0]]  # the sampler kept two of the three clusters, in its own order
+    pool_path = str(tmp_path / f"pool{ext}")
+    side = dedup.write_sidecar(pool, pool_path)
+    assert side == clusters_path(pool_path) == str(tmp_path / f"pool.clusters{ext}")
+    got = read_table(side)
+    assert sorted(got["text"]) == sorted([CAPTIONS[i] for i in (0, 1, 2, 3, 5)])
+    rep = dict(zip(got["text"], got["rep_text"]))
+    assert rep[CAPTIONS[3]] == CAPTIONS[0] and rep[CAPTIONS[5]] == CAPTIONS[2]
+    cid = dict(zip(got["text"], got["cluster_id"].astype(int)))
+    assert cid[CAPTIONS[1]] == 1 and cid[CAPTIONS[5]] == 0
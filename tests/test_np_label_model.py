@@ -0,0 +1,84 @@
+# test_np_label_model.py
+"""weak_supervision/np_label_model.py against snorkel's MajorityLabelVoter / LabelModel on simulated LFs."""
+import numpy as np
+import pytest
+
+from weak_supervision.np_label_model import DawidSkene, WeightedMajorityVote, _NumpyLabelModel
+from weak_supervision.snorkel_setup import ABSTAIN
+from weak_supervision.sparse_label_matrix import SparseLabelMatrix
+
+K = 4
+
+
+def simulate(n=3000, m=8, seed=0):
+    """L [n, m] of LFs that fire on 40% of the rows with accuracies in [0.6, 0.9], and the true Y."""
+    rng = np.random.default_rng(seed)
+    Y = rng.choice(K, size=n, p=[0.4, 0.3, 0.2, 0.1])
+    acc = rng.uniform(0.6, 0.9, m)
+    L = np.full((n, m), ABSTAIN)
+    for j in range(m):
+        fire = rng.random(n) < 0.4
+        vote = np.where(rng.random(n) < acc[j], Y, (Y + rng.integers(1, K, n)) % K)
+        L[fire, j] = vote[fire]
+    return L, Y, acc
+
+
+def test_abstract_base_cannot_be_instantiated():
+    with pytest.raises(TypeError):
+        _NumpyLabelModel(cardinality=K)
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_majority_vote_matches_snorkel(seed):
+    MajorityLabelVoter = pytest.importorskip("snorkel.labeling.model").MajorityLabelVoter
+    L, _, _ = simulate(seed=seed)
+    ref = MajorityLabelVoter(cardinality=K).predict_proba(L)
+    ours = WeightedMajorityVote(cardinality=K).fit(L).predict_proba(L)
+    # snorkel splits ties evenly, we break them by the prior: compare the rows with one winner
+    untied = (L != ABSTAIN).any(axis=1) & ((ref == ref.max(axis=1, keepdims=True)).sum(axis=1) == 1)
+    assert untied.mean() > 0.7
+    assert np.array_equal(ours.argmax(axis=1)[untied], ref.argmax(axis=1)[untied])
+    # rows without votes get the (uniform) prior
+    np.testing.assert_allclose(ours[~(L != ABSTAIN).any(axis=1)], 1.0 / K)
+
+
+def test_weighted_vote_learns_the_lf_accuracies_from_gold():
+    L, Y, acc = simulate(seed=2)
+    wmv = WeightedMajorityVote(cardinality=K).fit(L, Y)
+    np.testing.assert_allclose(wmv.weights, np.log(acc / (1 - acc)), atol=0.25)  # ~1000 gold votes per LF
+    # the most accurate LF alone outvotes the least accurate one
+    best, worst = int(np.argmax(acc)), int(np.argmin(acc))
+    row = np.full((1, L.shape[1]), ABSTAIN)
+    row[0, best], row[0, worst] = 1, 2
+    assert wmv.predict(row).tolist() == [1]
+    with pytest.raises(ValueError):
+        WeightedMajorityVote(cardinality=K).fit(L, Y[:-1])
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_dawid_skene_at_least_as_accurate_as_snorkel(seed):
+    LabelModel = pytest.importorskip("snorkel.labeling.model").LabelModel
+    L, Y, _ = simulate(seed=seed)
+    covered = (L != ABSTAIN).any(axis=1)
+    ref = LabelModel(cardinality=K, verbose=False)
+    ref.fit(L, n_epochs=500, lr=1e-2, seed=42, progress_bar=False)
+    ds = DawidSkene(cardinality=K).fit(L, seed=42)
+    acc_ref = (ref.predict(L, tie_break_policy="random") == Y)[covered].mean()
+    acc_ds = (ds.predict(L) == Y)[covered].mean()
+    assert acc_ds >= acc_ref - 0.02, (acc_ds, acc_ref)
+    proba = ds.predict_proba(L)
+    np.testing.assert_allclose(proba.sum(axis=1), 1.0)
+    cond = ds.get_conditional_probs()
+    assert cond.shape == (L.shape[1], K, K + 1)
+    np.testing.assert_allclose(cond.sum(axis=2), 1.0)
+
+
+def test_dawid_skene_chunks_and_sparse_input_give_the_same_model():
+    L, _, _ = simulate(n=1000, seed=3)
+    dense = DawidSkene(cardinality=K).fit(L, seed=7)
+    chunked = DawidSkene(cardinality=K).fit(SparseLabelMatrix.from_dense(L), seed=7, chunk_size=97)
+    np.testing.assert_allclose(chunked.log_conf, dense.log_conf)
+    np.testing.assert_allclose(chunked.predict_proba(L, chunk_size=64), dense.predict_proba(L))
+    assert dense.history == sorted(dense.history)  # EM never decreases the likelihood
+    with pytest.raises(ValueError):
+        DawidSkene(cardinality=2).fit(L)
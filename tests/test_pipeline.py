@@ -0,0 +1,44 @@
+# test_pipeline.py
+"""scripts/run_pipeline.py end to end: the default config/pipeline.yaml on a small offline fixture, then from cache."""
+import json, os, shutil, subprocess, sys
+
+import yaml
+
+from conftest import ROOT
+from weak_supervision.table_io import read_table
+
+
+def run(*argv):
+    return subprocess.run([sys.executable, os.path.join(ROOT, "scripts", "run_pipeline.py"), *argv],
+                          cwd=ROOT, capture_output=True, text=True)
+
+
+def test_default_pipeline_finishes_offline_then_hits_the_cache(tmp_path):
+    gold = read_table(os.path.join(ROOT, "data/processed/gold_label.csv"), columns=["text", "label"]).head(60)
+    gold.to_csv(tmp_path / "gold.csv", index=False)
+    with open(os.path.join(ROOT, "config/pipeline.yaml"), encoding="utf-8") as f:
+        spec = yaml.safe_load(f)
+    spec["sources"]["gold"] = str(tmp_path / "gold.csv")
+    with open(tmp_path / "pipeline.yaml", "w", encoding="utf-8") as f:
+        yaml.safe_dump(spec, f)
+    sets = ["build.offline_only=true", "build.synthetic=120", "build.sample=200", "label.llm_labeler=none",
+            "eval_ws.n_boot=0", "baseline_rules.n_boot=0", "evaluate.n_boot=0"]
+    argv = ["--pipeline", str(tmp_path / "pipeline.yaml"), "--workdir", str(tmp_path / "work"),
+            "--cache", str(tmp_path / "cache"), "--jobs", "1", *[a for s in sets for a in ("--set", s)]]
+    r = run(*argv)
+    assert r.returncode == 0, r.stdout + r.stderr
+    assert "6 ran" in r.stdout
+    work = tmp_path / "work"
+    with open(work / "eval_ws" / "metrics_weak_labels.json", encoding="utf-8") as f:
+        assert json.load(f)["gold_coverage"] == {"matched": 60, "gold": 60}  # build kept the gold texts
+    assert (work / "train" / "meta.json").exists()
+    assert (work / "evaluate" / "metrics_end_model_train.json").exists()
+
+    # same inputs and params: every stage is a cache hit, its outputs restored from the store
+    shutil.rmtree(work)
+    r = run(*argv)
+    assert r.returncode == 0 and "6 cached" in r.stdout and " ran" not in r.stdout, r.stdout + r.stderr
+    assert (work / "evaluate" / "metrics_end_model_train.json").exists()
+    # one changed parameter reruns only that stage
+    r = run(*argv, "--set", "evaluate.n_boot=10")
+    assert r.returncode == 0 and "1 ran, 5 cached" in r.stdout, r.stdout + r.stderr
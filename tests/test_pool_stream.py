@@ -0,0 +1,44 @@
+# test_pool_stream.py
+"""scripts/pool_stream.py: filtering, the distinct bottom-k sampler and its pinned texts."""
+import os, sys
+
+from conftest import ROOT
+
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+from pool_stream import DistinctReservoir, filtered, read_texts  # noqa: E402
+
+STREAM = [f"query number {i}" for i in range(200)]
+
+
+def test_filtered_strips_and_bounds_word_count():
+    assert list(filtered(["  a b c  ", "a b", None, "", "w " * 81, "x y z"], 3, 80)) == ["a b c", "x y z"]
+
+
+def test_sample_is_distinct_bounded_and_order_free():
+    a = DistinctReservoir(20, seed=1)
+    a.extend(STREAM + STREAM[:50])
+    b = DistinctReservoir(20, seed=1)
+    b.extend(reversed(STREAM))
+    assert len(a) == 20 and len(set(a.sample())) == 20
+    assert a.sample() == b.sample()
+    assert a.seen == 250
+
+
+def test_pinned_texts_are_always_kept_and_share_k():
+    pinned = ["gold one here", "gold two here", STREAM[7]]
+    r = DistinctReservoir(10, seed=1, pinned=pinned)
+    r.extend(STREAM)
+    got = r.sample()
+    assert len(got) == 10 and len(set(got)) == 10
+    assert set(pinned) <= set(got)
+    r = DistinctReservoir(2, seed=1, pinned=pinned)  # more pinned texts than k: the pool is the pinned set
+    r.extend(STREAM)
+    assert sorted(r.sample()) == sorted(pinned)
+
+
+def test_read_texts(tmp_path):
+    p = tmp_path / "gold.csv"
+    p.write_text("text,label\nb text,Music\na text,News\nb text,Music\n", encoding="utf-8")
+    q = tmp_path / "more.txt"
+    q.write_text("c text\n\n", encoding="utf-8")
+    assert read_texts([str(p), str(q)]) == ["b text", "a text", "c text"]
@@ -0,0 +1,72 @@
+# test_profiling.py
+"""weak_supervision/profiling.py: stages, counters, merging worker records, instrumentation."""
+import json
+
+import pytest
+
+from weak_supervision import profiling
+from weak_supervision.profiling import Profiler
+
+
+def test_disabled_profiler_records_nothing():
+    p = Profiler(enabled=False)
+    assert p.stage("a") is p.stage("b")  # the shared no-op context manager
+    with p.stage("a"):
+        p.record("lf", "x", hits=1)
+    assert p.snapshot() == {"stages": {}, "counters": {}}
+
+
+def test_nested_stages_and_counters():
+    p = Profiler(enabled=True)
+    with p.stage("fit"):
+        assert p.current() == "fit"
+        for _ in range(2):
+            with p.stage("epoch"):
+                assert p.current() == "fit/epoch"
+                p.record("zero_shot", "nli", seconds=0.5, items=10)
+    p.record("zs_cache", "lookup", calls=4, hits=3)
+    rep = p.report()
+    assert set(rep["stages"]) == {"fit", "fit/epoch"} and rep["stages"]["fit/epoch"]["calls"] == 2
+    assert rep["stages"]["fit"]["wall_s"] >= rep["stages"]["fit/epoch"]["wall_s"]
+    assert rep["counters"]["zero_shot"]["nli"]["items_per_s"] == 20.0
+    assert rep["counters"]["zs_cache"]["lookup"]["hit_rate"] == 0.75
+    assert rep["peak_rss_mb"] > 0 and p.current() == ""
+
+
+def test_worker_records_merge_under_the_parent_stage():
+    worker, parent = Profiler(enabled=True), Profiler(enabled=True)
+    with worker.stage("lfs"):
+        worker.record("lf", "kw_music", hits=1, seconds=0.1)
+    snap = worker.drain()
+    assert worker.snapshot() == {"stages": {}, "counters": {}}
+    with parent.stage("label"):
+        parent.merge(snap)
+        parent.merge(snap)
+    parent.merge(snap, prefix="")
+    stages = parent.snapshot()["stages"]
+    assert stages["label/lfs"]["calls"] == 2 and stages["lfs"]["calls"] == 1
+    c = parent.snapshot()["counters"]["lf"]["kw_music"]
+    assert c["calls"] == c["hits"] == 3 and c["seconds"] == pytest.approx(0.3)
+
+
+class Engine:
+    names = ["Music", "News"]
+
+    def scan(self, text):
+        return 0b01 if "nhạc" in text else 0
+
+
+def test_instrument_engine_and_write_report(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILER", Profiler(enabled=True))
+    engine = Engine()
+    profiling.instrument_engine(engine, "kw")
+    profiling.instrument_engine(engine, "kw")  # wrapped once
+    assert [engine.scan(t) for t in ("nhạc trẻ", "tin tức")] == [1, 0]
+    counters = profiling.report()["counters"]["regex"]
+    assert counters["kw"]["calls"] == 2 and counters["kw"]["hits"] == 1
+    assert counters["kw[Music]"]["hits"] == 1 and counters["kw[News]"]["hits"] == 0
+    path = str(tmp_path / "out" / "profile_report.json")
+    profiling.write_report(path, run="test")
+    with open(path, "r", encoding="utf-8") as f:
+        rep = json.load(f)
+    assert rep["meta"] == {"run": "test"} and rep["enabled"] and "kw" in rep["counters"]["regex"]
@@ -0,0 +1,95 @@
+# test_result_cache.py
+"""app/result_cache.py: canonical keys, the process LRU and the shared SQLite store."""
+import sqlite3
+
+import pytest
+
+import app.result_cache as rc
+from app.result_cache import ResultCache, SharedStore, canonical_query
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+
+    def tick(dt=1.0):
+        now[0] += dt
+    monkeypatch.setattr(rc.time, "time", lambda: now[0])
+    return tick
+
+
+def test_canonical_query():
+    nfd = "Bản tin  THỜI SỰ"
+    assert canonical_query(nfd) == canonical_query(" bản tin thời sự ") == "bản tin thời sự"
+
+
+def test_process_lru_and_ttl(clock):
+    c = ResultCache(max_entries=2, ttl_seconds=10)
+    c.put("a", 1)
+    c.put("b", 2)
+    assert c.get("a") == 1
+    c.put("c", 3)  # evicts b, the least recently used
+    assert c.get("b") is None and c.get("a") == 1 and c.get("c") == 3
+    clock(11)
+    assert c.get("a") is None
+    assert c.stats == dict(c.stats, hits=3, misses=2, evictions=1, expired=1)
+
+
+def test_shared_hit_between_workers(tmp_path, clock):
+    path = str(tmp_path / "shared.sqlite")
+    w1, w2 = (ResultCache(10, 10, version="v1", shared_path=path) for _ in range(2))
+    w1.put("q", {"label": "Music"})
+    assert w2.get("q") == {"label": "Music"} and w2.stats["shared_hits"] == 1
+    assert ResultCache(10, 10, version="v2", shared_path=path).get("q") is None
+    clock(11)
+    assert ResultCache(10, 10, version="v1", shared_path=path).get("q") is None
+
+
+def test_shared_count_is_incremental(tmp_path, clock):
+    path = str(tmp_path / "shared.sqlite")
+    a, b = SharedStore(path), SharedStore(path)
+    for i in range(5):
+        a.put("v", f"k{i}", i, 1e12)
+    b.put("v", "k0", "again", 1e12)  # an overwrite is not a new row
+    b.put("v2", "k0", 0, 1e12)
+    assert len(a) == len(b) == 6
+    assert a.get("v", "k0")[1] == "again"
+
+
+def test_shared_eviction_is_lru(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(rc, "TOUCH_SECONDS", 0.0)
+    store = SharedStore(str(tmp_path / "shared.sqlite"), max_entries=4)
+    for k in "abcd":
+        store.put("v", k, k, 1e12)
+        clock()
+    assert store.get("v", "a") is not None  # a is now the most recently used
+    clock()
+    store.put("v", "e", "e", 1e12)  # 5 > 4: down to int(0.9 * 4) = 3 rows
+    assert len(store) == 3
+    assert [k for k in "abcde" if store.get("v", k)] == ["a", "d", "e"]
+
+
+def test_shared_eviction_drops_expired_first(tmp_path, clock):
+    store = SharedStore(str(tmp_path / "shared.sqlite"), max_entries=4)
+    for k in "abc":
+        store.put("v", k, k, 1e12)
+        clock()
+    store.put("v", "old", 0, rc.time.time() + 5)  # most recently used, but about to expire
+    clock(10)
+    store.put("v", "d", "d", 1e12)  # 5 > 4: the expired row goes, then one LRU row down to 3
+    assert len(store) == 3
+    assert [k for k in ("a", "b", "c", "d", "old") if store.get("v", k)] == ["b", "c", "d"]
+
+
+def test_shared_file_without_counter(tmp_path):
+    path = str(tmp_path / "shared.sqlite")
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE results (version TEXT NOT NULL, k TEXT NOT NULL, v TEXT NOT NULL, expires REAL NOT NULL,"
+               " last_used REAL NOT NULL, PRIMARY KEY (version, k)) WITHOUT ROWID")
+    db.executemany("INSERT INTO results VALUES (?,?,?,?,?)", [("v", str(i), "1", 1e12, 0.0) for i in range(7)])
+    db.commit()
+    db.close()
+    store = SharedStore(path)
+    assert len(store) == 7
+    store.put("v", "new", 1, 1e12)
+    assert len(store) == 8
@@ -0,0 +1,104 @@
+# test_serving.py
+"""app/serving_artifact.py and app/prefork.py: one mapped artifact, workers forked from a preloaded master."""
+import json, os, signal, socket, subprocess, sys, time, urllib.request
+
+import numpy as np
+import pytest
+
+from conftest import ROOT
+from app.serving_artifact import build, open_artifact
+from lfs.keyword_lfs import LABELS
+from weak_supervision.end_model import EndModel
+from weak_supervision.ngram_model import HashedNgrams, NgramModel
+
+TEXTS = ["nhạc remix", "tin tức hôm nay", "cách nấu phở", "bóng đá", "review điện thoại"]
+
+
+@pytest.fixture(scope="module")
+def ngram_dir(tmp_path_factory):
+    Y_prob = np.full((len(TEXTS), len(LABELS)), 0.02)
+    Y_prob[np.arange(len(TEXTS)), [2, 3, 1, 4, 5]] = 0.86
+    path = str(tmp_path_factory.mktemp("models") / "ngram")
+    NgramModel.fit(TEXTS, Y_prob, LABELS, HashedNgrams(bits=12)).save(path)
+    return path
+
+
+def test_artifact_round_trip_shares_the_mapped_weights(tmp_path, ngram_dir):
+    out = str(tmp_path / "serving.wsa")
+    tax = os.path.join(ROOT, "config", "taxonomy.yaml")
+    version = build(out, LABELS, tax, ngram_dir)
+    art = open_artifact(out)
+    assert art.version == version and art.labels == LABELS and art.taxonomy["labels"]
+    model = art.end_model
+    assert isinstance(model, NgramModel) and not model.weights.flags.owndata and not model.weights.flags.writeable
+    np.testing.assert_allclose(model.scores(TEXTS), NgramModel.load(ngram_dir).scores(TEXTS), atol=1e-6)
+    # same content -> same version; the taxonomy is part of it
+    assert build(str(tmp_path / "again.wsa"), LABELS, tax, ngram_dir) == version
+    assert build(str(tmp_path / "notax.wsa"), LABELS, "", ngram_dir) != version
+    assert not os.path.exists(out + ".tmp")
+
+
+def test_artifact_with_an_embedding_end_model_or_none(tmp_path):
+    end = str(tmp_path / "end")
+    rng = np.random.default_rng(0)
+    EndModel(rng.normal(size=(6, len(LABELS))), rng.normal(size=len(LABELS)), LABELS, "some/encoder").save(end)
+    build(str(tmp_path / "e.wsa"), LABELS, "", end)
+    art = open_artifact(str(tmp_path / "e.wsa"))
+    X = rng.normal(size=(3, 6)).astype(np.float32)
+    assert art.end_model.encoder_name == "some/encoder"
+    np.testing.assert_allclose(art.end_model.proba(X), EndModel.load(end).proba(X), rtol=1e-6)
+    build(str(tmp_path / "none.wsa"), LABELS)
+    assert open_artifact(str(tmp_path / "none.wsa")).end_model is None
+    with pytest.raises(ValueError):
+        build(str(tmp_path / "bad.wsa"), LABELS[::-1], "", end)
+    (tmp_path / "junk.wsa").write_bytes(b"not an artifact at all")
+    with pytest.raises(ValueError):
+        open_artifact(str(tmp_path / "junk.wsa"))
+
+
+def _get(port, path, body=None):
+    req = urllib.request.Request(f"http://127.0.0.1:{port}{path}", data=body and json.dumps(body).encode(),
+                                 headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=10) as r:
+        return json.loads(r.read())
+
+
+def test_prefork_serves_restarts_workers_and_stops(tmp_path, ngram_dir):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    art = str(tmp_path / "serving.wsa")
+    build(art, LABELS, "", ngram_dir)
+    env = dict(os.environ, WS_ARTIFACT=art, WS_ZS_MODEL="", WS_CACHE_SIZE="0", WS_CACHE_SHARED="")
+    proc = subprocess.Popen([sys.executable, "-m", "app.prefork", "--workers", "2", "--host", "127.0.0.1",
+                             "--port", str(port)], cwd=ROOT, env=env, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT, text=True)
+    try:
+        for _ in range(200):
+            try:
+                health = _get(port, "/health")
+                break
+            except OSError:
+                time.sleep(0.1)
+        else:
+            pytest.fail("prefork did not start")
+        assert health["artifact"] == open_artifact(art).version and health["batcher"] is None
+        out = _get(port, "/predict", {"text": "a man is walking his dog"})
+        assert out["tier"] in ("rules", "end_model") and out["zero_shot"] is None
+
+        os.kill(health["worker"]["pid"], signal.SIGKILL)  # the master forks a replacement
+        time.sleep(0.5)
+        for _ in range(100):
+            try:
+                if _get(port, "/health")["worker"]["pid"] != health["worker"]["pid"]:
+                    break
+            except OSError:
+                pass
+            time.sleep(0.1)
+        proc.send_signal(signal.SIGTERM)
+        log = proc.communicate(timeout=30)[0]
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+    assert proc.returncode == 0, log
+    assert "end_model=NgramModel zero_shot=-" in log and "with 2 workers" in log and "restarted" in log
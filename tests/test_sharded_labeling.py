@@ -0,0 +1,61 @@
+# test_sharded_labeling.py
+"""weak_supervision/sharded_labeling.py: shards on disk, resume after a crash, manifest checks."""
+import json, os, sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import ROOT
+
+sys.path.insert(0, os.path.join(ROOT, "lfs"))  # lfs_text, the way the entry points import it
+from weak_supervision.sharded_labeling import label_pool_sharded  # noqa: E402
+from weak_supervision.table_io import read_table  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def texts():
+    return read_table(os.path.join(ROOT, "data/processed/unlabeled_pool.csv"))["text"].tolist()[:130]
+
+
+def test_matches_one_pass_and_resumes_only_missing_shards(tmp_path, texts, capsys):
+    from snorkel.labeling import PandasLFApplier
+    from lfs_text import LFS
+    shard_dir = str(tmp_path / "shards")
+    L = label_pool_sharded(texts, shard_dir, llm_labeler="none", shard_size=50)
+    ref = PandasLFApplier(LFS).apply(df=pd.DataFrame({"text": texts}), progress_bar=False)
+    assert L.names == [lf.name for lf in LFS]
+    np.testing.assert_array_equal(L.to_dense(), ref)
+    files = sorted(f for f in os.listdir(shard_dir) if f.startswith("L_"))
+    assert files == ["L_00000.npz", "L_00001.npz", "L_00002.npz"]
+    with open(os.path.join(shard_dir, "manifest.json"), "r", encoding="utf-8") as f:
+        assert json.load(f)["n_rows"] == 130
+
+    # a run killed after shard 0: the other shards are labeled again, shard 0 is reused
+    kept = os.stat(os.path.join(shard_dir, "L_00000.npz")).st_mtime_ns
+    for f in files[1:]:
+        os.remove(os.path.join(shard_dir, f))
+    capsys.readouterr()
+    again = label_pool_sharded(texts, shard_dir, llm_labeler="none", shard_size=50)
+    assert "3 total, 1 already done, 2 to run" in capsys.readouterr().out
+    assert os.stat(os.path.join(shard_dir, "L_00000.npz")).st_mtime_ns == kept
+    np.testing.assert_array_equal(again.to_dense(), ref)
+    label_pool_sharded(texts, shard_dir, llm_labeler="none", shard_size=50)
+    assert "3 total, 3 already done, 0 to run" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("change", [{"shard_size": 40}, {"llm_labeler": "embed"}, {"seed": 1}, {"pool": True}])
+def test_refuses_shards_of_another_pool_or_config(tmp_path, texts, change):
+    shard_dir = str(tmp_path / "shards")
+    label_pool_sharded(texts[:20], shard_dir, llm_labeler="none", shard_size=50)
+    kw = dict({"llm_labeler": "none", "shard_size": 50}, **change)
+    pool = texts[1:21] if kw.pop("pool", False) else texts[:20]
+    with pytest.raises(RuntimeError):  # raised before any shard or model is loaded
+        label_pool_sharded(pool, shard_dir, **kw)
+
+
+def test_empty_pool_and_unknown_labeler(tmp_path):
+    L = label_pool_sharded([], str(tmp_path / "shards"), llm_labeler="none")
+    assert L.shape[0] == 0 and L.names[-1] != "llm"
+    with pytest.raises(ValueError):
+        label_pool_sharded(["x"], str(tmp_path / "other"), llm_labeler="gpt")
@@ -0,0 +1,91 @@
+# test_sparse_label_matrix.py
+"""SparseLabelMatrix and lf_summary against the dense matrix and snorkel's LFAnalysis."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from weak_supervision.snorkel_setup import ABSTAIN
+from weak_supervision.sparse_label_matrix import SparseLabelMatrix, lf_summary
+
+
+def random_matrix(n=400, m=6, k=4, density=0.25, seed=0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    L = rng.integers(0, k, size=(n, m))
+    L[rng.random((n, m)) > density] = ABSTAIN
+    L[:, -1] = ABSTAIN  # an LF that never votes
+    return L
+
+
+def test_dense_round_trip_and_shape():
+    L = random_matrix()
+    S = SparseLabelMatrix.from_dense(L)
+    assert S.shape == L.shape and len(S) == L.shape[0]
+    assert S.nnz == int((L != ABSTAIN).sum())
+    assert np.array_equal(S.to_dense(), L)
+    assert np.array_equal(S.column(2), L[:, 2])
+    assert np.array_equal(S.n_votes(), (L != ABSTAIN).sum(axis=1))
+    with pytest.raises(ValueError):
+        SparseLabelMatrix.from_dense(L[0])
+    assert SparseLabelMatrix.empty(3).shape == (0, 3)
+
+
+def test_conflict_rows():
+    L = random_matrix()
+    expected = [len({v for v in row if v != ABSTAIN}) > 1 for row in L]
+    assert SparseLabelMatrix.from_dense(L).conflict_rows().tolist() == expected
+
+
+def test_with_column_vstack_rows():
+    L = random_matrix()
+    S = SparseLabelMatrix.from_dense(L, names=[f"lf{j}" for j in range(L.shape[1])])
+    llm = np.where(np.arange(len(L)) % 3 == 0, 1, ABSTAIN)
+    assert np.array_equal(S.with_column(llm, "llm").to_dense(), np.column_stack([L, llm]))
+    assert S.with_column(llm, "llm").names[-1] == "llm"
+    with pytest.raises(ValueError):
+        S.with_column(llm[:-1], "llm")
+
+    parts = [SparseLabelMatrix.from_dense(L[a:b]) for a, b in ((0, 100), (100, 101), (101, 101), (101, len(L)))]
+    assert np.array_equal(SparseLabelMatrix.vstack(parts).to_dense(), L)
+    with pytest.raises(ValueError):
+        SparseLabelMatrix.vstack([])
+
+    idx = np.array([5, 0, 399, 5, 17])
+    assert np.array_equal(S.rows(idx).to_dense(), L[idx])
+
+
+def test_save_load(tmp_path):
+    S = SparseLabelMatrix.from_dense(random_matrix(), names=list("abcdef"))
+    path = str(tmp_path / "L.npz")
+    S.save(path, hashes=np.array(["h"] * S.n_rows))
+    back = SparseLabelMatrix.load(path)
+    assert back.names == list("abcdef") and np.array_equal(back.to_dense(), S.to_dense())
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_lf_summary_matches_snorkel(seed):
+    LFAnalysis = pytest.importorskip("snorkel.labeling").LFAnalysis
+    L = random_matrix(seed=seed)
+    Y = np.random.default_rng(seed).integers(0, 4, size=len(L))
+    ours = lf_summary(SparseLabelMatrix.from_dense(L), Y, cardinality=4)
+    ref = LFAnalysis(L).lf_summary(Y)
+    assert ours["Polarity"].tolist() == [list(p) for p in ref["Polarity"]]
+    for col in ("Coverage", "Overlaps", "Conflicts"):
+        np.testing.assert_allclose(ours[col].to_numpy(float), ref[col].to_numpy(float), err_msg=col)
+    # an LF without votes has no empirical accuracy (snorkel reports 0.0)
+    np.testing.assert_allclose(ours["Emp. Acc."][:-1], ref["Emp. Acc."][:-1])
+    assert np.isnan(ours["Emp. Acc."].iloc[-1])
+    for col in ("Correct", "Incorrect"):
+        assert ours[col].tolist() == ref[col].tolist(), col
+
+    no_gold = lf_summary(SparseLabelMatrix.from_dense(L))
+    assert "Correct" not in no_gold.columns
+    pd.testing.assert_frame_equal(no_gold[["Coverage", "Overlaps", "Conflicts"]],
+                                  ours[["Coverage", "Overlaps", "Conflicts"]])
+
+
+def test_lf_summary_ignores_rows_without_gold():
+    L = np.array([[0, ABSTAIN], [1, 1], [0, 0]])
+    Y = np.array([0, ABSTAIN, 1])
+    s = lf_summary(SparseLabelMatrix.from_dense(L), Y)
+    assert s["Correct"].tolist() == [1, 0] and s["Incorrect"].tolist() == [1, 1]
+    assert s["Emp. Acc."].tolist() == [0.5, 0.0]
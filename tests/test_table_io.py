@@ -0,0 +1,127 @@
+# test_table_io.py
+"""weak_supervision/table_io.py: every format round-trips the pipeline's tables."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from weak_supervision.sparse_label_matrix import SparseLabelMatrix
+from weak_supervision.table_io import (FORMATS, label_matrix_frame, label_probs_frame, read_table, resolve_table,
+                                       table_exists, table_parts, table_path, text_hash, write_rows, write_table)
+
+FMTS = list(FORMATS)
+
+
+def weak_labels(n=50) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    labels = np.array(["KIS", "Music", "News", "Sports"])
+    ids = rng.integers(0, len(labels), n)
+    return pd.DataFrame({"text": [f"query {i} đánh giá" for i in range(n)], "ws_label": labels[ids],
+                         "ws_label_id": ids, "ws_conf": rng.random(n).round(3)})
+
+
+@pytest.mark.parametrize("fmt", FMTS)
+def test_round_trip(tmp_path, fmt):
+    df = weak_labels()
+    path = table_path(str(tmp_path), "weak_labels_all", fmt)
+    write_table(df, path)
+    back = read_table(path)
+    assert back["text"].tolist() == df["text"].tolist()
+    assert back["ws_label"].tolist() == df["ws_label"].tolist()
+    assert back["ws_label_id"].tolist() == df["ws_label_id"].tolist()
+    np.testing.assert_allclose(back["ws_conf"], df["ws_conf"], rtol=1e-6)
+    if fmt != "csv":
+        assert back["ws_label_id"].dtype == np.int8 and back["ws_conf"].dtype == np.float32
+        assert not isinstance(back["ws_label"].dtype, pd.CategoricalDtype)  # dictionary columns come back as strings
+
+
+@pytest.mark.parametrize("fmt", FMTS)
+def test_append_and_overwrite(tmp_path, fmt):
+    df = weak_labels(20)
+    path = table_path(str(tmp_path), "t", fmt)
+    write_table(df[:8], path)
+    write_table(df[8:], path, append=True)
+    assert read_table(path)["text"].tolist() == df["text"].tolist()
+    write_table(df[:3], path)
+    assert len(read_table(path)) == 3
+
+
+@pytest.mark.parametrize("fmt", FMTS)
+def test_projection_and_filter(tmp_path, fmt):
+    df = weak_labels()
+    path = table_path(str(tmp_path), "t", fmt)
+    write_table(df, path)
+    out = read_table(path, columns=["text", "ws_label"], filters=[("ws_conf", ">=", 0.5)])
+    expected = df[df["ws_conf"] >= 0.5]
+    assert list(out.columns) == ["text", "ws_label"]
+    assert out["text"].tolist() == expected["text"].tolist()
+    assert list(read_table(path, columns=["ws_label"]).columns) == ["ws_label"]
+
+
+@pytest.mark.parametrize("fmt", FMTS)
+def test_write_rows_in_batches(tmp_path, fmt):
+    path = table_path(str(tmp_path), "pool", fmt)
+    n = write_rows(path, ({"text": f"t{i}"} for i in range(25)), ["text"], batch_rows=10)
+    assert n == 25
+    assert read_table(path)["text"].tolist() == [f"t{i}" for i in range(25)]
+    assert write_rows(table_path(str(tmp_path), "empty", fmt), iter(()), ["text"]) == 0
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_replace_one_part(tmp_path, fmt):
+    df = weak_labels(30)
+    path = table_path(str(tmp_path), "weak_labels_all", fmt)
+    for i in range(3):
+        write_table(df.iloc[10 * i:10 * (i + 1)], path, append=i > 0)
+    first = os.path.join(path, f"part-00000{FORMATS[fmt]}")
+    before = os.stat(first).st_mtime_ns
+    patched = df.iloc[10:20].assign(ws_label="Review")
+    write_table(patched, path, part=1)
+    assert table_parts(path) == 3 and os.stat(first).st_mtime_ns == before
+    back = read_table(path)
+    assert back["ws_label"].tolist() == df["ws_label"].tolist()[:10] + ["Review"] * 10 + df["ws_label"].tolist()[20:]
+    with pytest.raises(ValueError):
+        write_table(patched, path, part=3)
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_empty_first_part_keeps_the_types(tmp_path, fmt):
+    path = table_path(str(tmp_path), "weak_train_0p75", fmt)
+    write_table(pd.DataFrame({"text": [], "label": []}), path)
+    write_table(pd.DataFrame({"text": ["a b c"], "label": ["News"]}), path, append=True)
+    assert read_table(path).to_dict("list") == {"text": ["a b c"], "label": ["News"]}
+
+
+def test_resolve_sibling_extension(tmp_path):
+    write_table(weak_labels(5), str(tmp_path / "weak.parquet"))
+    csv_default = str(tmp_path / "weak.csv")
+    assert resolve_table(csv_default) == str(tmp_path / "weak.parquet")
+    assert table_exists(csv_default) and not table_exists(str(tmp_path / "other.csv"))
+    assert len(read_table(csv_default)) == 5
+
+
+def test_unknown_extension():
+    with pytest.raises(ValueError, match="unknown table format"):
+        read_table("x/y.xlsx")
+
+
+def test_csv_mixed_encodings(tmp_path):
+    path = tmp_path / "gold.csv"
+    path.write_bytes("text,label\nbản tin thời sự,News\n".encode("utf-8") + "café live,Sports\n".encode("latin1"))
+    assert read_table(str(path))["text"].tolist() == ["bản tin thời sự", "café live"]
+
+
+def test_label_frames(tmp_path):
+    texts = ["a", "b", "c"]
+    hashes = [text_hash(t) for t in texts]
+    L = SparseLabelMatrix.from_dense(np.array([[-1, 2], [0, -1], [-1, -1]]), names=["lf_a", "lf_b"])
+    path = os.path.join(tmp_path, "L.parquet")
+    write_table(label_matrix_frame(L, hashes), path)
+    back = read_table(path)
+    assert back["text_hash"].tolist() == hashes
+    assert back[["lf_a", "lf_b"]].to_numpy().tolist() == L.to_dense().tolist()
+
+    P = np.array([[0.2, 0.8], [0.5, 0.5], [1.0, 0.0]])
+    probs = label_probs_frame(P, hashes, ["KIS", "Music"])
+    assert list(probs.columns) == ["text_hash", "p_KIS", "p_Music"] and probs["p_Music"].dtype == np.float32
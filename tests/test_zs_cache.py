@@ -0,0 +1,88 @@
+# test_zs_cache.py
+"""weak_supervision/zs_cache.py and the cache path of ZeroShotEngine.scores (no model needed)."""
+import sqlite3
+
+import numpy as np
+import pytest
+
+from weak_supervision import zs_cache
+from weak_supervision.zero_shot import ZeroShotEngine, parse_threads
+from weak_supervision.zs_cache import ScoreCache, normalize_text, text_hash
+
+LABELS = ["Music", "News"]
+
+
+def vec(x):
+    return np.array([x, 1 - x], dtype=np.float32)
+
+
+def test_normalize_text():
+    assert normalize_text("  Bàn   tin\n") == "Bàn tin"
+
+
+def test_round_trip_and_count(tmp_path):
+    path = str(tmp_path / "zs.sqlite")
+    a, b = ScoreCache(path), ScoreCache(path)
+    ns = a.namespace("m", LABELS, "This example is {}.")
+    a.put_many(ns, {"h1": vec(0.1), "h2": vec(0.2)})
+    b.put_many(ns, {"h2": vec(0.3), "h3": vec(0.4)})  # h2 is overwritten, not a new row
+    got = a.get_many(ns, ["h1", "h2", "h3", "nope"])
+    assert set(got) == {"h1", "h2", "h3"} and np.allclose(got["h2"], vec(0.3))
+    assert a.stats() == dict(a.stats(), hits=3, misses=1, entries=3)
+
+
+def test_eviction_is_lru(tmp_path, monkeypatch):
+    now = iter(range(1, 100))
+    monkeypatch.setattr(zs_cache.time, "time", lambda: float(next(now)))
+    cache = ScoreCache(str(tmp_path / "zs.sqlite"), max_entries=4)
+    for i in range(4):
+        cache.put_many("ns", {f"h{i}": vec(0.5)})
+    cache.get_many("ns", ["h0"])  # h0 is now the most recently used
+    cache.put_many("ns", {"h4": vec(0.5)})  # 5 > 4: down to int(0.9 * 4) = 3 rows
+    assert cache.stats()["entries"] == 3
+    assert sorted(cache.get_many("ns", [f"h{i}" for i in range(5)])) == ["h0", "h3", "h4"]
+
+
+def test_file_without_counter(tmp_path):
+    path = str(tmp_path / "zs.sqlite")
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE scores (ns TEXT NOT NULL, h TEXT NOT NULL, k INTEGER NOT NULL, v BLOB NOT NULL,"
+               " last_used REAL NOT NULL, PRIMARY KEY (ns, h)) WITHOUT ROWID")
+    db.executemany("INSERT INTO scores VALUES (?,?,?,?,?)", [("ns", str(i), 2, vec(0.5).tobytes(), 0.0)
+                                                             for i in range(5)])
+    db.commit()
+    db.close()
+    cache = ScoreCache(path)
+    assert cache.stats()["entries"] == 5
+    cache.put_many("ns", {"new": vec(0.5)})
+    assert cache.stats()["entries"] == 6
+
+
+def test_engine_scores_misses_on_the_original_text(tmp_path):
+    engine = ZeroShotEngine("stub-model", cache=ScoreCache(str(tmp_path / "zs.sqlite")))
+    seen = []
+
+    def compute(texts, labels):
+        seen.extend(texts)
+        return np.stack([vec(len(t) / 100) for t in texts])
+    engine._compute = compute
+
+    texts = ["Bàn  tin", "Bàn tin", "karaoke "]
+    first = engine.scores(texts, LABELS)
+    assert seen == ["Bàn  tin", "karaoke "]  # as given, one per normalized form
+    assert np.allclose(first[0], first[1]) and np.allclose(first[0], vec(len("Bàn  tin") / 100))
+    seen.clear()
+    again = engine.scores(["karaoke", "Bàn tin"], LABELS)
+    assert seen == [] and np.allclose(again, first[[2, 0]])
+    assert text_hash(normalize_text(texts[0])) == text_hash(normalize_text(texts[1]))
+    assert engine.scores([], LABELS).shape == (0, 2)
+
+
+def test_parse_threads():
+    assert parse_threads("") == parse_threads(None) == parse_threads("0") == (None, None)
+    assert parse_threads("4") == (4, None)
+    assert parse_threads("4:2") == (4, 2)
+    assert parse_threads(":2") == (None, 2)
+    for bad in ("x", "4:2:1", "-1", "4.5"):
+        with pytest.raises(ValueError):
+            parse_threads(bad)
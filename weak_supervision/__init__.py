@@ -0,0 +1,37 @@
+# __init__.py
+"""
+The modules of this directory import each other by their flat names (`from table_io import
+read_table`), the way the entry points run (PYTHONPATH=weak_supervision:lfs, see
+config/pipeline.yaml). Importing the package makes the same code work as `weak_supervision.x`:
+
+- this directory goes on sys.path, so the flat imports inside the modules resolve;
+- `weak_supervision.x` is the flat module `x` itself, not a second copy, so the per-process
+  singletons (model_registry, profiling) are shared whichever name imported them first.
+"""
+import importlib, importlib.abc, importlib.util, os, sys
+
+_DIR = os.path.dirname(os.path.abspath(__file__))
+if _DIR not in sys.path:
+    sys.path.append(_DIR)
+
+
+class _FlatAlias(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    """weak_supervision.<name> -> the module imported as <name>."""
+
+    def find_spec(self, fullname, path=None, target=None):
+        package, _, name = fullname.rpartition(".")
+        if package != __name__ or not os.path.isfile(os.path.join(_DIR, name + ".py")):
+            return None
+        return importlib.util.spec_from_loader(fullname, self)
+
+    def create_module(self, spec):
+        module = importlib.import_module(spec.name.rpartition(".")[2])
+        spec.loader_state = module.__spec__
+        return module
+
+    def exec_module(self, module):
+        module.__spec__ = module.__spec__.loader_state  # the import machinery set the alias spec: undo
+
+
+if not any(isinstance(f, _FlatAlias) for f in sys.meta_path):
+    sys.meta_path.insert(0, _FlatAlias())
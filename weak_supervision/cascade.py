@@ -0,0 +1,179 @@
+# cascade.py
+"""
+Latency-aware cascade: rules -> end model -> zero-shot NLI.
+
+1. rules      keyword LFs (lfs/keyword_lfs.py). When they resolve to one class (a single
+              class fires, or the tie-break settles it) that is the answer.
+2. end_model  a light classifier: any object with `scores(texts) -> [N, K]` over the
+              labels (`load_end_model`). Its answer stands when max proba >= `threshold`.
+3. zero_shot  the NLI model (callable texts -> [N, K]), only for what is still uncertain.
+
+Every tier has a per-request latency budget (ms). A tier is only entered when its
+expected cost per request (EMA of what it took so far) fits in the cumulative budget up
+to that tier minus the time already spent on the request. Otherwise the tier is skipped
+and the best answer so far is returned with `degraded=True` (the unconfident end-model
+answer, or "Other" when only the rules ran). Each answer records the `tier` that
+produced it; rules answers have no probability (`proba` None).
+"""
+import os, time
+from typing import Callable, Dict, List, Optional, Sequence
+import numpy as np
+
+from lfs.keyword_lfs import LABELS, predict_rules_only
+
+TIERS = ("rules", "end_model", "zero_shot")
+DEFAULT_BUDGETS_MS = {"rules": 2.0, "end_model": 50.0, "zero_shot": 1000.0}
+
+
+def rules_label(text: str, mask: Optional[int] = None) -> Optional[str]:
+    """The rules' class when they are unambiguous, else None (mask: keyword_lfs.hit_mask(text))."""
+    return predict_rules_only(text, include_other=False, mask=mask) or None
+
+
+def parse_budgets(spec: str) -> Dict[str, float]:
+    """'rules:2,end_model:50,zero_shot:1000' -> {tier: ms}; missing tiers keep the default."""
+    out = dict(DEFAULT_BUDGETS_MS)
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        tier, ms = part.split(":")
+        if tier not in TIERS:
+            raise ValueError(f"Unknown tier {tier!r}; expected one of {TIERS}")
+        out[tier] = float(ms)
+    return out
+
+
+def load_end_model(spec: str, labels: Sequence[str] = LABELS):
+    """End-model tier from a spec: a directory saved by train_end_model.py -> EndModel or
+    NgramModel (--kind ngram), a sentence-encoder name or local HF model dir -> bi-encoder
+    EmbeddingLabeler (untrained). A spec that points into the file system but is neither
+    raises instead of being sent to the HuggingFace hub."""
+    from embed_labeler import EmbeddingLabeler
+    from end_model import EndModel
+    from ngram_model import NgramModel
+    for cls in (NgramModel, EndModel):
+        if not cls.exists(spec):
+            continue
+        model = cls.load(spec)
+        if model.labels != list(labels):
+            raise ValueError(f"{spec} was trained on labels {model.labels}, expected {list(labels)}")
+        return model
+    # hub ids are "name" or "org/name"; artifacts/ is where train_end_model.py saves by default
+    head = spec.split("/")[0]
+    local = (os.path.isabs(spec) or spec.startswith(("./", "../", "~")) or os.path.exists(spec)
+             or spec.count("/") > 1 or head == "artifacts" or ("/" in spec and os.path.isdir(head)))
+    if local and not os.path.isfile(os.path.join(os.path.expanduser(spec), "config.json")):
+        raise FileNotFoundError(f"{spec} is neither a model saved by train_end_model.py nor a local encoder")
+    return EmbeddingLabeler(labels, model=spec)
+
+
+class TierClock:
+    """Per-tier cost estimates (EMA of seconds per request) and budget checks."""
+
+    def __init__(self, budgets_ms: Optional[Dict[str, float]] = None, alpha: float = 0.2):
+        self.budgets = dict(DEFAULT_BUDGETS_MS, **(budgets_ms or {}))
+        self.alpha = alpha
+        self.cost: Dict[str, float] = {}
+        self.stats = {t: {"answered": 0, "requests": 0, "over_budget": 0, "skipped": 0} for t in TIERS}
+
+    def deadline(self, tier: str) -> float:
+        """Cumulative budget (s) of the tiers up to and including `tier`."""
+        return sum(self.budgets[t] for t in TIERS[:TIERS.index(tier) + 1]) / 1000.0
+
+    def fits(self, tier: str, elapsed: float, n: int = 1) -> bool:
+        ok = elapsed + self.cost.get(tier, 0.0) <= self.deadline(tier)
+        if not ok:
+            self.stats[tier]["skipped"] += n
+            # decay the estimate so a tier is retried after a slow spike instead of never again
+            if tier in self.cost:
+                self.cost[tier] *= 1.0 - self.alpha
+        return ok
+
+    def observe(self, tier: str, seconds: float, n: int = 1):
+        per = seconds / max(n, 1)
+        prev = self.cost.get(tier)
+        self.cost[tier] = per if prev is None else prev + self.alpha * (per - prev)
+        st = self.stats[tier]
+        st["requests"] += n
+        if per > self.budgets[tier] / 1000.0:
+            st["over_budget"] += n
+
+
+class Cascade:
+    def __init__(self, labels: Sequence[str] = LABELS, end_model=None,
+                 zero_shot: Optional[Callable[[List[str]], np.ndarray]] = None,
+                 threshold: float = 0.7, budgets_ms: Optional[Dict[str, float]] = None):
+        self.labels = list(labels)
+        self.end_model = end_model
+        self.zero_shot = zero_shot
+        self.threshold = threshold
+        self.clock = TierClock(budgets_ms)
+
+    @staticmethod
+    def answer(label: str, proba: Optional[float], tier: str, degraded: bool = False) -> Dict:
+        return {"label": label, "proba": None if proba is None else round(float(proba), 4),
+                "tier": tier, "degraded": degraded}
+
+    def rules(self, text: str, mask: Optional[int] = None) -> Optional[Dict]:
+        lab = rules_label(text, mask)
+        return None if lab is None else self.answer(lab, None, "rules")
+
+    def from_scores(self, p: np.ndarray, tier: str, degraded: bool = False) -> Dict:
+        k = int(np.argmax(p))
+        return self.answer(self.labels[k], p[k], tier, degraded)
+
+    def confident(self, p: np.ndarray) -> bool:
+        return float(np.max(p)) >= self.threshold
+
+    def fallback(self, best: Optional[Dict], degraded: bool) -> Dict:
+        """Answer of a row no tier was sure about: the unconfident one so far, else "Other"."""
+        if best is None:
+            return self.answer("Other", None, "rules", degraded)
+        return dict(best, degraded=degraded)
+
+    def metrics(self) -> Dict:
+        c = self.clock
+        return {"threshold": self.threshold, "budgets_ms": c.budgets,
+                "cost_ms": {t: round(1000 * s, 3) for t, s in c.cost.items()}, "tiers": c.stats}
+
+    def predict(self, texts: Sequence) -> List[Dict]:
+        """Cascade over a batch: each tier runs once on what the previous ones left open.
+        `latency_ms` is the time from the start of the batch until the row was answered.
+        The per-request budgets are checked against the time spent per row so far (batch
+        time / batch size), not against the time of the whole batch."""
+        texts = [str(t) for t in texts]
+        t0 = time.perf_counter()
+        out: List[Optional[Dict]] = [self.rules(t) for t in texts]
+        self.clock.observe("rules", time.perf_counter() - t0, len(texts))
+        done = time.perf_counter() - t0
+        for a in out:
+            if a is not None:
+                a["latency_ms"] = round(1000 * done, 3)
+        rest = [i for i, a in enumerate(out) if a is None]
+        best: Dict[int, Dict] = {}
+        skipped = False
+
+        for tier, model in (("end_model", self.end_model), ("zero_shot", self.zero_shot)):
+            if not rest or model is None:
+                continue
+            if not self.clock.fits(tier, (time.perf_counter() - t0) / len(texts), len(rest)):
+                skipped = True
+                continue
+            t1 = time.perf_counter()
+            P = model.scores([texts[i] for i in rest]) if tier == "end_model" else model([texts[i] for i in rest])
+            self.clock.observe(tier, time.perf_counter() - t1, len(rest))
+            done = time.perf_counter() - t0
+            unsure = []
+            for i, p in zip(rest, np.asarray(P)):
+                a = self.from_scores(p, tier)
+                if tier == "end_model" and not self.confident(p):
+                    best[i] = a
+                    unsure.append(i)
+                else:
+                    out[i] = dict(a, latency_ms=round(1000 * done, 3))
+            rest = unsure
+
+        done = time.perf_counter() - t0
+        for i in rest:
+            out[i] = dict(self.fallback(best.get(i), skipped), latency_ms=round(1000 * done, 3))
+        for a in out:
+            self.clock.stats[a["tier"]]["answered"] += 1
+        return out
@@ -0,0 +1,112 @@
+# embed_labeler.py
+"""
+Bi-encoder zero-shot labeler: a fast alternative to NLI cross-encoding.
+
+NLI zero-shot runs one cross-encoder pass per (text, label) pair. Here every label is
+embedded once (mean of its name and its aliases from config/taxonomy.yaml), every
+text is embedded once, and scores are softmax(cosine / temperature) over the labels.
+Cost per text is a single encoder pass whatever the number of labels. Label
+embeddings are cached on disk, keyed by model name and the label texts.
+
+The temperature is fitted on labeled texts by `calibrate` (run_label_model.py does it on
+--gold with --llm_labeler embed) and stored next to the cached label embeddings
+(label_emb_<key>.json); later labelers of the same model and label texts pick it up.
+Without a stored temperature the scores use DEFAULT_TEMPERATURE and are NOT calibrated
+probabilities: the vote threshold then only ranks, it is not a confidence level.
+"""
+import hashlib, json, os
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+import yaml
+
+from encoder import SentenceEncoder, DEFAULT_ENCODER
+
+DEFAULT_TEMPERATURE = 0.05
+
+
+def load_label_texts(labels: Sequence[str], taxonomy_path: str = "config/taxonomy.yaml") -> Dict[str, List[str]]:
+    """Label name + its aliases (deduplicated, name first)."""
+    aliases = {}
+    if taxonomy_path and os.path.exists(taxonomy_path):
+        with open(taxonomy_path, "r", encoding="utf-8") as f:
+            aliases = (yaml.safe_load(f) or {}).get("aliases", {}) or {}
+    return {lab: list(dict.fromkeys([lab] + [str(a) for a in aliases.get(lab, [])])) for lab in labels}
+
+
+class EmbeddingLabeler:
+    def __init__(self, labels: Sequence[str], model: str = DEFAULT_ENCODER,
+                 taxonomy_path: str = "config/taxonomy.yaml", temperature: Optional[float] = None,
+                 cache_dir: Optional[str] = "cache", batch_size: int = 64):
+        """temperature None = the calibrated one stored in cache_dir, else DEFAULT_TEMPERATURE."""
+        self.labels = list(labels)
+        self.encoder = SentenceEncoder(model, batch_size=batch_size)
+        self.label_texts = load_label_texts(self.labels, taxonomy_path)
+        self.cache_dir = cache_dir
+        self._label_emb = None
+        stored = self.stored_temperature() if temperature is None else None
+        self.calibrated = stored is not None
+        self.temperature = temperature if temperature is not None else stored or DEFAULT_TEMPERATURE
+
+    def _cache_file(self, ext: str = ".npy") -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        key = json.dumps([self.encoder.model_name, [self.label_texts[l] for l in self.labels]], ensure_ascii=False)
+        return os.path.join(self.cache_dir, f"label_emb_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]}{ext}")
+
+    def stored_temperature(self) -> Optional[float]:
+        path = self._cache_file(".json")
+        if not path or not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return float(json.load(f)["temperature"])
+
+    def label_embeddings(self) -> np.ndarray:
+        """[K, D] unit-norm label prototypes."""
+        if self._label_emb is not None:
+            return self._label_emb
+        path = self._cache_file()
+        if path and os.path.exists(path):
+            self._label_emb = np.load(path)
+            return self._label_emb
+        flat = [t for l in self.labels for t in self.label_texts[l]]
+        E = self.encoder.encode(flat)
+        protos, s = [], 0
+        for l in self.labels:
+            n = len(self.label_texts[l])
+            v = E[s:s + n].mean(axis=0)
+            protos.append(v / max(np.linalg.norm(v), 1e-9))
+            s += n
+        self._label_emb = np.stack(protos).astype(np.float32)
+        if path:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            np.save(path, self._label_emb)
+        return self._label_emb
+
+    def similarities(self, texts: Sequence) -> np.ndarray:
+        """Cosine similarity [N, K]."""
+        return self.encoder.encode(texts) @ self.label_embeddings().T
+
+    def scores(self, texts: Sequence) -> np.ndarray:
+        """Probabilities [N, K] = softmax(cosine / temperature)."""
+        return _softmax(self.similarities(texts) / self.temperature)
+
+    def calibrate(self, texts: Sequence, gold: Sequence[str],
+                  grid: Sequence[float] = tuple(np.geomspace(0.005, 1.0, 40)), save: bool = True) -> float:
+        """Pick the temperature minimizing NLL on labeled texts (e.g. the gold set); with
+        `save` it is stored next to the label embeddings for later labelers."""
+        sims = self.similarities(texts)
+        y = np.array([self.labels.index(g) for g in gold])
+        nll = lambda T: -np.log(_softmax(sims / T)[np.arange(len(y)), y] + 1e-12).mean()
+        best = min(grid, key=nll)
+        self.temperature, self.calibrated = float(best), True
+        path = self._cache_file(".json") if save else None
+        if path:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"temperature": self.temperature, "nll": float(nll(best)), "n": len(y)}, f, indent=2)
+        return self.temperature
+
+
+def _softmax(x: np.ndarray) -> np.ndarray:
+    e = np.exp(x - x.max(axis=1, keepdims=True))
+    return e / e.sum(axis=1, keepdims=True)
@@ -0,0 +1,108 @@
+# embedding_store.py
+"""
+Sentence embeddings of the pool, computed once and kept on disk as a memory-mapped float16 matrix.
+
+<root>/<model slug>/meta.json   encoder name + embedding dim
+<root>/<model slug>/emb.f16     row-major float16 [N, D], append-only
+<root>/<model slug>/hashes.txt  text hash of every row (table_io.text_hash), one per line
+
+`lookup(texts)` returns the row of every text, embedding (in batches) and appending only
+the texts the store has not seen, so later training runs and experiments over the same
+pool never run the encoder again. `matrix()` maps the file read-only; rows come back as
+float16 and are converted per batch by the consumer. Rows are written before their hashes;
+whatever an interrupted append leaves behind is truncated on the next open.
+"""
+import json, os, re
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+
+from encoder import SentenceEncoder, DEFAULT_ENCODER
+from table_io import text_hash
+
+DEFAULT_STORE = "cache/embeddings"
+
+
+class EmbeddingStore:
+    def __init__(self, root: str = DEFAULT_STORE, model: str = DEFAULT_ENCODER,
+                 batch_rows: int = 4096, batch_size: int = 64):
+        self.model = model
+        self.dir = os.path.join(root, re.sub(r"[^\w.-]+", "_", model).strip("_"))
+        self.batch_rows = batch_rows
+        self.encoder = SentenceEncoder(model, batch_size=batch_size)
+        self.emb_path = os.path.join(self.dir, "emb.f16")
+        self.hash_path = os.path.join(self.dir, "hashes.txt")
+        self.dim: Optional[int] = None
+        self.hashes: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._mm = None
+        self._open()
+
+    def _open(self):
+        meta_path = os.path.join(self.dir, "meta.json")
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["model"] != self.model:
+            raise RuntimeError(f"{self.dir} holds embeddings of {meta['model']}, not {self.model}")
+        self.dim = int(meta["dim"])
+        text = ""
+        if os.path.exists(self.hash_path):
+            with open(self.hash_path, "r", encoding="ascii") as f:
+                text = f.read()
+        size = os.path.getsize(self.emb_path) if os.path.exists(self.emb_path) else 0
+        # complete hash lines that have their row: an interrupted append leaves a partial
+        # last line and / or rows without a hash, both dropped here
+        self.hashes = text.split("\n")[:-1][:size // (2 * self.dim)]
+        if size != 2 * self.dim * len(self.hashes):
+            with open(self.emb_path, "r+b") as f:
+                f.truncate(2 * self.dim * len(self.hashes))
+        if len(text) != 41 * len(self.hashes):
+            with open(self.hash_path, "w", encoding="ascii") as f:
+                f.write("".join(h + "\n" for h in self.hashes))
+        self._index = {h: i for i, h in enumerate(self.hashes)}
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def matrix(self) -> np.ndarray:
+        """Read-only memory map [N, D] float16 of every stored row."""
+        if self._mm is None or len(self._mm) != len(self):
+            self._mm = (np.memmap(self.emb_path, dtype=np.float16, mode="r", shape=(len(self), self.dim))
+                        if len(self) else np.zeros((0, self.dim or 0), dtype=np.float16))
+        return self._mm
+
+    def _append(self, hashes: Sequence[str], emb: np.ndarray):
+        os.makedirs(self.dir, exist_ok=True)
+        if self.dim is None:
+            self.dim = emb.shape[1]
+            with open(os.path.join(self.dir, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump({"model": self.model, "dim": self.dim}, f)
+        with open(self.emb_path, "ab") as f:
+            f.write(np.ascontiguousarray(emb, dtype=np.float16).tobytes())
+        with open(self.hash_path, "a", encoding="ascii") as f:
+            f.write("".join(h + "\n" for h in hashes))
+        for h in hashes:
+            self._index[h] = len(self.hashes)
+            self.hashes.append(h)
+
+    def lookup(self, texts: Sequence, verbose: bool = False) -> np.ndarray:
+        """Row index in matrix() of every text; missing texts are embedded and appended first."""
+        hashes = [text_hash(t) for t in texts]
+        todo: Dict[str, str] = {}
+        for h, t in zip(hashes, texts):
+            if h not in self._index:
+                todo.setdefault(h, str(t))
+        if todo:
+            items = list(todo.items())
+            for s in range(0, len(items), self.batch_rows):
+                part = items[s:s + self.batch_rows]
+                self._append([h for h, _ in part], self.encoder.encode([t for _, t in part]))
+                if verbose:
+                    print(f"    embedded {min(s + self.batch_rows, len(items))}/{len(items)} new texts")
+        return np.array([self._index[h] for h in hashes], dtype=np.int64)
+
+    def embed(self, texts: Sequence) -> np.ndarray:
+        """[N, D] float32 embeddings of texts (through the store)."""
+        idx = self.lookup(texts)
+        return np.asarray(self.matrix()[idx], dtype=np.float32)
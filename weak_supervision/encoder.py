@@ -0,0 +1,57 @@
+# encoder.py
+"""
+Sentence embeddings from a HF encoder with mean pooling (sentence-transformers style),
+L2-normalized. Texts are tokenized once, sorted by token length and encoded in padded
+batches under torch.inference_mode. Tokenizer and weights are shared process-wide
+through model_registry.py.
+"""
+from typing import Sequence
+import numpy as np
+
+import model_registry
+
+DEFAULT_ENCODER = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+
+class SentenceEncoder:
+    def __init__(self, model_name: str = DEFAULT_ENCODER, batch_size: int = 64,
+                 max_length: int = 128, device: str = "cpu"):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.device = device
+        self.model = None
+
+    def _load(self):
+        self._torch = model_registry.heavy_import("torch")
+        self.tokenizer = model_registry.tokenizer(self.model_name, "encoder")
+        self.model = model_registry.encoder_model(self.model_name, self.device)
+
+    @property
+    def dim(self) -> int:
+        if self.model is None:
+            self._load()
+        return self.model.config.hidden_size
+
+    def encode(self, texts: Sequence) -> np.ndarray:
+        """[N, D] float32, unit-norm rows."""
+        if self.model is None:
+            self._load()
+        texts = [str(t) for t in texts]
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        if not texts:
+            return out
+        enc = self.tokenizer(texts, truncation=True, max_length=self.max_length)
+        keys = list(enc.keys())
+        order = sorted(range(len(texts)), key=lambda i: len(enc["input_ids"][i]))
+        with self._torch.inference_mode():
+            for b in range(0, len(order), self.batch_size):
+                idx = order[b:b + self.batch_size]
+                batch = self.tokenizer.pad({k: [enc[k][i] for i in idx] for k in keys}, return_tensors="pt")
+                batch = {k: v.to(self.device) for k, v in batch.items()}
+                hidden = self.model(**batch).last_hidden_state
+                mask = batch["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                emb = (hidden * mask).sum(1) / mask.sum(1).clamp(min=1e-9)
+                emb = self._torch.nn.functional.normalize(emb, dim=-1)
+                out[idx] = emb.float().cpu().numpy()
+        return out
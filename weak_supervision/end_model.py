@@ -0,0 +1,141 @@
+# end_model.py
+"""
+End model: multinomial logistic regression on sentence embeddings, trained on the label
+model's soft labels (Y_prob, the label_probs table of run_label_model.py).
+
+`EndModel.fit` (fit_soft_logreg) minimizes the confidence-weighted soft cross-entropy
+
+    sum_i w_i * (-sum_k Y_prob[i, k] * log softmax(x_i W + b)_k) / sum_i w_i  +  l2/2 * |W|^2
+
+with L-BFGS, where w_i = max_k Y_prob[i, k] ** conf_power and rows with max_k Y_prob[i, k]
+< min_conf are left out. X may be the float16 memmap of EmbeddingStore (or rows of it):
+the training rows are converted to float32 once when they fit in `max_f32_bytes`, else one
+block of `block_rows` at a time per iteration. A fit over 100k texts x 384 dims takes
+seconds, and re-fitting with other thresholds needs no encoder.
+
+Serving is one encoder pass + one matrix multiply (`scores`).
+
+<dir>/end_model.npz   W [D, K], b [K]
+<dir>/meta.json       labels, encoder and the training config / stats
+"""
+import json, os, time
+from typing import Dict, Optional, Sequence
+import numpy as np
+from scipy.optimize import minimize
+from scipy.sparse import issparse
+
+from encoder import SentenceEncoder, DEFAULT_ENCODER
+
+
+def _softmax(z: np.ndarray) -> np.ndarray:
+    z = z - z.max(axis=1, keepdims=True)
+    np.exp(z, out=z)
+    z /= z.sum(axis=1, keepdims=True)
+    return z
+
+
+def confidence_weights(Y_prob: np.ndarray, min_conf: float = 0.0, conf_power: float = 1.0) -> np.ndarray:
+    """w_i = max_k Y_prob[i, k] ** conf_power, 0 below min_conf."""
+    conf = Y_prob.max(axis=1)
+    return np.where(conf >= min_conf, conf ** conf_power, 0.0)
+
+
+def fit_soft_logreg(X, Y_prob: np.ndarray, min_conf: float = 0.0, conf_power: float = 1.0, l2: float = 1e-4,
+                    max_iter: int = 300, block_rows: int = 65536, max_f32_bytes: int = 1 << 30):
+    """(W [D, K], b [K], stats) minimizing the objective above. X is dense (float16 / float32,
+    memmap ok) or a scipy.sparse CSR matrix (hashed n-gram features, see ngram_model.py)."""
+    t0 = time.perf_counter()
+    Y_prob = np.asarray(Y_prob, dtype=np.float32)
+    w = confidence_weights(Y_prob, min_conf, conf_power)
+    keep = np.flatnonzero(w > 0)
+    if not len(keep):
+        raise ValueError(f"no training rows with confidence >= {min_conf}")
+    X, Y, w = X[keep], Y_prob[keep], (w[keep] / w[keep].sum()).astype(np.float32)
+    N, D_all = X.shape
+    K = Y.shape[1]
+    sparse = issparse(X)
+    cols = None
+    if sparse:
+        # only the columns some training row uses (hash buckets hit by the pool): the
+        # weights of the others are 0 at the optimum, no need to carry them through L-BFGS
+        X = X.astype(np.float32).tocsr()
+        cols = np.unique(X.indices)
+        X = X[:, cols]
+    elif N * D_all * 4 <= max_f32_bytes:
+        X = np.asarray(X, dtype=np.float32)  # convert once instead of on every iteration
+    D = X.shape[1]
+
+    def loss_grad(theta):
+        W = theta[:D * K].reshape(D, K).astype(np.float32)
+        b = theta[D * K:].astype(np.float32)
+        loss, gW, gb = 0.0, np.zeros((D, K), np.float64), np.zeros(K, np.float64)
+        for s in range(0, N, block_rows):
+            Xb = X[s:s + block_rows] if sparse else np.asarray(X[s:s + block_rows], dtype=np.float32)
+            P = _softmax(np.asarray(Xb @ W) + b)
+            wb = w[s:s + block_rows, None]
+            loss -= float((wb * Y[s:s + block_rows] * np.log(P + 1e-12)).sum())
+            G = wb * (P - Y[s:s + block_rows])
+            gW += Xb.T @ G
+            gb += G.sum(axis=0)
+        loss += 0.5 * l2 * float((W.astype(np.float64) ** 2).sum())
+        gW += l2 * W
+        return loss, np.concatenate([gW.ravel(), gb])
+
+    res = minimize(loss_grad, np.zeros(D * K + K), jac=True, method="L-BFGS-B", options={"maxiter": max_iter})
+    meta = {"n_train": int(N), "min_conf": min_conf, "conf_power": conf_power, "l2": l2,
+            "loss": float(res.fun), "iterations": int(res.nit), "fit_seconds": round(time.perf_counter() - t0, 3)}
+    W = res.x[:D * K].reshape(D, K)
+    if cols is not None:
+        W, W_active = np.zeros((D_all, K)), W
+        W[cols] = W_active
+        meta["active_features"] = int(len(cols))
+    return W, res.x[D * K:], meta
+
+
+class EndModel:
+    def __init__(self, W: np.ndarray, b: np.ndarray, labels: Sequence[str],
+                 encoder: str = DEFAULT_ENCODER, meta: Optional[Dict] = None):
+        self.W = np.asarray(W, dtype=np.float32)
+        self.b = np.asarray(b, dtype=np.float32)
+        self.labels = list(labels)
+        self.encoder_name = encoder
+        self.meta = meta or {}
+        self._encoder = None
+
+    @classmethod
+    def fit(cls, X: np.ndarray, Y_prob: np.ndarray, labels: Sequence[str], encoder: str = DEFAULT_ENCODER,
+            min_conf: float = 0.0, conf_power: float = 1.0, l2: float = 1e-4, max_iter: int = 300,
+            block_rows: int = 65536, max_f32_bytes: int = 1 << 30) -> "EndModel":
+        W, b, meta = fit_soft_logreg(X, Y_prob, min_conf, conf_power, l2, max_iter, block_rows, max_f32_bytes)
+        return cls(W, b, labels, encoder, meta)
+
+    def proba(self, X: np.ndarray) -> np.ndarray:
+        """[N, K] class probabilities of embeddings X."""
+        return _softmax(np.asarray(X, dtype=np.float32) @ self.W + self.b)
+
+    def scores(self, texts: Sequence) -> np.ndarray:
+        """[N, K] class probabilities of raw texts (encoder + one matrix multiply)."""
+        if self._encoder is None:
+            self._encoder = SentenceEncoder(self.encoder_name)
+        return self.proba(self._encoder.encode(texts))
+
+    def predict(self, X: np.ndarray) -> list:
+        return [self.labels[k] for k in self.proba(X).argmax(axis=1)]
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        np.savez(os.path.join(path, "end_model.npz"), W=self.W, b=self.b)
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"labels": self.labels, "encoder": self.encoder_name, **self.meta}, f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "EndModel":
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with np.load(os.path.join(path, "end_model.npz")) as z:
+            W, b = z["W"], z["b"]
+        return cls(W, b, meta.pop("labels"), meta.pop("encoder"), meta)
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(path, "end_model.npz"))
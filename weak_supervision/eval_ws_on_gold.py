@@ -1,13 +1,41 @@
 # eval_ws_on_gold.py
-import pandas as pd, numpy as np
-from sklearn.metrics import accuracy_score, f1_score, confusion_matrix, classification_report
+import argparse, sys
 from snorkel_setup import LABELS
+from table_io import read_table
+from evaluation import evaluate, format_report, save_metrics
 
-gold = pd.read_csv("data/processed/gold_test.csv")             # text,label
-pred = pd.read_csv("outputs_ws/weak_labels_all.csv")            # text, ws_label, ws_conf
+def match_gold(gold, pred, min_coverage=0.5):
+    """Gold rows joined with their weak label by text; SystemExit when fewer than min_coverage of them
+    are in the pool (0 = only fail on an empty join): metrics on a handful of rows say nothing."""
+    df = gold.merge(pred.drop_duplicates("text"), on="text", how="inner")
+    cov = len(df) / max(len(gold), 1)
+    msg = f"{len(df)}/{len(gold)} gold rows ({cov:.1%}) have a weak label"
+    if df.empty or cov < min_coverage:
+        raise SystemExit(f"[!] only {msg} (--min_coverage {min_coverage:g}): was the pool rebuilt without "
+                         f"the gold texts? Label a pool that contains them or lower --min_coverage.")
+    if cov < 1:
+        print(f"[!] {msg}: metrics cover the matched rows only", file=sys.stderr)
+    return df
 
-df = gold.merge(pred[["text","ws_label"]], on="text", how="inner")
-acc = accuracy_score(df["label"], df["ws_label"])
-macro = f1_score(df["label"], df["ws_label"], average="macro", labels=LABELS)
-print("WS Acc:", acc, "Macro-F1:", macro)
-print(classification_report(df["label"], df["ws_label"], labels=LABELS, zero_division=0))
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--gold", default="data/processed/gold_test.csv")                  # text,label
+    ap.add_argument("--weak", default="outputs_ws/weak_labels_all.parquet")            # .csv also works
+    ap.add_argument("--n_boot", type=int, default=1000, help="bootstrap resamples for the CIs (0 = none)")
+    ap.add_argument("--min_coverage", type=float, default=0.5,
+                    help="fail when fewer of the gold texts are in the weak labels (0 = only when none are)")
+    ap.add_argument("--outdir", default="", help="also write <outdir>/metrics_weak_labels.json")
+    args = ap.parse_args()
+
+    gold = read_table(args.gold, columns=["text", "label"])
+    pred = read_table(args.weak, columns=["text", "ws_label"])
+    df = match_gold(gold, pred, args.min_coverage)
+    r = evaluate(df["label"].tolist(), df["ws_label"].tolist(), LABELS, n_boot=args.n_boot)["predictions"]
+    r["gold_coverage"] = {"matched": len(df), "gold": len(gold)}
+    print("WS Acc:", r["accuracy"], "Macro-F1:", r["macro_f1"])
+    print(format_report(r, LABELS))
+    if args.outdir:
+        print("[✓]", save_metrics(r, args.outdir, "weak_labels"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+# evaluation.py
+"""
+Gold-set evaluation shared by the baseline scripts, eval_ws_on_gold.py and train_end_model.py.
+
+Labels are encoded once as integers 0..K-1 (anything else -> K, an "outside the labels"
+bucket) and each prediction set is reduced to one (K+1) x (K+1) confusion matrix; accuracy,
+macro-F1 and the per-class report all come from that matrix. The numbers match sklearn's
+accuracy_score, f1_score(average="macro", labels=labels, zero_division=0) and
+classification_report(labels=labels, output_dict=True, zero_division=0): predictions outside
+the labels count as misses for recall and accuracy, never as a predicted class.
+
+Bootstrap confidence intervals resample the gold rows: W[b, i] = how often row i is drawn in
+resample b (one bincount for all B resamples), and the confusion matrices of every resample
+and every prediction set are W @ onehot(true, pred) -- one matrix product. `evaluate` takes
+any number of named prediction sets over the same gold rows, so a dozen variants with 1000
+resamples each cost one product of [B, n] x [n, sets * (K+1)^2]; with `reference` the
+intervals of each set's difference to that set come from the same resamples (paired).
+
+Plots are not drawn here: `plot_confusion` imports matplotlib when called, and callers
+collect the figures and render them after all the numbers are written (or not at all).
+"""
+import json, os
+from typing import Dict, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+
+Predictions = Union[Sequence, np.ndarray]
+
+
+def encode(values: Predictions, labels: Sequence[str]) -> np.ndarray:
+    """Label index per value; values not in `labels` (None, "", "UNK", ...) -> len(labels)."""
+    index = {lab: i for i, lab in enumerate(labels)}
+    K = len(labels)
+    return np.fromiter((index.get(v, K) for v in values), dtype=np.int64, count=len(values))
+
+
+def confusion(y_true: np.ndarray, y_pred: np.ndarray, K: int) -> np.ndarray:
+    """[K+1, K+1] counts, rows = true code, columns = predicted code (K = outside the labels)."""
+    return np.bincount(y_true * (K + 1) + y_pred, minlength=(K + 1) ** 2).reshape(K + 1, K + 1)
+
+
+def _ratio(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.divide(a, b, out=np.zeros(np.broadcast(a, b).shape), where=b > 0)
+
+
+def scores(cm: np.ndarray) -> Dict[str, np.ndarray]:
+    """accuracy, macro_f1 and per-class precision / recall / f1 / support of confusion
+    matrices [..., K+1, K+1]; leading axes (prediction sets, resamples) are kept."""
+    cm = np.asarray(cm, dtype=np.float64)
+    K = cm.shape[-1] - 1
+    tp = np.diagonal(cm, axis1=-2, axis2=-1)[..., :K]
+    support = cm[..., :K, :].sum(axis=-1)
+    predicted = cm[..., :, :K].sum(axis=-2)
+    precision, recall = _ratio(tp, predicted), _ratio(tp, support)
+    f1 = _ratio(2 * precision * recall, precision + recall)
+    return {"accuracy": _ratio(tp.sum(axis=-1), cm.sum(axis=(-2, -1))), "macro_f1": f1.mean(axis=-1),
+            "precision": precision, "recall": recall, "f1": f1, "support": support}
+
+
+def report(cm: np.ndarray, labels: Sequence[str]) -> Dict:
+    """classification_report(output_dict=True) of one [K+1, K+1] confusion matrix."""
+    s = scores(cm)
+    K = len(labels)
+    out = {lab: {"precision": float(s["precision"][k]), "recall": float(s["recall"][k]),
+                 "f1-score": float(s["f1"][k]), "support": int(s["support"][k])} for k, lab in enumerate(labels)}
+    total = int(s["support"].sum())
+    if cm[:, K].sum() == 0 and cm[K, :].sum() == 0:
+        out["accuracy"] = float(s["accuracy"])
+    else:  # like sklearn: values outside the labels turn "accuracy" into a micro average
+        tp = float(np.trace(cm[:K, :K]))
+        p, r = tp / max(cm[:, :K].sum(), 1), tp / max(total, 1)
+        out["micro avg"] = {"precision": p, "recall": r, "f1-score": 2 * p * r / (p + r) if p + r else 0.0,
+                            "support": total}
+    w = _ratio(s["support"], np.array(float(total)))
+    for name, weights in (("macro avg", np.full(K, 1.0 / K)), ("weighted avg", w)):
+        out[name] = {"precision": float(weights @ s["precision"]), "recall": float(weights @ s["recall"]),
+                     "f1-score": float(weights @ s["f1"]), "support": total}
+    return out
+
+
+def bootstrap_weights(n: int, n_boot: int, seed: int = 0) -> np.ndarray:
+    """[n_boot, n] draw counts of each row in each resample (rows drawn with replacement)."""
+    rng = np.random.default_rng(seed)
+    draws = rng.integers(0, n, size=(n_boot, n)) + n * np.arange(n_boot)[:, None]
+    return np.bincount(draws.ravel(), minlength=n_boot * n).reshape(n_boot, n).astype(np.float32)
+
+
+def evaluate(y_true: Predictions, predictions: Union[Mapping[str, Predictions], Predictions],
+             labels: Sequence[str], n_boot: int = 1000, ci: float = 0.95, seed: int = 0,
+             reference: Optional[str] = None) -> Dict[str, Dict]:
+    """
+    Metrics of every prediction set against y_true -> {name: {"accuracy", "macro_f1", "report",
+    "confusion_matrix", "ci": {"accuracy": [lo, hi], "macro_f1": [lo, hi]}, "n": rows}}.
+    A bare sequence of predictions is evaluated under the name "predictions". n_boot=0 skips
+    the intervals; with `reference`, every other set also gets "delta_vs_<reference>":
+    its difference to the reference and the paired interval of that difference.
+    """
+    if not isinstance(predictions, Mapping):
+        predictions = {"predictions": predictions}
+    names = list(predictions)
+    K = len(labels)
+    t = encode(y_true, labels)
+    P = np.stack([encode(predictions[name], labels) for name in names]) if names else np.empty((0, len(t)), int)
+    if P.shape[1] != len(t):
+        raise ValueError(f"prediction sets have {P.shape[1]} rows, y_true has {len(t)}")
+    pairs = t[None, :] * (K + 1) + P                                     # [sets, n]
+    cms = np.stack([np.bincount(p, minlength=(K + 1) ** 2) for p in pairs]).reshape(len(names), K + 1, K + 1)
+    point = scores(cms)
+
+    out = {}
+    for j, name in enumerate(names):
+        out[name] = {"accuracy": float(point["accuracy"][j]), "macro_f1": float(point["macro_f1"][j]),
+                     "report": report(cms[j], labels), "confusion_matrix": cms[j, :K, :K].tolist(), "n": len(t)}
+    if not n_boot or not len(t) or not names:
+        return out
+
+    W = bootstrap_weights(len(t), n_boot, seed)
+    C = (K + 1) ** 2
+    onehot = np.zeros((len(t), len(names) * C), dtype=np.float32)
+    rows = np.arange(len(t))
+    for j in range(len(names)):
+        onehot[rows, j * C + pairs[j]] = 1.0
+    boot = scores((W @ onehot).reshape(n_boot, len(names), K + 1, K + 1))  # [B, sets] per metric
+    q = [(1 - ci) / 2, 1 - (1 - ci) / 2]
+    for j, name in enumerate(names):
+        out[name]["ci"] = {m: np.quantile(boot[m][:, j], q).tolist() for m in ("accuracy", "macro_f1")}
+        out[name]["ci_level"], out[name]["n_boot"] = ci, n_boot
+    if reference is not None:
+        r = names.index(reference)
+        for j, name in enumerate(names):
+            if j != r:
+                out[name][f"delta_vs_{reference}"] = {
+                    m: {"value": out[name][m] - out[reference][m],
+                        "ci": np.quantile(boot[m][:, j] - boot[m][:, r], q).tolist()}
+                    for m in ("accuracy", "macro_f1")}
+    return out
+
+
+def save_metrics(result: Dict, outdir: str, title: str) -> str:
+    """metrics_<title>.json: accuracy, macro_f1, report (+ ci and confusion_matrix)."""
+    os.makedirs(outdir, exist_ok=True)
+    path = os.path.join(outdir, f"metrics_{title}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def format_report(result: Dict, labels: Sequence[str], digits: int = 3) -> str:
+    """Text table of one evaluate() result, in the layout of classification_report."""
+    rep = result["report"]
+    width = max(len(x) for x in list(labels) + ["weighted avg"])
+    lines = [f"{'':>{width}} {'precision':>9} {'recall':>9} {'f1-score':>9} {'support':>9}", ""]
+    row = lambda name, r: (f"{name:>{width}} {r['precision']:>9.{digits}f} {r['recall']:>9.{digits}f} "
+                           f"{r['f1-score']:>9.{digits}f} {r['support']:>9}")
+    lines += [row(lab, rep[lab]) for lab in labels] + [""]
+    if "accuracy" in rep:
+        lines.append(f"{'accuracy':>{width}} {'':>9} {'':>9} {rep['accuracy']:>9.{digits}f} "
+                     f"{rep['macro avg']['support']:>9}")
+    else:
+        lines.append(row("micro avg", rep["micro avg"]))
+    lines += [row("macro avg", rep["macro avg"]), row("weighted avg", rep["weighted avg"])]
+    if "ci" in result:
+        c = result["ci"]
+        lines += ["", f"{int(100 * result['ci_level'])}% bootstrap CI (n_boot={result['n_boot']}): "
+                      f"accuracy [{c['accuracy'][0]:.{digits}f}, {c['accuracy'][1]:.{digits}f}]  "
+                      f"macro-F1 [{c['macro_f1'][0]:.{digits}f}, {c['macro_f1'][1]:.{digits}f}]"]
+    return "\n".join(lines)
+
+
+def plot_confusion(cm: Sequence[Sequence[int]], labels: Sequence[str], title: str, path: str,
+                   figsize=(8, 7), dpi: int = 200):
+    """Write the confusion-matrix PNG (matplotlib is imported here, headless)."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    cm = np.asarray(cm)
+    fig = plt.figure(figsize=figsize)
+    ax = fig.add_subplot(111)
+    im = ax.imshow(cm, interpolation="nearest")
+    ax.set_title(f"Confusion Matrix — {title}")
+    ax.set_xlabel("Predicted")
+    ax.set_ylabel("True")
+    ax.set_xticks(range(len(labels))); ax.set_yticks(range(len(labels)))
+    ax.set_xticklabels(labels, rotation=45, ha="right"); ax.set_yticklabels(labels)
+    for i in range(len(labels)):
+        for j in range(len(labels)):
+            ax.text(j, i, int(cm[i, j]), ha="center", va="center", fontsize=9)
+    fig.colorbar(im, fraction=0.046, pad=0.04)
+    fig.tight_layout()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fig.savefig(path, dpi=dpi)
+    plt.close(fig)
+
+
+def render_plots(jobs: List[Dict]):
+    """Draw deferred plots: dicts of plot_confusion keyword arguments."""
+    for job in jobs:
+        plot_confusion(**job)
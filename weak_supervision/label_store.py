@@ -0,0 +1,131 @@
+# label_store.py
+"""
+On-disk label matrix for a growing pool, keyed by text hash (see run_label_model --incremental).
+
+<root>/meta.json          LF source hash + labeling config the rows were produced with
+<root>/seg_XXXXX.npz      one segment per refresh: a SparseLabelMatrix + `hashes` (sha1 of the raw text)
+<root>/pred.npz           the predictions currently written to the output tables (label id, conf),
+                          aligned with the concatenated segments
+<root>/label_model_mu.npy LabelModel parameters of the last fit, used to warm-start the next one
+
+A refresh only labels the rows whose hash is not in the store and writes them as a new
+segment; existing segments are never rewritten. A text appears once in the store. The output
+tables keep one part per segment, so a refresh appends a part and replaces only the parts of
+segments whose predictions changed.
+"""
+import glob, json, os
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from sparse_label_matrix import SparseLabelMatrix
+from table_io import text_hash as row_hash
+
+
+class LabelStore:
+    def __init__(self, root: str, meta: Dict):
+        self.root = root
+        self.meta = meta
+        self.hashes: List[str] = []
+        self.L: Optional[SparseLabelMatrix] = None
+        self.sizes: List[int] = []  # rows per segment
+        self.mpath = os.path.join(root, "meta.json")
+        if os.path.exists(self.mpath):
+            with open(self.mpath, "r", encoding="utf-8") as f:
+                old = json.load(f)
+            if old != meta:
+                raise RuntimeError(f"{root} was built with different LFs/labeling config; "
+                                   "delete it (or run without --incremental) to relabel the whole pool")
+            self._load()
+
+    def _load(self):
+        segs = sorted(glob.glob(os.path.join(self.root, "seg_*.npz")))
+        parts = []
+        for p in segs:
+            with np.load(p) as z:
+                self.hashes.extend(z["hashes"].tolist())
+                self.sizes.append(len(z["hashes"]))
+            parts.append(SparseLabelMatrix.load(p))
+        self.L = SparseLabelMatrix.vstack(parts) if parts else None
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def index(self) -> Dict[str, int]:
+        return {h: i for i, h in enumerate(self.hashes)}
+
+    def segments(self) -> List[Tuple[int, int]]:
+        """(first row, end row) of every segment, in store order."""
+        ends = np.cumsum(self.sizes).tolist()
+        return list(zip([0] + ends[:-1], ends))
+
+    def append(self, hashes: Sequence[str], L: SparseLabelMatrix):
+        """Persist one new segment (written to a temp file, then renamed)."""
+        if not len(hashes):
+            return
+        os.makedirs(self.root, exist_ok=True)
+        if not os.path.exists(self.mpath):
+            with open(self.mpath, "w", encoding="utf-8") as f:
+                json.dump(self.meta, f, ensure_ascii=False, indent=2)
+        path = os.path.join(self.root, f"seg_{len(self.sizes):05d}.npz")
+        tmp = path[:-len(".npz")] + ".tmp.npz"
+        L.save(tmp, hashes=np.asarray(hashes))
+        os.replace(tmp, path)
+        self.sizes.append(len(hashes))
+        self.hashes.extend(hashes)
+        self.L = L if self.L is None else SparseLabelMatrix.vstack([self.L, L])
+
+    # predictions currently in the output tables
+    def load_pred(self):
+        p = os.path.join(self.root, "pred.npz")
+        if not os.path.exists(p):
+            return None, None
+        with np.load(p) as z:
+            return z["label"], z["conf"]
+
+    def save_pred(self, label: np.ndarray, conf: np.ndarray):
+        tmp = os.path.join(self.root, "pred.tmp.npz")
+        np.savez(tmp, label=np.asarray(label, dtype=np.int64), conf=np.asarray(conf, dtype=np.float64))
+        os.replace(tmp, os.path.join(self.root, "pred.npz"))
+
+    def load_mu(self) -> Optional[np.ndarray]:
+        p = os.path.join(self.root, "label_model_mu.npy")
+        return np.load(p) if os.path.exists(p) else None
+
+    def save_mu(self, mu: np.ndarray):
+        np.save(os.path.join(self.root, "label_model_mu.npy"), mu)
+
+
+_warm_start_cls = None
+
+
+def _warm_start_label_model():
+    # snorkel's LabelModel pulls in torch + sklearn: define the subclass on first use only,
+    # so the dawid_skene / wmv paths and --help never import them
+    global _warm_start_cls
+    if _warm_start_cls is not None:
+        return _warm_start_cls
+    from snorkel.labeling.model import LabelModel
+
+    class WarmStartLabelModel(LabelModel):
+        """LabelModel whose fit starts from given mu (e.g. the previous day's) instead of the random init."""
+
+        def __init__(self, cardinality: int = 2, mu_start: Optional[np.ndarray] = None, **kwargs):
+            super().__init__(cardinality=cardinality, **kwargs)
+            self.mu_start = mu_start
+
+        def _init_params(self) -> None:
+            super()._init_params()
+            if self.mu_start is not None and tuple(self.mu_start.shape) == tuple(self.mu.shape):
+                import torch
+                self.mu = torch.nn.Parameter(torch.tensor(self.mu_start, dtype=self.mu.dtype))
+
+        def get_mu(self) -> np.ndarray:
+            return self.mu.detach().cpu().numpy()
+
+    _warm_start_cls = WarmStartLabelModel
+    return _warm_start_cls
+
+
+def __getattr__(name):
+    if name == "WarmStartLabelModel":
+        return _warm_start_label_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,19 +1,80 @@
 # llm_labeler_hf.py
 import random
+import numpy as np
 import pandas as pd
 from snorkel_setup import ABSTAIN, LABELS, L2I
-from transformers import pipeline
+from zero_shot import ZeroShotEngine, parse_threads
+from zs_cache import ScoreCache, DEFAULT_CACHE_PATH
+from embed_labeler import EmbeddingLabeler
+from encoder import DEFAULT_ENCODER
 
-def hf_zero_shot_votes(texts, label_names=LABELS, model="joeddav/xlm-roberta-large-xnli", top1_threshold=0.65, max_n=None, seed=42):
-    clf = pipeline("zero-shot-classification", model=model)
-    idxs = list(range(len(texts)))
+DEFAULT_MODELS = {"nli": "joeddav/xlm-roberta-large-xnli", "embed": DEFAULT_ENCODER}
+DEFAULT_THRESHOLDS = {"nli": 0.65, "embed": 0.5}
+
+def select_rows(n, max_n=None, seed=42):
+    """Row indices that get an LLM vote: a seeded shuffle of range(n), truncated to max_n
+    (None = all rows, 0 = none)."""
+    idxs = list(range(n))
     random.Random(seed).shuffle(idxs)
-    if max_n:
+    if max_n is not None:
         idxs = idxs[:max_n]
+    return idxs
+
+def scores_to_votes(S, label_names, top1_threshold):
+    """Top-1 label id per row of S, ABSTAIN where its score is below top1_threshold."""
+    top = S.argmax(axis=1)
+    top_p = S[np.arange(len(S)), top]
+    return [L2I[label_names[k]] if p >= top1_threshold else ABSTAIN for k, p in zip(top, top_p)]
+
+def hf_zero_shot_votes(texts, label_names=LABELS, model="joeddav/xlm-roberta-large-xnli", top1_threshold=0.65, max_n=None, seed=42, batch_size=64, cache_path=DEFAULT_CACHE_PATH, backend="torch", zs_threads=""):
+    idxs = select_rows(len(texts), max_n, seed)
     votes = {i: ABSTAIN for i in range(len(texts))}
-    for i in idxs:
-        t = str(texts[i])
-        r = clf(t, candidate_labels=label_names, multi_label=False)
-        lab, p = r["labels"][0], float(r["scores"][0])
-        votes[i] = L2I[lab] if p >= top1_threshold else ABSTAIN
+    if not idxs:
+        return votes
+    cache = ScoreCache(cache_path) if cache_path else None
+    intra, inter = parse_threads(zs_threads)
+    engine = ZeroShotEngine(model, batch_size=batch_size, cache=cache, backend=backend,
+                            intra_op_threads=intra, inter_op_threads=inter)
+    S = engine.scores([str(texts[i]) for i in idxs], label_names)
+    if cache is not None:
+        print("[zero-shot cache]", cache.stats())
+    votes.update(zip(idxs, scores_to_votes(S, label_names, top1_threshold)))
     return votes  # dict: row_index -> label_id (or ABSTAIN)
+
+def embed_zero_shot_votes(texts, label_names=LABELS, model=DEFAULT_ENCODER, top1_threshold=0.5, max_n=None, seed=42, batch_size=64, taxonomy_path="config/taxonomy.yaml", temperature=None):
+    """Same contract as hf_zero_shot_votes, scored with the bi-encoder EmbeddingLabeler."""
+    idxs = select_rows(len(texts), max_n, seed)
+    votes = {i: ABSTAIN for i in range(len(texts))}
+    if not idxs:
+        return votes
+    labeler = EmbeddingLabeler(label_names, model=model, taxonomy_path=taxonomy_path, temperature=temperature, batch_size=batch_size)
+    S = labeler.scores([str(texts[i]) for i in idxs])
+    votes.update(zip(idxs, scores_to_votes(S, label_names, top1_threshold)))
+    return votes
+
+def zero_shot_voter(texts, llm_labeler="nli", label_names=LABELS, model=None, top1_threshold=None, batch_size=64, cache_path=DEFAULT_CACHE_PATH, backend="torch", temperature=None, zs_threads=""):
+    """vote_fn(rows) -> votes for texts[rows]; the model is built on the first call and reused (see llm_selection).
+    temperature: embed only (None = the stored calibrated one, see embed_labeler);
+    zs_threads: nli only, "INTRA[:INTER]" threads of the model (see zero_shot.parse_threads)."""
+    if llm_labeler not in DEFAULT_MODELS:
+        raise ValueError(f"Unknown llm_labeler: {llm_labeler}")
+    model = model or DEFAULT_MODELS[llm_labeler]
+    thr = top1_threshold if top1_threshold is not None else DEFAULT_THRESHOLDS[llm_labeler]
+    state = {}
+
+    def vote_fn(rows):
+        if len(rows) == 0:
+            return []
+        if "scorer" not in state:
+            if llm_labeler == "nli":
+                cache = ScoreCache(cache_path) if cache_path else None
+                intra, inter = parse_threads(zs_threads)
+                engine = ZeroShotEngine(model, batch_size=batch_size, cache=cache, backend=backend,
+                                        intra_op_threads=intra, inter_op_threads=inter)
+                state["scorer"] = lambda xs: engine.scores(xs, label_names)
+            else:
+                state["scorer"] = EmbeddingLabeler(label_names, model=model, batch_size=batch_size,
+                                                   temperature=temperature).scores
+        S = state["scorer"]([str(texts[i]) for i in rows])
+        return scores_to_votes(S, label_names, thr)
+    return vote_fn
@@ -0,0 +1,104 @@
+# llm_selection.py
+"""
+Budgeted selection of the rows that get an (expensive) LLM/zero-shot vote.
+
+strategy="random" is the original behaviour: a seeded shuffle of the pool truncated
+to the budget (same rows as hf_zero_shot_votes(max_n=budget)).
+
+strategy="uncertainty" ranks rows with the cheap LF matrix and spends the budget on
+the rows the LFs cannot settle, in this order:
+  1. all-abstain rows (no LF fired),
+  2. conflicting rows (LFs vote for >= 2 different classes),
+  3. the rest, by ascending LabelModel confidence.
+Ties are broken by the same seeded shuffle. With rounds > 1 the budget is spent in
+equal slices: after each slice the LabelModel is refit on [L_lf, LLM column] and the
+remaining rows are re-ranked, so later slices see what the earlier votes resolved.
+"""
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+from snorkel_setup import ABSTAIN, LABELS
+from llm_labeler_hf import select_rows
+from sparse_label_matrix import SparseLabelMatrix
+
+STRATEGIES = ("random", "uncertainty")
+
+# tiers of the uncertainty ranking (lower = asked first)
+TIER_ALL_ABSTAIN, TIER_CONFLICT, TIER_REST = 0, 1, 2
+
+
+def lf_tiers(L) -> np.ndarray:
+    """Per-row tier of an LF matrix (SparseLabelMatrix, or dense [N, m] with ABSTAIN = -1)."""
+    if not isinstance(L, SparseLabelMatrix):
+        L = np.asarray(L)
+        L = SparseLabelMatrix.from_dense(L.reshape(len(L), -1))
+    tiers = np.full(L.n_rows, TIER_REST, dtype=np.int8)
+    tiers[L.conflict_rows()] = TIER_CONFLICT
+    tiers[L.n_votes() == 0] = TIER_ALL_ABSTAIN
+    return tiers
+
+
+def fit_confidence(L, cardinality: int = len(LABELS), seed: int = 42,
+                   n_epochs: int = 500, lr: float = 1e-2) -> np.ndarray:
+    """Max LabelModel probability per row (same fit settings as run_label_model)."""
+    from snorkel.labeling.model import LabelModel
+    if isinstance(L, SparseLabelMatrix):
+        L = L.to_dense()
+    lm = LabelModel(cardinality=cardinality, verbose=False)
+    lm.fit(L, n_epochs=n_epochs, seed=seed, lr=lr, progress_bar=False)
+    return lm.predict_proba(L).max(axis=1)
+
+
+def rank_rows(L_lf, conf: Optional[np.ndarray] = None, exclude: Optional[np.ndarray] = None,
+              seed: int = 42, tiers: Optional[np.ndarray] = None) -> np.ndarray:
+    """Row indices, most uncertain first; rows flagged in `exclude` are dropped."""
+    n = len(L_lf)
+    shuffle_pos = np.empty(n, dtype=np.int64)
+    shuffle_pos[select_rows(n, None, seed)] = np.arange(n)
+    conf = np.zeros(n) if conf is None else np.asarray(conf, dtype=float)
+    order = np.lexsort((shuffle_pos, conf, lf_tiers(L_lf) if tiers is None else tiers))  # last key = primary
+    if exclude is not None:
+        order = order[~np.asarray(exclude, dtype=bool)[order]]
+    return order
+
+
+def budgeted_llm_column(L_lf, budget: int, vote_fn: Callable[[np.ndarray], Sequence[int]],
+                        strategy: str = "uncertainty", rounds: int = 1, seed: int = 42,
+                        cardinality: int = len(LABELS)) -> Tuple[np.ndarray, List[Dict]]:
+    """
+    Spend `budget` LLM calls and return (column [N] of votes / ABSTAIN, per-round log).
+
+    vote_fn(rows) gets an array of row indices and returns one vote per row; it is called
+    once per round, so it may batch / cache however it likes.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy: {strategy}")
+    n = len(L_lf)
+    budget = max(0, min(int(budget), n))
+    col = np.full(n, ABSTAIN, dtype=np.int64)
+    asked = np.zeros(n, dtype=bool)
+    log = []
+    if strategy == "random":
+        rounds = 1  # nothing to re-rank
+    if not isinstance(L_lf, SparseLabelMatrix):
+        L_lf = SparseLabelMatrix.from_dense(np.asarray(L_lf).reshape(n, -1))
+    all_tiers = lf_tiers(L_lf)
+    slices = [budget // rounds + (r < budget % rounds) for r in range(rounds)]
+
+    for r, k in enumerate(slices):
+        if k == 0:
+            continue
+        if strategy == "random":
+            rows = np.asarray(select_rows(n, k, seed), dtype=np.int64)
+        else:
+            L = L_lf if r == 0 else L_lf.with_column(col, "llm")
+            conf = fit_confidence(L, cardinality, seed) if L.n_cols else None
+            rows = rank_rows(L_lf, conf, exclude=asked, seed=seed, tiers=all_tiers)[:k]
+        votes = np.asarray(vote_fn(rows), dtype=np.int64)
+        col[rows] = votes
+        asked[rows] = True
+        tiers = all_tiers[rows]
+        log.append({"round": r + 1, "calls": int(len(rows)), "votes": int((votes != ABSTAIN).sum()),
+                    "all_abstain": int((tiers == TIER_ALL_ABSTAIN).sum()),
+                    "conflict": int((tiers == TIER_CONFLICT).sum())})
+    return col, log
@@ -0,0 +1,187 @@
+# model_registry.py
+"""
+Process-wide registry of the HF models used by the zero-shot engine, the sentence encoder
+and the ONNX backend: one instance per (kind, model, backend, device, options), loaded on
+first use and shared by every engine / labeler / script stage of the process afterwards.
+
+Nothing heavy is imported by this module: torch, transformers and onnxruntime are
+imported by the loader of the first model that needs them, so code paths that never
+touch a model (rules-only baselines, cached runs, --help) never pay for them.
+
+Weights are read from a local safetensors snapshot of each model:
+
+<root>/<model slug>/model.safetensors  + config.json + tokenizer files
+
+written once by save_pretrained on first use (or by `python weak_supervision/model_registry.py
+<model> ...` ahead of time). from_pretrained on that directory maps model.safetensors
+instead of reading it into private memory, so a restarted worker starts from the page
+cache and processes loading the same model share its pages. A model name that is already
+a local directory is used as is.
+
+Offline mode (WS_OFFLINE=1 or set_offline()) never touches the network: HF_HUB_OFFLINE /
+TRANSFORMERS_OFFLINE are set and a model missing from the local cache is an error naming
+the directory to fill.
+
+Environment:
+  WS_MODEL_CACHE   snapshot root (default cache/models)
+  WS_OFFLINE       1 = no downloads
+"""
+import importlib, os, re, sys, threading, time
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_MODEL_CACHE = os.environ.get("WS_MODEL_CACHE", "cache/models")
+WEIGHTS_FILE = "model.safetensors"
+
+_lock = threading.RLock()
+_instances: Dict[Tuple, object] = {}
+_loads: List[Dict] = []
+_imports: Dict[str, float] = {}
+
+
+def is_offline() -> bool:
+    return os.environ.get("WS_OFFLINE", "").lower() in ("1", "true", "yes")
+
+
+def set_offline(offline: bool = True):
+    """Switch offline mode for this process (and the HF libraries it loads)."""
+    for var in ("WS_OFFLINE", "HF_HUB_OFFLINE", "TRANSFORMERS_OFFLINE"):
+        if offline:
+            os.environ[var] = "1"
+        else:
+            os.environ.pop(var, None)
+
+
+if is_offline():
+    set_offline(True)
+
+
+def heavy_import(module: str, attrs: Tuple[str, ...] = ()):
+    """importlib.import_module, recording how long the first import took (stats()["imports"]).
+    attrs are resolved inside the timing too (lazy modules import their backends there)."""
+    if module in _imports:
+        return sys.modules[module]
+    t0 = time.perf_counter()
+    mod = importlib.import_module(module)
+    for a in attrs:
+        getattr(mod, a)
+    _imports[module] = round(time.perf_counter() - t0, 3)
+    return mod
+
+
+def _transformers():
+    try:
+        heavy_import("torch")  # reported on its own; transformers would import it anyway
+    except ImportError:  # onnx-only install
+        pass
+    return heavy_import("transformers", ("AutoConfig", "AutoTokenizer", "AutoModel"))
+
+
+def local_dir(model_name: str, root: Optional[str] = None) -> str:
+    return os.path.join(root or DEFAULT_MODEL_CACHE, re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name.strip("/")))
+
+
+def snapshot(model_name: str, kind: str = "nli", root: Optional[str] = None) -> str:
+    """Directory with the safetensors snapshot of model_name, created on first use."""
+    if os.path.isdir(model_name):
+        return model_name
+    out = local_dir(model_name, root)
+    if os.path.exists(os.path.join(out, WEIGHTS_FILE)):
+        return out
+    if is_offline():
+        raise RuntimeError(f"offline mode: {model_name} is not in the local model cache ({out}); "
+                           f"run `python weak_supervision/model_registry.py {model_name}` with network access first")
+    model = _AUTO_CLASSES[kind]().from_pretrained(model_name)
+    tmp = out + ".tmp"
+    model.save_pretrained(tmp, safe_serialization=True)
+    _transformers().AutoTokenizer.from_pretrained(model_name).save_pretrained(tmp)
+    if os.path.exists(out):
+        import shutil
+        shutil.rmtree(out)
+    os.replace(tmp, out)
+    return out
+
+
+def _auto_nli():
+    return _transformers().AutoModelForSequenceClassification
+
+
+def _auto_encoder():
+    return _transformers().AutoModel
+
+
+_AUTO_CLASSES = {"nli": _auto_nli, "encoder": _auto_encoder}
+
+
+def get(key: Tuple, loader: Callable[[], object]) -> object:
+    """The instance registered under key, loading it (once per process) with loader()."""
+    obj = _instances.get(key)
+    if obj is not None:
+        return obj
+    with _lock:
+        if key not in _instances:
+            t0 = time.perf_counter()
+            _instances[key] = loader()
+            _loads.append({"kind": key[0], "model": key[1], "options": [str(k) for k in key[2:]],
+                           "load_seconds": round(time.perf_counter() - t0, 3)})
+        return _instances[key]
+
+
+def tokenizer(model_name: str, kind: str = "nli"):
+    def load():
+        tok = _transformers().AutoTokenizer.from_pretrained(snapshot(model_name, kind))
+        if tok.pad_token is None:
+            tok.pad_token = tok.eos_token
+        return tok
+    return get(("tokenizer", model_name), load)
+
+
+def nli_model(model_name: str, device: str = "cpu"):
+    """torch sequence-classification model in eval mode."""
+    return get(("nli", model_name, "torch", device),
+               lambda: _auto_nli().from_pretrained(snapshot(model_name, "nli")).to(device).eval())
+
+
+def encoder_model(model_name: str, device: str = "cpu"):
+    """torch encoder (AutoModel) in eval mode."""
+    return get(("encoder", model_name, "torch", device),
+               lambda: _auto_encoder().from_pretrained(snapshot(model_name, "encoder")).to(device).eval())
+
+
+def model_config(model_name: str, kind: str = "nli"):
+    def load():
+        return _transformers().AutoConfig.from_pretrained(snapshot(model_name, kind))
+    return get(("config", model_name), load)
+
+
+def onnx_nli(model_name: str, quantize: bool = True, intra_op_threads: Optional[int] = None,
+             inter_op_threads: Optional[int] = None):
+    """OnnxNLIRunner over the (int8) ONNX export of model_name."""
+    from onnx_backend import OnnxNLIRunner, export_onnx
+    return get(("nli", model_name, "onnx", "int8" if quantize else "fp32", intra_op_threads, inter_op_threads),
+               lambda: OnnxNLIRunner(export_onnx(model_name, quantize=quantize), intra_op_threads=intra_op_threads,
+                                     inter_op_threads=inter_op_threads))
+
+
+def stats() -> Dict:
+    """Heavy imports and loaded instances with their time (seconds, load_seconds include
+    the imports they triggered), for /health and run reports."""
+    return {"offline": is_offline(), "cache": DEFAULT_MODEL_CACHE, "imports": dict(_imports), "loaded": list(_loads)}
+
+
+def clear():
+    with _lock:
+        _instances.clear()
+        _loads.clear()
+
+
+if __name__ == "__main__":
+    # prefetch: python weak_supervision/model_registry.py <model> [<model> ...] [--kind encoder]
+    import argparse
+    ap = argparse.ArgumentParser(description="Write local safetensors snapshots for offline use")
+    ap.add_argument("models", nargs="+")
+    ap.add_argument("--kind", default="nli", choices=list(_AUTO_CLASSES))
+    ap.add_argument("--root", default=None)
+    args = ap.parse_args()
+    for name in args.models:
+        t0 = time.perf_counter()
+        print(f"[✓] {name} -> {snapshot(name, args.kind, args.root)} ({time.perf_counter() - t0:.1f}s)")
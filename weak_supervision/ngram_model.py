@@ -0,0 +1,165 @@
+# ngram_model.py
+"""
+Transformer-free end model: linear classifier on hashed character and word n-grams,
+distilled from the label model's soft labels (label_probs / Y_prob of run_label_model.py).
+
+Features of a query (after NFC, casefold, whitespace collapse):
+  - character n-grams (default 2..4) of " " + query + " ", so word boundaries are part
+    of the grams and VN / EN words need no tokenizer;
+  - word unigrams and bigrams, plus the same words with the diacritics stripped
+    ("tập" -> "tap", "đá" -> "da"), so queries typed without accents still match.
+Every n-gram is hashed into 2**bits buckets (no vocabulary); rows are L2-normalized counts.
+Character n-grams of a whole batch are hashed at once over the code points of the
+concatenated queries (polynomial rolling hash, uint64), so featurizing + one sparse
+matrix product is the whole inference.
+
+<dir>/ngram_model.npy   float16 [2**bits + 1, K]: weights, last row = bias (np.load, mmap)
+<dir>/meta.json         labels, featurizer config, training stats
+"""
+import json, os, re, unicodedata, zlib
+from typing import Dict, Optional, Sequence, Tuple
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from zs_cache import normalize_text
+from end_model import _softmax, fit_soft_logreg
+
+_WORD = re.compile(r"\w+")
+_PRIME = np.uint64(1099511628211)
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+_WORD_SALT = np.uint64(0x5BD1E9955BD1E995)
+
+
+def _accent_table() -> Dict[int, str]:
+    """Latin letters with diacritics (incl. all Vietnamese ones) -> base letter."""
+    table = {ord("đ"): "d", ord("Đ"): "D"}
+    for cp in list(range(0x00C0, 0x0250)) + list(range(0x1E00, 0x1F00)):
+        base = unicodedata.normalize("NFD", chr(cp))[0]
+        if base != chr(cp) and base.isascii():
+            table[cp] = base
+    return table
+
+
+_ACCENTS = _accent_table()
+
+
+def strip_accents(text: str) -> str:
+    return text.translate(_ACCENTS)
+
+
+def canonical(text: str) -> str:
+    return normalize_text(str(text).casefold())
+
+
+class HashedNgrams:
+    def __init__(self, bits: int = 18, char_ngrams: Tuple[int, int] = (2, 4), word_ngrams: int = 2):
+        self.bits = bits
+        self.n_features = 1 << bits
+        self.char_ngrams = tuple(char_ngrams)
+        self.word_ngrams = word_ngrams
+
+    def config(self) -> Dict:
+        return {"bits": self.bits, "char_ngrams": list(self.char_ngrams), "word_ngrams": self.word_ngrams}
+
+    def _bucket(self, h: np.ndarray) -> np.ndarray:
+        return ((h * _MIX) >> np.uint64(64 - self.bits)).astype(np.int64)
+
+    def _char_grams(self, texts) -> Tuple[np.ndarray, np.ndarray]:
+        # code points of "\0 q1 \0 q2 ..."; a gram is kept when it contains no separator
+        cps = np.frombuffer("".join(f"\0 {t} " for t in texts).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        sep = np.cumsum(cps == 0)
+        rows, cols = [], []
+        lo, hi = self.char_ngrams
+        for n in range(lo, hi + 1):
+            m = len(cps) - n + 1
+            if m <= 0:
+                continue
+            h = np.full(m, np.uint64(n))
+            for j in range(n):
+                h = h * _PRIME + cps[j:j + m]
+            ok = sep[n - 1:] == sep[:m]
+            ok &= cps[:m] != 0
+            rows.append(sep[:m][ok] - 1)
+            cols.append(self._bucket(h[ok]))
+        return np.concatenate(rows), np.concatenate(cols)
+
+    def _word_grams(self, texts) -> Tuple[np.ndarray, np.ndarray]:
+        rows, hashes = [], []
+        for i, t in enumerate(texts):
+            toks = _WORD.findall(t)
+            plain = _WORD.findall(strip_accents(t))
+            grams = toks + [f"{a} {b}" for a, b in zip(toks, toks[1:])] if self.word_ngrams > 1 else list(toks)
+            if plain != toks:
+                grams += ["~" + w for w in plain]
+            rows.extend([i] * len(grams))
+            hashes.extend(zlib.crc32(g.encode("utf-8")) for g in grams)
+        h = np.array(hashes, dtype=np.uint64) ^ _WORD_SALT
+        return np.array(rows, dtype=np.int64), self._bucket(h)
+
+    def transform(self, texts: Sequence) -> csr_matrix:
+        """[N, 2**bits] float32 CSR, L2-normalized rows."""
+        texts = [canonical(t) for t in texts]
+        if not texts:
+            return csr_matrix((0, self.n_features), dtype=np.float32)
+        r1, c1 = self._char_grams(texts)
+        r2, c2 = self._word_grams(texts)
+        rows, cols = np.concatenate([r1, r2]), np.concatenate([c1, c2])
+        X = csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(len(texts), self.n_features))
+        X.sum_duplicates()
+        norm = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+        X.data /= np.repeat(np.maximum(norm, 1e-12), np.diff(X.indptr)).astype(np.float32)
+        return X
+
+
+class NgramModel:
+    def __init__(self, weights: np.ndarray, labels: Sequence[str], featurizer: HashedNgrams,
+                 meta: Optional[Dict] = None):
+        self.weights = weights  # [n_features + 1, K], last row = bias
+        self.labels = list(labels)
+        self.featurizer = featurizer
+        self.meta = meta or {}
+
+    @classmethod
+    def fit(cls, texts: Sequence, Y_prob: np.ndarray, labels: Sequence[str], featurizer: Optional[HashedNgrams] = None,
+            min_conf: float = 0.0, conf_power: float = 1.0, l2: float = 1e-5, max_iter: int = 300,
+            X: Optional[csr_matrix] = None) -> "NgramModel":
+        """X: precomputed featurizer.transform(texts), to re-fit with other settings for free."""
+        featurizer = featurizer or HashedNgrams()
+        X = featurizer.transform(texts) if X is None else X
+        W, b, meta = fit_soft_logreg(X, Y_prob, min_conf, conf_power, l2, max_iter)
+        weights = np.vstack([W, b[None, :]]).astype(np.float16)
+        return cls(weights, labels, featurizer, meta)
+
+    def proba(self, X: csr_matrix) -> np.ndarray:
+        """[N, K] class probabilities of hashed features X (featurizer.transform)."""
+        # gather (and upcast) only the weight rows the batch uses, not the whole table
+        cols, inv = np.unique(X.indices, return_inverse=True)
+        Xc = csr_matrix((X.data, inv.ravel(), X.indptr), shape=(X.shape[0], len(cols)))
+        W = self.weights
+        return _softmax(np.asarray(Xc @ W[cols].astype(np.float32)) + W[-1].astype(np.float32))
+
+    def scores(self, texts: Sequence) -> np.ndarray:
+        """[N, K] class probabilities of raw texts (featurize + one sparse matrix multiply)."""
+        return self.proba(self.featurizer.transform(texts))
+
+    def predict(self, X: csr_matrix) -> list:
+        return [self.labels[k] for k in self.proba(X).argmax(axis=1)]
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "ngram_model.npy"), self.weights)
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"kind": "ngram", "labels": self.labels, "featurizer": self.featurizer.config(), **self.meta},
+                      f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "NgramModel":
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        weights = np.load(os.path.join(path, "ngram_model.npy"), mmap_mode="r")
+        meta.pop("kind", None)
+        return cls(weights, meta.pop("labels"), HashedNgrams(**meta.pop("featurizer")), meta)
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(path, "ngram_model.npy"))
@@ -0,0 +1,208 @@
+# np_label_model.py
+"""
+NumPy label models with the same fit / predict_proba / predict interface as snorkel's LabelModel.
+
+WeightedMajorityVote  each LF votes with weight log(acc / (1 - acc)), acc estimated on the
+                      gold rows (Y != ABSTAIN) with add-one smoothing; rows without votes get
+                      the class prior. Without gold every LF has weight 1 (= majority vote).
+DawidSkene            EM over per-LF confusion matrices P(LF j outputs l | Y = y). ABSTAIN is
+                      modelled as one more output, so single-polarity keyword LFs still carry
+                      information (how often they fire for each class). Initialised from the
+                      (seeded, jittered) majority vote, so runs are deterministic given the seed.
+
+Both accept a dense [N, m] matrix or a SparseLabelMatrix and only touch the votes:
+the abstain terms are a per-class constant, so an E-step costs O(votes * K). Dawid-Skene
+runs EM on the distinct vote patterns weighted by their counts (keyword LFs produce a few
+hundred patterns for any pool size). With `chunk_size`, the pattern scan and the E-steps
+run over row blocks and only accumulate the M-step counts, so neither a dense [N, m]
+matrix nor the [N, K] posterior is held in memory during fit.
+"""
+from abc import ABC, abstractmethod
+from typing import Iterator, Optional, Tuple
+import numpy as np
+
+from snorkel_setup import ABSTAIN
+from sparse_label_matrix import SparseLabelMatrix
+
+
+def _as_sparse(L) -> SparseLabelMatrix:
+    if isinstance(L, SparseLabelMatrix):
+        return L
+    L = np.asarray(L)
+    return SparseLabelMatrix.from_dense(L.reshape(len(L), -1))
+
+
+def _chunks(L: SparseLabelMatrix, chunk_size: Optional[int]) -> Iterator[Tuple[int, int, np.ndarray, np.ndarray, np.ndarray]]:
+    """(lo, hi, local row ids, column ids, labels) of the votes in each block of rows."""
+    step = chunk_size or max(L.n_rows, 1)
+    for lo in range(0, L.n_rows, step):
+        hi = min(L.n_rows, lo + step)
+        a, b = L.indptr[lo], L.indptr[hi]
+        rows = np.repeat(np.arange(hi - lo), np.diff(L.indptr[lo:hi + 1]))
+        yield lo, hi, rows, L.indices[a:b].astype(np.int64), L.data[a:b].astype(np.int64)
+
+
+def _unique_rows(L: SparseLabelMatrix, chunk_size: Optional[int]) -> Tuple[SparseLabelMatrix, np.ndarray]:
+    """Distinct rows of L (as a SparseLabelMatrix) and how many times each occurs."""
+    m = L.n_cols
+    if m == 0:
+        return SparseLabelMatrix(np.zeros(2), np.zeros(0), np.zeros(0), 0, L.names), np.array([float(L.n_rows)])
+    seen = {}
+    for lo, hi, rows, cols, labels in _chunks(L, chunk_size):
+        block = np.full((hi - lo, m), ABSTAIN, dtype=np.int8)
+        block[rows, cols] = labels
+        keys, counts = np.unique(block.view(np.dtype((np.void, m))).ravel(), return_counts=True)
+        for k, c in zip(keys.tolist(), counts.tolist()):
+            seen[k] = seen.get(k, 0) + c
+    keys = sorted(seen)  # canonical order: the result does not depend on chunk_size
+    patterns = np.frombuffer(b"".join(keys), dtype=np.int8).reshape(-1, m)
+    return SparseLabelMatrix.from_dense(patterns, L.names), np.array([seen[k] for k in keys], dtype=float)
+
+
+def _softmax_rows(logits: np.ndarray) -> np.ndarray:
+    logits = logits - logits.max(axis=1, keepdims=True)
+    np.exp(logits, out=logits)
+    logits /= logits.sum(axis=1, keepdims=True)
+    return logits
+
+
+class _NumpyLabelModel(ABC):
+    """predict_proba / predict over row blocks; a subclass fits and scores the votes of a block."""
+
+    def __init__(self, cardinality: int = 2, verbose: bool = False):
+        self.cardinality = cardinality
+        self.verbose = verbose
+
+    def _check(self, L: SparseLabelMatrix):
+        if L.nnz and int(L.data.max()) >= self.cardinality:
+            raise ValueError(f"L has label {int(L.data.max())}, cardinality={self.cardinality} passed in.")
+
+    @abstractmethod
+    def _log_scores(self, rows, cols, labels, n) -> np.ndarray:
+        """[n, K] unnormalized log posteriors of a block from its votes (local row ids, LF ids, labels)."""
+
+    def predict_proba(self, L, chunk_size: Optional[int] = None) -> np.ndarray:
+        L = _as_sparse(L)
+        out = np.empty((L.n_rows, self.cardinality))
+        for lo, hi, rows, cols, labels in _chunks(L, chunk_size):
+            out[lo:hi] = _softmax_rows(self._log_scores(rows, cols, labels, hi - lo))
+        return out
+
+    def predict(self, L, chunk_size: Optional[int] = None) -> np.ndarray:
+        return self.predict_proba(L, chunk_size).argmax(axis=1)
+
+
+class WeightedMajorityVote(_NumpyLabelModel):
+    def fit(self, L_train, Y=None, class_balance: Optional[np.ndarray] = None, smoothing: float = 1.0):
+        """Y: gold labels aligned with L_train rows (ABSTAIN where unknown); None = plain majority vote."""
+        L = _as_sparse(L_train)
+        self._check(L)
+        K, m = self.cardinality, L.n_cols
+        self.weights = np.ones(m)
+        if Y is not None:
+            Y = np.asarray(Y)
+            if len(Y) != L.n_rows:
+                raise ValueError(f"Y has {len(Y)} rows, L_train has {L.n_rows}")
+            row = L.row_ids()
+            gold = Y[row] != ABSTAIN
+            cols = L.indices[gold].astype(np.int64)
+            correct = np.bincount(cols[L.data[gold] == Y[row][gold]], minlength=m)
+            total = np.bincount(cols, minlength=m)
+            acc = (correct + smoothing) / (total + 2 * smoothing)
+            self.weights = np.log(acc / (1 - acc))
+        if class_balance is None:
+            class_balance = np.full(K, 1.0 / K)
+        self.log_prior = np.log(np.asarray(class_balance, dtype=float))
+        if self.verbose:
+            print("[wmv] LF weights:", np.round(self.weights, 3).tolist())
+        return self
+
+    def _log_scores(self, rows, cols, labels, n):
+        # rows without votes fall back to the prior; the prior only breaks ties elsewhere
+        K = self.cardinality
+        scores = np.bincount(rows * K + labels, weights=self.weights[cols], minlength=n * K).reshape(n, K)
+        has_vote = np.zeros(n, dtype=bool)
+        has_vote[rows] = True
+        scores[~has_vote] = self.log_prior
+        return scores + 1e-6 * self.log_prior
+
+
+class DawidSkene(_NumpyLabelModel):
+    def fit(self, L_train, class_balance: Optional[np.ndarray] = None, n_epochs: int = 100, tol: float = 1e-6,
+            seed: int = 42, smoothing: float = 0.01, chunk_size: Optional[int] = None, init_jitter: float = 1e-3):
+        """
+        EM for at most n_epochs iterations, stopping when the mean log-likelihood improves by
+        less than `tol`. class_balance fixes the class prior instead of estimating it.
+        """
+        L = _as_sparse(L_train)
+        self._check(L)
+        K, m, n = self.cardinality, L.n_cols, L.n_rows
+        rng = np.random.default_rng(seed)
+        # identical rows have identical posteriors: run EM on the distinct vote patterns, weighted
+        P, w = _unique_rows(L, chunk_size)
+        if self.verbose:
+            print(f"[dawid-skene] {n} rows -> {P.n_rows} distinct vote patterns")
+
+        # init: majority vote (uniform on all-abstain rows) + a small seeded jitter
+        counts = np.zeros((m, K, K + 1))
+        class_tot = np.zeros(K)
+        for lo, hi, rows, cols, labels in _chunks(P, chunk_size):
+            T = np.bincount(rows * K + labels, minlength=(hi - lo) * K).reshape(hi - lo, K) + 1e-2
+            T += init_jitter * rng.random(T.shape)
+            T /= T.sum(axis=1, keepdims=True)
+            self._accumulate(T * w[lo:hi, None], rows, cols, labels, counts, class_tot)
+        self._m_step(counts, class_tot, n, smoothing, class_balance)
+
+        self.history = []
+        prev = -np.inf
+        for epoch in range(n_epochs):
+            counts[:] = 0
+            class_tot[:] = 0
+            ll = 0.0
+            for lo, hi, rows, cols, labels in _chunks(P, chunk_size):
+                logits = self._log_scores(rows, cols, labels, hi - lo)
+                mx = logits.max(axis=1, keepdims=True)
+                ll += float((w[lo:hi] * (mx[:, 0] + np.log(np.exp(logits - mx).sum(axis=1)))).sum())
+                self._accumulate(_softmax_rows(logits) * w[lo:hi, None], rows, cols, labels, counts, class_tot)
+            self._m_step(counts, class_tot, n, smoothing, class_balance)
+            ll /= max(n, 1)
+            self.history.append(ll)
+            if self.verbose:
+                print(f"[dawid-skene] epoch {epoch + 1}: mean log-lik {ll:.6f}")
+            if ll - prev < tol:
+                break
+            prev = ll
+        return self
+
+    @staticmethod
+    def _accumulate(T, rows, cols, labels, counts, class_tot):
+        """Add one block's sufficient statistics: expected (LF, true class, output) counts."""
+        K = T.shape[1]
+        m = counts.shape[0]
+        # votes: counts[j, y, l] += T[i, y]
+        flat = (cols * K)[:, None] * (K + 1) + np.arange(K)[None, :] * (K + 1) + labels[:, None]
+        counts += np.bincount(flat.ravel(), weights=T[rows].ravel(), minlength=m * K * (K + 1)).reshape(counts.shape)
+        class_tot += T.sum(axis=0)
+
+    def _m_step(self, counts, class_tot, n, smoothing, class_balance):
+        K = self.cardinality
+        # every row not voted on by LF j is an ABSTAIN output of LF j
+        counts[:, :, K] = class_tot[None, :] - counts[:, :, :K].sum(axis=2)
+        conf = counts + smoothing
+        conf /= conf.sum(axis=2, keepdims=True)
+        self.log_conf = np.log(conf)                                   # [m, K, K+1]
+        prior = class_balance if class_balance is not None else (class_tot + smoothing) / (n + K * smoothing)
+        self.log_prior = np.log(np.asarray(prior, dtype=float))
+        # abstain terms are the same for every row: fold them into a per-class base score
+        self._base = self.log_prior + self.log_conf[:, :, K].sum(axis=0)
+        self._vote_delta = self.log_conf[:, :, :K] - self.log_conf[:, :, K:]   # [m, K, K]
+
+    def _log_scores(self, rows, cols, labels, n):
+        K = self.cardinality
+        delta = self._vote_delta[cols, :, labels]                     # [votes, K]
+        flat = (rows[:, None] * K + np.arange(K)[None, :]).ravel()
+        return np.bincount(flat, weights=delta.ravel(), minlength=n * K).reshape(n, K) + self._base
+
+    def get_conditional_probs(self) -> np.ndarray:
+        """[m, K, K+1] P(LF j outputs l | Y = y); the last output is ABSTAIN."""
+        return np.exp(self.log_conf)
@@ -0,0 +1,295 @@
+# profiling.py
+"""
+Opt-in instrumentation of the labeling pipeline and the serving path (WS_PROFILE=1 or enable()).
+
+Two kinds of records, aggregated per process in PROFILER:
+
+stages    `with stage("label_model.fit"): ...` -> calls, wall seconds, CPU seconds of this
+          process and of the children it reaped (spawned labeling workers), peak RSS inside
+          the stage and the RSS change. Nested stages are named "outer/inner".
+counters  record(group, name, calls, hits, seconds, items): call counts, hit counts and
+          cumulative time of the LFs (group "lf"), the regex tables ("regex"), the zero-shot
+          model ("zero_shot": items = texts scored, items_per_s = throughput) and its score
+          cache ("zs_cache": calls = lookups, hits = cached texts) and the API tiers ("serving").
+
+instrument_lfs / instrument_patterns / instrument_engine wrap the snorkel LFs of lfs_text.LFS,
+the compiled patterns of a module's RX tables and the single-pass RulesEngine of
+lfs/keyword_lfs; nothing is wrapped unless profiling is on. Disabled, stage() returns a
+shared no-op context manager and record() returns at its first line.
+
+Peak RSS per stage is VmHWM after resetting it at the stage start (/proc/self/clear_refs);
+where that is not available it falls back to the process peak so far (ru_maxrss).
+Workers in other processes hand their records back with drain(); the parent merge()s them
+under its current stage. report() adds the derived rates (mean_us, hit_rate, items_per_s)
+and write_report() writes it as JSON (run_label_model.py --profile -> <outdir>/profile_report.json,
+GET /metrics in the API).
+"""
+import json, os, resource, sys, threading, time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterable, Optional
+
+ENV = "WS_PROFILE"
+_NULL = nullcontext()
+
+
+def _status_mb(key: str) -> Optional[float]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(key):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak() -> bool:
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_mb() -> float:
+    peak = _status_mb("VmHWM:")
+    if peak is None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return peak
+
+
+def _children_cpu() -> float:
+    r = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return r.ru_utime + r.ru_stime
+
+
+class Profiler:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stages: Dict[str, Dict] = {}
+            self.counters: Dict[str, Dict[str, Dict]] = {}
+            self.peak_mb = 0.0  # process peak: VmHWM itself is reset by every stage
+            self.t0, self.cpu0 = time.perf_counter(), time.process_time()
+
+    def _stack(self):
+        st = getattr(self._local, "stack", None)
+        if st is None:
+            st = self._local.stack = []
+        return st
+
+    def current(self) -> str:
+        """Name of the innermost open stage of this thread ('' outside any)."""
+        st = self._stack()
+        return st[-1]["name"] if st else ""
+
+    def stage(self, name: str):
+        return self._stage(name) if self.enabled else _NULL
+
+    @contextmanager
+    def _stage(self, name: str):
+        st = self._stack()
+        if st:
+            name = f"{st[-1]['name']}/{name}"
+            st[-1]["peak"] = max(st[-1]["peak"], _peak_mb())  # the reset below drops the outer peak
+        self.peak_mb = max(self.peak_mb, _peak_mb())
+        frame = {"name": name, "peak": 0.0}
+        st.append(frame)
+        _reset_peak()
+        rss0 = _status_mb("VmRSS:") or 0.0
+        t0, cpu0, child0 = time.perf_counter(), time.process_time(), _children_cpu()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - t0, time.process_time() - cpu0
+            child = _children_cpu() - child0
+            peak = max(frame["peak"], _peak_mb())
+            rss1 = _status_mb("VmRSS:") or 0.0
+            st.pop()
+            if st:
+                st[-1]["peak"] = max(st[-1]["peak"], peak)
+            self._add_stage(name, {"calls": 1, "wall_s": wall, "cpu_s": cpu, "children_cpu_s": child,
+                                   "peak_rss_mb": peak, "rss_delta_mb": rss1 - rss0})
+
+    def _add_stage(self, name: str, r: Dict):
+        with self._lock:
+            self.peak_mb = max(self.peak_mb, r["peak_rss_mb"])
+            s = self.stages.get(name)
+            if s is None:
+                self.stages[name] = dict(r)
+                return
+            for k in ("calls", "wall_s", "cpu_s", "children_cpu_s", "rss_delta_mb"):
+                s[k] += r[k]
+            s["peak_rss_mb"] = max(s["peak_rss_mb"], r["peak_rss_mb"])
+
+    def record(self, group: str, name: str, calls: int = 1, hits: int = 0, seconds: float = 0.0, items: int = 0):
+        if not self.enabled:
+            return
+        with self._lock:
+            c = self.counters.setdefault(group, {}).get(name)
+            if c is None:
+                c = self.counters[group][name] = {"calls": 0, "hits": 0, "seconds": 0.0, "items": 0}
+            c["calls"] += calls
+            c["hits"] += hits
+            c["seconds"] += seconds
+            c["items"] += items
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {"stages": {k: dict(v) for k, v in self.stages.items()},
+                    "counters": {g: {k: dict(v) for k, v in c.items()} for g, c in self.counters.items()}}
+
+    def drain(self) -> Dict:
+        """Snapshot + reset: the records since the last drain (to ship them to another process)."""
+        snap = self.snapshot()
+        self.reset()
+        return snap
+
+    def merge(self, snap: Dict, prefix: Optional[str] = None):
+        """Add another process' snapshot; its stages go under `prefix` (default: the current stage)."""
+        prefix = self.current() if prefix is None else prefix
+        for name, s in snap["stages"].items():
+            self._add_stage(f"{prefix}/{name}" if prefix else name, s)
+        for group, c in snap["counters"].items():
+            for name, v in c.items():
+                self.record(group, name, **v)
+
+    def report(self) -> Dict:
+        snap = self.snapshot()
+        for c in snap["counters"].values():
+            for v in c.values():
+                v["mean_us"] = 1e6 * v["seconds"] / v["calls"] if v["calls"] else 0.0
+                v["hit_rate"] = v["hits"] / v["calls"] if v["calls"] else 0.0
+                if v["items"]:
+                    v["items_per_s"] = v["items"] / v["seconds"] if v["seconds"] else 0.0
+        return {"enabled": self.enabled, "pid": os.getpid(), "wall_s": time.perf_counter() - self.t0,
+                "cpu_s": time.process_time() - self.cpu0, "peak_rss_mb": max(self.peak_mb, _peak_mb()), **snap}
+
+
+PROFILER = Profiler(os.environ.get(ENV, "") not in ("", "0"))
+
+
+def enabled() -> bool:
+    return PROFILER.enabled
+
+
+def enable(on: bool = True):
+    """Turn profiling on / off for this process and (through WS_PROFILE) the processes it spawns."""
+    PROFILER.enabled = on
+    os.environ[ENV] = "1" if on else "0"
+
+
+def stage(name: str):
+    return PROFILER.stage(name)
+
+
+def record(group: str, name: str, calls: int = 1, hits: int = 0, seconds: float = 0.0, items: int = 0):
+    PROFILER.record(group, name, calls, hits, seconds, items)
+
+
+def drain() -> Dict:
+    return PROFILER.drain()
+
+
+def merge(snap: Dict, prefix: Optional[str] = None):
+    PROFILER.merge(snap, prefix)
+
+
+def instrument_lfs(lfs: Iterable, abstain: int = -1):
+    """Count calls / non-abstain votes / time of every snorkel LabelingFunction (group "lf")."""
+    if not PROFILER.enabled:
+        return
+    for lf in lfs:
+        f = lf._f
+        if getattr(f, "_profiled", False):
+            continue
+
+        def timed(x, _f=f, _name=lf.name, **kw):
+            t0 = time.perf_counter()
+            out = _f(x, **kw)
+            PROFILER.record("lf", _name, hits=int(out != abstain), seconds=time.perf_counter() - t0)
+            return out
+        timed._profiled = True
+        lf._f = timed
+
+
+class _TimedPattern:
+    """A compiled regex that counts its calls, matches and time (group "regex")."""
+    _profiled = True
+
+    def __init__(self, rx, name: str):
+        self._rx, self._name = rx, name
+
+    def _timed(self, method, *args, **kw):
+        t0 = time.perf_counter()
+        out = getattr(self._rx, method)(*args, **kw)
+        PROFILER.record("regex", self._name, hits=int(bool(out)), seconds=time.perf_counter() - t0)
+        return out
+
+    def search(self, *a, **kw):
+        return self._timed("search", *a, **kw)
+
+    def match(self, *a, **kw):
+        return self._timed("match", *a, **kw)
+
+    def fullmatch(self, *a, **kw):
+        return self._timed("fullmatch", *a, **kw)
+
+    def findall(self, *a, **kw):
+        return self._timed("findall", *a, **kw)
+
+    def __getattr__(self, attr):
+        return getattr(self._rx, attr)
+
+
+def instrument_patterns(module, prefix: Optional[str] = None):
+    """Wrap the module's RX tables: the patterns of every RX* dict and every RX_* pattern."""
+    if not PROFILER.enabled:
+        return
+    prefix = prefix or module.__name__.rsplit(".", 1)[-1]
+    for attr in [a for a in vars(module) if a.startswith("RX")]:
+        val = getattr(module, attr)
+        if isinstance(val, dict):
+            for k, rx in val.items():
+                if hasattr(rx, "search") and not getattr(rx, "_profiled", False):
+                    val[k] = _TimedPattern(rx, f"{prefix}.{attr}[{k}]")
+        elif hasattr(val, "search") and not getattr(val, "_profiled", False):
+            setattr(module, attr, _TimedPattern(val, f"{prefix}.{attr}"))
+
+
+def instrument_engine(engine, name: str):
+    """Count the scans of a RulesEngine (time + any-hit under `name`) and the hits per pattern
+    (`name[pattern]`). The patterns share one pass, so only the scan as a whole is timed."""
+    if not PROFILER.enabled or getattr(engine.scan, "_profiled", False):
+        return
+    scan, names = engine.scan, list(engine.names)
+
+    def timed(text):
+        t0 = time.perf_counter()
+        mask = scan(text)
+        PROFILER.record("regex", name, hits=int(mask != 0), seconds=time.perf_counter() - t0)
+        for i, n in enumerate(names):
+            PROFILER.record("regex", f"{name}[{n}]", hits=mask >> i & 1)
+        return mask
+    timed._profiled = True
+    engine.scan = timed
+
+
+def report() -> Dict:
+    return PROFILER.report()
+
+
+def write_report(path: str, **meta) -> Dict:
+    rep = {"meta": meta, **report()}
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(rep, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+    return rep
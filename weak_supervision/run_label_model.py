@@ -1,52 +1,310 @@
 # run_label_model.py
-import os, pandas as pd, numpy as np
-from snorkel.labeling import PandasLFApplier
-from snorkel.labeling.model import LabelModel
+import argparse, hashlib, os, shutil, sys, pandas as pd, numpy as np
+import profiling
 from snorkel_setup import ABSTAIN, LABELS, L2I, I2L
-from lfs_text import LFS
-from llm_labeler_hf import hf_zero_shot_votes
-
-UNLAB = "data/unlabeled_pool.csv"
-OUTDIR = "outputs_ws"
-os.makedirs(OUTDIR, exist_ok=True)
-
-# 4.1) Load data
-df = pd.read_csv(UNLAB)
-df = df.dropna(subset=["text"]).reset_index(drop=True)
-
-# 4.2) Apply LFs
-applier = PandasLFApplier(LFS)
-L = applier.apply(df=df)   # shape: [N, num_LFs], values in {ABSTAIN, 0..K-1}
-
-# 4.3) Add LLM-labeler votes for ~20%
-votes = hf_zero_shot_votes(df["text"].tolist(), max_n=int(0.2*len(df)))
-# convert to a column vector
-import numpy as np
-LLM_col = np.array([votes.get(i, ABSTAIN) for i in range(len(df))]).reshape(-1,1)
-# stack: [LFs ... , LLM]
-L_all = np.hstack([L, LLM_col])
-
-# 4.4) Train LabelModel
-label_model = LabelModel(cardinality=len(LABELS), verbose=True)
-label_model.fit(L_all, n_epochs=500, log_freq=50, seed=42, lr=1e-2)
-
-# 4.5) Get probabilistic labels & hard labels
-Y_prob = label_model.predict_proba(L_all)         # [N, K], each row sums to 1
-Y_hat  = Y_prob.argmax(axis=1)                    # hard labels (argmax)
-conf   = Y_prob.max(axis=1)                       # confidence
-
-out = df.copy()
-out["ws_label_id"] = Y_hat
-out["ws_label"]    = [I2L[i] for i in Y_hat]
-out["ws_conf"]     = conf.round(4)
-out.to_csv(f"{OUTDIR}/weak_labels_all.csv", index=False, encoding="utf-8")
-
-# 4.6) Chọn subset tin cậy để train baseline discriminative model
-MASK = conf >= 0.75
-subset = out[MASK][["text","ws_label"]].rename(columns={"ws_label":"label"})
-subset.to_csv(f"{OUTDIR}/weak_train_0p75.csv", index=False, encoding="utf-8")
-
-# 4.7) Kiểm tra phân phối lớp
-dist = subset["label"].value_counts().reindex(LABELS, fill_value=0)
-print("Class distribution (weak_train, >=0.75):\n", dist)
-dist.to_csv(f"{OUTDIR}/class_dist_weak_train.csv")
+from sharded_labeling import label_pool_sharded, lf_source_hash
+from llm_labeler_hf import DEFAULT_MODELS, zero_shot_voter
+from llm_selection import STRATEGIES, budgeted_llm_column
+from label_store import LabelStore, row_hash
+from sparse_label_matrix import lf_summary
+from np_label_model import DawidSkene, WeightedMajorityVote
+from table_io import (FORMATS, label_matrix_frame, label_probs_frame, read_table, table_parts, table_path, text_hash,
+                      write_table)
+
+CONF_THRESHOLD = 0.75
+
+def embed_temperature(args):
+    """--llm_labeler embed: softmax temperature fitted on --gold (and stored with the label
+    embeddings), else the stored one; None for the other labelers."""
+    if args.llm_labeler != "embed":
+        return None
+    from embed_labeler import EmbeddingLabeler
+    labeler = EmbeddingLabeler(LABELS, model=args.llm_model or DEFAULT_MODELS["embed"])
+    if args.gold:
+        gold = read_table(args.gold, columns=["text", "label"]).dropna()
+        gold = gold[gold["label"].isin(LABELS)]
+        if len(gold):
+            T = labeler.calibrate(gold["text"].astype(str).tolist(), gold["label"].tolist())
+            print(f"[embed] temperature calibrated on {len(gold)} gold rows: {T:.4g}")
+            return T
+    if not labeler.calibrated:
+        print(f"[embed] no calibrated temperature (pass --gold): scores are uncalibrated, T={labeler.temperature:g}")
+    return labeler.temperature
+
+def build_label_matrix(texts, shard_dir, args):
+    """SparseLabelMatrix [N, num_LFs (+ LLM)], values in {ABSTAIN, 0..K-1}."""
+    temperature = embed_temperature(args)
+    if args.llm_select == "random" or args.llm_labeler == "none":
+        return label_pool_sharded(
+            texts, shard_dir,
+            llm_labeler=args.llm_labeler, model=args.llm_model, backend=args.zs_backend, llm_frac=args.llm_frac,
+            shard_size=args.shard_size, workers=args.workers, threads_per_worker=args.threads_per_worker,
+            temperature=temperature, zs_threads=args.zs_threads,
+        )
+    # LFs shard by shard first, then the LLM budget goes to the rows the LFs can't settle
+    L_lf = label_pool_sharded(
+        texts, shard_dir + "_lf", llm_labeler="none",
+        shard_size=args.shard_size, workers=args.workers, threads_per_worker=args.threads_per_worker,
+    )
+    vote_fn = zero_shot_voter(texts, args.llm_labeler, model=args.llm_model, backend=args.zs_backend,
+                              temperature=temperature, zs_threads=args.zs_threads)
+    llm_col, log = budgeted_llm_column(L_lf, int(args.llm_frac * len(texts)), vote_fn,
+                                       strategy=args.llm_select, rounds=args.llm_rounds)
+    for r in log:
+        print(f"[llm round {r['round']}] {r['calls']} calls ({r['all_abstain']} all-abstain, "
+              f"{r['conflict']} conflicting), {r['votes']} non-abstain votes")
+    return L_lf.with_column(llm_col, "llm")
+
+def with_predictions(df, label_ids, conf):
+    out = df.copy()
+    out["text_hash"]   = [text_hash(t) for t in out["text"]]
+    out["ws_label_id"] = label_ids
+    out["ws_label"]    = [I2L[i] for i in label_ids]
+    out["ws_conf"]     = np.round(conf, 4)
+    return out
+
+def write_weak_labels(out, OUTDIR, fmt, append=False, part=None):
+    """weak_labels_all + weak_train_0p75 tables (--format); append=True adds `out` to the existing ones,
+    part=i replaces their part i (see table_io.write_table)."""
+    write_table(out, table_path(OUTDIR, "weak_labels_all", fmt), append=append, part=part)
+    subset = out[out["ws_conf"] >= CONF_THRESHOLD][["text","ws_label"]].rename(columns={"ws_label":"label"})
+    write_table(subset, table_path(OUTDIR, "weak_train_0p75", fmt), append=append, part=part)
+
+def write_label_matrix(L, hashes, OUTDIR, fmt, append=False, part=None):
+    """label_matrix table: text_hash + int8 votes per LF (and the LLM column), rows aligned with weak_labels_all."""
+    write_table(label_matrix_frame(L, hashes), table_path(OUTDIR, "label_matrix", fmt), append=append, part=part)
+
+def write_label_probs(Y_prob, hashes, OUTDIR, fmt, append=False, part=None):
+    """label_probs table: text_hash + the label model's p_<label> columns, rows aligned with weak_labels_all."""
+    write_table(label_probs_frame(Y_prob, hashes, LABELS), table_path(OUTDIR, "label_probs", fmt),
+                append=append, part=part)
+
+OUTPUT_TABLES = ("weak_labels_all", "weak_train_0p75", "label_matrix", "label_probs")
+
+def write_class_dist(labels, OUTDIR):
+    dist = pd.Series(labels, name="label").value_counts().reindex(LABELS, fill_value=0)
+    print("Class distribution (weak_train, >=0.75):\n", dist)
+    dist.to_csv(f"{OUTDIR}/class_dist_weak_train.csv")
+
+def gold_vector(df, path):
+    """Gold label id per row of df (matched by text), ABSTAIN where unknown; None without a gold file."""
+    if not path:
+        return None
+    gold = read_table(path, columns=["text", "label"])
+    gold_map = dict(zip(gold["text"], gold["label"]))
+    return np.array([L2I.get(gold_map.get(t), ABSTAIN) for t in df["text"]])
+
+def write_lf_summary(L, df, args):
+    """Coverage / overlaps / conflicts (+ accuracy on --gold rows) per LF -> <outdir>/lf_summary.csv."""
+    if not args.lf_summary:
+        return
+    summary = lf_summary(L, gold_vector(df, args.gold), cardinality=len(LABELS))
+    print(summary)
+    summary.to_csv(f"{args.outdir}/lf_summary.csv")
+
+def fit_label_model(L, df, args, mu_start=None):
+    """Fit --label_model on the SparseLabelMatrix L; returns (model, Y_prob [N, K])."""
+    if args.label_model == "dawid_skene":
+        lm = DawidSkene(cardinality=len(LABELS), verbose=True)
+        with profiling.stage("label_model.fit"):
+            lm.fit(L, seed=42, chunk_size=args.chunk_size or None)
+        with profiling.stage("label_model.predict"):
+            return lm, lm.predict_proba(L, chunk_size=args.chunk_size or None)
+    if args.label_model == "wmv":
+        with profiling.stage("label_model.fit"):
+            lm = WeightedMajorityVote(cardinality=len(LABELS), verbose=True).fit(L, gold_vector(df, args.gold))
+        with profiling.stage("label_model.predict"):
+            return lm, lm.predict_proba(L)
+    # snorkel; mu_start = previous parameters for a short warm-started fine-tune
+    with profiling.stage("label_model.fit"):
+        from label_store import WarmStartLabelModel
+        L_all = L.to_dense()
+        lm = WarmStartLabelModel(cardinality=len(LABELS), mu_start=mu_start, verbose=True)
+        lm.fit(L_all, n_epochs=args.warm_epochs if mu_start is not None else 500, log_freq=50, seed=42, lr=1e-2)
+    with profiling.stage("label_model.predict"):
+        return lm, lm.predict_proba(L_all)
+
+def run_full(df, args):
+    OUTDIR = args.outdir
+    # 4.2 + 4.3) Apply LFs and add LLM-labeler votes for ~20%, shard by shard (resumable)
+    with profiling.stage("label_matrix"):
+        L_sparse = build_label_matrix(df["text"].tolist(), args.shard_dir or os.path.join(OUTDIR, "shards"), args)
+    with profiling.stage("lf_summary"):
+        write_lf_summary(L_sparse, df, args)
+
+    # 4.4) Train LabelModel
+    label_model, Y_prob = fit_label_model(L_sparse, df, args)   # Y_prob: [N, K], each row sums to 1
+
+    # 4.5) Get probabilistic labels & hard labels
+    Y_hat  = Y_prob.argmax(axis=1)                    # hard labels (argmax)
+    conf   = Y_prob.max(axis=1)                       # confidence
+
+    # 4.6) Chọn subset tin cậy để train baseline discriminative model
+    with profiling.stage("write_outputs"):
+        out = with_predictions(df, Y_hat, conf)
+        write_weak_labels(out, OUTDIR, args.format)
+        write_label_matrix(L_sparse, out["text_hash"], OUTDIR, args.format)
+        write_label_probs(Y_prob, out["text_hash"], OUTDIR, args.format)
+
+    # 4.7) Kiểm tra phân phối lớp
+    write_class_dist(out.loc[out["ws_conf"] >= CONF_THRESHOLD, "ws_label"], OUTDIR)
+
+def run_incremental(df, args):
+    """Label only texts not in <outdir>/label_store yet, warm-start the LabelModel, patch the outputs."""
+    OUTDIR = args.outdir
+    meta = {"lf_sha1": lf_source_hash(), "llm_labeler": args.llm_labeler, "llm_model": args.llm_model,
+            "zs_backend": args.zs_backend, "llm_frac": args.llm_frac, "llm_select": args.llm_select}
+    store = LabelStore(os.path.join(OUTDIR, "label_store"), meta)
+
+    hashes = [row_hash(t) for t in df["text"]]
+    pos = {}
+    for i, h in enumerate(hashes):
+        pos.setdefault(h, i)
+    if any(h not in pos for h in store.hashes):
+        raise RuntimeError("rows in the label store are missing from the pool; run without --incremental to rebuild")
+    known = store.index()
+    new_rows = [i for h, i in pos.items() if h not in known]
+    print(f"[incremental] {len(store)} rows in store, {len(new_rows)} new")
+    weak_path = table_path(OUTDIR, "weak_labels_all", args.format)
+    if not new_rows and store.load_pred()[0] is not None and os.path.exists(weak_path):
+        print("[incremental] outputs are up to date")
+        return
+
+    # 4.2 + 4.3) LFs + LLM votes for the new rows only, appended as one segment
+    if new_rows:
+        new_hashes = [hashes[i] for i in new_rows]
+        delta = hashlib.sha1("".join(new_hashes).encode()).hexdigest()[:12]
+        shard_dir = os.path.join(store.root, f"delta_{delta}")
+        with profiling.stage("label_matrix"):
+            L_new = build_label_matrix(df["text"].iloc[new_rows].tolist(), shard_dir, args)
+        store.append(new_hashes, L_new)
+        shutil.rmtree(shard_dir, ignore_errors=True)
+        shutil.rmtree(shard_dir + "_lf", ignore_errors=True)
+    if not len(store):
+        print("[incremental] empty pool, nothing to do")
+        return
+    store_df = df.iloc[[pos[h] for h in store.hashes]]
+    with profiling.stage("lf_summary"):
+        write_lf_summary(store.L, store_df, args)
+
+    # 4.4) LabelModel; snorkel is warm-started: short fine-tune from the previous parameters
+    snorkel = args.label_model == "snorkel"
+    label_model, Y_prob = fit_label_model(store.L, store_df, args, mu_start=store.load_mu() if snorkel else None)
+    if snorkel:
+        store.save_mu(label_model.get_mu())
+
+    # 4.5) Predictions; rows already in the outputs only count as changed past the tolerance
+    Y_hat, conf = Y_prob.argmax(axis=1), Y_prob.max(axis=1)
+    prev_hat, prev_conf = store.load_pred()
+    n_old = 0 if prev_hat is None else len(prev_hat)
+    if not os.path.exists(weak_path):
+        n_old = 0  # outputs were removed: rewrite everything
+    n_changed, changed = 0, None
+    if n_old:
+        changed = (Y_hat[:n_old] != prev_hat) | (np.abs(conf[:n_old] - prev_conf) > args.conf_tol)
+        Y_hat[:n_old] = np.where(changed, Y_hat[:n_old], prev_hat)
+        conf[:n_old] = np.where(changed, conf[:n_old], prev_conf)
+        n_changed = int(changed.sum())
+    store.save_pred(Y_hat, conf)
+    rows = [pos[h] for h in store.hashes]
+
+    # 4.6) One output part per store segment: new segments are appended as parts, a segment with
+    # changed rows has its parts replaced (its votes never change, so label_matrix is kept).
+    # A csv table is one file: a change there still rewrites it.
+    bounds = store.segments()
+    written = sum(hi <= n_old for _, hi in bounds)  # segments already in the outputs
+    ends = np.array([hi for _, hi in bounds])
+    redo = np.unique(np.searchsorted(ends, np.flatnonzero(changed), side="right")).tolist() if n_changed else []
+    paths = [table_path(OUTDIR, t, args.format) for t in OUTPUT_TABLES]
+    if args.format == "csv":
+        patch = written > 0 and not redo
+    else:
+        patch = written > 0 and all(table_parts(p) == written for p in paths)
+
+    def write_segment(s, **mode):
+        lo, hi = bounds[s]
+        write_weak_labels(with_predictions(df.iloc[rows[lo:hi]], Y_hat[lo:hi], conf[lo:hi]), OUTDIR, args.format,
+                          **mode)
+        if "part" not in mode:
+            write_label_matrix(store.L.rows(np.arange(lo, hi)), store.hashes[lo:hi], OUTDIR, args.format, **mode)
+        write_label_probs(Y_prob[lo:hi], store.hashes[lo:hi], OUTDIR, args.format, **mode)
+
+    with profiling.stage("write_outputs"):
+        if patch:
+            print(f"[incremental] {n_changed} existing rows changed: {len(redo)} of {written} parts replaced, "
+                  f"{len(store) - n_old} new rows appended")
+            for s in redo:
+                write_segment(s, part=s)
+            for s in range(written, len(bounds)):
+                write_segment(s, append=True)
+        else:
+            print(f"[incremental] {n_changed} existing rows changed; rewriting the outputs" if n_old else
+                  "[incremental] writing the outputs")
+            for s in range(len(bounds)):
+                write_segment(s, append=s > 0)
+
+    # 4.7) Kiểm tra phân phối lớp
+    keep = np.round(conf, 4) >= CONF_THRESHOLD
+    write_class_dist([I2L[i] for i in Y_hat[keep]], OUTDIR)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--unlab", default="data/processed/unlabeled_pool.csv")
+    ap.add_argument("--outdir", default="outputs_ws")
+    # LLM-labeler column: "nli" (cross-encoder, 1 pass per text x label), "embed" (bi-encoder, 1 pass per text) or "none"
+    ap.add_argument("--llm_labeler", default="nli", choices=["nli", "embed", "none"])
+    ap.add_argument("--llm_model", default=None, help="override the labeler's default model")
+    ap.add_argument("--zs_backend", default="torch", choices=["torch", "onnx"], help="NLI backend (onnx = int8 ONNX Runtime)")
+    ap.add_argument("--zs_threads", default=os.environ.get("WS_ZS_THREADS", ""),
+                    help="NLI threads INTRA[:INTER] (default: WS_ZS_THREADS, else --threads_per_worker)")
+    ap.add_argument("--llm_frac", type=float, default=0.2, help="LLM budget, as a fraction of the pool")
+    # random = seeded shuffle; uncertainty = all-abstain / conflicting / low-confidence rows first (see llm_selection.py)
+    ap.add_argument("--llm_select", default="random", choices=list(STRATEGIES))
+    ap.add_argument("--llm_rounds", type=int, default=1, help="uncertainty: refit + re-rank between this many budget slices")
+    ap.add_argument("--shard_size", type=int, default=5000)
+    ap.add_argument("--workers", type=int, default=1, help="labeling processes (one model instance each)")
+    ap.add_argument("--threads_per_worker", type=int, default=0, help="0 = cpu_count // workers")
+    ap.add_argument("--shard_dir", default="", help="where finished shards are kept (default: <outdir>/shards)")
+    # incremental: label only new texts (kept in <outdir>/label_store), warm-start the LabelModel
+    ap.add_argument("--incremental", action="store_true")
+    ap.add_argument("--warm_epochs", type=int, default=100, help="incremental: LabelModel fine-tune epochs")
+    ap.add_argument("--conf_tol", type=float, default=0.02, help="incremental: conf change that counts as a changed row")
+    # snorkel = torch LabelModel; dawid_skene / wmv = NumPy models (np_label_model.py), wmv weights come from --gold
+    ap.add_argument("--label_model", default="snorkel", choices=["snorkel", "dawid_skene", "wmv"])
+    ap.add_argument("--chunk_size", type=int, default=0, help="dawid_skene: rows per E-step block (0 = all)")
+    ap.add_argument("--lf_summary", action="store_true", help="write per-LF coverage/overlap/conflict stats")
+    ap.add_argument("--gold", default="", help="gold table (text,label): lf_summary accuracy, wmv weights, "
+                                               "embed labeler temperature")
+    # output tables: weak_labels_all / weak_train_0p75 / label_matrix (see table_io.py); csv = the old plain files
+    ap.add_argument("--format", default="parquet", choices=list(FORMATS))
+    # wall / CPU / peak RSS per stage, per-LF and per-regex counts + time, zero-shot texts/s
+    ap.add_argument("--profile", action="store_true", help="write <outdir>/profile_report.json (same as WS_PROFILE=1)")
+    args = ap.parse_args()
+    if args.profile:
+        profiling.enable()
+
+    os.makedirs(args.outdir, exist_ok=True)
+
+    # 4.1) Load data
+    with profiling.stage("load"):
+        df = read_table(args.unlab)
+        df = df.dropna(subset=["text"])
+        n = len(df)
+        # one row per text in both modes: the incremental label store is keyed by text hash
+        df = df.drop_duplicates("text").reset_index(drop=True)
+        if len(df) < n:
+            print(f"[load] {n - len(df)} duplicate texts dropped")
+
+    if args.incremental:
+        run_incremental(df, args)
+    else:
+        run_full(df, args)
+
+    if profiling.enabled():
+        path = os.path.join(args.outdir, "profile_report.json")
+        profiling.write_report(path, argv=sys.argv[1:], rows=len(df), label_model=args.label_model,
+                               llm_labeler=args.llm_labeler, workers=args.workers)
+        print("[profile] report ->", path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# sharded_labeling.py
+"""
+Sharded, resumable construction of the label matrix L_all = [LFs ..., LLM].
+
+The pool is split into fixed-size shards. A worker process labels one shard at a time
+(LF application + LLM-labeler votes for the shard's selected rows) and its slice of
+L_all is written to <shard_dir>/L_<shard>.npz (SparseLabelMatrix) as soon as it completes. A
+manifest pins the pool fingerprint, the LF source and the labeling config; on restart,
+shards already on disk are skipped and all slices are concatenated back into L_all.
+
+The rows that get an LLM vote are chosen globally with the same seeded shuffle as
+hf_zero_shot_votes, so the reassembled L_all matches a single-process run.
+Each worker holds one model instance (created lazily on its first shard) and pins
+torch / ONNX Runtime / OpenMP to `threads_per_worker` threads.
+"""
+import hashlib, json, os, time
+from multiprocessing import get_context
+import numpy as np
+import pandas as pd
+from snorkel_setup import ABSTAIN, LABELS
+from llm_labeler_hf import select_rows, scores_to_votes, DEFAULT_MODELS, DEFAULT_THRESHOLDS
+from zs_cache import DEFAULT_CACHE_PATH
+from sparse_label_matrix import SparseLabelMatrix
+import profiling
+
+_WORKER = {}
+
+
+def _init_worker(cfg):
+    threads = cfg["threads"]
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    from snorkel.labeling import PandasLFApplier
+    from multiprocessing import parent_process
+    import lfs_text
+    from lfs_text import LFS
+
+    profiling.instrument_lfs(LFS, ABSTAIN)
+    profiling.instrument_patterns(lfs_text)
+    _WORKER["cfg"] = cfg
+    _WORKER["remote_profile"] = profiling.enabled() and parent_process() is not None
+    _WORKER["applier"] = PandasLFApplier(LFS)
+    _WORKER["names"] = [lf.name for lf in LFS]
+    _WORKER["model"] = None
+    if cfg["llm_labeler"] == "none":
+        return
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    if cfg["llm_labeler"] == "nli":
+        from zero_shot import ZeroShotEngine, parse_threads
+        from zs_cache import ScoreCache
+        cache = ScoreCache(cfg["cache_path"]) if cfg["cache_path"] else None
+        intra, inter = parse_threads(cfg["zs_threads"])  # default: this worker's share of the cores
+        _WORKER["model"] = ZeroShotEngine(cfg["model"], batch_size=cfg["batch_size"], cache=cache,
+                                          backend=cfg["backend"], intra_op_threads=intra or threads,
+                                          inter_op_threads=inter)
+    else:
+        from embed_labeler import EmbeddingLabeler
+        _WORKER["model"] = EmbeddingLabeler(LABELS, model=cfg["model"], batch_size=cfg["batch_size"],
+                                            temperature=cfg["temperature"])
+
+
+def _label_shard(task):
+    shard, texts, llm_rows, out_path = task
+    cfg, t0 = _WORKER["cfg"], time.time()
+    with profiling.stage("lfs"):
+        L = _WORKER["applier"].apply(df=pd.DataFrame({"text": texts}), progress_bar=False)
+        L = SparseLabelMatrix.from_dense(L, _WORKER["names"])
+    if cfg["llm_labeler"] != "none":
+        col = np.full(len(texts), ABSTAIN, dtype=np.int64)
+        if len(llm_rows):
+            sel = [str(texts[i]) for i in llm_rows]
+            model = _WORKER["model"]
+            with profiling.stage("llm"):
+                S = model.scores(sel, LABELS) if cfg["llm_labeler"] == "nli" else model.scores(sel)
+            col[llm_rows] = scores_to_votes(S, LABELS, cfg["top1_threshold"])
+        L = L.with_column(col, "llm")
+    tmp = out_path[:-len(".npz")] + ".tmp.npz"
+    L.save(tmp)
+    os.replace(tmp, out_path)  # atomic: a shard file on disk is always complete
+    # a spawned worker ships its profile records back with the result (drain() resets them)
+    prof = profiling.drain() if _WORKER["remote_profile"] else None
+    return shard, len(texts), len(llm_rows), time.time() - t0, prof
+
+
+def _fingerprint(texts) -> str:
+    h = hashlib.sha1()
+    for t in texts:
+        h.update(str(t).encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+def lf_source_hash() -> str:
+    import lfs_text
+    with open(lfs_text.__file__, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def label_pool_sharded(texts, shard_dir, llm_labeler="nli", model=None, backend="torch", llm_frac=0.2,
+                       seed=42, top1_threshold=None, shard_size=5000, workers=1, threads_per_worker=0,
+                       batch_size=64, cache_path=DEFAULT_CACHE_PATH, temperature=None, zs_threads=""):
+    """Build (or resume) L_all for `texts`; returns a SparseLabelMatrix [N, num_LFs (+1 LLM column)]."""
+    if llm_labeler not in ("nli", "embed", "none"):
+        raise ValueError(f"Unknown llm_labeler: {llm_labeler}")
+    texts = list(texts)
+    n = len(texts)
+    workers = max(1, workers)
+    cfg = {
+        "llm_labeler": llm_labeler,
+        "model": model or DEFAULT_MODELS.get(llm_labeler),
+        "backend": backend,
+        "top1_threshold": top1_threshold if top1_threshold is not None else DEFAULT_THRESHOLDS.get(llm_labeler),
+        "batch_size": batch_size,
+        "cache_path": cache_path,
+        "threads": threads_per_worker or max(1, (os.cpu_count() or 1) // workers),
+        "temperature": temperature,
+        "zs_threads": zs_threads,
+    }
+    manifest = {
+        "n_rows": n, "shard_size": shard_size, "pool_sha1": _fingerprint(texts), "lf_sha1": lf_source_hash(),
+        "labeling": {k: cfg[k] for k in ("llm_labeler", "model", "backend", "top1_threshold")
+                     + (("temperature",) if llm_labeler == "embed" else ())},
+        "llm_frac": llm_frac, "seed": seed,
+    }
+    os.makedirs(shard_dir, exist_ok=True)
+    mpath = os.path.join(shard_dir, "manifest.json")
+    if os.path.exists(mpath):
+        with open(mpath, "r", encoding="utf-8") as f:
+            old = json.load(f)
+        if old != manifest:
+            raise RuntimeError(f"{shard_dir} holds shards of a different pool/config; delete it or use another shard_dir")
+    else:
+        with open(mpath, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    llm_mask = np.zeros(n, dtype=bool)
+    budget = int(llm_frac * n)
+    if llm_labeler != "none" and budget > 0:
+        llm_mask[select_rows(n, budget, seed)] = True
+
+    n_shards = (n + shard_size - 1) // shard_size
+    paths = [os.path.join(shard_dir, f"L_{s:05d}.npz") for s in range(n_shards)]
+    tasks = []
+    for s in range(n_shards):
+        if os.path.exists(paths[s]):
+            continue
+        lo, hi = s * shard_size, min(n, (s + 1) * shard_size)
+        tasks.append((s, texts[lo:hi], np.flatnonzero(llm_mask[lo:hi]), paths[s]))
+    print(f"[shards] {n_shards} total, {n_shards - len(tasks)} already done, {len(tasks)} to run "
+          f"({workers} worker(s) x {cfg['threads']} thread(s))")
+
+    if tasks:
+        done = n_shards - len(tasks)
+        if workers == 1:
+            _init_worker(cfg)
+            results = map(_label_shard, tasks)
+            pool = None
+        else:
+            pool = get_context("spawn").Pool(workers, initializer=_init_worker, initargs=(cfg,))
+            results = pool.imap_unordered(_label_shard, tasks)
+        try:
+            for shard, rows, llm_rows, dt, prof in results:
+                if prof is not None:
+                    profiling.merge(prof)
+                done += 1
+                print(f"  [{done}/{n_shards}] shard {shard}: {rows} rows, {llm_rows} LLM votes, {dt:.1f}s")
+        finally:
+            if pool is not None:  # all results consumed, or a shard failed
+                pool.terminate()
+                pool.join()
+
+    if not paths:
+        from lfs_text import LFS
+        return SparseLabelMatrix.empty(len(LFS) + (llm_labeler != "none"),
+                                       [lf.name for lf in LFS] + ([] if llm_labeler == "none" else ["llm"]))
+    return SparseLabelMatrix.vstack([SparseLabelMatrix.load(p) for p in paths])
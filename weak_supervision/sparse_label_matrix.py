@@ -0,0 +1,182 @@
+# sparse_label_matrix.py
+"""
+Compact label matrix: CSR of the non-abstain votes, int8 labels.
+
+Most captions trigger no keyword LF, so the dense [N, num_LFs] int64 matrix from
+PandasLFApplier is almost all ABSTAIN. SparseLabelMatrix keeps only the votes
+(indptr int64, indices int16, data int8 -> 3 bytes per vote + 8 per row), concatenates
+shards / adds the LLM column without densifying, and saves to a single .npz.
+
+`lf_summary` computes the same statistics as snorkel's LFAnalysis.lf_summary
+(polarity, coverage, overlaps, conflicts, empirical accuracy against gold) with a
+handful of bincounts over the vote arrays, so time and memory grow with the number of
+votes rather than N x num_LFs.
+"""
+from typing import Optional, Sequence
+import numpy as np
+import pandas as pd
+
+from snorkel_setup import ABSTAIN
+
+
+class SparseLabelMatrix:
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray, n_cols: int,
+                 names: Optional[Sequence[str]] = None):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int16)
+        self.data = np.asarray(data, dtype=np.int8)
+        self.n_cols = int(n_cols)
+        self.names = list(names) if names is not None else [f"lf_{j}" for j in range(self.n_cols)]
+        if len(self.names) != self.n_cols:
+            raise ValueError(f"{len(self.names)} names for {self.n_cols} columns")
+
+    # ---- construction / conversion ----
+    @classmethod
+    def from_dense(cls, L: np.ndarray, names: Optional[Sequence[str]] = None) -> "SparseLabelMatrix":
+        L = np.asarray(L)
+        if L.ndim != 2:
+            raise ValueError(f"expected a 2-D label matrix, got shape {L.shape}")
+        rows, cols = np.nonzero(L != ABSTAIN)  # row-major order = CSR order
+        indptr = np.zeros(L.shape[0] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=L.shape[0]), out=indptr[1:])
+        return cls(indptr, cols, L[rows, cols], L.shape[1], names)
+
+    @classmethod
+    def empty(cls, n_cols: int, names: Optional[Sequence[str]] = None) -> "SparseLabelMatrix":
+        return cls(np.zeros(1), np.zeros(0), np.zeros(0), n_cols, names)
+
+    def to_dense(self, dtype=np.int64) -> np.ndarray:
+        L = np.full(self.shape, ABSTAIN, dtype=dtype)
+        L[self.row_ids(), self.indices] = self.data
+        return L
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.indptr) - 1
+
+    @property
+    def shape(self):
+        return (self.n_rows, self.n_cols)
+
+    @property
+    def nnz(self) -> int:
+        return len(self.data)
+
+    def __len__(self):
+        return self.n_rows
+
+    def row_ids(self) -> np.ndarray:
+        """Row index of every stored vote."""
+        return np.repeat(np.arange(self.n_rows), np.diff(self.indptr))
+
+    def column(self, j: int) -> np.ndarray:
+        """Dense column j (ABSTAIN where the LF did not vote)."""
+        col = np.full(self.n_rows, ABSTAIN, dtype=np.int64)
+        m = self.indices == j
+        col[self.row_ids()[m]] = self.data[m]
+        return col
+
+    def with_column(self, col: np.ndarray, name: str) -> "SparseLabelMatrix":
+        """New matrix with a dense vote column (e.g. the LLM labeler) appended as the last column."""
+        col = np.asarray(col)
+        if len(col) != self.n_rows:
+            raise ValueError(f"column has {len(col)} rows, matrix has {self.n_rows}")
+        add = (col != ABSTAIN).astype(np.int64)
+        counts = np.diff(self.indptr) + add
+        indptr = np.zeros(self.n_rows + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        indices = np.empty(indptr[-1], dtype=np.int16)
+        data = np.empty(indptr[-1], dtype=np.int8)
+        # old votes keep their slot order, the new vote goes last in its row
+        old_pos = np.arange(self.nnz) + np.repeat(indptr[:-1] - self.indptr[:-1], np.diff(self.indptr))
+        indices[old_pos], data[old_pos] = self.indices, self.data
+        new_rows = np.flatnonzero(add)
+        indices[indptr[new_rows + 1] - 1] = self.n_cols
+        data[indptr[new_rows + 1] - 1] = col[new_rows]
+        return SparseLabelMatrix(indptr, indices, data, self.n_cols + 1, self.names + [name])
+
+    @staticmethod
+    def vstack(parts: Sequence["SparseLabelMatrix"]) -> "SparseLabelMatrix":
+        if not parts:
+            raise ValueError("nothing to stack")
+        n_cols, names = parts[0].n_cols, parts[0].names
+        if any(p.n_cols != n_cols for p in parts):
+            raise ValueError("all parts must have the same columns")
+        offsets = np.cumsum([0] + [p.nnz for p in parts[:-1]])
+        indptr = np.concatenate([[0]] + [p.indptr[1:] + o for p, o in zip(parts, offsets)])
+        return SparseLabelMatrix(indptr, np.concatenate([p.indices for p in parts]),
+                                 np.concatenate([p.data for p in parts]), n_cols, names)
+
+    def rows(self, idx: np.ndarray) -> "SparseLabelMatrix":
+        """Row subset (fancy index) in the given order."""
+        idx = np.asarray(idx, dtype=np.int64)
+        starts, ends = self.indptr[idx], self.indptr[idx + 1]
+        counts = ends - starts
+        indptr = np.zeros(len(idx) + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        take = np.repeat(starts - indptr[:-1], counts) + np.arange(indptr[-1])
+        return SparseLabelMatrix(indptr, self.indices[take], self.data[take], self.n_cols, self.names)
+
+    # ---- persistence ----
+    def save(self, path: str, **extra):
+        """Write to `path` (.npz); `extra` arrays (e.g. row hashes) are stored alongside."""
+        np.savez(path, indptr=self.indptr, indices=self.indices, data=self.data,
+                 n_cols=np.int64(self.n_cols), names=np.asarray(self.names), **extra)
+
+    @classmethod
+    def load(cls, path: str) -> "SparseLabelMatrix":
+        with np.load(path) as z:
+            return cls(z["indptr"], z["indices"], z["data"], int(z["n_cols"]), z["names"].tolist())
+
+    # ---- per-row structure ----
+    def n_votes(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    def conflict_rows(self) -> np.ndarray:
+        """Bool [N]: at least two different labels among the row's votes."""
+        counts = self.n_votes()
+        out = np.zeros(self.n_rows, dtype=bool)
+        nz = np.flatnonzero(counts)
+        if len(nz):
+            starts = self.indptr[nz]
+            lo = np.minimum.reduceat(self.data, starts)
+            hi = np.maximum.reduceat(self.data, starts)
+            out[nz] = lo != hi
+        return out
+
+
+def lf_summary(L: SparseLabelMatrix, Y: Optional[np.ndarray] = None, cardinality: Optional[int] = None) -> pd.DataFrame:
+    """
+    Per-column statistics, same columns/definitions as snorkel LFAnalysis(L).lf_summary(Y):
+    Polarity, Coverage, Overlaps, Conflicts and, if gold Y is given, Correct / Incorrect /
+    Emp. Acc. over the rows with a gold label (Y = ABSTAIN elsewhere). Unlike snorkel, Emp. Acc.
+    is Correct / (Correct + Incorrect), i.e. votes on rows without gold are not counted as wrong.
+    """
+    n, m = L.shape
+    cols = L.indices.astype(np.int64)
+    row = L.row_ids()
+    denom = max(n, 1)
+    votes = L.n_votes()
+    k = int(cardinality or (int(L.data.max(initial=-1)) + 1))
+
+    coverage = np.bincount(cols, minlength=m) / denom
+    overlaps = np.bincount(cols[votes[row] > 1], minlength=m) / denom
+    conflicts = np.bincount(cols[L.conflict_rows()[row]], minlength=m) / denom
+    seen = np.zeros((m, max(k, 1)), dtype=bool)
+    seen[cols, L.data] = True
+    polarity = [np.flatnonzero(s).tolist() for s in seen]
+
+    df = pd.DataFrame({"j": np.arange(m), "Polarity": polarity, "Coverage": coverage,
+                       "Overlaps": overlaps, "Conflicts": conflicts}, index=L.names)
+    if Y is not None:
+        Y = np.asarray(Y)
+        if len(Y) != n:
+            raise ValueError(f"Y has {len(Y)} rows, L has {n}")
+        has_gold = Y[row] != ABSTAIN
+        ok = L.data == Y[row]
+        correct = np.bincount(cols[has_gold & ok], minlength=m)
+        incorrect = np.bincount(cols[has_gold & ~ok], minlength=m)
+        df["Correct"], df["Incorrect"] = correct, incorrect
+        with np.errstate(invalid="ignore", divide="ignore"):
+            df["Emp. Acc."] = correct / (correct + incorrect)
+    return df
@@ -0,0 +1,210 @@
+# table_io.py
+"""
+Table storage shared by the scripts and run_label_model: pool, label matrix, weak labels, predictions.
+
+The format follows the file extension:
+  .parquet   Parquet (zstd), written as a directory of part files so a refresh can append or
+             replace single parts
+  .arrow     Arrow IPC, uncompressed, same directory layout; read through a memory map
+  .csv       plain CSV (utf-8; lines of hand-edited gold files that are not utf-8 are read as latin1)
+
+Columns are typed on write: text / text_hash as strings, label columns dictionary-encoded,
+*_label_id and LF votes as int8, confidences / probabilities as float32. Reads take a column
+projection and a filter (pyarrow DNF list, e.g. [("ws_conf", ">=", 0.75)], or an Expression)
+that Parquet pushes down to row-group statistics, so an evaluator can load only text, ws_label.
+
+A path whose file does not exist is resolved to a sibling with the same stem and another
+extension, so readers with a *.csv default keep working after the writer moved to Parquet.
+"""
+import glob, hashlib, io, os, shutil
+from typing import Dict, Iterable, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow", "csv": ".csv"}
+_EXT = {".parquet": "parquet", ".pq": "parquet", ".arrow": "arrow", ".feather": "arrow", ".ipc": "arrow", ".csv": "csv"}
+
+LABEL_COLUMNS = ("label", "ws_label", "y_true", "y_pred")
+STRING_COLUMNS = ("text", "text_hash", "rep_text")
+INT8_COLUMNS = ("ws_label_id",)
+FLOAT32_COLUMNS = ("ws_conf",)
+PROB_PREFIX = "p_"  # label_probs columns: p_<label>
+
+
+def text_hash(text) -> str:
+    return hashlib.sha1(str(text).encode("utf-8")).hexdigest()
+
+
+def table_format(path: str) -> str:
+    ext = os.path.splitext(path.rstrip("/"))[1].lower()
+    if ext not in _EXT:
+        raise ValueError(f"{path}: unknown table format (use one of {sorted(_EXT)})")
+    return _EXT[ext]
+
+
+def table_path(outdir: str, stem: str, fmt: str) -> str:
+    return os.path.join(outdir, stem + FORMATS[fmt])
+
+
+def resolve_table(path: str) -> str:
+    """`path` if it exists, else the first existing sibling <stem>.parquet / .arrow / .csv."""
+    if os.path.exists(path):
+        return path
+    stem = os.path.splitext(path.rstrip("/"))[0]
+    for ext in FORMATS.values():
+        if os.path.exists(stem + ext):
+            return stem + ext
+    return path
+
+
+def table_exists(path: str) -> bool:
+    return os.path.exists(resolve_table(path))
+
+
+def to_arrow(df: pd.DataFrame):
+    """pyarrow.Table with the storage types described in the module docstring."""
+    import pyarrow as pa
+    tbl = pa.Table.from_pandas(df, preserve_index=False)
+    fields = []
+    for f in tbl.schema:
+        t = f.type
+        if f.name in LABEL_COLUMNS and (pa.types.is_string(t) or not len(tbl)):
+            t = pa.dictionary(pa.int8(), pa.string())
+        elif f.name in STRING_COLUMNS:  # an empty frame has no string to infer the type from
+            t = pa.string()
+        elif f.name in INT8_COLUMNS:
+            t = pa.int8()
+        elif f.name in FLOAT32_COLUMNS or pa.types.is_floating(t):
+            t = pa.float32()
+        fields.append(pa.field(f.name, t))
+    schema = pa.schema(fields)
+    return tbl.cast(schema) if len(tbl) else schema.empty_table()  # empty columns carry no usable type
+
+
+def _parts(path: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(path, "part-*")))
+
+
+def table_parts(path: str) -> int:
+    """Part files of a parquet / arrow table (1 for a csv or single-file table, 0 if missing)."""
+    if os.path.isdir(path):
+        return len(_parts(path))
+    return int(os.path.exists(path))
+
+
+def write_table(df: pd.DataFrame, path: str, append: bool = False, row_group_size: int = 1 << 16,
+                part: Optional[int] = None):
+    """Write (or, with append=True, add) the rows of df to the table at `path`. part=i (parquet /
+    arrow) replaces part file i only, so a refresh rewrites just the partitions that changed."""
+    fmt = table_format(path)
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    if part is not None and (fmt == "csv" or part >= table_parts(path)):
+        raise ValueError(f"{path}: no part {part} to replace")
+    if fmt == "csv":
+        header = not (append and os.path.exists(path))
+        df.to_csv(path, index=False, encoding="utf-8", mode="a" if append else "w", header=header)
+        return
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    if not append and part is None and os.path.exists(path):
+        shutil.rmtree(path) if os.path.isdir(path) else os.remove(path)
+    os.makedirs(path, exist_ok=True)
+    part = os.path.join(path, f"part-{len(_parts(path)) if part is None else part:05d}{FORMATS[fmt]}")
+    tmp = part + ".tmp"
+    tbl = to_arrow(df)
+    if fmt == "parquet":
+        pq.write_table(tbl, tmp, compression="zstd", row_group_size=row_group_size)
+    else:
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, tbl.schema) as writer:
+            writer.write_table(tbl, max_chunksize=row_group_size)
+    os.replace(tmp, part)
+
+
+def write_rows(path: str, rows: Iterable[Dict], fieldnames: List[str], batch_rows: int = 1 << 16) -> int:
+    """Stream dict rows into a table in batches of `batch_rows` (bounded memory)."""
+    n, batch = 0, []
+    for r in rows:
+        batch.append(r)
+        if len(batch) >= batch_rows:
+            write_table(pd.DataFrame(batch, columns=fieldnames), path, append=n > 0)
+            n += len(batch)
+            batch = []
+    if batch or n == 0:
+        write_table(pd.DataFrame(batch, columns=fieldnames), path, append=n > 0)
+        n += len(batch)
+    return n
+
+
+def _expression(filters):
+    if filters is None:
+        return None
+    import pyarrow.compute as pc
+    if isinstance(filters, pc.Expression):
+        return filters
+    import pyarrow.parquet as pq
+    return pq.filters_to_expression(filters)
+
+
+def _decode(tbl) -> pd.DataFrame:
+    """Dictionary columns come back as plain strings, not pandas categoricals."""
+    import pyarrow as pa
+    schema = pa.schema([pa.field(f.name, f.type.value_type if pa.types.is_dictionary(f.type) else f.type)
+                        for f in tbl.schema])
+    return tbl.cast(schema).to_pandas()
+
+
+def _decode_lines(path: str) -> str:
+    """utf-8 line by line, latin1 only for the lines that are not: a spreadsheet-edited gold
+    file often mixes both, and decoding the whole file as latin1 mangles the Vietnamese texts."""
+    out = []
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                out.append(line.decode("utf-8"))
+            except UnicodeDecodeError:
+                out.append(line.decode("latin1"))
+    return "".join(out)
+
+
+def read_table(path: str, columns: Optional[Sequence[str]] = None, filters=None) -> pd.DataFrame:
+    """DataFrame of `columns` (default: all) from the rows matching `filters` (default: all)."""
+    path = resolve_table(path)
+    fmt = table_format(path)
+    if fmt == "csv":
+        # no pushdown: the filter may need columns outside the projection, so project last
+        usecols = list(columns) if columns is not None and filters is None else None
+        try:
+            df = pd.read_csv(path, usecols=usecols)
+        except UnicodeDecodeError:
+            df = pd.read_csv(io.StringIO(_decode_lines(path)), usecols=usecols)
+        if filters is None:
+            return df
+        import pyarrow as pa
+        df = pa.Table.from_pandas(df, preserve_index=False).filter(_expression(filters)).to_pandas()
+        return df[list(columns)] if columns is not None else df
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+    files = _parts(path) if os.path.isdir(path) else [path]
+    dset = ds.dataset(files, format="parquet" if fmt == "parquet" else "ipc",
+                      filesystem=fs.LocalFileSystem(use_mmap=True))
+    return _decode(dset.to_table(columns=list(columns) if columns is not None else None,
+                                 filter=_expression(filters)))
+
+
+def label_probs_frame(Y_prob: np.ndarray, hashes: Sequence[str], labels: Sequence[str]) -> pd.DataFrame:
+    """Label-model posteriors as a table: text_hash + one float32 column p_<label> per class."""
+    out = pd.DataFrame({"text_hash": list(hashes)})
+    for k, lab in enumerate(labels):
+        out[PROB_PREFIX + lab] = np.asarray(Y_prob[:, k], dtype=np.float32)
+    return out
+
+
+def label_matrix_frame(L, hashes: Sequence[str]) -> pd.DataFrame:
+    """SparseLabelMatrix as a table: text_hash + one int8 column of votes per LF (-1 = abstain)."""
+    dense = L.to_dense()
+    out = pd.DataFrame({"text_hash": list(hashes)})
+    for j, name in enumerate(L.names):
+        out[name] = dense[:, j].astype(np.int8)
+    return out
@@ -0,0 +1,144 @@
+# train_end_model.py
+"""
+Train the end model (end_model.py) on the output of run_label_model.py.
+
+Reads <outdir>/weak_labels_all (text) and <outdir>/label_probs (Y_prob), computes the
+features and fits the soft-label logistic regression:
+  --kind embedding  sentence embeddings through the EmbeddingStore (only texts it has not
+                    seen yet run through the encoder) -> EndModel
+  --kind ngram      hashed char / word n-grams, no encoder at all -> NgramModel (ngram_model.py)
+--sweep fits one model per min_conf on the same features and reports each on the gold set,
+to pick the threshold in seconds. When fewer than --min_rows rows reach --min_conf (a small or
+uncertain pool), the threshold drops to keep the --min_rows most confident rows, with a warning.
+
+Usage:
+  python weak_supervision/train_end_model.py --outdir outputs_ws --save_dir artifacts/end_model \
+    --gold data/processed/gold_label.csv --sweep 0 0.5 0.75 0.9
+  python weak_supervision/train_end_model.py --kind ngram --save_dir artifacts/ngram_model \
+    --gold data/processed/gold_label.csv
+"""
+import argparse, json, os, time
+import numpy as np
+
+from snorkel_setup import LABELS, L2I
+from encoder import DEFAULT_ENCODER
+from embedding_store import DEFAULT_STORE, EmbeddingStore
+from end_model import EndModel
+from ngram_model import HashedNgrams, NgramModel
+from table_io import PROB_PREFIX, read_table, table_exists
+from evaluation import evaluate
+
+def soft_labels(outdir):
+    """(texts, Y_prob [N, K]) of the weak-labeled pool. Without a label_probs table (older
+    outputs) the label model's posterior is approximated from ws_label / ws_conf."""
+    weak = read_table(os.path.join(outdir, "weak_labels_all.parquet"))
+    probs_path = os.path.join(outdir, "label_probs.parquet")
+    K = len(LABELS)
+    if table_exists(probs_path):
+        probs = read_table(probs_path)
+        if not (len(probs) == len(weak) and (probs["text_hash"].to_numpy() == weak["text_hash"].to_numpy()).all()):
+            probs = weak[["text_hash"]].merge(probs.drop_duplicates("text_hash"), on="text_hash", how="left")
+        Y = probs[[PROB_PREFIX + l for l in LABELS]].to_numpy(dtype=np.float32)
+    else:
+        print("    no label_probs table; soft labels from ws_label / ws_conf")
+        conf = weak["ws_conf"].to_numpy(dtype=np.float32)
+        Y = np.repeat(((1 - conf) / (K - 1))[:, None], K, axis=1)
+        Y[np.arange(len(weak)), weak["ws_label"].map(L2I).to_numpy()] = conf
+    ok = ~np.isnan(Y).any(axis=1)
+    return weak["text"].astype(str).to_numpy()[ok], Y[ok]
+
+def fallback_min_conf(Y, min_conf, min_rows):
+    """min_conf, or the confidence of the min_rows-th most confident row when fewer rows reach it
+    (a small or uncertain pool would otherwise leave nothing to train on)."""
+    conf = np.sort(Y.max(axis=1))[::-1] if len(Y) else np.zeros(0)
+    n = int((conf >= min_conf).sum())
+    if n >= min_rows or not len(conf):
+        if not n:
+            raise SystemExit(f"no training rows with confidence >= {min_conf}: lower --min_conf "
+                             f"(pipeline: --set train.min_conf=...) or set --min_rows")
+        return min_conf
+    th = float(conf[min(min_rows, len(conf)) - 1])
+    print(f"[!] only {n} rows have confidence >= {min_conf} (max {conf[0]:.3f}); training on the "
+          f"{int((conf >= th).sum())} most confident (min_conf={th:.3g}). Lower --min_conf "
+          f"(pipeline: train.min_conf) or --min_rows to change this.")
+    return th
+
+def gold_metrics(model, featurize, path):
+    gold = read_table(path).dropna(subset=["text", "label"])
+    gold = gold[gold["label"].isin(LABELS)]
+    pred = model.predict(featurize(gold["text"].astype(str).tolist()))
+    r = evaluate(gold["label"].tolist(), pred, LABELS, n_boot=0)["predictions"]
+    return {"accuracy": r["accuracy"], "macro_f1": r["macro_f1"]}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--outdir", default="outputs_ws", help="run_label_model.py output directory")
+    ap.add_argument("--kind", default="embedding", choices=["embedding", "ngram"])
+    ap.add_argument("--encoder", default=DEFAULT_ENCODER)
+    ap.add_argument("--store", default=DEFAULT_STORE, help="embedding store root (shared by runs)")
+    ap.add_argument("--min_conf", type=float, default=0.75, help="drop rows whose max Y_prob is below")
+    ap.add_argument("--min_rows", type=int, default=200,
+                    help="if fewer rows reach --min_conf, lower it to keep the N most confident rows (0 = fail)")
+    ap.add_argument("--conf_power", type=float, default=1.0, help="row weight = max Y_prob ** conf_power")
+    ap.add_argument("--l2", type=float, default=None, help="default 1e-4 (embedding) / 1e-5 (ngram)")
+    ap.add_argument("--bits", type=int, default=18, help="ngram: 2**bits hash buckets")
+    ap.add_argument("--char_ngrams", type=int, nargs=2, default=[2, 4], help="ngram: min / max char n-gram")
+    ap.add_argument("--max_iter", type=int, default=300)
+    ap.add_argument("--gold", default="", help="gold table (text,label) to report accuracy / macro-F1")
+    ap.add_argument("--sweep", type=float, nargs="*", default=[], help="also fit and report these min_conf values")
+    ap.add_argument("--save_dir", default="artifacts/end_model")
+    args = ap.parse_args()
+    if args.l2 is None:
+        args.l2 = 1e-5 if args.kind == "ngram" else 1e-4
+
+    print("[1/3] Loading soft labels...")
+    texts, Y = soft_labels(args.outdir)
+    print(f"    {len(texts)} rows")
+    args.min_conf = fallback_min_conf(Y, args.min_conf, args.min_rows)
+
+    t0 = time.perf_counter()
+    if args.kind == "ngram":
+        featurizer = HashedNgrams(args.bits, tuple(args.char_ngrams))
+        print(f"[2/3] Hashed n-grams ({featurizer.config()})...")
+        featurize = featurizer.transform
+        X = featurize(texts)
+        print(f"    {X.nnz / max(len(texts), 1):.1f} features / text ({time.perf_counter() - t0:.1f}s)")
+        fit = lambda th: NgramModel.fit(texts, Y, LABELS, featurizer, min_conf=th, conf_power=args.conf_power,
+                                        l2=args.l2, max_iter=args.max_iter, X=X)
+    else:
+        print(f"[2/3] Embeddings ({args.encoder}, store {args.store})...")
+        store = EmbeddingStore(args.store, args.encoder)
+        n_before = len(store)
+        rows = store.lookup(texts, verbose=True)
+        X = store.matrix()[rows]
+        print(f"    {len(store) - n_before} texts embedded, {len(texts) - (len(store) - n_before)} from the store "
+              f"({time.perf_counter() - t0:.1f}s)")
+        featurize = store.embed
+        fit = lambda th: EndModel.fit(X, Y, LABELS, args.encoder, min_conf=th, conf_power=args.conf_power,
+                                      l2=args.l2, max_iter=args.max_iter)
+
+    print("[3/3] Fitting...")
+    runs = []
+    for th in list(args.sweep) + [args.min_conf]:
+        try:
+            model = fit(th)
+        except ValueError as e:
+            if th == args.min_conf:
+                raise
+            print(f"    min_conf={th:<5g} skipped: {e}")
+            continue
+        r = dict(model.meta)
+        if args.gold:
+            r.update(gold_metrics(model, featurize, args.gold))
+        runs.append(r)
+        print(f"    min_conf={th:<5g} n={r['n_train']:<7} {r['fit_seconds']:.2f}s"
+              + (f"  acc={r['accuracy']:.3f} F1={r['macro_f1']:.3f}" if args.gold else ""))
+    model.meta.update({k: v for k, v in runs[-1].items() if k in ("accuracy", "macro_f1")})
+    model.save(args.save_dir)
+    if args.sweep:
+        with open(os.path.join(args.save_dir, "sweep.json"), "w", encoding="utf-8") as f:
+            json.dump(runs, f, ensure_ascii=False, indent=2)
+    print(f"[✓] {args.kind} end model (min_conf={args.min_conf}) saved to {args.save_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# zero_shot.py
+"""
+Batched NLI zero-shot classification, shared by the LLM-labeler and the baseline scripts.
+
+Scores are the same as transformers' `pipeline("zero-shot-classification")` with
+multi_label=False: every (text, hypothesis_template.format(label)) pair goes through
+the NLI model and the entailment logits are softmaxed over the candidate labels.
+Instead of one pipeline call per text (= one tiny batch of K pairs), all pairs of a
+chunk are tokenized once, sorted by token length into buckets and run in padded
+batches of `batch_size` pairs, so each forward pass carries almost no padding.
+
+With a `ScoreCache`, texts are looked up by the hash of their normalized form (see
+zs_cache.normalize_text) and only the misses go through the model, on their original
+text: a cached run scores a text exactly as an uncached one, and variants that only
+differ in whitespace / Unicode composition reuse the scores of the first one seen. The
+model itself is loaded on the first miss, so a fully cached run never touches the weights. Tokenizer and weights come
+from model_registry.py: every engine of a process over the same model / backend shares
+one loaded instance, so engines are cheap to create.
+
+backend="onnx" runs an int8-quantized ONNX export of the same model with ONNX Runtime
+(see onnx_backend.py); its scores are cached under a separate key.
+
+`intra_op_threads` / `inter_op_threads` size the model's thread pools: the ONNX Runtime
+session options, or torch's process-wide pools for the torch backend. The entry points
+take them as one spec, `--zs_threads` / WS_ZS_THREADS = "INTRA[:INTER]" (parse_threads);
+unset = the runtime's default (all cores, one inter-op thread).
+"""
+import time, warnings
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+
+from zs_cache import ScoreCache, normalize_text, text_hash
+import model_registry, profiling
+
+DEFAULT_TEMPLATE = "This example is {}."  # same default as the HF pipeline
+
+
+def parse_threads(spec) -> Tuple[Optional[int], Optional[int]]:
+    """'4' -> (4, None), '4:2' -> (4, 2), '' / None / '0' -> (None, None): intra- / inter-op threads."""
+    parts = [p.strip() for p in str(spec or "").split(":")]
+    if len(parts) > 2 or not all(p.isdigit() for p in parts if p):
+        raise ValueError(f"zero-shot threads {spec!r}: expected INTRA or INTRA:INTER (integers)")
+    intra, inter = (parts + [""])[:2]
+    return (int(intra) or None) if intra else None, (int(inter) or None) if inter else None
+
+
+class ZeroShotEngine:
+    def __init__(self, model_name: str, hypothesis_template: str = DEFAULT_TEMPLATE,
+                 batch_size: int = 64, chunk_size: int = 4096, device: str = "cpu",
+                 cache: Optional[ScoreCache] = None, backend: str = "torch",
+                 quantize: bool = True, intra_op_threads: Optional[int] = None,
+                 inter_op_threads: Optional[int] = None):
+        if backend not in ("torch", "onnx"):
+            raise ValueError(f"Unknown backend: {backend}")
+        self.model_name = model_name
+        self.backend = backend
+        self.quantize = quantize
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.hypothesis_template = hypothesis_template
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.device = device
+        self.cache = cache
+        self.model = None
+
+    @property
+    def model_id(self) -> str:
+        """Identifies the scoring model, e.g. for cache keys."""
+        if self.backend == "onnx":
+            return f"{self.model_name}#onnx-{'int8' if self.quantize else 'fp32'}"
+        return self.model_name
+
+    def _load(self):
+        self.tokenizer = model_registry.tokenizer(self.model_name)
+        if self.backend == "onnx":
+            self.model = model_registry.onnx_nli(self.model_name, self.quantize, self.intra_op_threads,
+                                                 self.inter_op_threads)
+            config = model_registry.model_config(self.model_name)
+        else:
+            self._torch = model_registry.heavy_import("torch")
+            self._torch_threads()
+            self.model = model_registry.nli_model(self.model_name, self.device)
+            config = self.model.config
+        self.entailment_id = self._entailment_id(config)
+
+    def _torch_threads(self):
+        torch = self._torch
+        if self.intra_op_threads:
+            torch.set_num_threads(self.intra_op_threads)
+        if self.inter_op_threads and torch.get_num_interop_threads() != self.inter_op_threads:
+            try:
+                torch.set_num_interop_threads(self.inter_op_threads)
+            except RuntimeError:  # fixed once torch has run parallel work in this process
+                warnings.warn(f"torch inter-op threads already started ({torch.get_num_interop_threads()}); "
+                              f"ignoring inter_op_threads={self.inter_op_threads}")
+
+    def _forward(self, batch) -> np.ndarray:
+        """Logits [B, num_nli_classes] of one padded batch."""
+        if self.backend == "onnx":
+            return self.model(batch)
+        with self._torch.inference_mode():
+            batch = {k: v.to(self.device) for k, v in batch.items()}
+            return self.model(**batch).logits.float().cpu().numpy()
+
+    @staticmethod
+    def _entailment_id(config) -> int:
+        # same lookup as ZeroShotClassificationPipeline.entailment_id
+        for label, ind in config.label2id.items():
+            if label.lower().startswith("entail"):
+                return ind
+        return -1
+
+    def _entail_logits(self, texts: List[str], hypotheses: List[str]) -> np.ndarray:
+        """Entailment logit of every (text, hypothesis) pair -> [len(texts), len(hypotheses)]."""
+        if self.model is None:
+            self._load()
+        K = len(hypotheses)
+        enc = self.tokenizer([t for t in texts for _ in range(K)], hypotheses * len(texts),
+                             truncation="only_first")
+        keys = list(enc.keys())
+        n = len(enc["input_ids"])
+        # length buckets: consecutive batches in sorted order have near-equal lengths
+        order = sorted(range(n), key=lambda i: len(enc["input_ids"][i]))
+        logits = np.empty(n, dtype=np.float32)
+        tensors = "np" if self.backend == "onnx" else "pt"
+        for b in range(0, n, self.batch_size):
+            idx = order[b:b + self.batch_size]
+            batch = self.tokenizer.pad({k: [enc[k][i] for i in idx] for k in keys}, return_tensors=tensors)
+            logits[idx] = self._forward(batch)[:, self.entailment_id]
+        return logits.reshape(len(texts), K)
+
+    def scores(self, texts: Sequence, labels: Sequence[str]) -> np.ndarray:
+        """Zero-shot probabilities [N, K], columns in the order of `labels`."""
+        if self.cache is None:
+            return self._compute([str(t) for t in texts], labels)
+        ns = self.cache.namespace(self.model_id, labels, self.hypothesis_template)
+        norm = [normalize_text(t) for t in texts]
+        hashes = [text_hash(t) for t in norm]
+        found = self.cache.get_many(ns, hashes)
+        miss = {}  # hash -> original text, first occurrence only
+        for h, t in zip(hashes, texts):
+            if h not in found and h not in miss:
+                miss[h] = str(t)
+        profiling.record("zs_cache", self.model_id, calls=len(hashes), hits=len(hashes) - len(miss))
+        if miss:
+            new = dict(zip(miss, self._compute(list(miss.values()), labels)))
+            self.cache.put_many(ns, new)
+            found.update(new)
+        if not hashes:
+            return np.empty((0, len(labels)), dtype=np.float32)
+        return np.stack([found[h] for h in hashes])
+
+    def _compute(self, texts: List[str], labels: Sequence[str]) -> np.ndarray:
+        t0 = time.perf_counter()
+        hypotheses = [self.hypothesis_template.format(lab) for lab in labels]
+        logits = np.empty((len(texts), len(labels)), dtype=np.float32)
+        for s in range(0, len(texts), self.chunk_size):
+            chunk = texts[s:s + self.chunk_size]
+            logits[s:s + len(chunk)] = self._entail_logits(chunk, hypotheses)
+        profiling.record("zero_shot", self.model_id, items=len(texts), seconds=time.perf_counter() - t0)
+        e = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return e / e.sum(axis=1, keepdims=True)
+
+    def predict(self, texts: Sequence, labels: Sequence[str]) -> List[str]:
+        """Top-1 label per text (what `clf(t, candidate_labels=labels)["labels"][0]` returns)."""
+        if len(texts) == 0:
+            return []
+        top = self.scores(texts, labels).argmax(axis=1)
+        return [labels[k] for k in top]
@@ -0,0 +1,130 @@
+# zs_cache.py
+"""
+Persistent, content-addressed cache of zero-shot score vectors (single SQLite file).
+
+Entries are keyed by a namespace = hash(model name, ordered candidate labels,
+hypothesis template) and the hash of the normalized text. The full probability
+vector is stored (float32), so changing `top1_threshold` never needs re-inference.
+
+- Several processes may share one file: WAL journal, busy timeout, short
+  IMMEDIATE write transactions, one connection per process (re-opened after fork).
+- `max_entries` caps the size; least recently used entries are evicted first. The row
+  count lives in a one-row table kept up to date by an insert trigger, so a write never
+  scans the table to find out whether eviction is due.
+"""
+import hashlib, os, re, sqlite3, time, unicodedata
+from typing import Dict, Iterable, Sequence
+import numpy as np
+
+DEFAULT_CACHE_PATH = "cache/zero_shot_scores.sqlite"
+
+_WS = re.compile(r"\s+")
+_SQL_CHUNK = 500  # stay below SQLite's host-parameter limit
+
+
+def normalize_text(text: str) -> str:
+    """NFC + collapsed whitespace: the cache key form, shared by texts that only differ in these."""
+    return _WS.sub(" ", unicodedata.normalize("NFC", str(text))).strip()
+
+
+def text_hash(norm_text: str) -> str:
+    return hashlib.sha1(norm_text.encode("utf-8")).hexdigest()
+
+
+class ScoreCache:
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = 2_000_000, timeout: float = 60.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._pid = None
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+
+    @staticmethod
+    def namespace(model_name: str, labels: Sequence[str], template: str) -> str:
+        key = "\x1f".join([model_name, "\x1e".join(labels), template])
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS scores ("
+                " ns TEXT NOT NULL, h TEXT NOT NULL, k INTEGER NOT NULL, v BLOB NOT NULL,"
+                " last_used REAL NOT NULL, PRIMARY KEY (ns, h)) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS scores_lru ON scores(last_used)")
+            with self._write(conn):
+                conn.execute("CREATE TABLE IF NOT EXISTS scores_count ("
+                             " id INTEGER PRIMARY KEY CHECK (id = 0), n INTEGER NOT NULL)")
+                conn.execute("CREATE TRIGGER IF NOT EXISTS scores_insert AFTER INSERT ON scores"
+                             " BEGIN UPDATE scores_count SET n = n + 1; END")
+                # counted once, for a file written before the counter existed
+                conn.execute("INSERT OR IGNORE INTO scores_count SELECT 0, COUNT(*) FROM scores")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get_many(self, ns: str, hashes: Iterable[str]) -> Dict[str, np.ndarray]:
+        hashes = list(dict.fromkeys(hashes))
+        db = self._db()
+        found: Dict[str, np.ndarray] = {}
+        for s in range(0, len(hashes), _SQL_CHUNK):
+            part = hashes[s:s + _SQL_CHUNK]
+            q = f"SELECT h, v FROM scores WHERE ns=? AND h IN ({','.join('?' * len(part))})"
+            for h, v in db.execute(q, [ns, *part]):
+                found[h] = np.frombuffer(v, dtype=np.float32)
+        if found:
+            now = time.time()
+            with self._write(db):
+                db.executemany("UPDATE scores SET last_used=? WHERE ns=? AND h=?",
+                               [(now, ns, h) for h in found])
+        self.hits += len(found)
+        self.misses += len(hashes) - len(found)
+        return found
+
+    def put_many(self, ns: str, items: Dict[str, np.ndarray]):
+        if not items:
+            return
+        now = time.time()
+        rows = [(ns, h, len(v), np.asarray(v, dtype=np.float32).tobytes(), now) for h, v in items.items()]
+        db = self._db()
+        with self._write(db):
+            # an upsert, not INSERT OR REPLACE: only new rows fire the counting trigger
+            db.executemany("INSERT INTO scores VALUES (?,?,?,?,?) ON CONFLICT (ns, h) DO UPDATE"
+                           " SET k=excluded.k, v=excluded.v, last_used=excluded.last_used", rows)
+            self._evict(db)
+
+    @staticmethod
+    def _count(db: sqlite3.Connection) -> int:
+        return db.execute("SELECT n FROM scores_count").fetchone()[0]
+
+    def _evict(self, db: sqlite3.Connection):
+        n = self._count(db)
+        if n > self.max_entries:
+            # drop down to 90% of the cap so eviction does not run on every insert
+            drop = n - int(self.max_entries * 0.9)
+            db.execute("DELETE FROM scores WHERE (ns, h) IN "
+                       "(SELECT ns, h FROM scores ORDER BY last_used LIMIT ?)", (drop,))
+            db.execute("UPDATE scores_count SET n = (SELECT COUNT(*) FROM scores)")
+
+    class _write:
+        """BEGIN IMMEDIATE ... COMMIT: takes the write lock up front, waits up to `timeout`."""
+        def __init__(self, db):
+            self.db = db
+        def __enter__(self):
+            self.db.execute("BEGIN IMMEDIATE")
+        def __exit__(self, exc_type, *_):
+            self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        n = self._count(self._db())
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "entries": n, "max_entries": self.max_entries}